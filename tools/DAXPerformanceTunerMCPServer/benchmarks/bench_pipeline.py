@@ -0,0 +1,181 @@
+"""Benchmarks for the tuner's Python pipeline, run offline against replay fixtures.
+
+Usage (from the project root, with the server's requirements installed)::
+
+    python benchmarks/bench_pipeline.py                      # synthetic model
+    python benchmarks/bench_pipeline.py --scale 2            # twice the default model size
+    python benchmarks/bench_pipeline.py --fixtures recorded/ --query-file query.dax
+    python benchmarks/bench_pipeline.py --save baseline.json
+    python benchmarks/bench_pipeline.py --compare baseline.json --tolerance 0.25
+
+``--fixtures`` points at a directory recorded with ``DAX_TUNER_RECORD_DIR``.
+``--compare`` exits non-zero when any benchmark's median is slower than the
+saved baseline by more than ``--tolerance``.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dax_performance_tuner.core import execution, metadata  # noqa: E402
+from dax_performance_tuner.core.analysis import fingerprint_results  # noqa: E402
+from dax_performance_tuner.core.session import session_manager  # noqa: E402
+from dax_performance_tuner.infrastructure.replay import FixtureStore, replay_fixtures  # noqa: E402
+from dax_performance_tuner.response_encoder import encode_response  # noqa: E402
+from synthetic_model import DATASET_NAME, DESKTOP_ENDPOINT, build_fixture_store, build_model  # noqa: E402
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def _dependency_collection(query: str) -> Callable[[], Any]:
+    model = metadata.get_complete_model_definition(DESKTOP_ENDPOINT, DATASET_NAME)
+    measures_info, measure_lookup = execution._build_measure_catalog(model.get("measures", []))
+    functions_data = metadata.execute_dmv_query(
+        DESKTOP_ENDPOINT, DATASET_NAME, "SELECT * FROM $SYSTEM.TMSCHEMA_FUNCTIONS"
+    )
+    if not isinstance(functions_data, list):
+        functions_data = []
+    functions_info, function_lookup = execution._build_function_catalog(functions_data)
+    define_block, main_query = execution._parse_define_block(query)
+
+    def run():
+        functions, measures = execution._collect_dependencies(
+            define_block + main_query,
+            execution._find_existing_measures(define_block),
+            execution._find_existing_functions(define_block),
+            measures_info, measure_lookup, functions_info, function_lookup
+        )
+        return execution._build_enhanced_query(query, functions, measures)
+
+    return run
+
+
+def _executor_results(query: str) -> List[Dict[str, Any]]:
+    success, data, error = execution.execute_with_dax_executor(query, DESKTOP_ENDPOINT, DATASET_NAME)
+    if not success:
+        raise RuntimeError(error)
+    return data.get("Results", [])
+
+
+def _equivalence(query: str) -> Callable[[], Any]:
+    session_id = session_manager.create_session("Benchmark", DATASET_NAME, DESKTOP_ENDPOINT)
+    execution.execute_dax_query_core(query, execution_mode="baseline", session_id=session_id)
+    session = session_manager.get_session(session_id)
+    current = {"results": _executor_results(query)}
+
+    def run():
+        with session.lock:
+            return execution.compute_semantic_equivalence(session, current)
+
+    return run
+
+
+def _response_serialization(query: str) -> Callable[[], Any]:
+    session_id = session_manager.create_session("Benchmark", DATASET_NAME, DESKTOP_ENDPOINT)
+    response = execution.execute_dax_query_core(query, execution_mode="baseline", session_id=session_id)
+
+    def run():
+        return encode_response(response, "execute_dax_query")
+
+    return run
+
+
+def run_benchmarks(store: FixtureStore, query: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    with replay_fixtures(store):
+        results["dependency_collection"] = _measure(_dependency_collection(query), repeat)
+        executor_results = _executor_results(query)
+        results["result_fingerprint"] = _measure(lambda: fingerprint_results(executor_results), repeat)
+        results["semantic_equivalence"] = _measure(_equivalence(query), repeat)
+        results["metadata_shaping"] = _measure(
+            lambda: metadata.get_limited_metadata(query, DESKTOP_ENDPOINT, DATASET_NAME), repeat
+        )
+        results["execute_query_end_to_end"] = _measure(
+            lambda: execution.execute_dax_query_core(query, execution_mode="baseline"), repeat
+        )
+        results["response_serialization"] = _measure(_response_serialization(query), repeat)
+    return results
+
+
+def _compare(results: Dict[str, Dict[str, float]], baseline_path: Path, tolerance: float) -> List[str]:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = []
+    for name, timing in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        limit = previous["median_ms"] * (1 + tolerance)
+        if timing["median_ms"] > limit:
+            regressions.append(
+                f"{name}: {timing['median_ms']:.1f} ms vs baseline {previous['median_ms']:.1f} ms"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=Path, help="Directory of recorded fixtures (default: synthetic model)")
+    parser.add_argument("--query-file", type=Path, help="DAX query to replay (required with --fixtures)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Synthetic model size multiplier")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="Write timings to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown versus baseline")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        if not args.query_file:
+            parser.error("--query-file is required with --fixtures")
+        store = FixtureStore.from_directory(args.fixtures)
+        query = args.query_file.read_text(encoding="utf-8")
+    else:
+        scale = args.scale
+        model = build_model(
+            tables=max(2, int(40 * scale)),
+            measures=max(10, int(1500 * scale)),
+            result_rows=max(10, int(50000 * scale)),
+            events=max(10, int(2000 * scale)),
+        )
+        store = build_fixture_store(model)
+        query = model["query"]
+
+    results = run_benchmarks(store, query, args.repeat)
+
+    width = max(len(name) for name in results)
+    print(f"{'benchmark'.ljust(width)}  {'min ms':>10}  {'median ms':>10}  {'max ms':>10}")
+    for name, timing in results.items():
+        print(f"{name.ljust(width)}  {timing['min_ms']:>10.2f}  {timing['median_ms']:>10.2f}  {timing['max_ms']:>10.2f}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.compare:
+        regressions = _compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
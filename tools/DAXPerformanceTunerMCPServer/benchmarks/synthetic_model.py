@@ -0,0 +1,158 @@
+"""Synthetic fixtures shaped like a mid-sized star-schema model.
+
+Builds a ``FixtureStore`` whose pattern entries answer the INFO.* metadata
+queries, the TMSCHEMA_FUNCTIONS DMV, INFO.CALCDEPENDENCY and DaxExecutor runs,
+so benchmarks can run at realistic sizes without a recorded model.
+"""
+
+import json
+import random
+from typing import Any, Dict, List
+
+from dax_performance_tuner.infrastructure.replay import EXECUTOR_KIND, XMLA_KIND, FixtureStore
+
+DATASET_NAME = "SyntheticModel"
+DESKTOP_ENDPOINT = "localhost:50000"
+
+
+def _xmla(match: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns = list(rows[0].keys()) if rows else []
+    return {
+        "kind": XMLA_KIND,
+        "match": match,
+        "payload": json.dumps({"columns": columns, "rows": rows, "row_count": len(rows)}),
+    }
+
+
+def build_model(
+    tables: int = 40,
+    columns_per_table: int = 30,
+    measures: int = 1500,
+    functions: int = 50,
+    result_rows: int = 50000,
+    result_columns: int = 8,
+    events: int = 2000,
+    seed: int = 7,
+) -> Dict[str, Any]:
+    """Return the raw synthetic model plus the benchmark query that touches it."""
+    rng = random.Random(seed)
+    table_names = [f"Table {t}" for t in range(tables)]
+
+    table_rows = [
+        {"[@table_id]": str(t + 1), "[@table_name]": name, "[@description]": None, "[@is_hidden]": "False"}
+        for t, name in enumerate(table_names)
+    ]
+
+    column_rows = []
+    column_id = 1000
+    for t in range(tables):
+        for c in range(columns_per_table):
+            column_id += 1
+            column_rows.append({
+                "[@column_id]": str(column_id),
+                "[@table_id]": str(t + 1),
+                "[@column_name]": f"Column {c}",
+                "[@description]": None,
+                "[@data_type]": rng.choice(["2", "6", "8", "9", "10"]),
+                "[@is_hidden]": "False",
+                "[@format_string]": None,
+            })
+
+    # Each measure references one or two earlier measures and a function, forming deep chains
+    measure_rows = []
+    for m in range(measures):
+        refs = [f"[Measure {rng.randrange(m)}]" for _ in range(min(m, 2))]
+        func = f"Fn.Helper{rng.randrange(functions)}" if functions else "SUM"
+        expression = f"{func}( SUM ( 'Table 0'[Column {m % columns_per_table}] ) ) + " + " + ".join(refs or ["0"])
+        measure_rows.append({
+            "[@measure_id]": str(50000 + m),
+            "[@table_id]": str(m % tables + 1),
+            "[@measure_name]": f"Measure {m}",
+            "[@description]": None,
+            "[@expression]": expression,
+            "[@format_string]": "#,0",
+            "[@is_hidden]": "False",
+            "[@display_folder]": None,
+        })
+
+    # Table 0 is the fact; every other table filters it, a few bidirectionally
+    relationship_rows = []
+    for t in range(1, tables):
+        relationship_rows.append({
+            "[@from_table_id]": "1",
+            "[@from_column_id]": str(1001 + t % columns_per_table),
+            "[@to_table_id]": str(t + 1),
+            "[@to_column_id]": str(1001 + t * columns_per_table),
+            "[@cross_filtering_behavior]": "2" if t % 10 == 0 else "1",
+            "[@is_active]": "True",
+            "[@from_cardinality]": "2",
+            "[@to_cardinality]": "1",
+        })
+
+    function_rows = [
+        {"Name": f"Fn.Helper{f}", "Expression": f"( x ) => x * {f + 1} + [Measure {rng.randrange(max(measures, 1))}]"}
+        for f in range(functions)
+    ]
+
+    top_measures = [f"Measure {m}" for m in range(measures - 5, measures)]
+    query = (
+        "EVALUATE\nSUMMARIZECOLUMNS(\n    'Table 1'[Column 0],\n"
+        + ",\n".join(f'    "{name}", [{name}]' for name in top_measures)
+        + "\n)"
+    )
+
+    dependency_rows = [
+        {"[@referenced_object_type]": "MEASURE", "[@referenced_table]": table_names[m % tables],
+         "[@referenced_object]": f"Measure {m}"}
+        for m in range(measures)
+    ] + [
+        {"[@referenced_object_type]": "COLUMN", "[@referenced_table]": table_names[t],
+         "[@referenced_object]": "Column 0"}
+        for t in range(0, tables, 3)
+    ]
+
+    rows = [
+        {f"[Col{c}]": (rng.random() * 1000 if c else f"Key {r}") for c in range(result_columns)}
+        for r in range(result_rows)
+    ]
+    executor_result = {
+        "Results": [{"ResultNumber": 1, "RowCount": result_rows, "ColumnCount": result_columns, "Rows": rows}],
+        "Performance": {"Total": 1234, "FE": 400, "SE": 834, "SE_CPU": 2100, "SE_Par": 2.5,
+                        "SE_Queries": events // 2, "SE_Cache": 3, "QueryEnd": "2024-01-01T00:00:00"},
+        "EventDetails": [
+            {"Line": e, "Class": "VertiPaq", "Subclass": "Scan", "Duration": rng.randrange(50),
+             "CPU": rng.randrange(100), "Rows": rng.randrange(10000), "KB": rng.randrange(500),
+             "Query": f"SET DC_KIND=\"AUTO\"; SELECT 'Table {e % tables}'[Column 0] FROM 'Table {e % tables}';"}
+            for e in range(events)
+        ],
+    }
+
+    return {
+        "query": query,
+        "tables": table_rows,
+        "columns": column_rows,
+        "measures": measure_rows,
+        "relationships": relationship_rows,
+        "functions": function_rows,
+        "dependencies": dependency_rows,
+        "executor_result": executor_result,
+    }
+
+
+def build_fixture_store(model: Dict[str, Any]) -> FixtureStore:
+    column_names = [
+        {"[@column_id]": row["[@column_id]"], "[@column_name]": row["[@column_name]"]}
+        for row in model["columns"]
+    ]
+    functions = [{f"[@{key}]": value for key, value in row.items()} for row in model["functions"]]
+    return FixtureStore([
+        _xmla(["INFO.TABLES()"], model["tables"]),
+        _xmla(["INFO.COLUMNS()", "@data_type"], model["columns"]),
+        _xmla(["INFO.COLUMNS()"], column_names),
+        _xmla(["INFO.MEASURES()"], model["measures"]),
+        _xmla(["INFO.RELATIONSHIPS()"], model["relationships"]),
+        _xmla(["INFO.CALCDEPENDENCY"], model["dependencies"]),
+        _xmla(["TMSCHEMA_FUNCTIONS"], functions),
+        {"kind": EXECUTOR_KIND, "match": ["EVALUATE"],
+         "payload": {"success": True, "data": model["executor_result"], "error": None}},
+    ])
@@ -40,3 +40,39 @@ DAX_EXECUTOR_RELATIVE_PATH = "dax_executor/bin/Release/net8.0-windows/win-x64/Da
 RESEARCH_REQUEST_TIMEOUT = 30
 RESEARCH_MAX_WORKERS = 8
 RESEARCH_MIN_CONTENT_LENGTH = 200
+
+# Session management
+SESSION_MAX_SESSIONS = 8                   # LRU-evict idle sessions beyond this count
+SESSION_IDLE_TIMEOUT_SECONDS = 3600        # Sessions untouched for an hour are evicted
+SESSION_MAX_CONCURRENT_PER_DATASET = 2     # Concurrent executions allowed against one model
+SESSION_DATASET_SLOT_TIMEOUT_SECONDS = DAX_EXECUTION_TIMEOUT_SECONDS
+SESSION_MEMORY_BUDGET_BYTES = 32 * 1024 * 1024  # Result rows/event details beyond this spill to disk
+
+# Desktop instance discovery
+DESKTOP_DISCOVERY_CACHE_TTL_SECONDS = 15   # Reuse discovery results while the msmdsrv PID/port set is unchanged
+DESKTOP_DISCOVERY_MAX_WORKERS = 8          # Parallel TOM connections when listing databases per port
+
+# Power BI Service discovery
+POWERBI_API_TIMEOUT_SECONDS = 30
+POWERBI_API_PAGE_SIZE = 1000               # $top used when paging /groups
+SERVICE_DISCOVERY_MAX_WORKERS = 4          # Concurrent page requests
+SERVICE_DISCOVERY_CACHE_TTL_SECONDS = 300  # Workspace and dataset listings are reused for five minutes
+
+# Offline replay
+REPLAY_RECORD_DIR_ENV = "DAX_TUNER_RECORD_DIR"  # When set, executor and XMLA outputs are recorded as fixtures here
+
+# Tool response encoding (sizes are in serialized characters)
+RESPONSE_DEFAULT_BUDGET_CHARS = 200_000
+RESPONSE_BUDGET_CHARS = {
+    "execute_dax_query": 250_000,
+    "prepare_query_for_optimization": 400_000,
+    "get_query_details": 500_000,
+}
+RESPONSE_MIN_ITEMS_KEPT = 10               # Truncated arrays keep at least this many items
+RESPONSE_STORE_MAX_ENTRIES = 16            # Truncated arrays retained for get_response_page
+
+# Filter-context sweeps
+SWEEP_TOP_K_DEFAULT = 5                    # Most frequent values per filter column
+SWEEP_MAX_CONTEXTS = 25                    # Filter combinations executed per sweep
+SWEEP_MAX_CONCURRENCY = 2                  # Sweep executions in flight (per-dataset slots still apply)
+SWEEP_WORST_CONTEXTS = 5                   # Slowest contexts reported per definition
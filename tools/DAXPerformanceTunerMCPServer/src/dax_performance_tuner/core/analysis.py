@@ -5,6 +5,7 @@ equivalence between baseline and optimized runs, and selecting the fastest
 execution result recorded by the .NET DAX executor.
 """
 
+import hashlib
 import json
 from typing import Any, Dict, List
 
@@ -23,6 +24,32 @@ def _row_signatures(rows: Any) -> List[str]:
     return signatures
 
 
+def fingerprint_results(results: Any) -> List[Dict[str, Any]]:
+    """Summarize each result set as counts plus an order-insensitive digest of its rows.
+
+    Fingerprints are small enough to keep in session memory and are all that
+    semantic equivalence needs, so full rows can live elsewhere.
+    """
+    if not isinstance(results, list):
+        return []
+
+    fingerprints: List[Dict[str, Any]] = []
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        digest = hashlib.sha256()
+        for signature in _row_signatures(result.get("Rows", [])):
+            digest.update(signature.encode("utf-8"))
+            digest.update(b"\n")
+        fingerprints.append({
+            "ResultNumber": result.get("ResultNumber", 0),
+            "RowCount": result.get("RowCount", 0),
+            "ColumnCount": result.get("ColumnCount", 0),
+            "RowsDigest": digest.hexdigest(),
+        })
+    return fingerprints
+
+
 def calculate_improvement(
     baseline_metrics: Dict[str, Any],
     optimized_metrics: Dict[str, Any]
@@ -61,9 +88,11 @@ def compute_semantic_equivalence(
             "reasons": ["Baseline record not found"],
         }
     
-    # Extract baseline results array from the results dict
+    # Baseline rows may have been spilled to disk; fingerprints always stay in memory
     baseline_result_data = baseline_record.get("results", {})
-    baseline_results = baseline_result_data.get("results", [])
+    baseline_results = baseline_result_data.get("result_fingerprints")
+    if baseline_results is None:
+        baseline_results = fingerprint_results(baseline_result_data.get("results", []))
     
     if not baseline_results:
         return {
@@ -73,7 +102,7 @@ def compute_semantic_equivalence(
         }
 
     # Get current results array
-    current_results = current_query_data.get("results", [])
+    current_results = fingerprint_results(current_query_data.get("results", []))
     
     # Check result count matches
     if len(current_results) != len(baseline_results):
@@ -86,16 +115,14 @@ def compute_semantic_equivalence(
         }
     
     # Compare each result by ResultNumber
+    baseline_by_number = {r.get("ResultNumber"): r for r in baseline_results}
     all_reasons = []
     
     for current_result in current_results:
         result_num = current_result.get("ResultNumber", 0)
         
         # Find matching baseline result by ResultNumber
-        baseline_result = next(
-            (r for r in baseline_results if r.get("ResultNumber") == result_num), 
-            None
-        )
+        baseline_result = baseline_by_number.get(result_num)
         
         if not baseline_result:
             all_reasons.append(f"Result #{result_num}: No matching baseline found")
@@ -118,10 +145,7 @@ def compute_semantic_equivalence(
         
         # Compare data if counts match
         if current_rows == baseline_rows and current_cols == baseline_cols:
-            current_rows_data = current_result.get("Rows", [])
-            baseline_rows_data = baseline_result.get("Rows", [])
-            
-            if _row_signatures(current_rows_data) != _row_signatures(baseline_rows_data):
+            if current_result.get("RowsDigest") != baseline_result.get("RowsDigest"):
                 all_reasons.append(f"Result #{result_num}: Data values differ")
 
     return {
@@ -152,7 +152,11 @@ def _handle_service_connection(
         
         # If workspace was specified but no datasets found, check if workspace exists
         if workspace_name and len(datasets) == 0:
-            workspace_result = list_workspaces()
+            # Suggest workspaces whose name contains the one given; list them all only when none does
+            search = workspace_name.strip()
+            workspace_result = list_workspaces(name_filter=search) if search else {}
+            if not workspace_result.get("workspaces"):
+                workspace_result = list_workspaces()
             if workspace_result.get("status") == "error":
                 return workspace_result
             
@@ -215,6 +219,12 @@ def _attempt_connection(
                 }
         
         if not _test_xmla_connection(resolved_endpoint, dataset_name):
+            if is_desktop:
+                from ..infrastructure.discovery import clear_desktop_discovery_cache
+                clear_desktop_discovery_cache()
+            else:
+                from ..infrastructure.powerbi_api import clear_discovery_cache
+                clear_discovery_cache()
             return {
                 "status": "error",
                 "error": f"Failed to connect to dataset '{dataset_name}' at {resolved_endpoint}"
@@ -222,7 +232,7 @@ def _attempt_connection(
         
         try:
             from .session import session_manager
-            session_manager.create_session(resolved_workspace, dataset_name, resolved_endpoint)
+            session_id = session_manager.create_session(resolved_workspace, dataset_name, resolved_endpoint)
         except Exception as exc:
             return {
                 "status": "error",
@@ -232,6 +242,7 @@ def _attempt_connection(
         return {
             "status": "success",
             "action": "connected",
+            "session_id": session_id,
             "workspace_name": resolved_workspace,
             "dataset_name": dataset_name,
             "xmla_endpoint": resolved_endpoint,
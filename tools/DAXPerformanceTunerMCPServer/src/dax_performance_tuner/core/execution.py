@@ -7,7 +7,7 @@ from ..infrastructure.auth import get_access_token
 from ..infrastructure.xmla import is_desktop_connection
 from .analysis import calculate_improvement, compute_semantic_equivalence, select_fastest_run
 from ..infrastructure.dax_executor import execute_with_dax_executor
-from .session import validate_session, session_manager
+from .session import validate_session, session_manager, SessionState
 from ..config import (
     DAX_EXECUTION_RUNS,
     DAX_EXECUTION_TIMEOUT_SECONDS,
@@ -15,16 +15,18 @@ from ..config import (
 )
 
 
-def _get_connection_details() -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
-    """Get connection details from current session with auth token if needed.
+def _get_connection_details(
+    session_id: Optional[str] = None
+) -> Tuple[Optional[SessionState], Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """Get connection details from the requested session with auth token if needed.
     
     Returns:
-        Tuple of (xmla_endpoint, dataset_name, access_token, error_message)
+        Tuple of (session, xmla_endpoint, dataset_name, access_token, error_message)
         If error_message is not None, other values should be ignored.
     """
-    is_valid, session, error_msg = validate_session()
+    is_valid, session, error_msg = validate_session(session_id)
     if not is_valid:
-        return None, None, None, error_msg or "No active optimization session found"
+        return None, None, None, None, error_msg or "No active optimization session found"
     
     xmla_endpoint = session.connection_info.xmla_endpoint
     dataset_name = session.connection_info.dataset_name
@@ -35,9 +37,9 @@ def _get_connection_details() -> Tuple[Optional[str], Optional[str], Optional[st
     if not is_desktop:
         access_token = get_access_token()
         if not access_token:
-            return None, None, None, "No access token for Power BI Service connection. Please reconnect using connect_to_dataset."
+            return None, None, None, None, "No access token for Power BI Service connection. Please reconnect using connect_to_dataset."
     
-    return xmla_endpoint, dataset_name, access_token, None
+    return session, xmla_endpoint, dataset_name, access_token, None
 
 
 def execute_multiple_dax_runs(
@@ -269,16 +271,23 @@ def _build_enhanced_query(
 
 def execute_dax_query_core(
     dax_query: str, 
-    execution_mode: str = "optimization"
+    execution_mode: str = "optimization",
+    session_id: Optional[str] = None
 ) -> Dict[str, Any]:
     try:
-        xmla_endpoint, dataset_name, access_token, error_msg = _get_connection_details()
+        session_state, xmla_endpoint, dataset_name, access_token, error_msg = _get_connection_details(session_id)
         if error_msg:
             return {"status": "error", "error": error_msg}
 
-        runs, all_success, recent_error = execute_multiple_dax_runs(
-            xmla_endpoint, dataset_name, access_token, dax_query
-        )
+        with session_manager.dataset_execution_slot(session_state) as acquired:
+            if not acquired:
+                return {
+                    "status": "error",
+                    "error": f"Too many concurrent executions against '{dataset_name}'. Retry once a running query finishes."
+                }
+            runs, all_success, recent_error = execute_multiple_dax_runs(
+                xmla_endpoint, dataset_name, access_token, dax_query
+            )
 
         if not all_success:
             return {
@@ -295,10 +304,11 @@ def execute_dax_query_core(
         semantic_equivalence = None
         
         if execution_mode == "optimization":
-            session_state = session_manager.get_current_session()
-            
-            if session_state and session_state.query_data["summary"].get("baseline_established"):
+            with session_state.lock:
+                baseline_established = bool(session_state.query_data["summary"].get("baseline_established"))
                 baseline_data = session_state.query_data.get("baseline", {})
+            
+            if baseline_established:
                 baseline_performance = baseline_data.get("results", {}).get("performance_metrics", {})
                 current_performance = {
                     "total_ms": performance_data.get("Total", 0),
@@ -319,7 +329,8 @@ def execute_dax_query_core(
                 # Simple: just pass the results array
                 current_query_data = {"results": results}
                 
-                semantic_equivalence = compute_semantic_equivalence(session_state, current_query_data)
+                with session_state.lock:
+                    semantic_equivalence = compute_semantic_equivalence(session_state, current_query_data)
 
         session_manager.track_dax_query_execution(
             dax_query=dax_query,
@@ -336,11 +347,14 @@ def execute_dax_query_core(
             },
             result_data=results,
             performance_analysis=performance_analysis if performance_analysis else None,
-            semantic_equivalence=semantic_equivalence if semantic_equivalence else None
+            semantic_equivalence=semantic_equivalence if semantic_equivalence else None,
+            session_id=session_state.session_id,
+            event_details=dax_executor_result.get("EventDetails", [])
         )
 
         response_data = {
-            "status": "success"
+            "status": "success",
+            "session_id": session_state.session_id
         }
 
         if performance_analysis:
@@ -364,13 +378,13 @@ def execute_dax_query_core(
         }
 
 
-def prepare_query_for_optimization_core(query: str) -> Dict[str, Any]:
+def prepare_query_for_optimization_core(query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
     try:
-        xmla_endpoint, dataset_name, access_token, error_msg = _get_connection_details()
+        session_state, xmla_endpoint, dataset_name, access_token, error_msg = _get_connection_details(session_id)
         if error_msg:
             return {"status": "error", "error": error_msg}
 
-        session_manager.establish_new_baseline_for_current_session(query)
+        session_manager.establish_new_baseline(query, session_id=session_state.session_id)
         define_block, main_query = _parse_define_block(query)
 
         # Find already-defined measures and functions
@@ -437,7 +451,8 @@ def prepare_query_for_optimization_core(query: str) -> Dict[str, Any]:
         # STEP 2: Execute baseline query
         baseline_execution = execute_dax_query_core(
             dax_query=enhanced_query,
-            execution_mode="baseline"
+            execution_mode="baseline",
+            session_id=session_state.session_id
         )
 
         try:
@@ -459,6 +474,7 @@ def prepare_query_for_optimization_core(query: str) -> Dict[str, Any]:
 
         return {
             "status": "success",
+            "session_id": session_state.session_id,
             "prepared_query": {
                 "enhanced_query": enhanced_query,
                 "original_query": query,
@@ -1,17 +1,44 @@
 """
 Session management primitives for the DAX Performance Tuner workflow.
 
-The module exposes a minimal in-memory session store that captures:
+The module exposes an in-memory session store, keyed by session id, that captures:
 - Connection metadata
 - DAX query executions (baseline + optimizations)
 - Derived performance insights for the best optimization so far
 - Lightweight audit information for tool executions
+
+Each session carries its own lock so tuning efforts against different models run
+concurrently; idle sessions are evicted LRU-first and executions against a single
+dataset are bounded by a per-dataset concurrency limit.
+
+Query records keep only summaries and result fingerprints in ``query_data``; the
+bulky payload (result rows and trace event details) is held in memory up to a
+per-session budget and spilled oldest-first to a temporary on-disk store beyond it.
 """
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
 import threading
+import time
+import uuid
+
+from ..config import (
+    SESSION_MAX_SESSIONS,
+    SESSION_IDLE_TIMEOUT_SECONDS,
+    SESSION_MAX_CONCURRENT_PER_DATASET,
+    SESSION_DATASET_SLOT_TIMEOUT_SECONDS,
+    SESSION_MEMORY_BUDGET_BYTES,
+)
+from .analysis import fingerprint_results
+from .spill_store import SpillStore
+
+
+def _new_session_id() -> str:
+    return uuid.uuid4().hex[:12]
 
 
 def _create_empty_query_data() -> Dict[str, Any]:
@@ -37,19 +64,48 @@ class ConnectionInfo:
     dataset_name: str
     workspace_name: str
 
+    @property
+    def dataset_key(self) -> Tuple[str, str]:
+        """Key identifying the underlying model, used for per-dataset limits."""
+        return (self.xmla_endpoint or "").lower(), (self.dataset_name or "").lower()
+
+
 @dataclass 
 class SessionState:
     
     connection_info: ConnectionInfo
+    session_id: str = field(default_factory=_new_session_id)
     created_at: datetime = field(default_factory=datetime.now)
     last_updated: datetime = field(default_factory=datetime.now)
+    last_accessed: float = field(default_factory=time.monotonic, repr=False)
     query_data: Dict[str, Any] = field(default_factory=_create_empty_query_data)
+    memory_budget_bytes: int = SESSION_MEMORY_BUDGET_BYTES
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+    in_flight: int = field(default=0, repr=False, compare=False)  # Executions in a dataset slot; guarded by the registry lock
+    _resident_payloads: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = field(
+        default_factory=OrderedDict, repr=False, compare=False
+    )
+    _spill_store: SpillStore = field(default_factory=SpillStore, repr=False, compare=False)
 
     def update_timestamp(self) -> None:
         self.last_updated = datetime.now()
+        self.touch()
+
+    def touch(self) -> None:
+        self.last_accessed = time.monotonic()
+
+    def is_busy(self) -> bool:
+        """True while an execution is in flight or another thread holds the session lock."""
+        if self.in_flight:
+            return True
+        if not self.lock.acquire(blocking=False):
+            return True
+        self.lock.release()
+        return False
     
     def track_query_execution(self, query: str, execution_mode: str, results: Dict[str, Any], 
-                             error: Optional[str] = None) -> str:
+                             error: Optional[str] = None,
+                             event_details: Optional[List[Dict[str, Any]]] = None) -> str:
         if execution_mode == "baseline":
             query_id = "baseline"
         else:
@@ -57,12 +113,20 @@ class SessionState:
             current_count = len(optimization_queries) + 1
             query_id = f"optimization_{current_count}"
         
+        result_rows = results.pop("results", None) or []
+        results["result_fingerprints"] = fingerprint_results(result_rows)
+        payload_size = self._store_payload(query_id, {
+            "results": result_rows,
+            "event_details": event_details or [],
+        })
+        
         query_record = {
             "query_id": query_id,
             "query_text": query,
             "execution_mode": execution_mode,
             "executed_at": datetime.now().isoformat(),
             "results": results,
+            "payload_size_bytes": payload_size,
             "error": error,
             "success": error is None
         }
@@ -88,7 +152,46 @@ class SessionState:
     
     def reset_query_data(self) -> None:
         self.query_data = _create_empty_query_data()
+        self.release_resources()
         self.update_timestamp()
+
+    def get_query_payload(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Return the full rows and event details for a query, loading spilled payloads from disk."""
+        resident = self._resident_payloads.get(query_id)
+        if resident is not None:
+            return resident[0]
+        return self._spill_store.get(query_id)
+
+    def payload_location(self, query_id: str) -> Optional[str]:
+        if query_id in self._resident_payloads:
+            return "memory"
+        if self._spill_store.contains(query_id):
+            return "disk"
+        return None
+
+    def resident_payload_bytes(self) -> int:
+        return sum(size for _, size in self._resident_payloads.values())
+
+    def release_resources(self) -> None:
+        """Drop resident payloads and delete the session's spill directory."""
+        self._resident_payloads.clear()
+        self._spill_store.close()
+
+    def _store_payload(self, query_id: str, payload: Dict[str, Any]) -> int:
+        size = len(json.dumps(payload, separators=(",", ":"), default=str))
+        self._spill_store.discard(query_id)
+        self._resident_payloads.pop(query_id, None)
+        self._resident_payloads[query_id] = (payload, size)
+        self._enforce_memory_budget()
+        return size
+
+    def _enforce_memory_budget(self) -> None:
+        """Spill the oldest resident payloads until the session fits its budget."""
+        resident_bytes = self.resident_payload_bytes()
+        while self._resident_payloads and resident_bytes > self.memory_budget_bytes:
+            query_id, (payload, size) = self._resident_payloads.popitem(last=False)
+            self._spill_store.put(query_id, payload)
+            resident_bytes -= size
     
     def establish_new_baseline(self, query: str) -> None:
         self.reset_query_data()
@@ -117,39 +220,150 @@ class SessionState:
                 summary["best_optimization_equivalent"] = bool(semantic_equivalence.get("is_equivalent"))
 
 
+
+
 class SessionManager:
-    
-    def __init__(self):
-        self._current_session: Optional[SessionState] = None
-        self._lock = threading.Lock()
-    
-    def create_session(self, workspace_name: str, dataset_name: str, xmla_endpoint: str) -> None:
-        with self._lock:
-            connection_info = ConnectionInfo(
-                xmla_endpoint=xmla_endpoint,
-                dataset_name=dataset_name,
-                workspace_name=workspace_name
-            )
-            
-            session_state = SessionState(
-                connection_info=connection_info
-            )
-            
-            session_state.update_timestamp()
-            
-            self._current_session = session_state
-    
+    """Registry of optimization sessions keyed by session id.
+
+    The most recently created (or explicitly selected) session is the default
+    for callers that do not pass a ``session_id``, which keeps single-client
+    usage unchanged.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        idle_timeout_seconds: float = SESSION_IDLE_TIMEOUT_SECONDS,
+        max_concurrent_per_dataset: int = SESSION_MAX_CONCURRENT_PER_DATASET,
+    ):
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._current_session_id: Optional[str] = None
+        self._dataset_slots: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+        self._registry_lock = threading.Lock()
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_concurrent_per_dataset = max_concurrent_per_dataset
+
+    def create_session(self, workspace_name: str, dataset_name: str, xmla_endpoint: str) -> str:
+        connection_info = ConnectionInfo(
+            xmla_endpoint=xmla_endpoint,
+            dataset_name=dataset_name,
+            workspace_name=workspace_name
+        )
+        session_state = SessionState(connection_info=connection_info)
+        session_state.update_timestamp()
+
+        with self._registry_lock:
+            self._sessions[session_state.session_id] = session_state
+            self._current_session_id = session_state.session_id
+            self._evict_locked()
+
+        return session_state.session_id
+
+    def get_session(self, session_id: Optional[str] = None) -> Optional[SessionState]:
+        """Return the requested session (or the current one) and mark it as recently used."""
+        with self._registry_lock:
+            self._evict_locked()
+            key = session_id or self._current_session_id
+            session = self._sessions.get(key) if key else None
+            if session:
+                self._sessions.move_to_end(key)
+                session.touch()
+            return session
+
     def get_current_session(self) -> Optional[SessionState]:
-        with self._lock:
-            return self._current_session
-    
-    def establish_new_baseline_for_current_session(self, query: str) -> bool:
-        with self._lock:
-            if not self._current_session:
+        return self.get_session(None)
+
+    def set_current_session(self, session_id: str) -> bool:
+        with self._registry_lock:
+            if session_id not in self._sessions:
                 return False
-            self._current_session.establish_new_baseline(query)
+            self._current_session_id = session_id
             return True
-    
+
+    def close_session(self, session_id: str) -> bool:
+        with self._registry_lock:
+            removed = self._sessions.pop(session_id, None)
+            if removed and self._current_session_id == session_id:
+                self._current_session_id = next(reversed(self._sessions), None)
+        if removed is None:
+            return False
+        with removed.lock:
+            removed.release_resources()
+        return True
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._registry_lock:
+            now = time.monotonic()
+            return [
+                {
+                    "session_id": session.session_id,
+                    "workspace_name": session.connection_info.workspace_name,
+                    "dataset_name": session.connection_info.dataset_name,
+                    "xmla_endpoint": session.connection_info.xmla_endpoint,
+                    "is_current": session.session_id == self._current_session_id,
+                    "idle_seconds": round(now - session.last_accessed, 1),
+                    "last_updated": session.last_updated.isoformat(),
+                }
+                for session in self._sessions.values()
+            ]
+
+    def _evict_locked(self) -> None:
+        """Drop expired sessions, then least-recently-used idle ones beyond the cap."""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_accessed > self.idle_timeout_seconds and not session.is_busy():
+                self._sessions.pop(session_id).release_resources()
+
+        for session_id, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session_id == self._current_session_id or session.is_busy():
+                continue
+            self._sessions.pop(session_id).release_resources()
+
+        if self._current_session_id not in self._sessions:
+            self._current_session_id = next(reversed(self._sessions), None)
+
+    @contextmanager
+    def dataset_execution_slot(
+        self,
+        session: SessionState,
+        timeout_seconds: Optional[float] = SESSION_DATASET_SLOT_TIMEOUT_SECONDS
+    ) -> Iterator[bool]:
+        """
+        Hold one of the per-dataset execution slots; yields False on timeout.
+
+        The session counts as busy (and is not evicted) until the slot is left,
+        including while waiting for it.
+        """
+        key = session.connection_info.dataset_key
+        with self._registry_lock:
+            slot = self._dataset_slots.get(key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_concurrent_per_dataset)
+                self._dataset_slots[key] = slot
+            session.in_flight += 1
+
+        try:
+            acquired = slot.acquire(timeout=timeout_seconds)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    slot.release()
+        finally:
+            with self._registry_lock:
+                session.in_flight -= 1
+
+    def establish_new_baseline(self, query: str, session_id: Optional[str] = None) -> bool:
+        session = self.get_session(session_id)
+        if not session:
+            return False
+        with session.lock:
+            session.establish_new_baseline(query)
+        return True
+
     def track_dax_query_execution(
         self,
         dax_query: str,
@@ -158,13 +372,15 @@ class SessionManager:
         result_data: Any,  # Now expects array of results
         error: Optional[str] = None,
         performance_analysis: Optional[Dict[str, Any]] = None,
-        semantic_equivalence: Optional[Dict[str, Any]] = None
+        semantic_equivalence: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        event_details: Optional[List[Dict[str, Any]]] = None
     ) -> Optional[str]:
-        session = self.get_current_session()
+        session = self.get_session(session_id)
         if not session:
             return None
         
-        with self._lock:
+        with session.lock:
             query_results = {
                 "performance_metrics": performance_data,
                 "results": result_data  # Array of results, each with ResultNumber
@@ -180,22 +396,24 @@ class SessionManager:
                 query=dax_query,
                 execution_mode=execution_mode,
                 results=query_results,
-                error=error
+                error=error,
+                event_details=event_details
             )
             
             return query_id
-    
 
 
 session_manager = SessionManager()
 
 
 
-def validate_session() -> Tuple[bool, Optional[SessionState], Optional[str]]:
+def validate_session(session_id: Optional[str] = None) -> Tuple[bool, Optional[SessionState], Optional[str]]:
     """Validate that an active session exists. Returns (is_valid, session_state, error_message)."""
-    session_state = session_manager.get_current_session()
+    session_state = session_manager.get_session(session_id)
     
     if not session_state:
+        if session_id:
+            return False, None, f"Optimization session '{session_id}' not found or expired"
         return False, None, "No active optimization session found"
     
-    return True, session_state, None
\ No newline at end of file
+    return True, session_state, None
@@ -0,0 +1,68 @@
+"""Temporary on-disk store for optimization payloads evicted from session memory."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import Any, Optional
+
+
+class SpillStore:
+    """Write JSON payloads to a private temp directory and read them back on demand.
+
+    The directory is created on first use and removed when the store is closed
+    or garbage collected, so sessions that never exceed their budget touch no disk.
+    """
+
+    def __init__(self, prefix: str = "dax_tuner_"):
+        self._prefix = prefix
+        self._directory: Optional[str] = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix=self._prefix)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._directory, True)
+        safe_key = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in key)
+        return os.path.join(self._directory, f"{safe_key}.json")
+
+    def put(self, key: str, payload: Any) -> int:
+        """Persist ``payload`` under ``key``; returns the number of bytes written."""
+        with self._lock:
+            data = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+            with open(self._path(key), "wb") as handle:
+                handle.write(data)
+            return len(data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if self._directory is None:
+                return None
+            try:
+                with open(self._path(key), "rb") as handle:
+                    return json.loads(handle.read())
+            except (OSError, ValueError):
+                return None
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return self._directory is not None and os.path.exists(self._path(key))
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if self._directory is None:
+                return
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._directory = None
+            self._finalizer = None
@@ -0,0 +1,405 @@
+"""Filter-context sweeps: run a prepared query under many slicer combinations.
+
+A query tuned against one shape can still regress under other filters. The
+sweep takes the session's baseline query (and an optimized variant), wraps
+each EVALUATE in ``CALCULATETABLE(..., TREATAS({value}, column))`` for
+combinations of the most frequent values of the requested columns, runs the
+variants concurrently and reports latency percentiles, the slowest contexts
+and any context where the optimized definition is slower or returns
+different rows.
+"""
+
+import concurrent.futures
+import itertools
+import json
+import math
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..infrastructure.dax_executor import execute_with_dax_executor
+from ..infrastructure.xmla import execute_dax_query_direct
+from .analysis import fingerprint_results
+from .execution import _get_connection_details
+from .session import SessionState, session_manager
+from ..config import (
+    DAX_EXECUTION_TIMEOUT_SECONDS,
+    SWEEP_MAX_CONCURRENCY,
+    SWEEP_MAX_CONTEXTS,
+    SWEEP_TOP_K_DEFAULT,
+    SWEEP_WORST_CONTEXTS,
+)
+
+_COLUMN_PATTERN = re.compile(r"^\s*(?:'((?:[^']|'')+)'|([A-Za-z_][\w ]*?))\s*\[\s*([^\]]+?)\s*\]\s*$")
+
+# INFO.COLUMNS ExplicitDataType codes
+_STRING, _INT64, _DOUBLE, _DATETIME, _DECIMAL, _BOOLEAN = "2", "6", "8", "9", "10", "11"
+
+
+def _parse_column_reference(reference: str) -> Optional[Tuple[str, str]]:
+    match = _COLUMN_PATTERN.match(reference or "")
+    if not match:
+        return None
+    table = (match.group(1) or match.group(2)).replace("''", "'").strip()
+    return table, match.group(3)
+
+
+def _column_ref(table: str, column: str) -> str:
+    return "'" + table.replace("'", "''") + "'[" + column + "]"
+
+
+def _numeric_literal(text: str) -> Optional[str]:
+    """
+    A DAX number for a value's text, or None if it is not a finite number.
+
+    The text comes from .NET ``ToString()``, which never groups digits, so a
+    comma can only be the decimal separator of a non-English culture.
+    """
+    text = text.strip()
+    if "," in text and "." not in text:
+        text = text.replace(",", ".")
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    # Fixed notation: "1e-05" is written 0.00001
+    return format(number, "f")
+
+
+def _dax_literal(value: Any, iso_value: Any, data_type: str) -> Optional[str]:
+    """Render a column value as a DAX literal using its model data type (None if it cannot be written)."""
+    if value is None:
+        return "BLANK()"
+    text = str(value)
+    if data_type in (_INT64, _DOUBLE, _DECIMAL):
+        return _numeric_literal(text)
+    if data_type == _BOOLEAN:
+        return "TRUE()" if text.lower() == "true" else "FALSE()"
+    if data_type == _DATETIME and iso_value:
+        date_part, _, time_part = str(iso_value).partition(" ")
+        year, month, day = (int(part) for part in date_part.split("-"))
+        hour, minute, second = (int(part) for part in (time_part or "0:0:0").split(":"))
+        return f"DATE({year}, {month}, {day}) + TIME({hour}, {minute}, {second})"
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _top_values_query(table: str, column: str, top_k: int) -> str:
+    column_ref = _column_ref(table, column)
+    table_ref = "'" + table.replace("'", "''") + "'"
+    return f"""
+    EVALUATE
+    TOPN(
+        {int(top_k)},
+        ADDCOLUMNS(
+            VALUES({column_ref}),
+            "@rows", CALCULATE(COUNTROWS({table_ref})),
+            "@iso", FORMAT({column_ref}, "yyyy-mm-dd hh:nn:ss")
+        ),
+        [@rows], DESC
+    )
+    """
+
+
+def _fetch_top_values(
+    xmla_endpoint: str,
+    dataset_name: str,
+    table: str,
+    column: str,
+    data_type: str,
+    top_k: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    raw = execute_dax_query_direct(xmla_endpoint, dataset_name, _top_values_query(table, column, top_k))
+    if raw.startswith("Error:"):
+        return [], raw
+    parsed = json.loads(raw)
+    columns = parsed.get("columns", [])
+    if not columns:
+        return [], None
+
+    value_key = columns[0]
+    iso_key = next((name for name in columns if name.endswith("@iso]")), None)
+    rows_key = next((name for name in columns if name.endswith("@rows]")), None)
+    values = []
+    for row in parsed.get("rows", []):
+        literal = _dax_literal(row.get(value_key), row.get(iso_key), data_type)
+        if literal is None:
+            continue  # NaN or infinity cannot be written as a DAX filter value
+        values.append({
+            "value": row.get(value_key),
+            "rows": row.get(rows_key),
+            "literal": literal,
+        })
+    return values, None
+
+
+# DAX tokens; comments, strings, 'quoted' names and [bracketed] names are single tokens,
+# so keywords inside them are not taken for clauses. Unterminated ones run to the end of the text.
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:[^"]|"")*"?)
+  | (?P<table>'(?:[^']|'')*'?)
+  | (?P<column>\[(?:[^\]]|\]\])*\]?)
+  | (?P<word>[A-Za-z_][\w.]*)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def _tokenize(query: str) -> List[Tuple[str, str, int, int]]:
+    """(kind, text, start, end) of every token except whitespace."""
+    return [
+        (match.lastgroup, match.group(), match.start(), match.end())
+        for match in _TOKEN_PATTERN.finditer(query)
+        if match.lastgroup != "space"
+    ]
+
+
+def _top_level_clauses(tokens: List[Tuple[str, str, int, int]]) -> List[Tuple[str, int]]:
+    """(``EVALUATE`` or ``ORDER BY``, index of its first token) for clauses outside parentheses."""
+    code = [i for i, token in enumerate(tokens) if token[0] != "comment"]
+    clauses = []
+    depth = 0
+    for position, i in enumerate(code):
+        kind, text = tokens[i][0], tokens[i][1]
+        if kind == "other" and text in "({":
+            depth += 1
+        elif kind == "other" and text in ")}":
+            depth -= 1
+        elif kind == "word" and depth == 0:
+            word = text.upper()
+            following = tokens[code[position + 1]] if position + 1 < len(code) else None
+            if word == "EVALUATE":
+                clauses.append(("EVALUATE", i))
+            elif word == "ORDER" and following and following[0] == "word" and following[1].upper() == "BY":
+                clauses.append(("ORDER BY", i))
+    return clauses
+
+
+def apply_filter_context(query: str, filters: List[Tuple[str, str]]) -> str:
+    """Wrap every EVALUATE expression in CALCULATETABLE with a TREATAS filter per column."""
+    if not filters:
+        return query
+    treatas = ",\n    ".join(f"TREATAS({{{literal}}}, {column_ref})" for column_ref, literal in filters)
+
+    tokens = _tokenize(query)
+    clauses = _top_level_clauses(tokens)
+    statements = [i for keyword, i in clauses if keyword == "EVALUATE"]
+    if not statements:
+        return query
+    # Everything before the first EVALUATE (the DEFINE block) is kept as it is
+    pieces = [query[:tokens[statements[0]][2]]]
+    for position, first in enumerate(statements):
+        last = statements[position + 1] if position + 1 < len(statements) else len(tokens)
+        order_at = next((i for keyword, i in clauses if keyword == "ORDER BY" and first < i < last), last)
+        # Comments around the expression are dropped so none can swallow the appended filters
+        code = [i for i in range(first + 1, order_at) if tokens[i][0] != "comment"]
+        expression = query[tokens[code[0]][2]:tokens[code[-1]][3]] if code else ""
+        order_by = query[tokens[order_at][2]:tokens[last - 1][3]] if order_at < last else ""
+        pieces.append(
+            f"EVALUATE\nCALCULATETABLE(\n{expression},\n    {treatas}\n)\n{order_by}\n"
+        )
+    return "".join(pieces)
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least ``percent``% of the values at or below it."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _distribution(timings: List[float]) -> Dict[str, Any]:
+    values = sorted(timings)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min_ms": values[0],
+        "p50_ms": _percentile(values, 50),
+        "p90_ms": _percentile(values, 90),
+        "p95_ms": _percentile(values, 95),
+        "max_ms": values[-1],
+        "mean_ms": round(sum(values) / len(values), 2),
+    }
+
+
+def _run_variant(
+    session: SessionState,
+    query: str,
+    xmla_endpoint: str,
+    dataset_name: str,
+    access_token: Optional[str],
+    runs: int
+) -> Dict[str, Any]:
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(max(1, runs)):
+        with session_manager.dataset_execution_slot(session) as acquired:
+            if not acquired:
+                return {"status": "error", "error": "Timed out waiting for a dataset execution slot"}
+            success, data, error = execute_with_dax_executor(
+                query, xmla_endpoint, dataset_name, access_token,
+                timeout_seconds=DAX_EXECUTION_TIMEOUT_SECONDS
+            )
+        if not success:
+            return {"status": "error", "error": error or "DAX execution failed"}
+
+        performance = data.get("Performance", {})
+        results = data.get("Results", [])
+        run = {
+            "status": "success",
+            "total_ms": performance.get("Total", 0),
+            "fe_ms": performance.get("FE", 0),
+            "se_ms": performance.get("SE", 0),
+            "se_queries": performance.get("SE_Queries", 0),
+            "row_count": sum(result.get("RowCount", 0) for result in results if isinstance(result, dict)),
+            "_digests": [fp["RowsDigest"] for fp in fingerprint_results(results)],
+        }
+        if best is None or run["total_ms"] < best["total_ms"]:
+            best = run
+    return best
+
+
+def _resolve_queries(
+    session: SessionState,
+    optimized_query: Optional[str]
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Return (baseline_query, optimized_query, optimized_source); the best recorded optimization is the default."""
+    with session.lock:
+        query_data = session.query_data
+        baseline_query = query_data.get("baseline", {}).get("query_text")
+        if optimized_query:
+            return baseline_query, optimized_query, "argument"
+        best_id = query_data.get("summary", {}).get("best_optimization_query_id")
+        best = query_data.get("optimizations", {}).get(best_id) if best_id else None
+        if not best:
+            return baseline_query, None, None
+        return baseline_query, best.get("query_text"), best_id
+
+
+def sweep_filter_contexts_core(
+    filter_columns: List[str],
+    top_k: int = SWEEP_TOP_K_DEFAULT,
+    optimized_query: Optional[str] = None,
+    max_contexts: int = SWEEP_MAX_CONTEXTS,
+    runs_per_context: int = 1,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    try:
+        session, xmla_endpoint, dataset_name, access_token, error_msg = _get_connection_details(session_id)
+        if error_msg:
+            return {"status": "error", "error": error_msg}
+
+        baseline_query, optimized_query, optimized_source = _resolve_queries(session, optimized_query)
+        if not baseline_query:
+            return {"status": "error", "error": "No baseline query in this session. Run prepare_query_for_optimization first."}
+        if not filter_columns:
+            return {"status": "error", "error": "Provide at least one filter column, e.g. 'Product'[Category]"}
+
+        parsed_columns = []
+        for reference in filter_columns:
+            parsed = _parse_column_reference(reference)
+            if not parsed:
+                return {"status": "error", "error": f"Invalid column reference '{reference}'. Use 'Table'[Column]."}
+            parsed_columns.append(parsed)
+
+        from .metadata import get_complete_model_definition
+        model = get_complete_model_definition(xmla_endpoint, dataset_name)
+        if model.get("status") == "error":
+            return model
+        column_types = {
+            (col.get("table_name", "").lower(), (col.get("column_name") or "").lower()): col.get("data_type")
+            for col in model.get("columns", [])
+        }
+
+        column_values: List[Tuple[str, List[Dict[str, Any]]]] = []
+        for table, column in parsed_columns:
+            data_type = column_types.get((table.lower(), column.lower()))
+            if data_type is None:
+                return {"status": "error", "error": f"Column {_column_ref(table, column)} not found in model metadata"}
+            values, fetch_error = _fetch_top_values(
+                xmla_endpoint, dataset_name, table, column, str(data_type), max(1, top_k)
+            )
+            if fetch_error:
+                return {"status": "error", "error": f"Failed to read values for {_column_ref(table, column)}: {fetch_error}"}
+            if values:
+                column_values.append((_column_ref(table, column), values))
+
+        # Unfiltered reference context first, then the most frequent combinations
+        contexts: List[List[Tuple[str, Dict[str, Any]]]] = [[]]
+        value_lists = [[(column_ref, value) for value in values] for column_ref, values in column_values]
+        contexts.extend(
+            list(combo) for combo in itertools.islice(itertools.product(*value_lists), max(0, max_contexts - 1))
+        )
+
+        definitions = {"baseline": baseline_query}
+        if optimized_query:
+            definitions["optimized"] = optimized_query
+
+        tasks = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, SWEEP_MAX_CONCURRENCY)) as executor:
+            for context_id, context in enumerate(contexts):
+                filters = [(column_ref, value["literal"]) for column_ref, value in context]
+                for name, query in definitions.items():
+                    future = executor.submit(
+                        _run_variant, session,
+                        apply_filter_context(query, filters),
+                        xmla_endpoint, dataset_name, access_token, runs_per_context
+                    )
+                    tasks[(context_id, name)] = future
+
+        context_reports = []
+        for context_id, context in enumerate(contexts):
+            report: Dict[str, Any] = {
+                "context_id": context_id,
+                "filters": {column_ref: value["value"] for column_ref, value in context} or "(unfiltered)",
+            }
+            for name in definitions:
+                report[name] = tasks[(context_id, name)].result()
+            baseline_run, optimized_run = report["baseline"], report.get("optimized")
+            if optimized_run and baseline_run.get("status") == optimized_run.get("status") == "success":
+                report["equivalent"] = baseline_run["_digests"] == optimized_run["_digests"]
+                if baseline_run["total_ms"]:
+                    report["improvement_percent"] = round(
+                        (baseline_run["total_ms"] - optimized_run["total_ms"]) / baseline_run["total_ms"] * 100, 2
+                    )
+            for name in definitions:
+                report[name].pop("_digests", None)
+            context_reports.append(report)
+
+        summary: Dict[str, Any] = {}
+        for name in definitions:
+            successes = [r for r in context_reports if r[name].get("status") == "success"]
+            slowest = sorted(successes, key=lambda r: r[name]["total_ms"], reverse=True)[:SWEEP_WORST_CONTEXTS]
+            summary[name] = {
+                "latency": _distribution([r[name]["total_ms"] for r in successes]),
+                "failed_contexts": len(context_reports) - len(successes),
+                "worst_contexts": [
+                    {"context_id": r["context_id"], "filters": r["filters"], "total_ms": r[name]["total_ms"],
+                     "se_queries": r[name]["se_queries"]}
+                    for r in slowest
+                ],
+            }
+        if optimized_query:
+            summary["regressions"] = [
+                {"context_id": r["context_id"], "filters": r["filters"], "improvement_percent": r["improvement_percent"]}
+                for r in context_reports if r.get("improvement_percent", 0) < 0
+            ]
+            summary["non_equivalent_contexts"] = [
+                r["context_id"] for r in context_reports if r.get("equivalent") is False
+            ]
+
+        return {
+            "status": "success",
+            "session_id": session.session_id,
+            "filter_columns": [column_ref for column_ref, _ in column_values],
+            "contexts_executed": len(contexts),
+            "optimized_source": optimized_source,
+            "summary": summary,
+            "contexts": context_reports,
+        }
+
+    except Exception as e:
+        return {"status": "error", "error": f"Filter-context sweep failed: {str(e)}"}
@@ -7,6 +7,7 @@ import os
 from ..config import get_project_root, DAX_EXECUTION_TIMEOUT_SECONDS, DAX_EXECUTOR_RELATIVE_PATH
 from .auth import get_access_token
 from .xmla import is_desktop_connection
+from .replay import EXECUTOR_KIND, record_call
 
 
 def _extract_json_from_dax_output(raw_stdout: str) -> Optional[Dict[str, Any]]:
@@ -71,7 +72,20 @@ def execute_with_dax_executor(
         access_token: Optional access token (will be fetched if not provided)
         timeout_seconds: Optional timeout in seconds
     """
-    
+    success, result_data, error = _run_dax_executor(
+        query, xmla_endpoint, dataset_name, access_token, timeout_seconds
+    )
+    record_call(EXECUTOR_KIND, dataset_name, query, {"success": success, "data": result_data, "error": error})
+    return success, result_data, error
+
+
+def _run_dax_executor(
+    query: str,
+    xmla_endpoint: str,
+    dataset_name: str,
+    access_token: Optional[str],
+    timeout_seconds: Optional[int]
+) -> Tuple[bool, Dict[str, Any], Optional[str]]:
     if timeout_seconds is None:
         timeout_seconds = DAX_EXECUTION_TIMEOUT_SECONDS
     
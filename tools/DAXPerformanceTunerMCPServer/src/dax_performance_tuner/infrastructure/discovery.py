@@ -1,11 +1,22 @@
 """Unified discovery for Power BI Desktop instances and Service datasets."""
 
-from typing import List, Dict, Any, Optional
+import concurrent.futures
+import copy
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set
+
+# Desktop discovery cache: {"fingerprint": frozenset((pid, port)), "result": {...}, "expires_at": monotonic}
+_desktop_cache: Dict[str, Any] = {}
+_desktop_cache_lock = threading.Lock()
+_tom_server_class = None
+_tom_load_lock = threading.Lock()
 
 
 def discover_datasets(
     workspace_name: Optional[str] = None,
-    xmla_endpoint: Optional[str] = None
+    xmla_endpoint: Optional[str] = None,
+    force_refresh: bool = False
 ) -> Dict[str, Any]:
     """Unified discovery of datasets - either desktop instances or service datasets.
     
@@ -14,90 +25,151 @@ def discover_datasets(
     """
     
     if not workspace_name and not xmla_endpoint:
-        return _discover_desktop_instances()
+        return _discover_desktop_instances(force_refresh=force_refresh)
     
     # Service discovery - workspace or endpoint provided
-    return _discover_service_datasets(workspace_name, xmla_endpoint)
+    return _discover_service_datasets(workspace_name, xmla_endpoint, force_refresh=force_refresh)
+
+
+def _scan_msmdsrv_listeners() -> Dict[int, Dict[str, Any]]:
+    """Map each listening msmdsrv.exe PID to its port and parent PID.
+
+    Processes are filtered by name first, so the connection table is walked
+    once and only consulted for the handful of Analysis Services PIDs.
+    """
+    import psutil
+
+    msmdsrv: Dict[int, Optional[int]] = {}
+    for proc in psutil.process_iter(['pid', 'name', 'ppid']):
+        try:
+            if proc.info['name'] == 'msmdsrv.exe':
+                msmdsrv[proc.info['pid']] = proc.info.get('ppid')
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
 
+    if not msmdsrv:
+        return {}
 
-def _discover_desktop_instances() -> Dict[str, Any]:
-    """Discover local Power BI Desktop instances and their datasets."""
+    listeners: Dict[int, Dict[str, Any]] = {}
+    for conn in psutil.net_connections(kind='tcp'):
+        if conn.pid in msmdsrv and conn.pid not in listeners and conn.status == 'LISTEN' and conn.laddr.ip == '127.0.0.1':
+            listeners[conn.pid] = {'port': conn.laddr.port, 'parent_pid': msmdsrv[conn.pid]}
+    return listeners
+
+
+def _window_titles_by_pid(pids: Set[int]) -> Dict[int, str]:
+    """Return the first visible window title for each PID using one EnumWindows pass."""
+    titles: Dict[int, str] = {}
+    if not pids:
+        return titles
     try:
-        import psutil
-        
+        import win32gui
+        import win32process
+
+        def enum_windows_callback(hwnd, results):
+            if win32gui.IsWindowVisible(hwnd):
+                _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
+                if window_pid in pids and window_pid not in results:
+                    window_text = win32gui.GetWindowText(hwnd)
+                    if window_text:
+                        results[window_pid] = window_text
+
+        win32gui.EnumWindows(enum_windows_callback, titles)
+    except (ImportError, Exception):
+        pass
+    return titles
+
+
+def _parent_names(parent_pids: Set[int]) -> Dict[int, str]:
+    import psutil
+
+    names: Dict[int, str] = {}
+    for parent_pid in parent_pids:
+        try:
+            names[parent_pid] = psutil.Process(parent_pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return names
+
+
+def _discover_desktop_instances(force_refresh: bool = False) -> Dict[str, Any]:
+    """Discover local Power BI Desktop instances and their datasets.
+
+    Results are cached for ``DESKTOP_DISCOVERY_CACHE_TTL_SECONDS`` and reused only
+    while the set of msmdsrv PIDs and ports is unchanged.
+    """
+    try:
+        from ..config import DESKTOP_DISCOVERY_CACHE_TTL_SECONDS, DESKTOP_DISCOVERY_MAX_WORKERS
+
+        listeners = _scan_msmdsrv_listeners()
+        fingerprint = frozenset((pid, info['port']) for pid, info in listeners.items())
+
+        with _desktop_cache_lock:
+            cached = _desktop_cache.get("result")
+            if (
+                not force_refresh
+                and cached is not None
+                and _desktop_cache.get("fingerprint") == fingerprint
+                and time.monotonic() < _desktop_cache.get("expires_at", 0)
+            ):
+                return copy.deepcopy(cached)
+
+        parent_pids = {info['parent_pid'] for info in listeners.values() if info['parent_pid']}
+        parent_names = _parent_names(parent_pids)
+        window_titles = _window_titles_by_pid(set(parent_names))
+
+        ports = sorted(info['port'] for info in listeners.values())
+        databases_by_port: Dict[int, List[Dict[str, Any]]] = {}
+        if ports:
+            max_workers = min(len(ports), DESKTOP_DISCOVERY_MAX_WORKERS)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(_list_databases_on_endpoint, f"localhost:{port}"): port
+                    for port in ports
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        databases_by_port[futures[future]] = future.result()
+                    except Exception:
+                        databases_by_port[futures[future]] = []
+
         instances = []
-        
-        listening_ports = {}
-        for conn in psutil.net_connections(kind='tcp'):
-            if conn.status == 'LISTEN' and conn.laddr.ip == '127.0.0.1':
-                listening_ports[conn.pid] = conn.laddr.port
-        
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.info['name'] == 'msmdsrv.exe':
-                    pid = proc.info['pid']
-                    if pid in listening_ports:
-                        port = listening_ports[pid]
-                        
-                        parent_name = None
-                        window_title = None
-                        
-                        try:
-                            as_process = psutil.Process(pid)
-                            parent = as_process.parent()
-                            
-                            if parent:
-                                parent_name = parent.name()
-                                
-                                try:
-                                    import win32gui
-                                    import win32process
-                                    
-                                    def enum_windows_callback(hwnd, results):
-                                        if win32gui.IsWindowVisible(hwnd):
-                                            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                                            if window_pid == parent.pid:
-                                                window_text = win32gui.GetWindowText(hwnd)
-                                                if window_text:
-                                                    results.append(window_text)
-                                    
-                                    window_titles = []
-                                    win32gui.EnumWindows(enum_windows_callback, window_titles)
-                                    
-                                    if window_titles:
-                                        window_title = window_titles[0]
-                                except (ImportError, Exception):
-                                    window_title = f"{parent_name} (PID: {parent.pid})"
-                        except Exception:
-                            pass
-                        
-                        datasets = _list_databases_on_endpoint(f"localhost:{port}")
-                        
-                        instances.append({
-                            'port': port,
-                            'window_title': window_title,
-                            'parent_process_name': parent_name,
-                            'datasets': datasets
-                        })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        for pid, info in listeners.items():
+            parent_pid = info['parent_pid']
+            parent_name = parent_names.get(parent_pid)
+            window_title = window_titles.get(parent_pid)
+            if not window_title and parent_name:
+                window_title = f"{parent_name} (PID: {parent_pid})"
+            instances.append({
+                'port': info['port'],
+                'window_title': window_title,
+                'parent_process_name': parent_name,
+                'datasets': databases_by_port.get(info['port'], [])
+            })
         
         instances.sort(key=lambda x: x['port'])
         
         if not instances:
-            return {
+            result = {
                 "status": "success",
                 "discovery_type": "desktop",
                 "instances": [],
                 "message": "No Power BI Desktop instances found running. Please ensure Power BI Desktop is open with a model loaded."
             }
-        
-        return {
-            "status": "success",
-            "discovery_type": "desktop",
-            "instances": instances,
-            "message": f"Found {len(instances)} Power BI Desktop instance(s)"
-        }
+        else:
+            result = {
+                "status": "success",
+                "discovery_type": "desktop",
+                "instances": instances,
+                "message": f"Found {len(instances)} Power BI Desktop instance(s)"
+            }
+
+        with _desktop_cache_lock:
+            _desktop_cache["fingerprint"] = fingerprint
+            _desktop_cache["result"] = copy.deepcopy(result)
+            _desktop_cache["expires_at"] = time.monotonic() + DESKTOP_DISCOVERY_CACHE_TTL_SECONDS
+
+        return result
         
     except ImportError:
         return {
@@ -111,17 +183,35 @@ def _discover_desktop_instances() -> Dict[str, Any]:
         }
 
 
-def _discover_service_datasets(workspace_name: Optional[str], xmla_endpoint: Optional[str]) -> Dict[str, Any]:
-    """Discover datasets in a Power BI Service workspace."""
+def clear_desktop_discovery_cache() -> None:
+    """Forget cached desktop discovery results."""
+    with _desktop_cache_lock:
+        _desktop_cache.clear()
+
+
+def _discover_service_datasets(
+    workspace_name: Optional[str],
+    xmla_endpoint: Optional[str],
+    force_refresh: bool = False
+) -> Dict[str, Any]:
+    """Discover datasets in a Power BI Service workspace.
+
+    Power BI workspaces are listed through the cached REST API; a TOM
+    connection is only opened for endpoints the REST API cannot resolve.
+    """
     try:
         from .xmla import determine_xmla_endpoint, is_desktop_connection
         
         endpoint, resolved_workspace = determine_xmla_endpoint(workspace_name, xmla_endpoint)
         
-        datasets = _list_databases_on_endpoint(endpoint)
-        
         is_desktop = is_desktop_connection(endpoint)
         
+        datasets = None
+        if not is_desktop and "api.powerbi.com" in endpoint.lower():
+            datasets = _list_service_datasets_via_rest(resolved_workspace, force_refresh)
+        if datasets is None:
+            datasets = _list_databases_on_endpoint(endpoint)
+        
         if not datasets:
             return {
                 "status": "success",
@@ -148,6 +238,37 @@ def _discover_service_datasets(workspace_name: Optional[str], xmla_endpoint: Opt
         }
 
 
+def _list_service_datasets_via_rest(workspace_name: str, force_refresh: bool) -> Optional[List[Dict[str, Any]]]:
+    """List workspace datasets from the REST API; None means fall back to TOM."""
+    try:
+        from .powerbi_api import find_workspace, list_datasets
+        
+        workspace = find_workspace(workspace_name)
+        if not workspace:
+            return None
+        return list_datasets(workspace["id"], force_refresh=force_refresh)
+    except Exception:
+        return None
+
+
+def _load_tom_server_class():
+    """Load the bundled TOM assembly once and return its ``Server`` type (None if missing)."""
+    global _tom_server_class
+    with _tom_load_lock:
+        if _tom_server_class is None:
+            from ..config import get_project_root
+            import clr
+            
+            tom_path = get_project_root() / "dotnet" / "Microsoft.AnalysisServices.Tabular.dll"
+            if not tom_path.exists():
+                return None
+            
+            clr.AddReference(str(tom_path))
+            from Microsoft.AnalysisServices.Tabular import Server  # type: ignore
+            _tom_server_class = Server
+    return _tom_server_class
+
+
 def _list_databases_on_endpoint(xmla_endpoint: str) -> List[Dict[str, Any]]:
     """List all databases available on an XMLA endpoint.
     
@@ -160,17 +281,12 @@ def _list_databases_on_endpoint(xmla_endpoint: str) -> List[Dict[str, Any]]:
     databases = []
     
     try:
-        from ..config import get_project_root
         from .xmla import build_connection_string
-        import clr
         
-        tom_path = get_project_root() / "dotnet" / "Microsoft.AnalysisServices.Tabular.dll"
-        if not tom_path.exists():
+        Server = _load_tom_server_class()
+        if Server is None:
             return []
         
-        clr.AddReference(str(tom_path))
-        from Microsoft.AnalysisServices.Tabular import Server  # type: ignore
-        
         try:
             connection_string = build_connection_string(xmla_endpoint)
         except ValueError:
@@ -1,69 +1,174 @@
-"""Power BI REST API helpers for workspace discovery and management."""
+"""Power BI REST API helpers for workspace discovery and management.
 
+Listings are fetched through one pooled ``requests.Session``, paged with
+``$top``/``$skip`` (later pages requested concurrently) and cached for
+``SERVICE_DISCOVERY_CACHE_TTL_SECONDS`` so repeated name resolution is local.
+"""
+
+import concurrent.futures
+import threading
+import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from .auth import get_access_token
+from ..config import (
+    POWERBI_API_TIMEOUT_SECONDS,
+    POWERBI_API_PAGE_SIZE,
+    SERVICE_DISCOVERY_MAX_WORKERS,
+    SERVICE_DISCOVERY_CACHE_TTL_SECONDS,
+)
 
 
 POWERBI_API_BASE = "https://api.powerbi.com/v1.0/myorg"
 
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+# {cache_key: (expires_at, value)}
+_listing_cache: Dict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]] = {}
+_listing_cache_lock = threading.Lock()
+
+
+class PowerBIApiError(Exception):
+    """Raised when a Power BI REST call fails; ``details`` carries the response excerpt."""
+
+    def __init__(self, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.details = details
+
+
+def _get_http_session() -> requests.Session:
+    """Return the shared HTTP session (connection pool sized for concurrent paging)."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=SERVICE_DISCOVERY_MAX_WORKERS,
+                pool_maxsize=SERVICE_DISCOVERY_MAX_WORKERS,
+            )
+            session.mount("https://", adapter)
+            _http_session = session
+    return _http_session
+
+
+def _get_json(path: str, token: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    response = _get_http_session().get(
+        f"{POWERBI_API_BASE}{path}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        },
+        params=params,
+        timeout=POWERBI_API_TIMEOUT_SECONDS,
+    )
+    if not response.ok:
+        raise PowerBIApiError(
+            f"HTTP {response.status_code}",
+            response.text[:200] if response.text else None
+        )
+    return response.json()
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+    with _listing_cache_lock:
+        entry = _listing_cache.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return list(entry[1])
+        return None
+
 
-def list_workspaces() -> Dict[str, Any]:
+def _cache_put(key: Tuple[str, str], value: List[Dict[str, Any]]) -> None:
+    with _listing_cache_lock:
+        _listing_cache[key] = (time.monotonic() + SERVICE_DISCOVERY_CACHE_TTL_SECONDS, list(value))
+
+
+def clear_discovery_cache() -> None:
+    """Forget cached workspace and dataset listings."""
+    with _listing_cache_lock:
+        _listing_cache.clear()
+
+
+def _odata_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _fetch_all_groups(token: str, odata_filter: Optional[str]) -> List[Dict[str, Any]]:
+    """Page through ``/groups``; after the first page, pages are requested in concurrent waves."""
+    page_size = POWERBI_API_PAGE_SIZE
+
+    def fetch_page(skip: int) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"$top": page_size, "$skip": skip}
+        if odata_filter:
+            params["$filter"] = odata_filter
+        return _get_json("/groups", token, params).get("value", [])
+
+    groups = fetch_page(0)
+    if len(groups) < page_size:
+        return groups
+
+    next_skip = page_size
+    with concurrent.futures.ThreadPoolExecutor(max_workers=SERVICE_DISCOVERY_MAX_WORKERS) as executor:
+        while True:
+            skips = [next_skip + i * page_size for i in range(SERVICE_DISCOVERY_MAX_WORKERS)]
+            pages = list(executor.map(fetch_page, skips))
+            for page in pages:
+                groups.extend(page)
+            if any(len(page) < page_size for page in pages):
+                return groups
+            next_skip = skips[-1] + page_size
+
+
+def list_workspaces(name_filter: Optional[str] = None, force_refresh: bool = False) -> Dict[str, Any]:
     """List all Power BI workspaces (groups) the user has access to.
     
     Uses the Power BI REST API to enumerate workspaces since this information
     is not available through XMLA/TOM endpoints.
     
+    Args:
+        name_filter: Optional substring; applied server-side via ``$filter=contains(name, ...)``
+        force_refresh: Bypass the listing cache
+    
     Returns:
         Dictionary with status and workspace list, or error details
     """
     try:
-        # Get access token
-        token = get_access_token()
-        if not token:
-            return {
-                "status": "error",
-                "error": "Authentication required - please sign in to Power BI"
-            }
-        
-        # Call Power BI REST API
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(f"{POWERBI_API_BASE}/groups", headers=headers)
-        
-        if not response.ok:
-            return {
-                "status": "error",
-                "error": f"Failed to list workspaces: HTTP {response.status_code}",
-                "details": response.text[:200] if response.text else None
-            }
-        
-        data = response.json()
-        workspaces = data.get("value", [])
+        cache_key = ("workspaces", (name_filter or "").lower())
+        workspace_list = None if force_refresh else _cache_get(cache_key)
+
+        if workspace_list is None:
+            # Get access token
+            token = get_access_token()
+            if not token:
+                return {
+                    "status": "error",
+                    "error": "Authentication required - please sign in to Power BI"
+                }
+            
+            odata_filter = f"contains(name,{_odata_literal(name_filter)})" if name_filter else None
+            groups = _fetch_all_groups(token, odata_filter)
+            workspace_list = [{"name": ws.get("name"), "id": ws.get("id")} for ws in groups]
+            _cache_put(cache_key, workspace_list)
         
-        if not workspaces:
+        if not workspace_list:
             return {
                 "status": "success",
                 "workspaces": [],
                 "message": "No workspaces found. You may need to create or get access to a Power BI workspace."
             }
         
-        workspace_list = []
-        for ws in workspaces:
-            workspace_list.append({
-                "name": ws.get("name"),
-                "id": ws.get("id")
-            })
-        
         return {
             "status": "success",
             "workspaces": workspace_list,
             "message": f"Found {len(workspace_list)} workspace(s)"
         }
         
+    except PowerBIApiError as e:
+        return {
+            "status": "error",
+            "error": f"Failed to list workspaces: {str(e)}",
+            "details": e.details
+        }
     except requests.exceptions.RequestException as e:
         return {
             "status": "error",
@@ -74,3 +179,47 @@ def list_workspaces() -> Dict[str, Any]:
             "status": "error",
             "error": f"Unexpected error listing workspaces: {str(e)}"
         }
+
+
+def find_workspace(workspace_name: str) -> Optional[Dict[str, Any]]:
+    """Resolve a workspace by exact (case-insensitive) name, using any cached listing first.
+
+    Raises:
+        PowerBIApiError: When the lookup cannot be performed (auth or HTTP failure)
+    """
+    wanted = workspace_name.lower()
+    for key in (("workspaces", ""), ("workspaces", wanted)):
+        cached = _cache_get(key)
+        if cached is not None:
+            match = next((ws for ws in cached if (ws.get("name") or "").lower() == wanted), None)
+            if match or key[1] == "":
+                return match
+
+    result = list_workspaces(name_filter=workspace_name)
+    if result.get("status") == "error":
+        raise PowerBIApiError(result["error"], result.get("details"))
+    return next(
+        (ws for ws in result.get("workspaces", []) if (ws.get("name") or "").lower() == wanted),
+        None
+    )
+
+
+def list_datasets(workspace_id: str, force_refresh: bool = False) -> List[Dict[str, Any]]:
+    """List datasets in a workspace as ``[{"name", "id"}]``, cached per workspace id.
+
+    Raises:
+        PowerBIApiError: When authentication or the REST call fails
+    """
+    cache_key = ("datasets", workspace_id)
+    datasets = None if force_refresh else _cache_get(cache_key)
+    if datasets is not None:
+        return datasets
+
+    token = get_access_token()
+    if not token:
+        raise PowerBIApiError("Authentication required - please sign in to Power BI")
+
+    data = _get_json(f"/groups/{workspace_id}/datasets", token)
+    datasets = [{"name": ds.get("name"), "id": ds.get("id")} for ds in data.get("value", [])]
+    _cache_put(cache_key, datasets)
+    return datasets
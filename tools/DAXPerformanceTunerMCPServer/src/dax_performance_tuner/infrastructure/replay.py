@@ -0,0 +1,170 @@
+"""Record and replay executor/XMLA traffic so the Python pipeline runs offline.
+
+Set ``DAX_TUNER_RECORD_DIR`` to a directory and every DaxExecutor run and
+direct XMLA query (DMVs, INFO.* metadata, CALCDEPENDENCY) is written there as
+a JSON fixture keyed by dataset and query text. ``replay_fixtures`` then
+swaps in a fake executor and XMLA client that answer from those fixtures,
+so execution, metadata and analysis code can be exercised and benchmarked
+without a live endpoint or the Windows-only executor.
+
+Fixture format (one entry, or a list of entries, per ``*.json`` file)::
+
+    {"kind": "executor" | "xmla", "dataset": "...", "query": "...", "payload": ...}
+
+Entries may use ``"match": ["substring", ...]`` instead of ``"query"`` to
+answer any query containing every substring; exact entries win over matches
+and longer match lists win over shorter ones.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..config import REPLAY_RECORD_DIR_ENV
+
+EXECUTOR_KIND = "executor"
+XMLA_KIND = "xmla"
+
+_record_lock = threading.Lock()
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised when a replayed call has no matching fixture."""
+
+
+def fixture_key(kind: str, dataset_name: str, query: str) -> str:
+    digest = hashlib.sha256(f"{kind}\0{dataset_name}\0{query}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def recording_directory() -> Optional[Path]:
+    """Return the active recording directory, or None when recording is off."""
+    value = os.environ.get(REPLAY_RECORD_DIR_ENV)
+    return Path(value) if value else None
+
+
+def record_call(kind: str, dataset_name: str, query: str, payload: Any) -> None:
+    """Persist one call as a fixture when recording is enabled; never raises."""
+    directory = recording_directory()
+    if directory is None:
+        return
+    try:
+        key = fixture_key(kind, dataset_name, query)
+        entry = {"kind": kind, "dataset": dataset_name, "query": query, "payload": payload}
+        with _record_lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"{kind}-{key[:16]}.json").write_text(
+                json.dumps(entry, indent=2, default=str), encoding="utf-8"
+            )
+    except Exception:
+        pass
+
+
+class FixtureStore:
+    """In-memory index of recorded or synthetic fixtures."""
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None):
+        self._exact: Dict[str, Any] = {}
+        self._patterns: List[Tuple[str, Optional[str], List[str], Any]] = []
+        for entry in entries or []:
+            self.add(entry)
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, Path]) -> "FixtureStore":
+        store = cls()
+        for path in sorted(Path(directory).glob("*.json")):
+            loaded = json.loads(path.read_text(encoding="utf-8"))
+            for entry in loaded if isinstance(loaded, list) else [loaded]:
+                store.add(entry)
+        return store
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        kind = entry["kind"]
+        if "query" in entry:
+            self._exact[fixture_key(kind, entry.get("dataset", ""), entry["query"])] = entry["payload"]
+        else:
+            self._patterns.append((kind, entry.get("dataset"), list(entry["match"]), entry["payload"]))
+            self._patterns.sort(key=lambda item: len(item[2]), reverse=True)
+
+    def lookup(self, kind: str, dataset_name: str, query: str) -> Any:
+        key = fixture_key(kind, dataset_name, query)
+        if key in self._exact:
+            return self._exact[key]
+        for pattern_kind, dataset, needles, payload in self._patterns:
+            if pattern_kind != kind or (dataset is not None and dataset != dataset_name):
+                continue
+            if all(needle in query for needle in needles):
+                return payload
+        raise FixtureNotFoundError(f"No {kind} fixture for dataset '{dataset_name}': {query[:80]!r}")
+
+
+class FakeDaxExecutor:
+    """Drop-in for ``execute_with_dax_executor`` that answers from fixtures."""
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+        self.calls = 0
+
+    def __call__(
+        self,
+        query: str,
+        xmla_endpoint: str,
+        dataset_name: str,
+        access_token: str = None,
+        timeout_seconds: int = None
+    ) -> Tuple[bool, Dict[str, Any], Optional[str]]:
+        self.calls += 1
+        try:
+            payload = self.store.lookup(EXECUTOR_KIND, dataset_name, query)
+        except FixtureNotFoundError as e:
+            return False, {}, str(e)
+        return payload.get("success", True), payload.get("data", {}), payload.get("error")
+
+
+class FakeXmlaClient:
+    """Drop-in for ``execute_dax_query_direct`` that answers from fixtures."""
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+        self.calls = 0
+
+    def __call__(self, xmla_endpoint: str, dataset_name: str, query: str) -> str:
+        self.calls += 1
+        try:
+            payload = self.store.lookup(XMLA_KIND, dataset_name, query)
+        except FixtureNotFoundError as e:
+            return f"Error: {e}"
+        return payload if isinstance(payload, str) else json.dumps(payload)
+
+
+@contextlib.contextmanager
+def replay_fixtures(
+    store: Union[FixtureStore, str, Path]
+) -> Iterator[Tuple[FakeDaxExecutor, FakeXmlaClient]]:
+    """Route executor and XMLA calls to fakes backed by ``store`` for the duration."""
+    # Consumers import the entry points by name, so patch them where they are used
+    from ..core import execution, metadata, sweep
+
+    if not isinstance(store, FixtureStore):
+        store = FixtureStore.from_directory(store)
+    executor, xmla_client = FakeDaxExecutor(store), FakeXmlaClient(store)
+
+    patched = [
+        (execution, "execute_with_dax_executor", execution.execute_with_dax_executor),
+        (metadata, "execute_dax_query_direct", metadata.execute_dax_query_direct),
+        (sweep, "execute_with_dax_executor", sweep.execute_with_dax_executor),
+        (sweep, "execute_dax_query_direct", sweep.execute_dax_query_direct),
+    ]
+    execution.execute_with_dax_executor = executor
+    metadata.execute_dax_query_direct = xmla_client
+    sweep.execute_with_dax_executor = executor
+    sweep.execute_dax_query_direct = xmla_client
+    try:
+        yield executor, xmla_client
+    finally:
+        for module, attribute, original in reversed(patched):
+            setattr(module, attribute, original)
@@ -5,6 +5,7 @@ import urllib.parse
 from typing import Any, Dict, Optional, Tuple
 
 from .auth import force_token_refresh, is_auth_error, get_access_token
+from .replay import XMLA_KIND, record_call
 from ..config import get_project_root
 
 
@@ -96,6 +97,12 @@ def execute_dax_query_direct(
         dataset_name: Dataset name
         query: DAX query to execute
     """
+    result = _execute_dax_query_direct(xmla_endpoint, dataset_name, query)
+    record_call(XMLA_KIND, dataset_name, query, result)
+    return result
+
+
+def _execute_dax_query_direct(xmla_endpoint: str, dataset_name: str, query: str) -> str:
     def _execute_query_internal() -> str:
         """Internal query execution logic"""
         try:
@@ -1,7 +1,9 @@
 """Register FastMCP tools backed by the core business logic functions."""
 
-import json
-from typing import Dict, Any
+import copy
+from typing import Dict, Any, List
+
+from .response_encoder import encode_response, get_response_page
 
 
 def register_tools_with_fastmcp(mcp):
@@ -60,9 +62,9 @@ def register_tools_with_fastmcp(mcp):
                 desktop_port=desktop_port,
                 location=location
             )
-            return json.dumps(result, indent=2, default=str)
+            return encode_response(result, "connect_to_dataset")
         except Exception as e:
-            return json.dumps({"status": "error", "error": str(e)}, indent=2, default=str)
+            return encode_response({"status": "error", "error": str(e)}, "connect_to_dataset")
     
     @mcp.tool(name="execute_dax_query", description="""Execute optimized DAX queries with performance measurement and comparison to baseline.
 
@@ -90,13 +92,13 @@ def register_tools_with_fastmcp(mcp):
         • Attempt to understand the root cause and adjust syntax before abandoning the optimization approach
         • Only abandon the optimization approach after it is clear that all reasonable syntax variations have been exhausted
 
-        **INPUT:** dax_query (string)""") 
-    def execute_dax_query_wrapper(dax_query: str):
+        **INPUT:** dax_query (string), session_id (optional - defaults to the most recent connection)""") 
+    def execute_dax_query_wrapper(dax_query: str, session_id: str = None):
         try:
-            result = execute_dax_query_core(dax_query=dax_query, execution_mode="optimization")
-            return json.dumps(result, indent=2, default=str)
+            result = execute_dax_query_core(dax_query=dax_query, execution_mode="optimization", session_id=session_id)
+            return encode_response(result, "execute_dax_query")
         except Exception as e:
-            return json.dumps({"status": "error", "error": str(e)}, indent=2, default=str)
+            return encode_response({"status": "error", "error": str(e)}, "execute_dax_query")
     
     @mcp.tool(name="prepare_query_for_optimization", description="""Comprehensive DAX query preparation, baseline execution, and analysis setup.
 
@@ -148,13 +150,14 @@ def register_tools_with_fastmcp(mcp):
 
         **INPUT REQUIRED:** Raw DAX query with measure references (e.g. `EVALUATE SUMMARIZECOLUMNS('Product'[Category], "Total Sales", [Total Sales])`).
         **DO NOT PASS** already inlined / modified optimization attempts here—use only original user intent query.
+        **OPTIONAL:** `session_id` returned by connect_to_dataset, to target a specific connection when several are open.
                 """)
-    def prepare_query_for_optimization_wrapper(query: str):
+    def prepare_query_for_optimization_wrapper(query: str, session_id: str = None):
         try:
-            result = prepare_query_for_optimization_core(query=query)
-            return json.dumps(result, indent=2, default=str)
+            result = prepare_query_for_optimization_core(query=query, session_id=session_id)
+            return encode_response(result, "prepare_query_for_optimization")
         except Exception as e:
-            return json.dumps({"status": "error", "error": str(e)}, indent=2, default=str)
+            return encode_response({"status": "error", "error": str(e)}, "prepare_query_for_optimization")
     
 
     
@@ -168,23 +171,27 @@ def register_tools_with_fastmcp(mcp):
         • Essential for understanding current analysis status and progress toward optimization goals
         • Purely informational for strategic planning
 
-        **INPUT:** No parameters required.""")
-    def get_session_status_wrapper():
-        from .core.session import session_manager
+        **INPUT:** session_id (optional - defaults to the most recent connection).""")
+    def get_session_status_wrapper(session_id: str = None):
+        from .core.session import session_manager, validate_session
         
         try:
-            session = session_manager.get_current_session()
-            if not session:
-                return json.dumps({
+            is_valid, session, error_msg = validate_session(session_id)
+            if not is_valid:
+                return encode_response({
                     "status": "error",
-                    "error": "No active optimization session found",
-                }, indent=2, default=str)
+                    "error": error_msg,
+                    "active_sessions": session_manager.list_sessions(),
+                }, "get_session_status")
 
             connection = session.connection_info
+            with session.lock:
+                query_data = copy.deepcopy(session.query_data)
             session_payload: Dict[str, Any] = {
+                "session_id": session.session_id,
                 "created_at": session.created_at.isoformat(),
                 "last_updated": session.last_updated.isoformat(),
-                "query_data": session.query_data,
+                "query_data": query_data,
                 "connection_info": {
                     "workspace_name": connection.workspace_name,
                     "dataset_name": connection.dataset_name,
@@ -192,9 +199,92 @@ def register_tools_with_fastmcp(mcp):
                 }
             }
 
-            return json.dumps({
+            return encode_response({
                 "status": "success",
                 "session": session_payload,
-            }, indent=2, default=str)
+                "active_sessions": session_manager.list_sessions(),
+            }, "get_session_status")
+        except Exception as e:
+            return encode_response({"status": "error", "error": str(e)}, "get_session_status")
+
+    @mcp.tool(name="get_query_details", description="""Retrieve the full result rows and trace EventDetails recorded for a past execution.
+
+        Session history keeps only summaries and result fingerprints in memory; large payloads are
+        spilled to a temporary store and loaded here on demand.
+
+        **INPUT:** query_id ("baseline" or "optimization_N" from get_session_status), session_id (optional).""")
+    def get_query_details_wrapper(query_id: str, session_id: str = None):
+        from .core.session import validate_session
+
+        try:
+            is_valid, session, error_msg = validate_session(session_id)
+            if not is_valid:
+                return encode_response({"status": "error", "error": error_msg}, "get_query_details")
+
+            with session.lock:
+                payload = session.get_query_payload(query_id)
+                location = session.payload_location(query_id)
+
+            if payload is None:
+                return encode_response({
+                    "status": "error",
+                    "error": f"No recorded results for query '{query_id}'",
+                }, "get_query_details")
+
+            return encode_response({
+                "status": "success",
+                "session_id": session.session_id,
+                "query_id": query_id,
+                "loaded_from": location,
+                "Results": payload.get("results", []),
+                "EventDetails": payload.get("event_details", []),
+            }, "get_query_details")
+        except Exception as e:
+            return encode_response({"status": "error", "error": str(e)}, "get_query_details")
+
+    @mcp.tool(name="sweep_filter_contexts", description="""Run the prepared query under many slicer combinations to find worst-case filter contexts.
+
+        Wraps the session's baseline query (and the best optimization so far, or `optimized_query`) in
+        CALCULATETABLE(..., TREATAS({value}, column)) for combinations of the top-K most frequent values of each
+        filter column, executes the variants concurrently and reports latency percentiles, the slowest contexts,
+        contexts where the optimized definition regresses, and contexts where results differ.
+
+        **WHEN TO USE:** After an optimization looks good on the original query shape, before accepting it.
+
+        **INPUT:** filter_columns (list like ["'Product'[Category]", "'Date'[Year]"]), top_k (values per column, default 5),
+        optimized_query (optional), max_contexts (default 25, includes the unfiltered context),
+        runs_per_context (default 1, fastest run kept), session_id (optional).""")
+    def sweep_filter_contexts_wrapper(
+        filter_columns: List[str],
+        top_k: int = 5,
+        optimized_query: str = None,
+        max_contexts: int = 25,
+        runs_per_context: int = 1,
+        session_id: str = None
+    ):
+        from .core.sweep import sweep_filter_contexts_core
+
+        try:
+            result = sweep_filter_contexts_core(
+                filter_columns=filter_columns,
+                top_k=top_k,
+                optimized_query=optimized_query,
+                max_contexts=max_contexts,
+                runs_per_context=runs_per_context,
+                session_id=session_id
+            )
+            return encode_response(result, "sweep_filter_contexts")
+        except Exception as e:
+            return encode_response({"status": "error", "error": str(e)}, "sweep_filter_contexts")
+
+    @mcp.tool(name="get_response_page", description="""Fetch more items from an array that was truncated to keep a tool response within its size budget.
+
+        Truncated responses carry a `_truncated` list; each entry names the array `path`, how many items were
+        `returned` out of `total`, and a `handle`.
+
+        **INPUT:** handle (from `_truncated`), offset (first item to return), limit (items per page, default 100).""")
+    def get_response_page_wrapper(handle: str, offset: int = 0, limit: int = 100):
+        try:
+            return encode_response(get_response_page(handle, offset, limit), "get_response_page")
         except Exception as e:
-            return json.dumps({"status": "error", "error": str(e)}, indent=2, default=str)
+            return encode_response({"status": "error", "error": str(e)}, "get_response_page")
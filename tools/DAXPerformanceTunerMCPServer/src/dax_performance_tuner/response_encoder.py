@@ -0,0 +1,172 @@
+"""Compact JSON encoding for MCP tool responses.
+
+Responses are serialized without indentation (through ``orjson`` when it is
+installed) and held to a per-tool size budget. When a response is over
+budget its largest arrays are cut down; the full arrays are kept in a small
+LRU store and the response gains a ``_truncated`` list telling the caller
+how many items were returned and which handle to pass to
+``get_response_page`` for the rest.
+"""
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import (
+    RESPONSE_BUDGET_CHARS,
+    RESPONSE_DEFAULT_BUDGET_CHARS,
+    RESPONSE_MIN_ITEMS_KEPT,
+    RESPONSE_STORE_MAX_ENTRIES,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+TRUNCATION_KEY = "_truncated"
+_MAX_TRUNCATION_PASSES = 8
+
+Path = Tuple[Any, ...]
+
+_store: "OrderedDict[str, List[Any]]" = OrderedDict()
+_store_lock = threading.Lock()
+
+
+def dumps(payload: Any) -> str:
+    """Serialize ``payload`` compactly; non-JSON values fall back to ``str``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def encode_response(payload: Any, tool: Optional[str] = None) -> str:
+    """Serialize a tool response, truncating large arrays to fit the tool's budget."""
+    text = dumps(payload)
+    budget = RESPONSE_BUDGET_CHARS.get(tool, RESPONSE_DEFAULT_BUDGET_CHARS)
+    if len(text) <= budget:
+        return text
+
+    truncations: Dict[Path, Dict[str, Any]] = {}
+    for _ in range(_MAX_TRUNCATION_PASSES):
+        candidates = [(path, items) for path, items in _find_lists(payload) if len(items) > RESPONSE_MIN_ITEMS_KEPT]
+        if not candidates:
+            break
+
+        # Shrink every large array by the same ratio so no single array is emptied first
+        sizes = [_estimate_size(items) for _, items in candidates]
+        fixed = max(0.0, len(text) - sum(sizes))
+        ratio = min(1.0, max(0.0, (budget - fixed) / sum(sizes))) * 0.95
+
+        for (path, items), size in zip(candidates, sizes):
+            keep = max(RESPONSE_MIN_ITEMS_KEPT, int(len(items) * ratio))
+            if keep >= len(items):
+                continue
+            entry = truncations.get(path)
+            if entry is None:
+                entry = {
+                    "path": _format_path(path),
+                    "total": len(items),
+                    "handle": _remember(list(items)),
+                }
+                truncations[path] = entry
+            entry["returned"] = keep
+            payload = _replace_at(payload, path, items[:keep])
+
+        text = dumps(_with_marker(payload, truncations)) if truncations else text
+        if len(text) <= budget:
+            break
+
+    return text
+
+
+def get_response_page(handle: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """Return ``limit`` items starting at ``offset`` from a truncated array."""
+    with _store_lock:
+        items = _store.get(handle)
+        if items is not None:
+            _store.move_to_end(handle)
+    if items is None:
+        return {
+            "status": "error",
+            "error": f"Unknown or expired handle '{handle}'. Re-run the original tool to get a new one."
+        }
+
+    offset = max(0, int(offset))
+    limit = max(1, int(limit))
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    return {
+        "status": "success",
+        "handle": handle,
+        "offset": offset,
+        "total": len(items),
+        "items": page,
+        "next_offset": next_offset if next_offset < len(items) else None,
+    }
+
+
+def _remember(items: List[Any]) -> str:
+    handle = uuid.uuid4().hex[:12]
+    with _store_lock:
+        _store[handle] = items
+        while len(_store) > RESPONSE_STORE_MAX_ENTRIES:
+            _store.popitem(last=False)
+    return handle
+
+
+def _find_lists(node: Any, path: Path = ()) -> List[Tuple[Path, List[Any]]]:
+    """Collect truncatable arrays; long arrays are not descended into."""
+    found: List[Tuple[Path, List[Any]]] = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key != TRUNCATION_KEY:
+                found.extend(_find_lists(value, path + (key,)))
+    elif isinstance(node, list):
+        if len(node) > RESPONSE_MIN_ITEMS_KEPT:
+            found.append((path, node))
+        else:
+            for index, value in enumerate(node):
+                found.extend(_find_lists(value, path + (index,)))
+    return found
+
+
+def _estimate_size(items: List[Any]) -> float:
+    sample = items[::max(1, len(items) // 20)]
+    return len(dumps(sample)) * len(items) / len(sample)
+
+
+def _replace_at(node: Any, path: Path, value: Any) -> Any:
+    """Return ``node`` with ``value`` at ``path``, copying only the containers on the path."""
+    if not path:
+        return value
+    head, rest = path[0], path[1:]
+    if isinstance(node, dict):
+        copied = dict(node)
+    else:
+        copied = list(node)
+    copied[head] = _replace_at(node[head], rest, value)
+    return copied
+
+
+def _with_marker(payload: Any, truncations: Dict[Path, Dict[str, Any]]) -> Any:
+    marker = [
+        dict(entry, message=f"Returned {entry['returned']} of {entry['total']} items; "
+                            f"call get_response_page(handle='{entry['handle']}', offset={entry['returned']}) for more.")
+        for entry in truncations.values()
+    ]
+    if isinstance(payload, dict):
+        return dict(payload, **{TRUNCATION_KEY: marker})
+    return {"items": payload, TRUNCATION_KEY: marker}
+
+
+def _format_path(path: Path) -> str:
+    text = ""
+    for part in path:
+        text += f"[{part}]" if isinstance(part, int) else (f".{part}" if text else str(part))
+    return text or "items"
@@ -30,6 +30,7 @@ This is an MCP tool that enables a workflow-driven, research-driven, and testing
 **CALL THIS TOOL FIRST TO ESTABLISH CONNECTION**
 • Use connect_to_dataset with workspace_name + dataset_name or xmla_endpoint + dataset_name
 • Verify successful connection to Power BI dataset
+• Each connection returns a `session_id`; pass it to later tools when working on several datasets at once (omitting it targets the most recent connection)
 • Only proceed once connection is confirmed
 
 **STAGE 2 - COMPREHENSIVE BASELINE & OPTIMIZATION:**
@@ -0,0 +1,50 @@
+"""Tests for the filter-context sweep helpers.
+
+Run from the project root, with the server's requirements installed::
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from dax_performance_tuner.core.sweep import _dax_literal, _percentile  # noqa: E402
+
+_INT64, _DOUBLE, _DECIMAL, _STRING = "6", "8", "10", "2"
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+    assert _percentile(values, 50) == 5.0
+    assert _percentile(values, 90) == 9.0
+    assert _percentile(values, 95) == 10.0
+    assert _percentile(values, 100) == 10.0
+
+
+def test_percentile_even_and_small_samples():
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 90) == 4.0
+    assert _percentile([7.0], 95) == 7.0
+    assert _percentile([1.0, 2.0], 0) == 1.0
+    assert _percentile([], 50) == 0.0
+
+
+def test_numeric_literals_are_culture_independent():
+    assert _dax_literal("1,5", None, _DECIMAL) == "1.5"
+    assert _dax_literal("1.5", None, _DOUBLE) == "1.5"
+    assert _dax_literal(1e-05, None, _DOUBLE) == "0.00001"
+    assert _dax_literal("-1.25E+3", None, _DOUBLE) == "-1250"
+    assert _dax_literal(42, None, _INT64) == "42"
+
+
+def test_non_finite_numbers_are_rejected():
+    assert _dax_literal(float("nan"), None, _DOUBLE) is None
+    assert _dax_literal("Infinity", None, _DOUBLE) is None
+    assert _dax_literal("\u221e", None, _DOUBLE) is None
+
+
+def test_blank_and_string_literals():
+    assert _dax_literal(None, None, _DOUBLE) == "BLANK()"
+    assert _dax_literal('say "hi"', None, _STRING) == '"say ""hi"""'
@@ -18,7 +18,6 @@ Uses Power BI Desktop client ID for maximum compatibility with Power BI service.
 import time
 import threading
 from typing import Optional, Dict, Any
-from msal import PublicClientApplication
 
 # Configuration
 CLIENT_ID = "ea0616ba-638b-4df5-95b9-636659ae5121"  # Power BI Desktop client ID
@@ -29,7 +28,7 @@ SCOPES = ["https://analysis.windows.net/powerbi/api/.default"]
 _access_token: Optional[str] = None
 _token_expiry: Optional[float] = None
 _refresh_token: Optional[str] = None
-_auth_app: Optional[PublicClientApplication] = None
+_auth_app: Optional[Any] = None  # msal.PublicClientApplication, created (and msal imported) on first use
 _token_lock = threading.Lock()
 _last_successful_account: Optional[Dict[str, Any]] = None
 
@@ -127,6 +126,7 @@ def _initialize_app():
     """Initialize MSAL application if not already done"""
     global _auth_app
     if not _auth_app:
+        from msal import PublicClientApplication
         _auth_app = PublicClientApplication(
             CLIENT_ID,
             authority=AUTHORITY
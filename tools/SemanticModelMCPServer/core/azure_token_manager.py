@@ -3,98 +3,269 @@ Azure Token Management Helper
 
 This module provides functionality for managing Azure authentication tokens,
 including caching and automatic refresh for SQL Server connections.
+
+- One ``DefaultAzureCredential`` is shared by the whole process, and once a
+  credential of its chain (environment, managed identity, Azure CLI, ...) has
+  produced a token, later fetches go to that credential directly instead of
+  walking the chain again
+- Concurrent callers that find no valid token share a single fetch per scope
+- Each cached token is renewed by a background timer before it expires
+- ``warm_azure_credential`` resolves the credential and caches a first token
+  at startup, off the request path
 """
 
 import logging
+import struct
+import threading
 import time
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import Any, Dict, Optional, Tuple
+
+SQL_SCOPE = "https://database.windows.net/.default"
+
+EXPIRY_BUFFER_SECONDS = 300  # Tokens count as expired 5 minutes before they really expire
+RENEW_BEFORE_SECONDS = 600   # Background renewal runs this long before a cached token counts as expired
+RENEW_RETRY_SECONDS = 60     # Shortest delay between background renewals, also after a failed one
 
 # Token cache for Azure authentication
-# Structure: {scope: {"token": token_object, "expires_at": timestamp, "token_struct": packed_token}}
-_token_cache = {}
+# Structure: {scope: {"token": token_object, "expires_at": timestamp, "token_struct": packed_token, "provider": name}}
+_token_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+_scope_locks: Dict[str, threading.Lock] = {}  # Held while a token of the scope is fetched
+_renewal_timers: Dict[str, threading.Timer] = {}
+_generation = 0  # Bumped by clear_token_cache so fetches started before it are not cached
+
+_credential = None  # The shared DefaultAzureCredential
+_provider = None    # The credential of the chain that produced a token
+_credential_lock = threading.Lock()
+
+
+def _new_credential(interactive: bool) -> Any:
+    from azure import identity
+
+    return identity.DefaultAzureCredential(exclude_interactive_browser_credential=not interactive)
 
-def get_cached_azure_token(scope: str = "https://database.windows.net/.default") -> Tuple[Optional[bytes], bool, Optional[str]]:
+
+def _get_credential() -> Any:
+    global _credential
+    with _credential_lock:
+        if _credential is None:
+            _credential = _new_credential(interactive=True)
+        return _credential
+
+
+def _narrow(credential: Any) -> None:
+    """Remember the credential of the chain that just produced a token."""
+    global _provider
+    # DefaultAzureCredential (a ChainedTokenCredential) records it in a private attribute; without it the chain is kept
+    successful = getattr(credential, "_successful_credential", None)
+    if successful is None:
+        return
+    with _credential_lock:
+        if _provider is None:
+            _provider = successful
+            logging.info(f"Azure tokens are provided by {type(successful).__name__}")
+
+
+def _fetch_token(scope: str, interactive: bool) -> Any:
+    """
+    Get a new token, from the known provider if there is one.
+
+    Args:
+        interactive: Whether the full chain may fall back to an interactive
+            browser sign-in; background fetches pass False
+    """
+    global _provider
+    with _credential_lock:
+        provider = _provider
+    if provider is not None:
+        try:
+            return provider.get_token(scope)
+        except Exception as e:
+            # The provider stopped working (e.g. after `az logout`); walk the whole chain again
+            logging.info(f"{type(provider).__name__} could not provide an Azure token, trying all credentials: {e}")
+            with _credential_lock:
+                if _provider is provider:
+                    _provider = None
+
+    credential = _get_credential() if interactive else _new_credential(interactive=False)
+    token = credential.get_token(scope)
+    _narrow(credential)
+    return token
+
+
+def _scope_lock(scope: str) -> threading.Lock:
+    with _cache_lock:
+        return _scope_locks.setdefault(scope, threading.Lock())
+
+
+def _valid_entry(scope: str) -> Optional[Dict[str, Any]]:
+    with _cache_lock:
+        entry = _token_cache.get(scope)
+    if entry is not None and time.time() < entry["expires_at"]:
+        return entry
+    return None
+
+
+def _schedule_renewal(scope: str, delay: float) -> None:
+    """Start the renewal timer of a scope, replacing its current one. Caller holds ``_cache_lock``."""
+    old = _renewal_timers.pop(scope, None)
+    if old is not None:
+        old.cancel()
+    timer = threading.Timer(delay, _renew, args=(scope,))
+    timer.daemon = True
+    _renewal_timers[scope] = timer
+    timer.start()
+
+
+def _refresh(scope: str, interactive: bool) -> Dict[str, Any]:
+    """Fetch and cache a new token for a scope. Caller holds the scope's lock."""
+    generation = _generation
+    token = _fetch_token(scope, interactive)
+
+    # Calculate expiration time with the buffer
+    expires_at = token.expires_on - EXPIRY_BUFFER_SECONDS
+
+    # Encode token for SQL Server authentication
+    token_bytes = token.token.encode("UTF-16-LE")
+    token_struct = struct.pack(f'<I{len(token_bytes)}s', len(token_bytes), token_bytes)
+
+    with _credential_lock:
+        provider = type(_provider).__name__ if _provider is not None else "DefaultAzureCredential"
+    entry = {
+        "token": token,
+        "expires_at": expires_at,
+        "token_struct": token_struct,
+        "provider": provider
+    }
+    with _cache_lock:
+        if generation == _generation:
+            _token_cache[scope] = entry
+            _schedule_renewal(scope, max(expires_at - RENEW_BEFORE_SECONDS - time.time(), RENEW_RETRY_SECONDS))
+
+    logging.debug(f"Cached new Azure token for scope: {scope}, expires at: {datetime.fromtimestamp(expires_at)}")
+    return entry
+
+
+def _renew(scope: str) -> None:
+    with _scope_lock(scope):
+        with _cache_lock:
+            if _renewal_timers.get(scope) is not threading.current_thread():
+                return  # Cancelled or replaced while waiting for the lock
+        try:
+            _refresh(scope, interactive=False)
+            logging.debug(f"Renewed Azure token for scope: {scope}")
+        except Exception as e:
+            logging.warning(f"Background renewal of the Azure token for scope {scope} failed: {e}")
+            with _cache_lock:
+                entry = _token_cache.get(scope)
+                if entry is not None and time.time() < entry["expires_at"]:
+                    _schedule_renewal(scope, RENEW_RETRY_SECONDS)
+
+
+def _cached_token(scope: str, interactive: bool) -> Tuple[Optional[bytes], bool, Optional[str]]:
+    # Check if we have a valid cached token
+    entry = _valid_entry(scope)
+    if entry is not None:
+        logging.debug(f"Using cached Azure token for scope: {scope}")
+        return entry["token_struct"], True, None
+
+    with _scope_lock(scope):
+        # Another caller may have fetched the token while this one waited
+        entry = _valid_entry(scope)
+        if entry is not None:
+            return entry["token_struct"], True, None
+
+        logging.debug(f"No valid cached Azure token for scope: {scope}, fetching new token")
+        try:
+            entry = _refresh(scope, interactive)
+        except Exception as e:
+            return None, False, f"Failed to get Azure token: {str(e)}"
+        return entry["token_struct"], True, None
+
+
+def get_cached_azure_token(scope: str = SQL_SCOPE) -> Tuple[Optional[bytes], bool, Optional[str]]:
     """
     Get a cached Azure token or fetch a new one if not cached or expired.
-    
+
     Args:
         scope: The authentication scope for the token
-        
+
     Returns:
         Tuple of (token_struct, success_flag, error_message)
     """
-    import struct
-    from azure import identity
-    
-    current_time = time.time()
-    
-    # Check if we have a valid cached token
-    if scope in _token_cache:
-        cached_entry = _token_cache[scope]
-        if current_time < cached_entry["expires_at"]:
-            # Token is still valid, return cached token_struct
-            logging.debug(f"Using cached Azure token for scope: {scope}")
-            return cached_entry["token_struct"], True, None
+    return _cached_token(scope, interactive=True)
+
+
+def warm_azure_credential(scope: str = SQL_SCOPE) -> threading.Thread:
+    """
+    Resolve the Azure credential and cache a token in a background thread.
+
+    The warm-up never opens an interactive sign-in; if no other credential
+    works, the first tool call that needs a token walks the full chain.
+
+    Returns:
+        The started (daemon) thread
+    """
+    def warm() -> None:
+        started = time.perf_counter()
+        _, success, error = _cached_token(scope, interactive=False)
+        if success:
+            logging.info(f"Azure credential warmed in {time.perf_counter() - started:.2f}s")
         else:
-            logging.debug(f"Cached Azure token expired for scope: {scope}, fetching new token")
-    else:
-        logging.debug(f"No cached Azure token found for scope: {scope}, fetching new token")
-    
-    try:
-        # Get new token
-        credential = identity.DefaultAzureCredential(exclude_interactive_browser_credential=False)
-        token = credential.get_token(scope)
-        
-        # Calculate expiration time with 5-minute buffer
-        buffer_seconds = 300  # 5 minutes
-        expires_at = token.expires_on - buffer_seconds
-        
-        # Encode token for SQL Server authentication
-        token_bytes = token.token.encode("UTF-16-LE")
-        token_struct = struct.pack(f'<I{len(token_bytes)}s', len(token_bytes), token_bytes)
-        
-        # Cache the token
-        _token_cache[scope] = {
-            "token": token,
-            "expires_at": expires_at,
-            "token_struct": token_struct
-        }
-        
-        logging.debug(f"Cached new Azure token for scope: {scope}, expires at: {datetime.fromtimestamp(expires_at)}")
-        return token_struct, True, None
-        
-    except Exception as e:
-        return None, False, f"Failed to get Azure token: {str(e)}"
+            logging.info(f"Azure credential not warmed: {error}")
+
+    thread = threading.Thread(target=warm, name="azure-credential-warmup", daemon=True)
+    thread.start()
+    return thread
+
 
 def clear_token_cache() -> None:
     """
-    Clear the authentication token cache. 
+    Clear the authentication token cache.
     Useful for debugging or forcing token refresh.
+
+    The credential chain is also walked again on the next fetch, e.g. after
+    signing in with another account.
     """
-    global _token_cache
-    _token_cache.clear()
+    global _generation, _credential, _provider
+    with _cache_lock:
+        _generation += 1
+        _token_cache.clear()
+        for timer in _renewal_timers.values():
+            timer.cancel()
+        _renewal_timers.clear()
+    with _credential_lock:
+        _credential = None
+        _provider = None
     logging.debug("Azure token cache cleared")
 
+
 def get_token_cache_status() -> dict:
     """
     Get the current status of the token cache.
-    
+
     Returns:
         Dictionary containing cache status information
     """
     current_time = time.time()
     cache_status = {}
-    
-    for scope, cache_entry in _token_cache.items():
+
+    with _cache_lock:
+        entries = dict(_token_cache)
+        renewals = {scope: timer.is_alive() for scope, timer in _renewal_timers.items()}
+
+    for scope, cache_entry in entries.items():
         expires_at = cache_entry["expires_at"]
         is_valid = current_time < expires_at
         time_until_expiry = expires_at - current_time if is_valid else 0
-        
+
         cache_status[scope] = {
             "is_valid": is_valid,
             "expires_at": datetime.fromtimestamp(expires_at).isoformat(),
-            "time_until_expiry_seconds": max(0, time_until_expiry)
+            "time_until_expiry_seconds": max(0, time_until_expiry),
+            "provider": cache_entry.get("provider"),
+            "renewal_scheduled": renewals.get(scope, False)
         }
-    
+
     return cache_status
@@ -0,0 +1,967 @@
+"""
+Compiled Best Practice Analyzer Rule Expressions
+
+Parses the Tabular Editor (Dynamic LINQ) expression subset used by BPA rules
+and compiles each expression once into nested Python closures. Compiled
+expressions are evaluated against the objects of ``bpa_model``:
+- Identifiers resolve (case-insensitively) against the current object ``it``
+- Collection methods (``Any``, ``All``, ``Where``, ``Count``, ...) evaluate
+  their predicate with ``it`` rebound to each element
+- ``current`` is the object the rule is checking, ``outerIt`` the enclosing ``it``
+- ``string``, ``RegEx``, ``Convert``, ``Math`` and ``char`` helpers, and
+  enum constants such as ``DataType.Int64``, are bound at compile time
+
+Objects take part through a small protocol: ``bpa_member(name)``,
+``bpa_call(name, args)`` and ``bpa_index(key)``, with lower-cased names.
+"""
+
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+
+class BPAExpressionError(Exception):
+    """A rule expression could not be parsed or evaluated."""
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<number>\d+\.\d+|\d+)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>==|!=|<>|<=|>=|&&|\|\||[()\[\].,!=<>+\-*/%?:])
+""", re.VERBOSE)
+
+_STRING_ESCAPES = {'"': '"', 'n': '\n', 'r': '\r', 't': '\t'}
+
+Token = Tuple[str, Any, int]  # (kind, value, position)
+
+
+def _read_string(text: str, start: int, quote: str) -> Tuple[str, int]:
+    """
+    Read a quoted literal.
+
+    A doubled quote stands for one quote. Backslash sequences other than
+    \\" \\n \\r \\t are kept verbatim so RegEx patterns survive.
+    """
+    out: List[str] = []
+    i = start + 1
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\' and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append(quote if nxt == quote else _STRING_ESCAPES.get(nxt, '\\' + nxt))
+            i += 2
+        elif ch == quote:
+            if text[i + 1:i + 2] == quote:  # doubled quote inside a literal
+                out.append(quote)
+                i += 2
+                continue
+            return ''.join(out), i + 1
+        else:
+            out.append(ch)
+            i += 1
+    raise BPAExpressionError(f"Unterminated string literal at position {start}")
+
+
+def tokenize(text: str) -> List[Token]:
+    tokens: List[Token] = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in ('"', "'"):
+            value, i_next = _read_string(text, i, ch)
+            tokens.append(('string', value, i))
+            i = i_next
+            continue
+        match = _TOKEN_RE.match(text, i)
+        if not match:
+            raise BPAExpressionError(f"Unexpected character {ch!r} at position {i}")
+        kind = match.lastgroup
+        if kind == 'number':
+            raw = match.group()
+            tokens.append(('number', float(raw) if '.' in raw else int(raw), i))
+        elif kind != 'ws':
+            tokens.append((kind, match.group(), i))
+        i = match.end()
+    tokens.append(('eof', None, len(text)))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# Runtime helpers
+# ---------------------------------------------------------------------------
+
+class Scope:
+    """
+    Evaluation scope: the lambda parameter ``it``, the enclosing ``it``, the rule target and the model.
+
+    Scopes created for the elements of one collection-method call share
+    ``memo``, where subexpressions that do not read ``it`` are kept after
+    their first evaluation.
+    """
+
+    __slots__ = ('it', 'outer', 'current', 'model', 'memo')
+
+    def __init__(self, it: Any, outer: Any, current: Any, model: Any, memo: Optional[Dict[Any, Any]] = None):
+        self.it = it
+        self.outer = outer
+        self.current = current
+        self.model = model
+        self.memo = memo
+
+    def child(self, item: Any, memo: Optional[Dict[Any, Any]] = None) -> 'Scope':
+        return Scope(item, self.it, self.current, self.model, memo)
+
+
+def truthy(value: Any) -> bool:
+    return bool(value)
+
+
+def _type_name(value: Any) -> str:
+    return getattr(value, 'kind', None) or type(value).__name__
+
+
+def to_string(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, str):
+        return value
+    name = getattr(value, 'name', None)
+    return name if isinstance(name, str) else str(value)
+
+
+def _is_sequence(value: Any) -> bool:
+    return isinstance(value, (list, tuple))
+
+
+def get_member(obj: Any, key: str) -> Any:
+    if isinstance(obj, str):
+        if key == 'length':
+            return len(obj)
+    elif obj is None:
+        raise BPAExpressionError(f"Cannot read '{key}' of null")
+    else:
+        member = getattr(obj, 'bpa_member', None)
+        if member is not None:
+            return member(key)
+        if _is_sequence(obj) and key == 'count':
+            return len(obj)
+    raise BPAExpressionError(f"Unknown property '{key}' on {_type_name(obj)}")
+
+
+def get_index(obj: Any, key: Any) -> Any:
+    index = getattr(obj, 'bpa_index', None)
+    if index is not None:
+        return index(key)
+    if isinstance(obj, (list, tuple, str)) and isinstance(key, int) and not isinstance(key, bool):
+        try:
+            return obj[key]
+        except IndexError:
+            raise BPAExpressionError(f"Index {key} out of range")
+    raise BPAExpressionError(f"{_type_name(obj)} cannot be indexed by {key!r}")
+
+
+def _to_int(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            raise BPAExpressionError(f"Cannot convert {value!r} to an integer")
+    return int(value)
+
+
+def _to_float(value: Any) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BPAExpressionError(f"Cannot convert {value!r} to a number")
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == 'true'
+    return bool(value)
+
+
+def _ignore_case(options: Tuple[Any, ...]) -> bool:
+    return any(isinstance(option, str) and 'ignorecase' in option.lower() for option in options)
+
+
+@lru_cache(maxsize=2048)
+def _regex(pattern: str, ignore_case: bool) -> 're.Pattern':
+    flags = re.IGNORECASE if ignore_case else 0
+    if '(?i)' in pattern:
+        # .NET allows inline (?i) anywhere; Python only at the start, so apply it to the whole pattern
+        pattern = pattern.replace('(?i)', '')
+        flags |= re.IGNORECASE
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise BPAExpressionError(f"Invalid regular expression {pattern!r}: {e}")
+
+
+_LITERAL_PREFIX = re.compile(r"[^\\^$.|?*+()\[\]{}]+")
+
+
+@lru_cache(maxsize=2048)
+def _required_literal(pattern: str) -> str:
+    """Literal text every match must contain: the pattern's leading run of plain characters."""
+    if '|' in pattern:
+        return ''
+    match = _LITERAL_PREFIX.match(pattern.replace('(?i)', ''))
+    if not match:
+        return ''
+    literal = match.group()
+    if pattern.replace('(?i)', '')[match.end():match.end() + 1] in ('?', '*', '+', '{'):
+        literal = literal[:-1]  # a quantifier applies to the last character
+    return literal
+
+
+def _regex_is_match(text: Any, pattern: Any, *options: Any) -> bool:
+    text, pattern = to_string(text), to_string(pattern)
+    ignore_case = _ignore_case(options)
+    literal = _required_literal(pattern)
+    if literal:
+        # Cheap containment test first; most rule patterns are built per object and never match
+        if ignore_case or '(?i)' in pattern:
+            if literal.lower() not in text.lower():
+                return False
+        elif literal not in text:
+            return False
+    return _regex(pattern, ignore_case).search(text) is not None
+
+
+def _str_find(s: str, value: Any, rest: Tuple[Any, ...]) -> int:
+    start = next((arg for arg in rest if isinstance(arg, int) and not isinstance(arg, bool)), 0)
+    value = to_string(value)
+    if _ignore_case(rest):
+        return s.lower().find(value.lower(), start)
+    return s.find(value, start)
+
+
+def _str_substring(s: str, start: int, length: Optional[int] = None) -> str:
+    end = len(s) if length is None else start + length
+    if start < 0 or start > len(s) or end < start or end > len(s):
+        raise BPAExpressionError(f"Substring({start}, {length}) is out of range for a string of length {len(s)}")
+    return s[start:end]
+
+
+def _str_compare_args(s: str, value: Any, rest: Tuple[Any, ...]) -> Tuple[str, str]:
+    value = to_string(value)
+    return (s.lower(), value.lower()) if _ignore_case(rest) else (s, value)
+
+
+def _str_contains(s: str, value: Any, *rest: Any) -> bool:
+    s, value = _str_compare_args(s, value, rest)
+    return value in s
+
+
+def _str_starts_with(s: str, value: Any, *rest: Any) -> bool:
+    s, value = _str_compare_args(s, value, rest)
+    return s.startswith(value)
+
+
+def _str_ends_with(s: str, value: Any, *rest: Any) -> bool:
+    s, value = _str_compare_args(s, value, rest)
+    return s.endswith(value)
+
+
+def _str_equals(s: str, value: Any, *rest: Any) -> bool:
+    if value is None:
+        return False
+    s, value = _str_compare_args(s, value, rest)
+    return s == value
+
+
+_STRING_METHODS: Dict[str, Callable[..., Any]] = {
+    'toupper': lambda s: s.upper(),
+    'toupperinvariant': lambda s: s.upper(),
+    'tolower': lambda s: s.lower(),
+    'tolowerinvariant': lambda s: s.lower(),
+    'contains': _str_contains,
+    'startswith': _str_starts_with,
+    'endswith': _str_ends_with,
+    'equals': _str_equals,
+    'indexof': lambda s, value, *rest: _str_find(s, value, rest),
+    'lastindexof': lambda s, value: s.rfind(to_string(value)),
+    'replace': lambda s, old, new: s.replace(to_string(old), to_string(new)) if old else s,
+    'trim': lambda s, *chars: s.strip(''.join(chars) or None),
+    'trimstart': lambda s, *chars: s.lstrip(''.join(chars) or None),
+    'trimend': lambda s, *chars: s.rstrip(''.join(chars) or None),
+    'substring': _str_substring,
+    'tochararray': lambda s: list(s),
+    'split': lambda s, *seps: s.split(to_string(seps[0])) if seps else s.split(),
+    'tostring': lambda s: s,
+}
+
+
+def _predicate(args: List[Callable[[Scope], Any]]) -> Optional[Callable[[Scope], Any]]:
+    return args[0] if args else None
+
+
+def _build_index(items: List[Any], key: Callable[[Scope], Any], scope: Scope) -> Tuple[Dict[Any, List[int]], List[int]]:
+    buckets: Dict[Any, List[int]] = {}
+    unindexed: List[int] = []
+    memo: Dict[Any, Any] = {}
+    for position, item in enumerate(items):
+        try:
+            buckets.setdefault(key(scope.child(item, memo)), []).append(position)
+        except Exception:
+            unindexed.append(position)  # unhashable key or evaluation error: always re-check
+    return buckets, unindexed
+
+
+def _candidates(items: List[Any], pred: Callable[[Scope], Any], scope: Scope) -> List[Any]:
+    """
+    Items of ``items`` that may satisfy ``pred``, in order.
+
+    When ``pred`` has an equality conjunct whose one side reads only ``it``
+    (``Name == current.Name``) and the collection allows caching
+    (``bpa_indexes``), that side is hashed once per collection and only the
+    matching bucket is scanned; the full predicate still decides each item.
+    """
+    lookup = getattr(pred, 'lookup', None)
+    indexes = getattr(items, 'bpa_indexes', None)
+    if lookup is None or indexes is None:
+        return items
+    key, value = lookup
+    try:
+        wanted = value(scope.child(None))
+        hash(wanted)
+    except Exception:
+        return items
+    index = indexes.get(key)
+    if index is None:
+        index = indexes[key] = _build_index(items, key, scope)
+    buckets, unindexed = index
+    positions = buckets.get(wanted, [])
+    if unindexed:
+        positions = sorted(positions + unindexed)
+    return [items[position] for position in positions]
+
+
+def _seq_where(items: List[Any], args: List[Callable], scope: Scope) -> List[Any]:
+    pred = _predicate(args)
+    if pred is None:
+        return list(items)
+    memo: Dict[Any, Any] = {}
+    return [item for item in _candidates(items, pred, scope) if pred(scope.child(item, memo))]
+
+
+def _seq_any(items: List[Any], args: List[Callable], scope: Scope) -> bool:
+    pred = _predicate(args)
+    if pred is None:
+        return len(items) > 0
+    memo: Dict[Any, Any] = {}
+    for item in _candidates(items, pred, scope):
+        if pred(scope.child(item, memo)):
+            return True
+    return False
+
+
+def _seq_all(items: List[Any], args: List[Callable], scope: Scope) -> bool:
+    pred = _predicate(args)
+    if pred is None:
+        raise BPAExpressionError("All() requires a predicate")
+    memo: Dict[Any, Any] = {}
+    for item in items:
+        if not pred(scope.child(item, memo)):
+            return False
+    return True
+
+
+def _seq_count(items: List[Any], args: List[Callable], scope: Scope) -> int:
+    return len(items) if not args else len(_seq_where(items, args, scope))
+
+
+def _seq_first(items: List[Any], args: List[Callable], scope: Scope) -> Any:
+    matches = _seq_where(items, args, scope)
+    if not matches:
+        raise BPAExpressionError("Sequence contains no matching element")
+    return matches[0]
+
+
+def _seq_first_or_default(items: List[Any], args: List[Callable], scope: Scope) -> Any:
+    matches = _seq_where(items, args, scope)
+    return matches[0] if matches else None
+
+
+def _seq_select(items: List[Any], args: List[Callable], scope: Scope) -> List[Any]:
+    selector = _predicate(args)
+    if selector is None:
+        raise BPAExpressionError("Select() requires a selector")
+    memo: Dict[Any, Any] = {}
+    return [selector(scope.child(item, memo)) for item in items]
+
+
+def _seq_values(items: List[Any], args: List[Callable], scope: Scope) -> List[Any]:
+    return _seq_select(items, args, scope) if args else list(items)
+
+
+def _seq_contains(items: List[Any], args: List[Callable], scope: Scope) -> bool:
+    if len(args) != 1:
+        raise BPAExpressionError("Contains() takes one argument")
+    value = args[0](scope)
+    return any(item is value or item == value for item in items)
+
+
+def _seq_distinct(items: List[Any], args: List[Callable], scope: Scope) -> List[Any]:
+    seen: List[Any] = []
+    for item in items:
+        if item not in seen:
+            seen.append(item)
+    return seen
+
+
+_SEQUENCE_METHODS: Dict[str, Callable[[List[Any], List[Callable], Scope], Any]] = {
+    'any': _seq_any,
+    'all': _seq_all,
+    'count': _seq_count,
+    'where': _seq_where,
+    'first': _seq_first,
+    'firstordefault': _seq_first_or_default,
+    'select': _seq_select,
+    'sum': lambda items, args, scope: sum(_seq_values(items, args, scope)),
+    'max': lambda items, args, scope: max(_seq_values(items, args, scope)),
+    'min': lambda items, args, scope: min(_seq_values(items, args, scope)),
+    'contains': _seq_contains,
+    'distinct': _seq_distinct,
+    'tolist': lambda items, args, scope: list(items),
+    'toarray': lambda items, args, scope: list(items),
+}
+
+
+def call_method(obj: Any, key: str, args: List[Callable[[Scope], Any]], scope: Scope) -> Any:
+    if isinstance(obj, str):
+        method = _STRING_METHODS.get(key)
+        if method is not None:
+            try:
+                return method(obj, *[arg(scope) for arg in args])
+            except TypeError as e:
+                raise BPAExpressionError(f"Bad arguments for string.{key}(): {e}")
+    elif obj is None:
+        raise BPAExpressionError(f"Cannot call '{key}' on null")
+    else:
+        if _is_sequence(obj):
+            method = _SEQUENCE_METHODS.get(key)
+            if method is not None:
+                return method(obj, args, scope)
+        call = getattr(obj, 'bpa_call', None)
+        if call is not None:
+            return call(key, [arg(scope) for arg in args])
+        if key == 'tostring' and not args:
+            return to_string(obj)
+    raise BPAExpressionError(f"Unknown method '{key}' on {_type_name(obj)}")
+
+
+def _char_is_control(c: Any) -> bool:
+    return unicodedata.category(to_string(c)[:1] or ' ') == 'Cc'
+
+
+def _math_round(value: Any, digits: int = 0) -> float:
+    return round(_to_float(value), digits)
+
+
+_STATIC_FUNCTIONS: Dict[Tuple[str, str], Callable[..., Any]] = {
+    ('string', 'isnullorwhitespace'): lambda s: s is None or to_string(s).strip() == '',
+    ('string', 'isnullorempty'): lambda s: s is None or to_string(s) == '',
+    ('string', 'concat'): lambda *parts: ''.join(to_string(p) for p in parts),
+    ('string', 'equals'): lambda a, b, *rest: (a is None and b is None) or (a is not None and _str_equals(to_string(a), b, *rest)),
+    ('regex', 'ismatch'): _regex_is_match,
+    ('convert', 'toint64'): _to_int,
+    ('convert', 'toint32'): _to_int,
+    ('convert', 'toint16'): _to_int,
+    ('convert', 'todecimal'): _to_float,
+    ('convert', 'todouble'): _to_float,
+    ('convert', 'tosingle'): _to_float,
+    ('convert', 'tostring'): to_string,
+    ('convert', 'toboolean'): _to_bool,
+    ('math', 'max'): lambda a, b: max(a, b),
+    ('math', 'min'): lambda a, b: min(a, b),
+    ('math', 'abs'): abs,
+    ('math', 'round'): _math_round,
+    ('math', 'floor'): lambda x: math.floor(_to_float(x)),
+    ('math', 'ceiling'): lambda x: math.ceil(_to_float(x)),
+    ('math', 'pow'): lambda x, y: _to_float(x) ** _to_float(y),
+    ('char', 'iscontrol'): _char_is_control,
+    ('char', 'iswhitespace'): lambda c: to_string(c).isspace(),
+    ('char', 'isletter'): lambda c: to_string(c).isalpha(),
+    ('char', 'isdigit'): lambda c: to_string(c).isdigit(),
+    ('char', 'isletterordigit'): lambda c: to_string(c).isalnum(),
+    ('char', 'isupper'): lambda c: to_string(c).isupper(),
+    ('char', 'islower'): lambda c: to_string(c).islower(),
+    ('char', 'ispunctuation'): lambda c: unicodedata.category(to_string(c)[:1] or ' ').startswith('P'),
+}
+
+_STATIC_CLASSES = {cls for cls, _ in _STATIC_FUNCTIONS}
+
+# TOM enums referenced as ``Type.Member``; values are compared as their member names
+_ENUMS: Dict[str, Tuple[str, ...]] = {
+    'datatype': ('Automatic', 'String', 'Int64', 'Double', 'DateTime', 'Decimal', 'Boolean', 'Binary',
+                 'Unknown', 'Variant'),
+    'crossfilteringbehavior': ('OneDirection', 'BothDirections', 'Automatic'),
+    'relationshipendcardinality': ('None', 'One', 'Many'),
+    'aggregatefunction': ('Default', 'None', 'Sum', 'Min', 'Max', 'Count', 'Average', 'DistinctCount'),
+    'columntype': ('Data', 'Calculated', 'RowNumber', 'CalculatedTableColumn'),
+    'partitionsourcetype': ('Query', 'Calculated', 'None', 'M', 'Entity', 'PolicyRange', 'CalculationGroup'),
+    'modetype': ('Import', 'DirectQuery', 'Default', 'Push', 'Dual'),
+    'securityfilteringbehavior': ('OneDirection', 'BothDirections', 'None'),
+}
+_ENUM_MEMBERS = {
+    enum: {member.lower(): member for member in members}
+    for enum, members in _ENUMS.items()
+}
+
+
+def _equals(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(a: Any, b: Any) -> bool:
+        if a is None or b is None:
+            return False
+        try:
+            return op(a, b)
+        except TypeError:
+            raise BPAExpressionError(f"Cannot compare {_type_name(a)} with {_type_name(b)}")
+    return compare
+
+
+def _add(a: Any, b: Any) -> Any:
+    if isinstance(a, str) or isinstance(b, str):
+        return to_string(a) + to_string(b)
+    if a is None or b is None:
+        return None
+    return a + b
+
+
+def _arith(op: Callable[[Any, Any], Any], symbol: str) -> Callable[[Any, Any], Any]:
+    def arith(a: Any, b: Any) -> Any:
+        if a is None or b is None:
+            return None
+        try:
+            return op(a, b)
+        except (TypeError, ZeroDivisionError) as e:
+            raise BPAExpressionError(f"Cannot evaluate {a!r} {symbol} {b!r}: {e}")
+    return arith
+
+
+def _divide(a: Any, b: Any) -> Any:
+    if isinstance(a, int) and isinstance(b, int):
+        quotient = abs(a) // abs(b)  # .NET integer division truncates toward zero
+        return quotient if (a >= 0) == (b >= 0) else -quotient
+    return a / b
+
+
+_BINARY_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    '==': _equals,
+    '=': _equals,
+    '!=': lambda a, b: not _equals(a, b),
+    '<>': lambda a, b: not _equals(a, b),
+    '<': _compare(lambda a, b: a < b),
+    '>': _compare(lambda a, b: a > b),
+    '<=': _compare(lambda a, b: a <= b),
+    '>=': _compare(lambda a, b: a >= b),
+    '+': _add,
+    '-': _arith(lambda a, b: a - b, '-'),
+    '*': _arith(lambda a, b: a * b, '*'),
+    '/': _arith(_divide, '/'),
+    '%': _arith(lambda a, b: math.fmod(a, b) if isinstance(a, float) or isinstance(b, float) else int(math.fmod(a, b)), '%'),
+}
+
+_COMPARISON_OPERATORS = ('==', '=', '!=', '<>', '<', '>', '<=', '>=')
+
+
+# ---------------------------------------------------------------------------
+# Parser / compiler
+# ---------------------------------------------------------------------------
+
+Compiled = Callable[[Scope], Any]
+
+_NO_USES: FrozenSet[str] = frozenset()
+_USES_IT: FrozenSet[str] = frozenset({'it'})
+
+
+def _node(fn: Compiled, uses: FrozenSet[str], **attrs: Any) -> Compiled:
+    """
+    Tag a closure with the scope slots it reads (``it``, ``outer``, ``current``).
+
+    The tags let lambda predicates use cached hash indexes (see ``_candidates``).
+    """
+    fn.uses = uses
+    for name, value in attrs.items():
+        setattr(fn, name, value)
+    return fn
+
+
+def _uses(*fns: Compiled) -> FrozenSet[str]:
+    return frozenset().union(*(fn.uses for fn in fns))
+
+
+def _argument_uses(args: List[Compiled]) -> FrozenSet[str]:
+    """Uses of method arguments, which may be lambdas whose ``outerIt`` is the caller's ``it``."""
+    uses = _uses(*args)
+    return uses | _USES_IT if 'outer' in uses else uses
+
+
+def _constant(value: Any) -> Compiled:
+    return _node(lambda scope: value, _NO_USES, constant=True)
+
+
+def _hoist(parent_uses: FrozenSet[str], *fns: Compiled) -> List[Compiled]:
+    """
+    Wrap the operands of a node that reads ``it`` which do not read it
+    themselves, so they are evaluated once per collection-method call
+    (through ``Scope.memo``) instead of once per element.
+    """
+    if 'it' not in parent_uses:
+        return list(fns)
+    hoisted = []
+    for fn in fns:
+        if 'it' in fn.uses or getattr(fn, 'constant', False):
+            hoisted.append(fn)
+            continue
+
+        def memoized(scope: Scope, fn: Compiled = fn) -> Any:
+            memo = scope.memo
+            if memo is None:
+                return fn(scope)
+            try:
+                return memo[fn]
+            except KeyError:
+                value = memo[fn] = fn(scope)
+                return value
+        hoisted.append(_node(memoized, fn.uses))
+    return hoisted
+
+
+def _lookup(pred: Compiled) -> Optional[Tuple[Compiled, Compiled]]:
+    """
+    Find an ``a == b`` conjunct of a lambda predicate where ``a`` reads only
+    ``it`` and ``b`` does not read ``it``; ``a`` can then be indexed per collection.
+    """
+    for conjunct in getattr(pred, 'conjuncts', (pred,)):
+        equality = getattr(conjunct, 'equality', None)
+        if equality is None:
+            continue
+        for key, value in (equality, equality[::-1]):
+            if key.uses == _USES_IT and 'it' not in value.uses:
+                return key, value
+    return None
+
+
+class _Parser:
+    """Recursive-descent parser that returns a closure for each production."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.members: Set[str] = set()
+
+    # Token helpers
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Token:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def at_op(self, *ops: str) -> bool:
+        kind, value, _ = self.peek()
+        return kind == 'op' and value in ops
+
+    def at_word(self, *words: str) -> bool:
+        kind, value, _ = self.peek()
+        return kind == 'ident' and value.lower() in words
+
+    def expect_op(self, op: str) -> None:
+        kind, value, position = self.next()
+        if kind != 'op' or value != op:
+            raise BPAExpressionError(f"Expected '{op}' at position {position}, found {value!r}")
+
+    def expect_ident(self) -> str:
+        kind, value, position = self.next()
+        if kind != 'ident':
+            raise BPAExpressionError(f"Expected a name at position {position}, found {value!r}")
+        return value
+
+    # Grammar
+
+    def parse(self) -> Compiled:
+        fn = self.conditional()
+        kind, value, position = self.peek()
+        if kind != 'eof':
+            raise BPAExpressionError(f"Unexpected {value!r} at position {position}")
+        return fn
+
+    def conditional(self) -> Compiled:
+        test = self.logical_or()
+        if not self.at_op('?'):
+            return test
+        self.next()
+        if_true = self.conditional()
+        self.expect_op(':')
+        if_false = self.conditional()
+        return self._iif(test, if_true, if_false)
+
+    @staticmethod
+    def _iif(test: Compiled, if_true: Compiled, if_false: Compiled) -> Compiled:
+        uses = _uses(test, if_true, if_false)
+        test, if_true, if_false = _hoist(uses, test, if_true, if_false)
+        return _node(lambda scope: if_true(scope) if test(scope) else if_false(scope), uses)
+
+    def logical_or(self) -> Compiled:
+        operands = [self.logical_and()]
+        while self.at_op('||') or self.at_word('or'):
+            self.next()
+            operands.append(self.logical_and())
+        if len(operands) == 1:
+            return operands[0]
+        uses = _uses(*operands)
+        operands = _hoist(uses, *operands)
+
+        def logical_or(scope: Scope) -> bool:
+            for operand in operands:
+                if operand(scope):
+                    return True
+            return False
+        return _node(logical_or, uses)
+
+    def logical_and(self) -> Compiled:
+        operands = [self.comparison()]
+        while self.at_op('&&') or self.at_word('and'):
+            self.next()
+            operands.append(self.comparison())
+        if len(operands) == 1:
+            return operands[0]
+        uses = _uses(*operands)
+        conjuncts = tuple(operands)
+        operands = _hoist(uses, *operands)
+
+        def logical_and(scope: Scope) -> bool:
+            for operand in operands:
+                if not operand(scope):
+                    return False
+            return True
+        return _node(logical_and, uses, conjuncts=conjuncts)
+
+    def comparison(self) -> Compiled:
+        left = self.additive()
+        while self.at_op(*_COMPARISON_OPERATORS):
+            left = self._binary(left, self.next()[1], self.additive())
+        return left
+
+    def additive(self) -> Compiled:
+        left = self.multiplicative()
+        while self.at_op('+', '-'):
+            left = self._binary(left, self.next()[1], self.multiplicative())
+        return left
+
+    def multiplicative(self) -> Compiled:
+        left = self.unary()
+        while self.at_op('*', '/', '%'):
+            left = self._binary(left, self.next()[1], self.unary())
+        return left
+
+    @staticmethod
+    def _binary(left: Compiled, op: str, right: Compiled) -> Compiled:
+        fn = _BINARY_OPERATORS[op]
+        uses = _uses(left, right)
+        equality = (left, right)
+        left, right = _hoist(uses, left, right)
+        node = _node(lambda scope: fn(left(scope), right(scope)), uses)
+        if op in ('==', '='):
+            node.equality = equality
+        return node
+
+    def unary(self) -> Compiled:
+        if self.at_op('!') or self.at_word('not'):
+            self.next()
+            operand = self.unary()
+            return _node(lambda scope: not operand(scope), operand.uses)
+        if self.at_op('-'):
+            self.next()
+            operand = self.unary()
+            return _node(lambda scope: -operand(scope), operand.uses)
+        return self.postfix(self.primary())
+
+    def arguments(self, close: str = ')') -> List[Compiled]:
+        args: List[Compiled] = []
+        if self.at_op(close):
+            self.next()
+            return args
+        while True:
+            args.append(self.conditional())
+            if self.at_op(','):
+                self.next()
+                continue
+            self.expect_op(close)
+            return args
+
+    def postfix(self, target: Compiled) -> Compiled:
+        while True:
+            if self.at_op('.'):
+                self.next()
+                name = self.expect_ident()
+                target = self._member(target, name)
+            elif self.at_op('['):
+                self.next()
+                keys = self.arguments(']')
+                if len(keys) != 1:
+                    raise BPAExpressionError("Indexers take exactly one argument")
+                target = self._indexer(target, keys[0])
+            else:
+                return target
+
+    def _member(self, target: Compiled, name: str) -> Compiled:
+        key = name.lower()
+        self.members.add(key)
+        if self.at_op('('):
+            self.next()
+            return self._call(target, key, self.arguments())
+        return _node(lambda scope: get_member(target(scope), key), target.uses)
+
+    @staticmethod
+    def _call(target: Compiled, key: str, args: List[Compiled]) -> Compiled:
+        if key in _SEQUENCE_METHODS and args:
+            lookup = _lookup(args[0])
+            if lookup is not None:
+                args[0].lookup = lookup
+        uses = target.uses | _argument_uses(args)
+        lookup_arg = args[0] if args and hasattr(args[0], 'lookup') else None
+        target, *args = _hoist(uses, target, *args)
+        if lookup_arg is not None:
+            args[0] = lookup_arg  # keep the index-tagged predicate
+        return _node(lambda scope: call_method(target(scope), key, args, scope), uses)
+
+    @staticmethod
+    def _indexer(target: Compiled, key: Compiled) -> Compiled:
+        uses = _uses(target, key)
+        target, key = _hoist(uses, target, key)
+        return _node(lambda scope: get_index(target(scope), key(scope)), uses)
+
+    def primary(self) -> Compiled:
+        kind, value, position = self.next()
+        if kind in ('number', 'string'):
+            return _constant(value)
+        if kind == 'op' and value == '(':
+            inner = self.conditional()
+            self.expect_op(')')
+            return inner
+        if kind != 'ident':
+            raise BPAExpressionError(f"Unexpected {value!r} at position {position}")
+
+        word = value.lower()
+        if word == 'true':
+            return _constant(True)
+        if word == 'false':
+            return _constant(False)
+        if word == 'null':
+            return _constant(None)
+        if word == 'it':
+            return _node(lambda scope: scope.it, _USES_IT)
+        if word == 'current':
+            return _node(lambda scope: scope.current, frozenset({'current'}))
+        if word == 'outerit':
+            return _node(lambda scope: scope.outer, frozenset({'outer'}))
+        if word == 'model':
+            self.members.add(word)
+            return _node(lambda scope: scope.model, _NO_USES)
+        if word in ('and', 'or', 'not'):
+            raise BPAExpressionError(f"Unexpected '{value}' at position {position}")
+
+        if self.at_op('.') and self.peek(1)[0] == 'ident':
+            member = self.peek(1)[1].lower()
+            if word in _ENUM_MEMBERS and member in _ENUM_MEMBERS[word]:
+                self.pos += 2
+                return _constant(_ENUM_MEMBERS[word][member])
+            if (word, member) in _STATIC_FUNCTIONS and self.peek(2)[:2] == ('op', '('):
+                self.pos += 3
+                return self._static_call(_STATIC_FUNCTIONS[(word, member)], self.arguments())
+
+        if self.at_op('('):
+            self.next()
+            args = self.arguments()
+            if word == 'char':
+                return self._static_call(lambda code: chr(_to_int(code)), args)
+            if word == 'iif':
+                if len(args) != 3:
+                    raise BPAExpressionError("iif() takes three arguments")
+                return self._iif(*args)
+            self.members.add(word)
+            return self._call(_node(lambda scope: scope.it, _USES_IT), word, args)
+
+        if word in _STATIC_CLASSES:
+            raise BPAExpressionError(f"Unknown member of '{value}' at position {position}")
+        self.members.add(word)
+        return _node(lambda scope: get_member(scope.it, word), _USES_IT)
+
+    @staticmethod
+    def _static_call(fn: Callable[..., Any], args: List[Compiled]) -> Compiled:
+        def call(scope: Scope) -> Any:
+            values = [arg(scope) for arg in args]
+            try:
+                return fn(*values)
+            except TypeError as e:
+                raise BPAExpressionError(f"Bad arguments: {e}")
+        uses = _uses(*args)
+        args = _hoist(uses, *args)
+        return _node(call, uses)
+
+
+class CompiledExpression:
+    """
+    A parsed rule expression.
+
+    Attributes:
+        source: The expression text
+        members: Lower-cased property and method names the expression reads
+    """
+
+    __slots__ = ('source', 'members', '_fn')
+
+    def __init__(self, source: str, fn: Compiled, members: FrozenSet[str]):
+        self.source = source
+        self.members = members
+        self._fn = fn
+
+    def evaluate(self, obj: Any, model: Any = None) -> Any:
+        """Evaluate with ``it`` and ``current`` bound to ``obj``."""
+        if model is None:
+            model = getattr(obj, 'model', None)
+        return self._fn(Scope(obj, None, obj, model))
+
+    def matches(self, obj: Any, model: Any = None) -> bool:
+        return truthy(self.evaluate(obj, model))
+
+
+@lru_cache(maxsize=512)
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Compile a rule expression.
+
+    Raises:
+        BPAExpressionError: If the expression is empty or cannot be parsed
+    """
+    if not text or not text.strip():
+        raise BPAExpressionError("Empty expression")
+    parser = _Parser(text)
+    fn = parser.parse()
+    return CompiledExpression(text, fn, frozenset(parser.members))
@@ -0,0 +1,901 @@
+"""
+TMSL Object Graph for the Best Practice Analyzer
+
+Wraps the dictionaries of a TMSL model in lightweight objects that expose
+the Tabular Object Model property names BPA rule expressions use
+(``DataType``, ``IsHidden``, ``UsedInRelationships``, ``ReferencedBy``, ...).
+TMSL omits default values and spells enums in camelCase, so properties
+return TOM defaults and PascalCase enum names (``"BothDirections"``,
+``"Int64"``).
+
+The graph is built in a single pass over the model. That pass records every
+object in traversal order together with its BPA scope (``DataColumn``,
+``CalculatedTable``, ``KPI``, ...) and the lookup tables the ``UsedIn*``
+properties need. DAX dependencies behind ``DependsOn`` / ``ReferencedBy``
+are only scanned when a rule first asks for them.
+
+For incremental analysis every object also has a stable key and a content
+signature (``ModelGraph.signatures``). The signature covers the object, its
+children and its ancestors' own properties, so a rule that only reads
+``LOCAL`` members gives the same result for an unchanged signature.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .bpa_expression import BPAExpressionError
+
+TABLE_KINDS = ("Table", "CalculatedTable", "CalculationGroup")
+COLUMN_KINDS = ("DataColumn", "CalculatedColumn", "CalculatedTableColumn")
+
+# TOM ObjectType names (what ``ObjectType`` returns)
+_OBJECT_TYPES = {
+    "Model": "Model",
+    "Table": "Table",
+    "CalculatedTable": "Table",
+    "CalculationGroup": "CalculationGroup",
+    "DataColumn": "Column",
+    "CalculatedColumn": "Column",
+    "CalculatedTableColumn": "Column",
+    "Measure": "Measure",
+    "KPI": "KPI",
+    "Hierarchy": "Hierarchy",
+    "Level": "Level",
+    "Partition": "Partition",
+    "Relationship": "Relationship",
+    "Perspective": "Perspective",
+    "ModelRole": "Role",
+    "ModelRoleMember": "RoleMember",
+    "TablePermission": "TablePermission",
+    "CalculationItem": "CalculationItem",
+    "ProviderDataSource": "DataSource",
+    "StructuredDataSource": "DataSource",
+    "NamedExpression": "Expression",
+}
+
+# Tabular Editor display names (what ``ObjectTypeName`` returns)
+_OBJECT_TYPE_NAMES = {
+    "CalculatedTable": "Calculated Table",
+    "CalculationGroup": "Calculation Group Table",
+    "DataColumn": "Data Column",
+    "CalculatedColumn": "Calculated Column",
+    "CalculatedTableColumn": "Calculated Table Column",
+    "ModelRole": "Role",
+    "ModelRoleMember": "Role Member",
+    "TablePermission": "Table Permission",
+    "CalculationItem": "Calculation Item",
+    "ProviderDataSource": "Provider Data Source",
+    "StructuredDataSource": "Structured Data Source",
+    "NamedExpression": "Shared Expression",
+}
+
+
+def _text(value: Any) -> str:
+    """TMSL multi-line properties may be a list of lines."""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(str(line) for line in value)
+    return str(value)
+
+
+def _enum(value: Any, default: str) -> str:
+    """TMSL camelCase enum value -> TOM member name."""
+    if not value or not isinstance(value, str):
+        return default
+    return value[:1].upper() + value[1:]
+
+
+class ObjectList(list):
+    """
+    A list of graph objects; ``AllMeasures`` / ``AllColumns`` / ... filter it by kind (as on ``ReferencedBy``).
+
+    Model-wide collections set ``bpa_indexes`` to a dict so rule predicates
+    can cache hash indexes over them for the lifetime of the graph.
+    """
+
+    bpa_indexes: Optional[Dict[Any, Any]] = None
+
+    _FILTERS = {
+        "allmeasures": ("Measure",),
+        "allcolumns": COLUMN_KINDS,
+        "alltables": TABLE_KINDS,
+        "allcalculationitems": ("CalculationItem",),
+        "allkpis": ("KPI",),
+        "alltablepermissions": ("TablePermission",),
+    }
+
+    def bpa_member(self, key: str) -> Any:
+        if key == "count":
+            return len(self)
+        kinds = self._FILTERS.get(key)
+        if kinds is None:
+            raise BPAExpressionError(f"Unknown property '{key}' on collection")
+        filtered = self.__dict__.setdefault("_filtered", {})
+        if key not in filtered:
+            filtered[key] = ObjectList(obj for obj in self if obj.kind in kinds)
+        return filtered[key]
+
+
+class KeyedList(list):
+    """A list whose items can also be looked up by name, e.g. ``RowLevelSecurity["Role"]``."""
+
+    def __init__(self, items: Any = (), keys: Optional[Dict[str, Any]] = None):
+        super().__init__(items)
+        self.keys = keys or {}
+
+    def bpa_index(self, key: Any) -> Any:
+        if isinstance(key, str):
+            return self.keys.get(key.lower())
+        try:
+            return self[key]
+        except (IndexError, TypeError):
+            raise BPAExpressionError(f"Index {key!r} out of range")
+
+
+_EMPTY = ObjectList()
+
+
+class DaxReference:
+    """One reference from a DAX expression to a column or measure."""
+
+    __slots__ = ("obj", "fully_qualified")
+
+    def __init__(self, obj: "TomObject", fully_qualified: bool):
+        self.obj = obj
+        self.fully_qualified = fully_qualified
+
+    def bpa_member(self, key: str) -> Any:
+        if key == "fullyqualified":
+            return self.fully_qualified
+        if key == "object":
+            return self.obj
+        raise BPAExpressionError(f"Unknown property '{key}' on DAX reference")
+
+
+class Dependency:
+    """A ``DependsOn`` entry: the referenced object (``Key``) and its references (``Value``)."""
+
+    __slots__ = ("key", "value")
+
+    def __init__(self, key: "TomObject", value: List[DaxReference]):
+        self.key = key
+        self.value = value
+
+    def bpa_member(self, key: str) -> Any:
+        if key == "key":
+            return self.key
+        if key == "value":
+            return self.value
+        raise BPAExpressionError(f"Unknown property '{key}' on dependency")
+
+
+class _PerspectiveMembership:
+    """``InPerspective[name]`` for a table, column, measure or hierarchy."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: "TomObject"):
+        self.obj = obj
+
+    def bpa_index(self, key: Any) -> bool:
+        members = self.obj.graph.perspective_members.get(str(key).lower())
+        if members is None:
+            raise BPAExpressionError(f"Perspective '{key}' does not exist")
+        return self.obj.perspective_key() in members
+
+
+class TomObject:
+    """
+    One TMSL object.
+
+    Attributes:
+        kind: BPA scope name (``Table``, ``DataColumn``, ``Measure``, ...)
+        data: The TMSL dictionary
+        graph: Owning ``ModelGraph``
+        parent: Containing object (table for columns, measure for KPIs, ...)
+        table: Table the object belongs to, if any
+        name: Object name
+        children: Child collections by TMSL key (``columns``, ``measures``, ...)
+    """
+
+    __slots__ = ("kind", "data", "graph", "parent", "table", "name", "children")
+
+    def __init__(self, kind: str, data: Dict[str, Any], graph: "ModelGraph",
+                 parent: Optional["TomObject"] = None, table: Optional["TomObject"] = None,
+                 name: Optional[str] = None):
+        self.kind = kind
+        self.data = data
+        self.graph = graph
+        self.parent = parent
+        self.table = table
+        self.name = name if name is not None else str(data.get("name", ""))
+        self.children: Dict[str, ObjectList] = {}
+
+    def __repr__(self) -> str:
+        return f"<{self.kind} {self.name!r}>"
+
+    @property
+    def model(self) -> "TomObject":
+        return self.graph.model
+
+    def child_list(self, key: str) -> ObjectList:
+        return self.children.get(key, _EMPTY)
+
+    def perspective_key(self) -> Tuple[str, ...]:
+        if self.table is None:
+            return ("table", self.name.lower())
+        return (_OBJECT_TYPES.get(self.kind, self.kind).lower(), self.table.name.lower(), self.name.lower())
+
+    def annotation(self, name: str) -> Optional[str]:
+        for annotation in self.data.get("annotations", []) or []:
+            if annotation.get("name") == name:
+                return _text(annotation.get("value"))
+        return None
+
+    def bpa_member(self, key: str) -> Any:
+        getter = _MEMBERS.get(self.kind, _COMMON_MEMBERS).get(key)
+        if getter is None:
+            raise BPAExpressionError(f"Unknown property '{key}' on {self.kind}")
+        return getter(self)
+
+    def bpa_call(self, key: str, args: List[Any]) -> Any:
+        if key == "getannotation" and len(args) == 1:
+            return self.annotation(str(args[0]))
+        if key == "hasannotation" and len(args) == 1:
+            return self.annotation(str(args[0])) is not None
+        if key == "tostring" and not args:
+            return self.name
+        raise BPAExpressionError(f"Unknown method '{key}' on {self.kind}")
+
+
+# ---------------------------------------------------------------------------
+# Property tables
+# ---------------------------------------------------------------------------
+
+Getter = Callable[[TomObject], Any]
+
+
+def _flag(key: str, default: bool = False) -> Getter:
+    return lambda o: bool(o.data.get(key, default))
+
+
+def _string(key: str) -> Getter:
+    return lambda o: _text(o.data.get(key))
+
+
+def _children(key: str) -> Getter:
+    return lambda o: o.child_list(key)
+
+
+def _table_object_type_name(o: TomObject) -> str:
+    if o.kind != "Table":
+        return _OBJECT_TYPE_NAMES[o.kind]
+    default_mode = o.graph.model.data.get("defaultMode")
+    for partition in o.data.get("partitions", []) or []:
+        mode = partition.get("mode") or "default"
+        if mode == "directQuery" or (mode == "default" and default_mode == "directQuery"):
+            return "Table (DirectQuery)"
+    return "Table"
+
+
+def _partition_query(partition: Dict[str, Any]) -> str:
+    source = partition.get("source", {}) or {}
+    return _text(source.get("query") if source.get("query") is not None else source.get("expression"))
+
+
+def _table_source_expression(o: TomObject) -> str:
+    partitions = o.data.get("partitions", []) or []
+    return _partition_query(partitions[0]) if partitions else ""
+
+
+def _column_key(o: TomObject) -> Tuple[str, str]:
+    return (o.table.name.lower(), o.name.lower())
+
+
+def _sort_by_column(o: TomObject) -> Optional[TomObject]:
+    sort_by = o.data.get("sortByColumn")
+    return o.graph.column(o.table.name, sort_by) if sort_by else None
+
+
+def _level_column(o: TomObject) -> Optional[TomObject]:
+    return o.graph.column(o.table.name, o.data.get("column", ""))
+
+
+def _relationship_end(table_key: str, column_key: Optional[str] = None) -> Getter:
+    if column_key is None:
+        return lambda o: o.graph.table_by_name(o.data.get(table_key, ""))
+    return lambda o: o.graph.column(o.data.get(table_key, ""), o.data.get(column_key, ""))
+
+
+def _partition_data_source(o: TomObject) -> Optional[TomObject]:
+    name = (o.data.get("source", {}) or {}).get("dataSource")
+    return o.graph.data_sources_by_name.get(name.lower()) if name else None
+
+
+def _quoted_table(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+
+def _bracketed(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+
+_COMMON_MEMBERS: Dict[str, Getter] = {
+    "name": lambda o: o.name,
+    "description": _string("description"),
+    "ishidden": _flag("isHidden"),
+    "objecttype": lambda o: _OBJECT_TYPES.get(o.kind, o.kind),
+    "objecttypename": lambda o: _OBJECT_TYPE_NAMES.get(o.kind, o.kind),
+    "model": lambda o: o.graph.model,
+}
+
+_DAX_MEMBERS: Dict[str, Getter] = {
+    "dependson": lambda o: o.graph.depends_on(o),
+    "referencedby": lambda o: o.graph.referenced_by(o),
+}
+
+_TABLE_MEMBERS: Dict[str, Getter] = {
+    **_COMMON_MEMBERS,
+    **_DAX_MEMBERS,
+    "objecttypename": _table_object_type_name,
+    "columns": _children("columns"),
+    "measures": _children("measures"),
+    "hierarchies": _children("hierarchies"),
+    "partitions": _children("partitions"),
+    "calculationitems": _children("calculationItems"),
+    "datacategory": _string("dataCategory"),
+    "sourceexpression": _table_source_expression,
+    "isprivate": _flag("isPrivate"),
+    "excludefrommodelrefresh": _flag("excludeFromModelRefresh"),
+    "usedinrelationships": lambda o: o.graph.relationships_by_table.get(o.name.lower(), _EMPTY),
+    "rowlevelsecurity": lambda o: o.graph.row_level_security(o),
+    "inperspective": _PerspectiveMembership,
+    "daxobjectname": lambda o: _quoted_table(o.name),
+    "daxobjectfullname": lambda o: _quoted_table(o.name),
+    "daxtablename": lambda o: _quoted_table(o.name),
+    "precedence": lambda o: int((o.data.get("calculationGroup") or {}).get("precedence", 0)),
+}
+
+_COLUMN_MEMBERS: Dict[str, Getter] = {
+    **_COMMON_MEMBERS,
+    **_DAX_MEMBERS,
+    "table": lambda o: o.table,
+    "datatype": lambda o: _enum(o.data.get("dataType"), "Automatic"),
+    "type": lambda o: _enum(o.data.get("type"), "Data"),
+    "expression": _string("expression"),
+    "sourcecolumn": _string("sourceColumn"),
+    "formatstring": _string("formatString"),
+    "datacategory": _string("dataCategory"),
+    "displayfolder": _string("displayFolder"),
+    "summarizeby": lambda o: _enum(o.data.get("summarizeBy"), "Default"),
+    "iskey": _flag("isKey"),
+    "isunique": _flag("isUnique"),
+    "isnullable": _flag("isNullable", True),
+    "isavailableinmdx": _flag("isAvailableInMdx", True),
+    "isdefaultlabel": _flag("isDefaultLabel"),
+    "isdefaultimage": _flag("isDefaultImage"),
+    "encodinghint": lambda o: _enum(o.data.get("encodingHint"), "Default"),
+    "alternateof": lambda o: o.data.get("alternateOf"),
+    "sortbycolumn": _sort_by_column,
+    "usedinrelationships": lambda o: o.graph.relationships_by_column.get(_column_key(o), _EMPTY),
+    "usedinsortby": lambda o: o.graph.sort_by_users.get(_column_key(o), _EMPTY),
+    "usedinhierarchies": lambda o: o.graph.hierarchy_users.get(_column_key(o), _EMPTY),
+    "usedinvariations": lambda o: o.graph.variation_users.get(_column_key(o), _EMPTY),
+    "inperspective": _PerspectiveMembership,
+    "daxobjectname": lambda o: _bracketed(o.name),
+    "daxobjectfullname": lambda o: _quoted_table(o.table.name) + _bracketed(o.name),
+    "daxtablename": lambda o: _quoted_table(o.table.name),
+}
+
+_MEASURE_MEMBERS: Dict[str, Getter] = {
+    **_COMMON_MEMBERS,
+    **_DAX_MEMBERS,
+    "table": lambda o: o.table,
+    "expression": _string("expression"),
+    "formatstring": _string("formatString"),
+    "displayfolder": _string("displayFolder"),
+    "datatype": lambda o: _enum(o.data.get("dataType"), "Unknown"),
+    "detailrowsexpression": lambda o: _text((o.data.get("detailRowsDefinition") or {}).get("expression")),
+    "kpi": lambda o: o.children["kpi"][0] if o.children.get("kpi") else None,
+    "inperspective": _PerspectiveMembership,
+    "daxobjectname": lambda o: _bracketed(o.name),
+    "daxobjectfullname": lambda o: _bracketed(o.name),
+    "daxtablename": lambda o: _quoted_table(o.table.name),
+}
+
+_MEMBERS: Dict[str, Dict[str, Getter]] = {
+    "Model": {
+        **_COMMON_MEMBERS,
+        "tables": lambda o: o.graph.tables,
+        "alltables": lambda o: o.graph.tables,
+        "allcolumns": lambda o: o.graph.columns,
+        "allmeasures": lambda o: o.graph.measures,
+        "allhierarchies": lambda o: o.graph.hierarchies,
+        "alllevels": lambda o: o.graph.levels,
+        "allpartitions": lambda o: o.graph.partitions,
+        "allcalculationitems": lambda o: o.graph.calculation_items,
+        "relationships": lambda o: o.graph.relationships,
+        "perspectives": lambda o: o.graph.perspectives,
+        "roles": lambda o: o.graph.roles,
+        "datasources": lambda o: o.graph.data_sources,
+        "expressions": lambda o: o.graph.expressions,
+        "culture": _string("culture"),
+        "defaultmode": lambda o: _enum(o.data.get("defaultMode"), "Import"),
+        "defaultpowerbidatasourceversion": lambda o: _enum(o.data.get("defaultPowerBIDataSourceVersion"), "PowerBI_V1"),
+        "discourageimplicitmeasures": _flag("discourageImplicitMeasures"),
+    },
+    "Table": _TABLE_MEMBERS,
+    "CalculatedTable": _TABLE_MEMBERS,
+    "CalculationGroup": _TABLE_MEMBERS,
+    "DataColumn": _COLUMN_MEMBERS,
+    "CalculatedColumn": _COLUMN_MEMBERS,
+    "CalculatedTableColumn": _COLUMN_MEMBERS,
+    "Measure": _MEASURE_MEMBERS,
+    "KPI": {
+        **_COMMON_MEMBERS,
+        **_DAX_MEMBERS,
+        "measure": lambda o: o.parent,
+        "table": lambda o: o.table,
+        "targetexpression": _string("targetExpression"),
+        "statusexpression": _string("statusExpression"),
+        "trendexpression": _string("trendExpression"),
+        "targetformatstring": _string("targetFormatString"),
+        "targetdescription": _string("targetDescription"),
+        "statusgraphic": _string("statusGraphic"),
+        "trendgraphic": _string("trendGraphic"),
+    },
+    "Hierarchy": {
+        **_COMMON_MEMBERS,
+        "table": lambda o: o.table,
+        "levels": _children("levels"),
+        "displayfolder": _string("displayFolder"),
+        "inperspective": _PerspectiveMembership,
+    },
+    "Level": {
+        **_COMMON_MEMBERS,
+        "table": lambda o: o.table,
+        "hierarchy": lambda o: o.parent,
+        "column": _level_column,
+        "ordinal": lambda o: int(o.data.get("ordinal", 0)),
+    },
+    "Partition": {
+        **_COMMON_MEMBERS,
+        "table": lambda o: o.table,
+        "sourcetype": lambda o: _enum((o.data.get("source", {}) or {}).get("type"), "Query"),
+        "query": lambda o: _partition_query(o.data),
+        "expression": lambda o: _partition_query(o.data),
+        "mode": lambda o: _enum(o.data.get("mode"), "Default"),
+        "datasource": _partition_data_source,
+    },
+    "Relationship": {
+        **_COMMON_MEMBERS,
+        "fromtable": _relationship_end("fromTable"),
+        "fromcolumn": _relationship_end("fromTable", "fromColumn"),
+        "totable": _relationship_end("toTable"),
+        "tocolumn": _relationship_end("toTable", "toColumn"),
+        "fromcardinality": lambda o: _enum(o.data.get("fromCardinality"), "Many"),
+        "tocardinality": lambda o: _enum(o.data.get("toCardinality"), "One"),
+        "crossfilteringbehavior": lambda o: _enum(o.data.get("crossFilteringBehavior"), "OneDirection"),
+        "securityfilteringbehavior": lambda o: _enum(o.data.get("securityFilteringBehavior"), "OneDirection"),
+        "isactive": _flag("isActive", True),
+        "relyonreferentialintegrity": _flag("relyOnReferentialIntegrity"),
+    },
+    "Perspective": dict(_COMMON_MEMBERS),
+    "ModelRole": {
+        **_COMMON_MEMBERS,
+        "members": _children("members"),
+        "tablepermissions": _children("tablePermissions"),
+        "rowlevelsecurity": lambda o: o.graph.role_row_level_security(o),
+        "modelpermission": lambda o: _enum(o.data.get("modelPermission"), "Read"),
+    },
+    "ModelRoleMember": {
+        **_COMMON_MEMBERS,
+        "role": lambda o: o.parent,
+        "membername": _string("memberName"),
+        "identityprovider": _string("identityProvider"),
+    },
+    "TablePermission": {
+        **_COMMON_MEMBERS,
+        **_DAX_MEMBERS,
+        "role": lambda o: o.parent,
+        "table": lambda o: o.table,
+        "expression": _string("filterExpression"),
+        "filterexpression": _string("filterExpression"),
+        "metadatapermission": lambda o: _enum(o.data.get("metadataPermission"), "Default"),
+    },
+    "CalculationItem": {
+        **_COMMON_MEMBERS,
+        **_DAX_MEMBERS,
+        "table": lambda o: o.table,
+        "calculationgroup": lambda o: o.table,
+        "expression": _string("expression"),
+        "ordinal": lambda o: int(o.data.get("ordinal", 0)),
+        "formatstringexpression": lambda o: _text((o.data.get("formatStringDefinition") or {}).get("expression")),
+    },
+    "ProviderDataSource": {
+        **_COMMON_MEMBERS,
+        "type": lambda o: "Provider",
+        "connectionstring": _string("connectionString"),
+        "usedbypartitions": lambda o: o.graph.partitions_by_data_source.get(o.name.lower(), _EMPTY),
+    },
+    "StructuredDataSource": {
+        **_COMMON_MEMBERS,
+        "type": lambda o: "Structured",
+        "usedbypartitions": lambda o: o.graph.partitions_by_data_source.get(o.name.lower(), _EMPTY),
+    },
+    "NamedExpression": {
+        **_COMMON_MEMBERS,
+        "expression": _string("expression"),
+        "kind": lambda o: _enum(o.data.get("kind"), "M"),
+    },
+}
+
+
+# Members whose value depends on objects outside the owner's signature
+# (other tables, relationships, roles, perspectives, DAX references, the
+# model). Rules that read any of them are re-evaluated on every analysis.
+NONLOCAL_MEMBERS = frozenset({
+    "model", "tables", "alltables", "allcolumns", "allmeasures", "allhierarchies", "alllevels",
+    "allpartitions", "allcalculationitems", "relationships", "perspectives", "roles", "datasources",
+    "expressions", "dependson", "referencedby", "usedinrelationships", "usedinsortby",
+    "usedinhierarchies", "usedinvariations", "usedbypartitions", "rowlevelsecurity", "inperspective",
+    "sortbycolumn", "column", "fromtable", "fromcolumn", "totable", "tocolumn", "datasource",
+    "objecttypename",  # "Table (DirectQuery)" depends on the model's default mode
+})
+
+# Child collections, hashed as separate objects rather than as part of their owner
+_CHILD_KEYS = frozenset({"columns", "measures", "hierarchies", "partitions", "levels", "kpi",
+                         "members", "tablePermissions"})
+
+
+# ---------------------------------------------------------------------------
+# DAX reference scanning
+# ---------------------------------------------------------------------------
+
+# String literals and comments, blanked out before looking for references
+_DAX_NOISE = re.compile(r'"(?:[^"]|"")*"|//[^\n]*|--[^\n]*|/\*.*?\*/', re.DOTALL)
+# 'Table'[Name], Table[Name] or [Name]
+_DAX_REFERENCE = re.compile(r"(?:'((?:[^']|'')+)'|([A-Za-z_][A-Za-z0-9_]*))?\[((?:[^\]]|\]\])+)\]")
+
+
+def dax_references(expression: str) -> List[Tuple[Optional[str], str]]:
+    """Return ``(table or None, name)`` for every bracketed reference in a DAX expression."""
+    text = _DAX_NOISE.sub(" ", expression)
+    references = []
+    for match in _DAX_REFERENCE.finditer(text):
+        quoted, bare, name = match.groups()
+        table = quoted.replace("''", "'") if quoted is not None else bare
+        references.append((table, name.replace("]]", "]")))
+    return references
+
+
+class ModelGraph:
+    """
+    All objects of one TMSL model.
+
+    Attributes:
+        model: The model object
+        objects: Every object in traversal order (model, data sources,
+            expressions, tables with their children, relationships,
+            perspectives, roles with their table permissions)
+    """
+
+    def __init__(self, model: Dict[str, Any]):
+        self.objects: List[TomObject] = []
+        self.tables = ObjectList()
+        self.columns = ObjectList()
+        self.measures = ObjectList()
+        self.kpis = ObjectList()
+        self.hierarchies = ObjectList()
+        self.levels = ObjectList()
+        self.partitions = ObjectList()
+        self.calculation_items = ObjectList()
+        self.relationships = ObjectList()
+        self.perspectives = ObjectList()
+        self.roles = ObjectList()
+        self.table_permissions = ObjectList()
+        self.data_sources = ObjectList()
+        self.expressions = ObjectList()
+
+        self.tables_by_name: Dict[str, TomObject] = {}
+        self.columns_by_key: Dict[Tuple[str, str], TomObject] = {}
+        self.measures_by_name: Dict[str, TomObject] = {}
+        self.data_sources_by_name: Dict[str, TomObject] = {}
+        self.relationships_by_table: Dict[str, ObjectList] = {}
+        self.relationships_by_column: Dict[Tuple[str, str], ObjectList] = {}
+        self.sort_by_users: Dict[Tuple[str, str], ObjectList] = {}
+        self.hierarchy_users: Dict[Tuple[str, str], ObjectList] = {}
+        self.variation_users: Dict[Tuple[str, str], ObjectList] = {}
+        self.partitions_by_data_source: Dict[str, ObjectList] = {}
+        self.perspective_members: Dict[str, set] = {}
+        self._rls_by_table: Dict[str, List[Tuple[str, str]]] = {}
+        self._depends_on: Optional[Dict[int, List[Dependency]]] = None
+        self._referenced_by: Dict[int, ObjectList] = {}
+
+        self.model = self._add("Model", model, name=str(model.get("name", "Model")))
+        self._build(model)
+        for collection in (self.tables, self.columns, self.measures, self.kpis, self.hierarchies, self.levels,
+                           self.partitions, self.calculation_items, self.relationships, self.perspectives,
+                           self.roles, self.table_permissions, self.data_sources, self.expressions):
+            collection.bpa_indexes = {}
+
+    # Construction (single pass)
+
+    def _add(self, kind: str, data: Dict[str, Any], parent: Optional[TomObject] = None,
+             table: Optional[TomObject] = None, name: Optional[str] = None,
+             collection: Optional[ObjectList] = None) -> TomObject:
+        obj = TomObject(kind, data, self, parent, table, name)
+        self.objects.append(obj)
+        if collection is not None:
+            collection.append(obj)
+        return obj
+
+    @staticmethod
+    def _attach(parent: TomObject, key: str, obj: TomObject) -> None:
+        parent.children.setdefault(key, ObjectList()).append(obj)
+
+    def _build(self, model: Dict[str, Any]) -> None:
+        for data_source in model.get("dataSources", []) or []:
+            kind = "StructuredDataSource" if data_source.get("type") == "structured" else "ProviderDataSource"
+            obj = self._add(kind, data_source, collection=self.data_sources)
+            self.data_sources_by_name[obj.name.lower()] = obj
+
+        for expression in model.get("expressions", []) or []:
+            self._add("NamedExpression", expression, collection=self.expressions)
+
+        for table in model.get("tables", []) or []:
+            self._build_table(table)
+
+        for relationship in model.get("relationships", []) or []:
+            obj = self._add("Relationship", relationship, collection=self.relationships)
+            from_table = str(relationship.get("fromTable", ""))
+            to_table = str(relationship.get("toTable", ""))
+            self.relationships_by_table.setdefault(from_table.lower(), ObjectList()).append(obj)
+            if to_table.lower() != from_table.lower():
+                self.relationships_by_table.setdefault(to_table.lower(), ObjectList()).append(obj)
+            for column_key in {(from_table.lower(), str(relationship.get("fromColumn", "")).lower()),
+                               (to_table.lower(), str(relationship.get("toColumn", "")).lower())}:
+                self.relationships_by_column.setdefault(column_key, ObjectList()).append(obj)
+
+        for perspective in model.get("perspectives", []) or []:
+            obj = self._add("Perspective", perspective, collection=self.perspectives)
+            members = set()
+            for table in perspective.get("tables", []) or []:
+                table_name = str(table.get("name", "")).lower()
+                members.add(("table", table_name))
+                for key, object_type in (("columns", "column"), ("measures", "measure"), ("hierarchies", "hierarchy")):
+                    for item in table.get(key, []) or []:
+                        members.add((object_type, table_name, str(item.get("name", "")).lower()))
+            self.perspective_members[obj.name.lower()] = members
+
+        for role in model.get("roles", []) or []:
+            role_obj = self._add("ModelRole", role, collection=self.roles)
+            for member in role.get("members", []) or []:
+                member_obj = TomObject("ModelRoleMember", member, self, role_obj,
+                                       name=str(member.get("memberName", "")))
+                self._attach(role_obj, "members", member_obj)
+            for permission in role.get("tablePermissions", []) or []:
+                table_name = str(permission.get("name") or permission.get("table") or "")
+                permission_obj = self._add("TablePermission", permission, role_obj,
+                                           self.tables_by_name.get(table_name.lower()), table_name,
+                                           self.table_permissions)
+                self._attach(role_obj, "tablePermissions", permission_obj)
+                if permission.get("filterExpression"):
+                    self._rls_by_table.setdefault(table_name.lower(), []).append(
+                        (role_obj.name, _text(permission.get("filterExpression"))))
+
+    def _build_table(self, table: Dict[str, Any]) -> None:
+        partitions = table.get("partitions", []) or []
+        first_source = (partitions[0].get("source", {}) or {}) if partitions else {}
+        if table.get("calculationGroup"):
+            kind = "CalculationGroup"
+        elif first_source.get("type") == "calculated":
+            kind = "CalculatedTable"
+        else:
+            kind = "Table"
+        table_obj = self._add(kind, table, collection=self.tables)
+        table_key = table_obj.name.lower()
+        self.tables_by_name[table_key] = table_obj
+
+        for column in table.get("columns", []) or []:
+            column_type = column.get("type", "data")
+            if column_type == "rowNumber":
+                continue
+            if kind == "CalculatedTable" or column_type == "calculatedTableColumn":
+                column_kind = "CalculatedTableColumn"
+            elif column_type == "calculated":
+                column_kind = "CalculatedColumn"
+            else:
+                column_kind = "DataColumn"
+            obj = self._add(column_kind, column, table_obj, table_obj, collection=self.columns)
+            self._attach(table_obj, "columns", obj)
+            self.columns_by_key[(table_key, obj.name.lower())] = obj
+
+        for obj in table_obj.child_list("columns"):
+            sort_by = obj.data.get("sortByColumn")
+            if sort_by:
+                self.sort_by_users.setdefault((table_key, str(sort_by).lower()), ObjectList()).append(obj)
+            for variation in obj.data.get("variations", []) or []:
+                default_column = variation.get("defaultColumn") or {}
+                if default_column.get("column"):
+                    key = (str(default_column.get("table", table_obj.name)).lower(), str(default_column["column"]).lower())
+                    self.variation_users.setdefault(key, ObjectList()).append(obj)
+
+        for measure in table.get("measures", []) or []:
+            obj = self._add("Measure", measure, table_obj, table_obj, collection=self.measures)
+            self._attach(table_obj, "measures", obj)
+            self.measures_by_name.setdefault(obj.name.lower(), obj)
+            if measure.get("kpi"):
+                kpi = self._add("KPI", measure["kpi"], obj, table_obj, obj.name, self.kpis)
+                self._attach(obj, "kpi", kpi)
+
+        for hierarchy in table.get("hierarchies", []) or []:
+            obj = self._add("Hierarchy", hierarchy, table_obj, table_obj, collection=self.hierarchies)
+            self._attach(table_obj, "hierarchies", obj)
+            for level in hierarchy.get("levels", []) or []:
+                level_obj = self._add("Level", level, obj, table_obj, collection=self.levels)
+                self._attach(obj, "levels", level_obj)
+                users = self.hierarchy_users.setdefault((table_key, str(level.get("column", "")).lower()), ObjectList())
+                if not users or users[-1] is not obj:
+                    users.append(obj)
+
+        for partition in partitions:
+            obj = self._add("Partition", partition, table_obj, table_obj, collection=self.partitions)
+            self._attach(table_obj, "partitions", obj)
+            data_source = (partition.get("source", {}) or {}).get("dataSource")
+            if data_source:
+                self.partitions_by_data_source.setdefault(str(data_source).lower(), ObjectList()).append(obj)
+
+        for item in (table.get("calculationGroup") or {}).get("calculationItems", []) or []:
+            obj = self._add("CalculationItem", item, table_obj, table_obj, collection=self.calculation_items)
+            self._attach(table_obj, "calculationItems", obj)
+
+    # Lookups
+
+    def table_by_name(self, name: Any) -> Optional[TomObject]:
+        return self.tables_by_name.get(str(name).lower())
+
+    def column(self, table_name: Any, column_name: Any) -> Optional[TomObject]:
+        return self.columns_by_key.get((str(table_name).lower(), str(column_name).lower()))
+
+    def row_level_security(self, table: TomObject) -> KeyedList:
+        """Filter expressions on ``table``, one per role that filters it."""
+        entries = self._rls_by_table.get(table.name.lower(), [])
+        return KeyedList((expression for _, expression in entries),
+                         {role.lower(): expression for role, expression in entries})
+
+    def role_row_level_security(self, role: TomObject) -> KeyedList:
+        """Filter expressions of ``role``, keyed by table name."""
+        entries = [(p.name, _text(p.data.get("filterExpression")))
+                   for p in role.child_list("tablePermissions") if p.data.get("filterExpression")]
+        return KeyedList((expression for _, expression in entries),
+                         {table.lower(): expression for table, expression in entries})
+
+    # DAX dependencies (built on first use)
+
+    def _dax_sources(self) -> List[Tuple[TomObject, str]]:
+        sources: List[Tuple[TomObject, str]] = []
+        for obj in self.measures:
+            sources.append((obj, _text(obj.data.get("expression"))))
+        for obj in self.columns:
+            if obj.kind == "CalculatedColumn":
+                sources.append((obj, _text(obj.data.get("expression"))))
+        for obj in self.tables:
+            if obj.kind == "CalculatedTable":
+                sources.append((obj, _table_source_expression(obj)))
+        for obj in self.calculation_items:
+            sources.append((obj, _text(obj.data.get("expression"))))
+        for obj in self.kpis:
+            sources.append((obj, "\n".join(_text(obj.data.get(key)) for key in
+                                           ("targetExpression", "statusExpression", "trendExpression"))))
+        for obj in self.table_permissions:
+            sources.append((obj, _text(obj.data.get("filterExpression"))))
+        return sources
+
+    def _resolve(self, owner: TomObject, table: Optional[str], name: str) -> Optional[DaxReference]:
+        if table is not None:
+            target = self.column(table, name) or self.measures_by_name.get(name.lower())
+            return DaxReference(target, True) if target is not None else None
+        target = self.measures_by_name.get(name.lower())
+        if target is None and owner.table is not None:
+            target = self.column(owner.table.name, name)
+        return DaxReference(target, False) if target is not None else None
+
+    def _build_dependencies(self) -> Dict[int, List[Dependency]]:
+        depends_on: Dict[int, List[Dependency]] = {}
+        for owner, expression in self._dax_sources():
+            if not expression:
+                continue
+            grouped: Dict[int, Dependency] = {}
+            for table, name in dax_references(expression):
+                reference = self._resolve(owner, table, name)
+                if reference is None:
+                    continue
+                dependency = grouped.get(id(reference.obj))
+                if dependency is None:
+                    dependency = grouped[id(reference.obj)] = Dependency(reference.obj, [])
+                    self._referenced_by.setdefault(id(reference.obj), ObjectList()).append(owner)
+                dependency.value.append(reference)
+            depends_on[id(owner)] = list(grouped.values())
+        return depends_on
+
+    # Change tracking
+
+    @staticmethod
+    def object_key(obj: TomObject) -> Tuple[str, ...]:
+        """Stable identity across model versions: kind plus the names from the table (or role) down."""
+        names = []
+        node: Optional[TomObject] = obj
+        while node is not None and node.kind != "Model":
+            names.append(node.name)
+            node = node.parent
+        if obj.kind == "Relationship" and not obj.name:
+            data = obj.data
+            names = [f"{data.get('fromTable')}[{data.get('fromColumn')}]->{data.get('toTable')}[{data.get('toColumn')}]"]
+        return (obj.kind, *reversed(names))
+
+    def signatures(self) -> List[Tuple[Tuple[str, ...], Optional[str], Optional[str]]]:
+        """
+        ``(key, signature, content)`` for every object in ``objects`` order.
+
+        ``content`` hashes the object's own properties only; ``signature``
+        also covers its children and the own properties of its ancestors.
+        The model object has neither (it changes with everything). Keys that
+        occur more than once also get None, so they are never reused.
+        """
+        own: Dict[int, bytes] = {}
+        down: Dict[int, bytes] = {}
+
+        def own_digest(obj: TomObject) -> bytes:
+            digest = own.get(id(obj))
+            if digest is None:
+                data = {k: v for k, v in obj.data.items() if k not in _CHILD_KEYS}
+                if isinstance(data.get("calculationGroup"), dict):
+                    data["calculationGroup"] = {k: v for k, v in data["calculationGroup"].items()
+                                                if k != "calculationItems"}
+                text = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+                digest = own[id(obj)] = hashlib.blake2b(text, digest_size=16).digest()
+            return digest
+
+        def down_digest(obj: TomObject) -> bytes:
+            digest = down.get(id(obj))
+            if digest is None:
+                hasher = hashlib.blake2b(own_digest(obj), digest_size=16)
+                for key in sorted(obj.children):
+                    for child in obj.children[key]:
+                        hasher.update(down_digest(child))
+                digest = down[id(obj)] = hasher.digest()
+            return digest
+
+        keys = [self.object_key(obj) for obj in self.objects]
+        counts: Dict[Tuple[str, ...], int] = {}
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+
+        result: List[Tuple[Tuple[str, ...], Optional[str], Optional[str]]] = []
+        for obj, key in zip(self.objects, keys):
+            if obj.kind == "Model" or counts[key] > 1:
+                result.append((key, None, None))
+                continue
+            hasher = hashlib.blake2b(down_digest(obj), digest_size=16)
+            parent = obj.parent
+            while parent is not None and parent.kind != "Model":
+                hasher.update(own_digest(parent))
+                parent = parent.parent
+            if obj.table is not None and obj.table is not obj and obj.table is not obj.parent:
+                hasher.update(own_digest(obj.table))
+            result.append((key, hasher.hexdigest(), own_digest(obj).hex()))
+        return result
+
+    def depends_on(self, obj: TomObject) -> List[Dependency]:
+        if self._depends_on is None:
+            self._depends_on = self._build_dependencies()
+        return self._depends_on.get(id(obj), [])
+
+    def referenced_by(self, obj: TomObject) -> ObjectList:
+        if self._depends_on is None:
+            self._depends_on = self._build_dependencies()
+        return self._referenced_by.get(id(obj), _EMPTY)
@@ -0,0 +1,302 @@
+"""
+Workspace-wide BPA Scanning
+
+Runs the Best Practice Analyzer over every dataset of one or more Power BI
+workspaces. Model definitions are fetched over XMLA on a bounded thread
+pool, through the versioned TMSL cache so unchanged models are not
+serialized again. Each definition is handed to a process pool for analysis
+as soon as it arrives, so fetching and analysis overlap. Violations of all models are written to one JSON
+lines or Parquet table; per-model fetch and analysis timings go to a
+companion ``*.models.jsonl`` file and the returned summary.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .auth import get_access_token
+from .rest_client import LISTING_CACHE_TTL_SECONDS, POWERBI_API_BASE, get_rest_client
+from .tmsl_cache import get_model_tmsl
+
+SCAN_FORMATS = ("jsonl", "parquet")
+DEFAULT_FETCH_CONCURRENCY = 4   # Parallel XMLA model downloads
+MAX_FETCH_CONCURRENCY = 16
+DEFAULT_MAX_PROCESSES = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Columns of the consolidated violations table, in output order
+VIOLATION_COLUMNS = (
+    "workspace_name", "dataset_name", "rule_id", "rule_name", "category", "severity", "severity_level",
+    "object_type", "object_name", "table_name", "description", "details",
+)
+
+logger = logging.getLogger(__name__)
+
+_GUID = re.compile(r"^[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$")
+
+# Analyzer of a worker process, loaded once by ``_init_worker``
+_worker_analyzer = None
+
+
+def _init_worker(rules_file: str) -> None:
+    global _worker_analyzer
+    from .bpa_analyzer import BPAAnalyzer
+    _worker_analyzer = BPAAnalyzer(rules_file)
+
+
+def _analyze_tmsl(tmsl_definition: str) -> Tuple[List[Dict[str, Any]], float]:
+    """Analyze one model definition in a worker; returns the exported violations and the seconds spent"""
+    started = time.perf_counter()
+    _worker_analyzer.analyze_model(json.loads(tmsl_definition))
+    return _worker_analyzer.export_violations_to_dict(), time.perf_counter() - started
+
+
+def resolve_workspaces(workspaces: List[str], access_token: str) -> List[Dict[str, str]]:
+    """
+    Map workspace names or IDs to ``{"id", "name"}`` entries.
+
+    Raises:
+        ValueError: If a workspace is not visible to the user
+    """
+    groups = get_rest_client().list_all(f"{POWERBI_API_BASE}/groups", access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS)
+    by_id = {str(group.get("id", "")).lower(): group for group in groups}
+    by_name = {str(group.get("name", "")).lower(): group for group in groups}
+    resolved = []
+    for workspace in workspaces:
+        key = workspace.strip().lower()
+        group = by_id.get(key) if _GUID.match(key) else by_name.get(key)
+        if group is None:
+            raise ValueError(f"Workspace '{workspace}' not found")
+        resolved.append({"id": group["id"], "name": group["name"]})
+    return resolved
+
+
+def list_scan_targets(
+    workspaces: List[str],
+    access_token: str,
+    dataset_pattern: Optional[str] = None
+) -> List[Tuple[str, str]]:
+    """
+    Enumerate ``(workspace_name, dataset_name)`` pairs to scan.
+
+    Args:
+        workspaces: Workspace names or IDs
+        access_token: Power BI access token
+        dataset_pattern: Optional case-insensitive regex the dataset name must match
+
+    Raises:
+        ValueError: If a workspace is unknown or the pattern is invalid
+    """
+    try:
+        pattern = re.compile(dataset_pattern, re.IGNORECASE) if dataset_pattern else None
+    except re.error as e:
+        raise ValueError(f"Invalid dataset_pattern: {e}")
+    targets = []
+    for workspace in resolve_workspaces(workspaces, access_token):
+        url = f"{POWERBI_API_BASE}/groups/{workspace['id']}/datasets"
+        for dataset in get_rest_client().list_all(url, access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS):
+            name = dataset.get("name", "")
+            if pattern is None or pattern.search(name):
+                targets.append((workspace["name"], name))
+    return targets
+
+
+def fetch_model_tmsl(workspace_name: str, dataset_name: str, access_token: Optional[str] = None) -> str:
+    """Read a dataset's model definition (TMSL) through the versioned cache."""
+    return get_model_tmsl(workspace_name, dataset_name, access_token)[0]
+
+
+class _JsonLinesSink:
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str))
+            self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow); use output_format='jsonl' instead")
+        self._pa = pa
+        self._schema = pa.schema([(name, pa.int64() if name == "severity_level" else pa.string())
+                                  for name in VIOLATION_COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            columns = {name: [row.get(name) for row in rows] for name in VIOLATION_COLUMNS}
+            self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _resolve_output_path(output_path: Optional[str], output_format: str) -> str:
+    # The random suffix keeps scans started in the same second from overwriting each other's files
+    file_name = f"bpa_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.{output_format}"
+    if not output_path:
+        path = os.path.join(tempfile.gettempdir(), "semantic_model_exports", file_name)
+    elif os.path.isdir(output_path) or output_path.endswith(("/", "\\")):
+        path = os.path.join(output_path, file_name)
+    else:
+        path = output_path
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _violation_rows(workspace_name: str, dataset_name: str, violations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for violation in violations:
+        row = {name: violation.get(name) for name in VIOLATION_COLUMNS}
+        row["workspace_name"] = workspace_name
+        row["dataset_name"] = dataset_name
+        rows.append(row)
+    return rows
+
+
+def scan_workspaces(
+    workspaces: List[str],
+    rules_file: str,
+    dataset_pattern: Optional[str] = None,
+    output_format: str = "jsonl",
+    output_path: Optional[str] = None,
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    max_processes: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Analyze every dataset of the given workspaces and write one violations table.
+
+    A model that cannot be fetched or analyzed is recorded with its error and
+    the scan continues.
+
+    Args:
+        workspaces: Workspace names or IDs
+        rules_file: BPA rules JSON file
+        dataset_pattern: Optional case-insensitive regex selecting datasets by name
+        output_format: ``jsonl`` or ``parquet`` (Parquet requires pyarrow)
+        output_path: Target file or directory; a temp file is used when omitted
+        fetch_concurrency: Parallel model downloads (1-16)
+        max_processes: Analysis worker processes; 0 analyzes in this process
+
+    Returns:
+        Dict with the output paths, violation and model counts, total elapsed
+        time and one entry per model with fetch/analysis seconds and status
+
+    Raises:
+        ValueError: If the format, a workspace or the pattern is invalid
+        ImportError: If Parquet is requested and pyarrow is not installed
+        PermissionError: If no access token is available
+    """
+    output_format = (output_format or "jsonl").lower()
+    if output_format not in SCAN_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}'; use one of: {', '.join(SCAN_FORMATS)}")
+    access_token = get_access_token()
+    if not access_token:
+        raise PermissionError("No valid access token available")
+
+    started = time.perf_counter()
+    targets = list_scan_targets(workspaces, access_token, dataset_pattern)
+    path = _resolve_output_path(output_path, output_format)
+    models_path = os.path.splitext(path)[0] + ".models.jsonl"
+    fetch_concurrency = max(1, min(int(fetch_concurrency or DEFAULT_FETCH_CONCURRENCY), MAX_FETCH_CONCURRENCY))
+    max_processes = DEFAULT_MAX_PROCESSES if max_processes is None else max(0, int(max_processes))
+
+    models: List[Dict[str, Any]] = []
+    violation_count = 0
+    sink = _ParquetSink(path) if output_format == "parquet" else _JsonLinesSink(path)
+    analysis_pool = None
+    try:
+        if max_processes and targets:
+            # spawn: worker processes must not inherit the loaded .NET runtime
+            analysis_pool = ProcessPoolExecutor(max_workers=min(max_processes, len(targets)),
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker, initargs=(rules_file,))
+        else:
+            _init_worker(rules_file)
+        analyze_lock = threading.Lock()
+
+        def fetch(target: Tuple[str, str]) -> Tuple[str, float]:
+            fetch_started = time.perf_counter()
+            # Tokens are cached; asking per model keeps long scans past token expiry working
+            tmsl = fetch_model_tmsl(target[0], target[1], get_access_token())
+            return tmsl, time.perf_counter() - fetch_started
+
+        def analyze(tmsl: str) -> Tuple[List[Dict[str, Any]], float]:
+            with analyze_lock:
+                return _analyze_tmsl(tmsl)
+
+        with ThreadPoolExecutor(max_workers=fetch_concurrency, thread_name_prefix="bpa-scan") as fetch_pool:
+            pending: Dict[Future, Tuple[str, Dict[str, Any]]] = {}
+            for target in targets:
+                entry = {"workspace_name": target[0], "dataset_name": target[1], "status": "pending"}
+                models.append(entry)
+                pending[fetch_pool.submit(fetch, target)] = ("fetch", entry)
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, entry = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        entry.update(status=f"{stage}_failed", error=str(e))
+                        logger.warning(f"BPA scan {stage} failed for {entry['workspace_name']}/{entry['dataset_name']}: {e}")
+                        continue
+                    if stage == "fetch":
+                        tmsl, entry["fetch_seconds"] = result
+                        entry["tmsl_bytes"] = len(tmsl)
+                        if analysis_pool is not None:
+                            pending[analysis_pool.submit(_analyze_tmsl, tmsl)] = ("analysis", entry)
+                        else:
+                            pending[fetch_pool.submit(analyze, tmsl)] = ("analysis", entry)
+                    else:
+                        violations, entry["analysis_seconds"] = result
+                        rows = _violation_rows(entry["workspace_name"], entry["dataset_name"], violations)
+                        sink.write(rows)
+                        entry.update(status="analyzed", violation_count=len(rows))
+                        violation_count += len(rows)
+    finally:
+        sink.close()
+        if analysis_pool is not None:
+            analysis_pool.shutdown(cancel_futures=True)
+
+    for entry in models:
+        for key in ("fetch_seconds", "analysis_seconds"):
+            if key in entry:
+                entry[key] = round(entry[key], 3)
+    with open(models_path, "w", encoding="utf-8") as f:
+        for entry in models:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return {
+        "status": "completed",
+        "path": path,
+        "models_path": models_path,
+        "format": output_format,
+        "models_scanned": len(models),
+        "models_analyzed": sum(1 for entry in models if entry["status"] == "analyzed"),
+        "models_failed": sum(1 for entry in models if entry["status"] != "analyzed"),
+        "violation_count": violation_count,
+        "fetch_concurrency": fetch_concurrency,
+        "analysis_processes": min(max_processes, len(targets)) if targets else 0,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "models": models,
+    }
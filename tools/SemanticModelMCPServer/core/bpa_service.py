@@ -4,8 +4,10 @@ Best Practice Analyzer integration for the Semantic Model MCP Server
 
 import os
 import json
+import threading
 from typing import Dict, List, Any, Optional
 from .bpa_analyzer import BPAAnalyzer, BPAViolation, BPASeverity
+from .tmsl_index import TmslIndex, get_tmsl_index
 
 class BPAService:
     """Service class for integrating BPA functionality into the MCP server"""
@@ -20,17 +22,26 @@ class BPAService:
         self.server_directory = server_directory
         self.rules_file = os.path.join(server_directory, "core", "bpa.json")
         self.analyzer = None
+        self._lock = threading.Lock()  # the analyzer keeps per-call state (violations, last_analysis)
         
         # Initialize the analyzer if rules file exists
         if os.path.exists(self.rules_file):
             self.analyzer = BPAAnalyzer(self.rules_file)
     
-    def analyze_model_from_tmsl(self, tmsl_definition: str) -> Dict[str, Any]:
+    @staticmethod
+    def _model_key(index: TmslIndex) -> str:
+        """Key the incremental analysis state by database (or model) name"""
+        database = index.database or index.document
+        return str(database.get('name') or index.model.get('name') or 'Model')
+    
+    def analyze_model_from_tmsl(self, tmsl_definition: str, incremental: bool = True) -> Dict[str, Any]:
         """
         Analyze a TMSL model and return BPA violations
         
         Args:
             tmsl_definition: TMSL JSON string
+            incremental: Reuse the previous analysis of the same database for
+                objects that did not change
             
         Returns:
             Dictionary containing analysis results
@@ -43,26 +54,27 @@ class BPAService:
             }
         
         try:
-            # Preprocess TMSL definition to handle formatting issues
-            cleaned_tmsl = self._clean_tmsl_json(tmsl_definition)
-            
-            # Parse TMSL
-            tmsl_model = json.loads(cleaned_tmsl)
-            
-            # Run analysis
-            violations = self.analyzer.analyze_model(tmsl_model)
+            # Parse TMSL, handling formatting issues
+            index = self._parse_tmsl(tmsl_definition)
             
-            # Get summary
-            summary = self.analyzer.get_violations_summary()
-            
-            # Export violations
-            violations_dict = self.analyzer.export_violations_to_dict()
+            with self._lock:
+                # Run analysis
+                model_key = self._model_key(index) if incremental else None
+                violations = self.analyzer.analyze_model(index, model_key)
+                
+                # Get summary
+                summary = self.analyzer.get_violations_summary()
+                
+                # Export violations
+                violations_dict = self.analyzer.export_violations_to_dict()
+                analysis = dict(self.analyzer.last_analysis)
             
             return {
                 'success': True,
                 'violations': violations_dict,
                 'summary': summary,
                 'rules_count': len(self.analyzer.rules),
+                'analysis': analysis,
                 'analysis_complete': True
             }
             
@@ -79,6 +91,29 @@ class BPAService:
                 'summary': {}
             }
     
+    def get_changes_since_last_analysis(self, tmsl_definition: str) -> Dict[str, Any]:
+        """
+        List the objects added, changed or removed since the database was last analyzed
+        
+        Args:
+            tmsl_definition: TMSL JSON string
+            
+        Returns:
+            Dictionary with ``added``, ``changed`` and ``removed`` objects
+        """
+        if not self.analyzer:
+            return {'error': 'BPA rules not loaded. Please check if bpa.json exists.'}
+        
+        try:
+            index = self._parse_tmsl(tmsl_definition)
+            with self._lock:
+                changes = self.analyzer.changes_since_last_analysis(index, self._model_key(index))
+            return {'success': True, **changes}
+        except json.JSONDecodeError as e:
+            return {'error': f'Invalid TMSL JSON: {str(e)}'}
+        except Exception as e:
+            return {'error': f'Change detection failed: {str(e)}'}
+    
     def get_violations_by_severity(self, severity_name: str) -> List[Dict[str, Any]]:
         """Get violations filtered by severity level"""
         if not self.analyzer:
@@ -259,6 +294,28 @@ class BPAService:
         
         return report
     
+    def _parse_tmsl(self, tmsl_definition: str) -> TmslIndex:
+        """
+        Parse a TMSL JSON string, handling common formatting issues
+        
+        Valid JSON is parsed once and its index shared with other consumers
+        of the same text; anything else is cleaned first.
+        
+        Args:
+            tmsl_definition: Raw TMSL JSON string
+            
+        Returns:
+            Index of the parsed TMSL
+        
+        Raises:
+            json.JSONDecodeError: If the text is not valid JSON even after cleaning
+        """
+        try:
+            return get_tmsl_index(tmsl_definition)
+        except json.JSONDecodeError:
+            # If not valid, try additional cleaning steps
+            return get_tmsl_index(self._clean_tmsl_json(tmsl_definition))
+    
     def _clean_tmsl_json(self, tmsl_definition: str) -> str:
         """
         Clean and preprocess TMSL JSON string to handle common formatting issues
@@ -275,15 +332,6 @@ class BPAService:
         # Remove any leading/trailing whitespace
         cleaned = cleaned.strip()
         
-        # If the string is already valid JSON, try parsing it first
-        try:
-            # Test if it's already valid JSON
-            json.loads(cleaned)
-            return cleaned
-        except json.JSONDecodeError:
-            # If not valid, try additional cleaning steps
-            pass
-        
         # Handle common issues with escaped JSON strings
         # If the string starts and ends with quotes, it might be a JSON string containing JSON
         if cleaned.startswith('"') and cleaned.endswith('"'):
@@ -304,3 +352,21 @@ class BPAService:
         cleaned = cleaned.replace('\\n', '\n').replace('\\t', '\t')
         
         return cleaned
+
+
+_services: Dict[str, BPAService] = {}
+_services_lock = threading.Lock()
+
+
+def get_bpa_service(server_directory: str) -> BPAService:
+    """
+    Return the process-wide BPA service for ``server_directory``.
+    
+    Sharing it keeps the loaded rules, the last violations and the
+    incremental analysis state between tool calls.
+    """
+    with _services_lock:
+        service = _services.get(server_directory)
+        if service is None:
+            service = _services[server_directory] = BPAService(server_directory)
+        return service
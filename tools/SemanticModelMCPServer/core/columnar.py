@@ -0,0 +1,303 @@
+"""
+Columnar Conversion of ADOMD Readers
+
+Reads an ``AdomdDataReader`` into typed column lists instead of one dict
+per row. Each column's converter is chosen once from the reader's field
+type (int64, double, decimal, datetime, boolean, string), so the per-cell
+work is a ``GetValue`` call and a list append; rows are only assembled
+(``to_records`` / ``to_rows``) when a response is rendered, and
+``to_arrow`` hands the columns to pyarrow with explicit types.
+
+``System.Decimal`` (fixed decimal / currency) values become exact
+``decimal.Decimal`` values; the JSON encoders render them as strings.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Precision and scale of the Arrow decimal type for decimal columns: room for the 29 integer
+# digits of System.Decimal and more than the 4 decimals of Tabular's fixed decimal (currency)
+# type. The type is fixed so every batch of an export shares one schema.
+ARROW_DECIMAL_PRECISION = 38
+ARROW_DECIMAL_SCALE = 9
+
+# .NET field type -> logical column type
+_LOGICAL_TYPES = {
+    "System.Int64": "int64",
+    "System.Int32": "int64",
+    "System.Int16": "int64",
+    "System.Byte": "int64",
+    "System.Double": "double",
+    "System.Single": "double",
+    "System.Decimal": "decimal",
+    "System.DateTime": "datetime",
+    "System.Boolean": "boolean",
+    "System.String": "string",
+}
+
+
+def _field_type_name(reader: Any, index: int) -> str:
+    try:
+        field_type = reader.GetFieldType(index)
+    except Exception:
+        return "Unknown"
+    if field_type is None:
+        return "Unknown"
+    return str(getattr(field_type, "FullName", None) or field_type)
+
+
+def _to_int(value: Any) -> Any:
+    return value if isinstance(value, int) else int(value)
+
+
+def _to_float(value: Any) -> Any:
+    return value if isinstance(value, float) else float(value)
+
+
+_invariant_culture: Any = None  # .NET CultureInfo.InvariantCulture once looked up, False without .NET
+
+
+def _get_invariant_culture() -> Any:
+    global _invariant_culture
+    if _invariant_culture is None:
+        try:
+            from System.Globalization import CultureInfo  # type: ignore
+            _invariant_culture = CultureInfo.InvariantCulture
+        except Exception:
+            _invariant_culture = False
+    return _invariant_culture
+
+
+def _to_decimal(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    culture = _get_invariant_culture()
+    if culture:
+        # System.Decimal: its invariant-culture text is exact ("1.5", never "1,5")
+        return Decimal(value.ToString(culture))
+    return Decimal(str(value))
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value
+    if hasattr(value, "Year"):  # System.DateTime
+        return datetime(value.Year, value.Month, value.Day, value.Hour, value.Minute, value.Second,
+                        value.Millisecond * 1000)
+    return value
+
+
+def _to_bool(value: Any) -> Any:
+    return value if isinstance(value, bool) else bool(value)
+
+
+def _to_str(value: Any) -> Any:
+    return value if isinstance(value, str) else str(value)
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "int64": _to_int,
+    "double": _to_float,
+    "decimal": _to_decimal,
+    "datetime": _to_datetime,
+    "boolean": _to_bool,
+    "string": _to_str,
+}
+
+
+# Python type a converter returns; values already of this type are appended as-is
+_NATIVE_TYPES: Dict[str, type] = {
+    "int64": int,
+    "double": float,
+    "decimal": Decimal,
+    "datetime": datetime,
+    "boolean": bool,
+    "string": str,
+}
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ColumnarResult:
+    """
+    Typed column lists read from a reader.
+
+    Attributes:
+        names: Column names
+        field_types: .NET field type names as reported by the reader
+        types: Logical types (int64, double, decimal, datetime, boolean, string, unknown)
+        columns: One list of converted values per column; None marks nulls
+        row_count: Number of rows read
+        truncated: True when ``max_rows`` stopped the read before the reader was exhausted
+    """
+
+    def __init__(self, names: List[str], field_types: List[str], types: List[str]):
+        self.names = names
+        self.field_types = field_types
+        self.types = types
+        self.columns: List[List[Any]] = [[] for _ in names]
+        self.row_count = 0
+        self.truncated = False
+
+    def column_info(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": name, "index": i, "type": field_type, "logical_type": logical}
+            for i, (name, field_type, logical) in enumerate(zip(self.names, self.field_types, self.types))
+        ]
+
+    def to_rows(self) -> List[List[Any]]:
+        """Rows as JSON-ready lists (datetimes rendered as ISO 8601)."""
+        datetime_columns = [i for i, t in enumerate(self.types) if t in ("datetime", "unknown")]
+        if not datetime_columns:
+            return [list(row) for row in zip(*self.columns)]
+        columns = list(self.columns)
+        for i in datetime_columns:
+            columns[i] = [_json_value(value) for value in columns[i]]
+        return [list(row) for row in zip(*columns)]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Rows as JSON-ready dicts keyed by column name."""
+        names = self.names
+        return [dict(zip(names, row)) for row in self.to_rows()]
+
+    def to_arrow(self) -> Any:
+        """
+        Build a ``pyarrow.Table`` with one typed array per column.
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        import pyarrow as pa  # type: ignore
+
+        arrow_types = {
+            "int64": pa.int64(),
+            "double": pa.float64(),
+            "decimal": pa.decimal128(ARROW_DECIMAL_PRECISION, ARROW_DECIMAL_SCALE),
+            "datetime": pa.timestamp("ms"),
+            "boolean": pa.bool_(),
+            "string": pa.string(),
+        }
+        arrays = []
+        for logical, values in zip(self.types, self.columns):
+            if logical in arrow_types:
+                arrays.append(pa.array(values, type=arrow_types[logical]))
+            else:
+                arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+        return pa.Table.from_arrays(arrays, names=self.names)
+
+
+def describe_reader(reader: Any) -> ColumnarResult:
+    """Create an empty result carrying the reader's column names and types."""
+    count = reader.FieldCount
+    names = [reader.GetName(i) for i in range(count)]
+    field_types = [_field_type_name(reader, i) for i in range(count)]
+    types = [_LOGICAL_TYPES.get(field_type, "unknown") for field_type in field_types]
+    return ColumnarResult(names, field_types, types)
+
+
+def _safe_convert(convert: Optional[Callable[[Any], Any]], value: Any) -> Any:
+    try:
+        return convert(value) if convert else value
+    except Exception:
+        return str(value)
+
+
+def read_columnar(
+    reader: Any,
+    max_rows: Optional[int] = None,
+    empty_strings_as_null: bool = False,
+    positioned: bool = False,
+    result: Optional[ColumnarResult] = None
+) -> ColumnarResult:
+    """
+    Read rows from a reader into typed columns.
+
+    Args:
+        reader: An ``AdomdDataReader`` (or anything with the same surface)
+        max_rows: Stop after this many rows; one extra ``Read`` decides ``truncated``
+        empty_strings_as_null: Store empty strings as None
+        positioned: The reader already sits on an unread row (a previous
+            ``truncated`` read advanced onto it)
+        result: Append to this result instead of describing the reader again
+
+    Returns:
+        The populated ``ColumnarResult``
+    """
+    if result is None:
+        result = describe_reader(reader)
+    get = reader.GetValue
+    read = reader.Read
+    columns = result.columns
+    plan = [
+        (i, column, _CONVERTERS.get(logical), _NATIVE_TYPES.get(logical))
+        for i, (column, logical) in enumerate(zip(columns, result.types))
+    ]
+    limit = max_rows if max_rows is not None else -1
+    base = result.row_count
+    count = 0
+
+    has_row = positioned or read()
+    while has_row:
+        if count == limit:
+            result.truncated = True
+            break
+        try:
+            for i, column, convert, native in plan:
+                value = get(i)
+                if value is None or (empty_strings_as_null and value == ""):
+                    column.append(None)
+                elif convert is None or type(value) is native:
+                    column.append(value)
+                else:
+                    column.append(convert(value))
+        except Exception:
+            # Roll back the partial row and re-read it cell by cell, keeping unreadable values as text
+            for column in columns:
+                del column[base + count:]
+            for i, column, convert, _ in plan:
+                try:
+                    value = get(i)
+                except Exception as e:
+                    column.append(f"<read_error: {e}>")
+                    continue
+                if value is None or (empty_strings_as_null and value == ""):
+                    column.append(None)
+                else:
+                    column.append(_safe_convert(convert, value))
+        count += 1
+        has_row = read()
+
+    result.row_count += count
+    return result
+
+
+def iter_columnar_batches(
+    reader: Any,
+    batch_rows: int,
+    empty_strings_as_null: bool = False,
+    template: Optional[ColumnarResult] = None
+) -> Iterator[ColumnarResult]:
+    """
+    Yield successive ``ColumnarResult`` batches of at most ``batch_rows`` rows.
+
+    Args:
+        template: The reader's ``describe_reader`` result, if the caller already has it
+    """
+    if template is None:
+        template = describe_reader(reader)
+    positioned = False
+    while True:
+        batch = ColumnarResult(template.names, template.field_types, template.types)
+        read_columnar(reader, batch_rows, empty_strings_as_null, positioned, batch)
+        if batch.row_count:
+            yield batch
+        if not batch.truncated:
+            return
+        positioned = True
@@ -0,0 +1,335 @@
+"""
+Shared .NET Assembly Loader and XMLA Connection Pool
+
+Loads the Analysis Services assemblies once per process and keeps open
+ADOMD connections (keyed by workspace and dataset) and connected TOM servers
+(keyed by workspace) for reuse. Pooled objects remember the access token
+they were opened with and are reconnected when the token changes, so
+back-to-back calls against the same model skip the connect cost.
+"""
+
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .auth import get_access_token
+
+_ASSEMBLIES = [
+    "Microsoft.AnalysisServices.dll",
+    "Microsoft.AnalysisServices.Tabular.dll",
+    "Microsoft.Identity.Client.dll",
+    "Microsoft.IdentityModel.Abstractions.dll",
+    "Microsoft.AnalysisServices.AdomdClient.dll",
+]
+
+POOL_MAX_IDLE_PER_KEY = 2        # Idle connections kept for each workspace/dataset
+POOL_MAX_KEYS = 16               # Distinct workspace/dataset keys kept before LRU eviction
+POOL_IDLE_TIMEOUT_SECONDS = 900  # Idle connections older than this are closed on checkout
+
+_assemblies_loaded = False
+_assembly_lock = threading.Lock()
+
+
+def get_dotnet_dir() -> str:
+    """Return the directory holding the bundled .NET assemblies."""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dotnet")
+
+
+def load_assemblies() -> None:
+    """
+    Add references to the bundled Analysis Services assemblies (first call only).
+
+    Raises:
+        Exception: If an assembly cannot be loaded
+    """
+    global _assemblies_loaded
+    if _assemblies_loaded:
+        return
+    with _assembly_lock:
+        if _assemblies_loaded:
+            return
+        import clr
+        dotnet_dir = get_dotnet_dir()
+        for assembly in _ASSEMBLIES:
+            clr.AddReference(os.path.join(dotnet_dir, assembly))
+        _assemblies_loaded = True
+        logging.info(f"Loaded .NET assemblies from: {dotnet_dir}")
+
+
+def build_xmla_connection_string(workspace_name: str, access_token: str, dataset_name: Optional[str] = None) -> str:
+    """Build the Power BI XMLA connection string, with a catalog when a dataset is given."""
+    workspace_name_encoded = urllib.parse.quote(workspace_name)
+    connection_string = f"Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name_encoded};Password={access_token}"
+    if dataset_name:
+        connection_string += f";Catalog={dataset_name};"
+    return connection_string
+
+
+class PooledConnection:
+    """A connection object plus the token it was opened with."""
+
+    def __init__(self, connection: Any, token: str):
+        self.connection = connection
+        self.token = token
+        self.last_used = time.monotonic()
+        self.reused = False
+
+
+class ConnectionPool:
+    """
+    Keyed pool of open connections.
+
+    Connections are checked out exclusively (ADOMD and TOM objects are not
+    thread-safe) and returned on success. A connection is discarded instead
+    of returned when the block raises, when it was opened with a stale
+    token, or when it has been idle longer than the timeout.
+    """
+
+    def __init__(
+        self,
+        opener: Callable[[Tuple[str, ...], str], Any],
+        is_open: Callable[[Any], bool],
+        closer: Callable[[Any], None],
+        max_idle_per_key: int = POOL_MAX_IDLE_PER_KEY,
+        max_keys: int = POOL_MAX_KEYS,
+        idle_timeout_seconds: float = POOL_IDLE_TIMEOUT_SECONDS,
+    ):
+        self._opener = opener
+        self._is_open = is_open
+        self._closer = closer
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._idle: "OrderedDict[Tuple[str, ...], List[PooledConnection]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    @contextmanager
+    def connection(self, key: Tuple[str, ...], access_token: str) -> Iterator[PooledConnection]:
+        """Yield an open connection for ``key``, reusing an idle one opened with the same token."""
+        pooled = self._checkout(key, access_token)
+        if pooled is None:
+            pooled = self.open(key, access_token)
+        try:
+            yield pooled
+        except BaseException:
+            self._discard(pooled)
+            raise
+        else:
+            self._checkin(key, pooled)
+
+    def open(self, key: Tuple[str, ...], access_token: str) -> PooledConnection:
+        """Open a new, unpooled connection for ``key``."""
+        pooled = PooledConnection(self._opener(key, access_token), access_token)
+        with self._lock:
+            self.stats["opened"] += 1
+        return pooled
+
+    def close(self, pooled: PooledConnection) -> None:
+        """Close a connection without returning it to the pool."""
+        self._discard(pooled)
+
+    def clear(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle = [pooled for entries in self._idle.values() for pooled in entries]
+            self._idle.clear()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "idle_connections": {"|".join(key): len(entries) for key, entries in self._idle.items()},
+                **self.stats,
+            }
+
+    def _checkout(self, key: Tuple[str, ...], access_token: str) -> Optional[PooledConnection]:
+        stale: List[PooledConnection] = []
+        found = None
+        now = time.monotonic()
+        with self._lock:
+            entries = self._idle.get(key, [])
+            while entries:
+                pooled = entries.pop()
+                if pooled.token != access_token or now - pooled.last_used > self.idle_timeout_seconds:
+                    stale.append(pooled)
+                    continue
+                found = pooled
+                break
+            if key in self._idle and not entries:
+                del self._idle[key]
+        for pooled in stale:
+            self._discard(pooled)
+        if found is not None and not self._is_open(found.connection):
+            self._discard(found)
+            found = None
+        if found is not None:
+            found.reused = True
+            with self._lock:
+                self.stats["reused"] += 1
+        return found
+
+    def _checkin(self, key: Tuple[str, ...], pooled: PooledConnection) -> None:
+        pooled.last_used = time.monotonic()
+        evicted: List[PooledConnection] = []
+        with self._lock:
+            entries = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(entries) < self.max_idle_per_key:
+                entries.append(pooled)
+            else:
+                evicted.append(pooled)
+            while len(self._idle) > self.max_keys:
+                _, old_entries = self._idle.popitem(last=False)
+                evicted.extend(old_entries)
+        for old in evicted:
+            self._discard(old)
+
+    def _discard(self, pooled: PooledConnection) -> None:
+        with self._lock:
+            self.stats["discarded"] += 1
+        try:
+            self._closer(pooled.connection)
+        except Exception as e:
+            logging.debug(f"Error closing pooled connection: {e}")
+
+
+def _open_adomd(key: Tuple[str, ...], access_token: str) -> Any:
+    load_assemblies()
+    from Microsoft.AnalysisServices.AdomdClient import AdomdConnection  # type: ignore
+
+    workspace_name, dataset_name = key
+    connection = AdomdConnection(build_xmla_connection_string(workspace_name, access_token, dataset_name))
+    connection.Open()
+    return connection
+
+
+def _adomd_is_open(connection: Any) -> bool:
+    return hasattr(connection, "State") and connection.State == 1  # ConnectionState.Open = 1
+
+
+def _close_adomd(connection: Any) -> None:
+    if _adomd_is_open(connection):
+        connection.Close()
+
+
+def _open_tom(key: Tuple[str, ...], access_token: str) -> Any:
+    load_assemblies()
+    from Microsoft.AnalysisServices.Tabular import Server  # type: ignore
+
+    (workspace_name,) = key
+    server = Server()
+    server.Connect(build_xmla_connection_string(workspace_name, access_token))
+    return server
+
+
+def _tom_is_open(server: Any) -> bool:
+    return bool(getattr(server, "Connected", False))
+
+
+def _close_tom(server: Any) -> None:
+    if _tom_is_open(server):
+        server.Disconnect()
+
+
+_adomd_pool = ConnectionPool(_open_adomd, _adomd_is_open, _close_adomd)
+_tom_pool = ConnectionPool(_open_tom, _tom_is_open, _close_tom)
+
+
+def _require_token(access_token: Optional[str]) -> str:
+    token = access_token or get_access_token()
+    if not token:
+        raise PermissionError("No valid access token available")
+    return token
+
+
+@contextmanager
+def adomd_connection(workspace_name: str, dataset_name: str, access_token: Optional[str] = None) -> Iterator[Any]:
+    """
+    Borrow an open ADOMD connection to a Power BI dataset.
+
+    Args:
+        workspace_name: Power BI workspace name
+        dataset_name: Dataset (catalog) name
+        access_token: Token to connect with; fetched when omitted
+
+    Yields:
+        An open ``AdomdConnection``; it is returned to the pool unless the block raises
+    """
+    token = _require_token(access_token)
+    with _adomd_pool.connection((workspace_name, dataset_name), token) as pooled:
+        yield pooled.connection
+
+
+def open_adomd_connection(workspace_name: str, dataset_name: str, access_token: Optional[str] = None) -> Any:
+    """
+    Open a dedicated (unpooled) ADOMD connection.
+
+    Used when a reader has to stay open across tool calls; close it with
+    ``close_adomd_connection`` rather than returning it to the pool.
+    """
+    token = _require_token(access_token)
+    return _adomd_pool.open((workspace_name, dataset_name), token).connection
+
+
+def close_adomd_connection(connection: Any) -> None:
+    """Close a connection returned by ``open_adomd_connection``."""
+    try:
+        _close_adomd(connection)
+    except Exception as e:
+        logging.debug(f"Error closing ADOMD connection: {e}")
+
+
+@contextmanager
+def tom_server(
+    workspace_name: str,
+    access_token: Optional[str] = None,
+    database_name: Optional[str] = None,
+    full_refresh: bool = True
+) -> Iterator[Any]:
+    """
+    Borrow a connected TOM ``Server`` for a Power BI workspace.
+
+    A reused server caches database metadata from earlier calls, so when
+    ``database_name`` is given that database is refreshed before use; if the
+    cached database list does not contain it, a fresh connection is opened.
+
+    Args:
+        workspace_name: Power BI workspace name
+        access_token: Token to connect with; fetched when omitted
+        database_name: Database that the caller is about to read
+        full_refresh: Refresh the database's whole metadata tree; False only
+            refreshes its own properties (``Version``, ``LastUpdate``), for
+            callers that check those before reading the model
+
+    Yields:
+        A connected ``Server``; it is returned to the pool unless the block raises
+    """
+    token = _require_token(access_token)
+    key = (workspace_name,)
+    with _tom_pool.connection(key, token) as pooled:
+        if pooled.reused and database_name:
+            database = pooled.connection.Databases.FindByName(database_name)
+            if database is None:
+                _tom_pool.close(pooled)
+                pooled.connection, pooled.reused = _tom_pool.open(key, token).connection, False
+            else:
+                database.Refresh(full_refresh)
+        yield pooled.connection
+
+
+def clear_connection_pools() -> None:
+    """Close all pooled ADOMD connections and TOM servers."""
+    _adomd_pool.clear()
+    _tom_pool.clear()
+
+
+def get_connection_pool_status() -> Dict[str, Any]:
+    """Return idle counts and open/reuse/discard statistics for both pools."""
+    return {"adomd": _adomd_pool.status(), "tom": _tom_pool.status()}
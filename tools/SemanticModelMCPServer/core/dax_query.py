@@ -0,0 +1,296 @@
+"""
+Server-Side Row Limits for DAX Queries
+
+Exploratory tools only show the first rows of a result, but the engine
+materializes everything a query returns: ``EVALUATE 'BigTable'`` produces the
+whole table even when the client stops reading after 1000 rows.
+``limit_dax_query`` rewrites every ``EVALUATE`` statement so the engine only
+produces the rows that are shown:
+- ``EVALUATE <table>`` becomes ``EVALUATE TOPN(<limit + 1>, <table>)``
+- with an offset, ``TOPNSKIP(<limit + 1>, <offset>, <table>)``
+- an ``ORDER BY`` clause is passed to TOPN/TOPNSKIP as its order-by
+  arguments, so the limited rows are the first rows of the requested order;
+  the clause itself stays and orders the returned rows
+- TOPNSKIP takes a single order-by expression, so an offset with a
+  multi-column ``ORDER BY`` uses ``TOPN(<offset + limit + 1>, ...)`` instead
+  and the reader discards the first ``offset`` rows (``LimitedQuery.client_skip``)
+
+One row beyond the limit is requested so the reader can tell whether the
+result was cut off (see ``read_columnar(max_rows=...)``). Statements that are
+already limited to at most ``limit`` rows (``TOPN``/``SAMPLE`` with a literal
+count) or that use ``START AT`` are left as they are.
+
+The query is tokenized (strings, quoted table names, bracketed names and
+comments are kept intact), and only top-level clauses are rewritten.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+
+class DaxSyntaxError(ValueError):
+    """The query text could not be tokenized (e.g. an unterminated string or comment)."""
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|--[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<table>'(?:[^']|'')*')
+  | (?P<column>\[(?:[^\]]|\]\])*\])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<op>&&|\|\||<=|>=|<>|==|[(){},=<>+\-*/&^!:;@])
+""", re.VERBOSE | re.DOTALL)
+
+Token = Tuple[str, str, int, int]  # (kind, text, start, end)
+
+
+def tokenize_dax(text: str) -> List[Token]:
+    """
+    Split a DAX query into tokens, without whitespace.
+
+    Kinds: ``comment``, ``string``, ``table`` ('quoted name'), ``column``
+    ([bracketed name]), ``number``, ``ident`` (keywords, functions and
+    unquoted names, including dotted ones like ``INFO.TABLES``) and ``op``.
+
+    Raises:
+        DaxSyntaxError: If the text contains something that is not a DAX token
+    """
+    tokens: List[Token] = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            snippet = text[pos:pos + 20]
+            raise DaxSyntaxError(f"Unexpected text at position {pos}: {snippet!r}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            tokens.append((kind, match.group(), pos, match.end()))
+        pos = match.end()
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# Statements
+# ---------------------------------------------------------------------------
+
+_LIMITING_FUNCTIONS = ('TOPN', 'SAMPLE')
+
+
+def _keyword(token: Token, *words: str) -> bool:
+    return token[0] == 'ident' and token[1].upper() in words
+
+
+@dataclass
+class _Statement:
+    """Token ranges (start inclusive, end exclusive) of one top-level EVALUATE statement"""
+    expression: Tuple[int, int]
+    order_by: Optional[Tuple[int, int]] = None
+    start_at: bool = False
+
+
+def _statements(tokens: List[Token]) -> List[_Statement]:
+    # Top-level clauses: keyword, index of its first token, index of its first body token
+    clauses: List[Tuple[str, int, int]] = []
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token[0] == 'op' and token[1] in '({':
+            depth += 1
+        elif token[0] == 'op' and token[1] in ')}':
+            depth -= 1
+        elif depth == 0 and token[0] == 'ident':
+            word = token[1].upper()
+            following = _next_code(tokens, i + 1)
+            if word in ('DEFINE', 'EVALUATE'):
+                clauses.append((word, i, i + 1))
+            elif word == 'ORDER' and following is not None and _keyword(tokens[following], 'BY'):
+                clauses.append(('ORDER BY', i, following + 1))
+            elif word == 'START' and following is not None and _keyword(tokens[following], 'AT'):
+                clauses.append(('START AT', i, following + 1))
+
+    statements: List[_Statement] = []
+    for position, (word, _, body) in enumerate(clauses):
+        end = clauses[position + 1][1] if position + 1 < len(clauses) else len(tokens)
+        if word == 'EVALUATE':
+            statements.append(_Statement(expression=(body, end)))
+        elif word == 'ORDER BY' and statements:
+            statements[-1].order_by = (body, end)
+        elif word == 'START AT' and statements:
+            statements[-1].start_at = True
+    return statements
+
+
+def _next_code(tokens: List[Token], i: int) -> Optional[int]:
+    while i < len(tokens) and tokens[i][0] == 'comment':
+        i += 1
+    return i if i < len(tokens) else None
+
+
+def _code(tokens: List[Token], span: Tuple[int, int]) -> List[int]:
+    """Indexes of the non-comment tokens in a range"""
+    return [i for i in range(*span) if tokens[i][0] != 'comment']
+
+
+def _split_arguments(tokens: List[Token], indexes: List[int]) -> List[List[int]]:
+    """Split token indexes at top-level commas"""
+    parts: List[List[int]] = [[]]
+    depth = 0
+    for i in indexes:
+        kind, text = tokens[i][0], tokens[i][1]
+        if kind == 'op' and text in '({':
+            depth += 1
+        elif kind == 'op' and text in ')}':
+            depth -= 1
+        if kind == 'op' and text == ',' and depth == 0:
+            parts.append([])
+        else:
+            parts[-1].append(i)
+    return parts
+
+
+def _already_limited(tokens: List[Token], indexes: List[int], limit: int) -> bool:
+    """Whether the expression is TOPN/SAMPLE(<literal n <= limit>, ...) as a whole"""
+    if len(indexes) < 4 or not _keyword(tokens[indexes[0]], *_LIMITING_FUNCTIONS):
+        return False
+    if tokens[indexes[1]][1] != '(' or tokens[indexes[-1]][1] != ')':
+        return False
+    # The opening parenthesis must close at the end of the expression
+    depth = 0
+    for position, i in enumerate(indexes[1:], start=1):
+        if tokens[i][0] == 'op' and tokens[i][1] in '({':
+            depth += 1
+        elif tokens[i][0] == 'op' and tokens[i][1] in ')}':
+            depth -= 1
+            if depth == 0 and position != len(indexes) - 1:
+                return False
+    count = tokens[indexes[2]]
+    if count[0] != 'number' or tokens[indexes[3]][1] != ',':
+        return False
+    try:
+        return float(count[1]) <= limit
+    except ValueError:
+        return False
+
+
+def _order_arguments(text: str, tokens: List[Token], span: Tuple[int, int]) -> List[str]:
+    """ORDER BY items as TOPN order-by arguments: expression, ASC|DESC, ..."""
+    arguments = []
+    for item in _split_arguments(tokens, _code(tokens, span)):
+        if not item:
+            continue
+        direction = 'ASC'  # ORDER BY defaults to ascending; TOPN would default to descending
+        if len(item) > 1 and _keyword(tokens[item[-1]], 'ASC', 'DESC'):
+            direction = tokens[item[-1]][1].upper()
+            item = item[:-1]
+        arguments.extend([text[tokens[item[0]][2]:tokens[item[-1]][3]], direction])
+    return arguments
+
+
+# ---------------------------------------------------------------------------
+# Rewriting
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LimitedQuery:
+    """
+    A query rewritten to produce a limited number of rows.
+
+    Attributes:
+        query: The query to execute
+        limit: Rows to show; the rewritten statements produce at most ``limit + 1``
+        offset: Rows skipped, by the engine or by the reader
+        client_skip: Leading rows of the result the reader must discard
+            (part of ``offset`` that the engine could not skip)
+        rewritten: Statements that were wrapped in TOPN/TOPNSKIP
+        skipped: Statements left as they were, with the reason
+    """
+    query: str
+    limit: int
+    offset: int = 0
+    client_skip: int = 0
+    rewritten: int = 0
+    skipped: List[str] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        return {
+            'limit': self.limit,
+            'offset': self.offset,
+            'client_skip': self.client_skip,
+            'statements_limited': self.rewritten,
+            'statements_unchanged': self.skipped,
+        }
+
+
+def limit_dax_query(query: str, limit: int, offset: int = 0) -> LimitedQuery:
+    """
+    Rewrite a DAX query so each EVALUATE statement returns at most ``limit + 1`` rows
+    from row ``offset`` on.
+
+    Args:
+        query: DAX query (``DEFINE``/``EVALUATE``/``ORDER BY``/``START AT``)
+        limit: Rows to show (at least 1)
+        offset: Rows to skip
+
+    Returns:
+        The rewritten query; ``query`` is returned unchanged if it cannot be
+        tokenized or contains no EVALUATE statement
+
+    Raises:
+        ValueError: If ``limit`` is below 1 or ``offset`` is negative
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    if offset < 0:
+        raise ValueError("offset cannot be negative")
+
+    result = LimitedQuery(query=query, limit=limit, offset=offset)
+    try:
+        tokens = tokenize_dax(query)
+    except DaxSyntaxError as e:
+        # Let the engine report the error
+        result.skipped.append(f"not tokenized: {e}")
+        return result
+
+    statements = _statements(tokens)
+    orders = [
+        _order_arguments(query, tokens, statement.order_by) if statement.order_by is not None else []
+        for statement in statements
+    ]
+    if offset and any(len(order) > 2 and not statement.start_at for statement, order in zip(statements, orders)):
+        # TOPNSKIP accepts one order-by expression; rank on every key with TOPN and skip on the client
+        result.client_skip = offset
+    server_offset = offset - result.client_skip
+
+    replacements: List[Tuple[int, int, str]] = []
+    for number, (statement, order) in enumerate(zip(statements, orders), start=1):
+        indexes = _code(tokens, statement.expression)
+        if not indexes:
+            continue
+        if statement.start_at:
+            result.skipped.append(f"statement {number}: START AT")
+            continue
+        if offset == 0 and _already_limited(tokens, indexes, limit):
+            result.skipped.append(f"statement {number}: already limited")
+            continue
+
+        start, end = tokens[indexes[0]][2], tokens[indexes[-1]][3]
+        arguments = [str(result.client_skip + limit + 1)]
+        if server_offset:
+            arguments.append(str(server_offset))
+        arguments.append(query[start:end])
+        arguments.extend(order)
+        function = 'TOPNSKIP' if server_offset else 'TOPN'
+        replacements.append((start, end, f"{function}({', '.join(arguments)})"))
+
+    text = query
+    for start, end, replacement in reversed(replacements):
+        text = text[:start] + replacement + text[end:]
+    result.query = text
+    result.rewritten = len(replacements)
+    return result
@@ -0,0 +1,363 @@
+"""
+Paged and File-Backed DAX Results
+
+Reads ``AdomdDataReader`` results without materializing the whole result
+set. Paging keeps the reader of a partially read query open on a dedicated
+connection and hands out an opaque cursor; the next call resumes that
+reader, or re-runs the query and skips the rows already returned when the
+reader has expired. Export streams rows in batches into a local CSV or
+Parquet file and returns only the path and summary statistics.
+"""
+
+import base64
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .columnar import ColumnarResult, describe_reader, iter_columnar_batches, read_columnar
+from .connection_pool import adomd_connection, close_adomd_connection, open_adomd_connection
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 50000
+MAX_OPEN_CURSORS = 8              # Readers kept open between page requests
+CURSOR_IDLE_TIMEOUT_SECONDS = 300  # Open readers idle longer than this are closed
+EXPORT_BATCH_ROWS = 10000          # Rows buffered before each write to the export file
+EXPORT_FORMATS = ("csv", "parquet")
+
+
+def _empty_like(template: ColumnarResult) -> ColumnarResult:
+    return ColumnarResult(template.names, template.field_types, template.types)
+
+
+def query_fingerprint(workspace_name: str, dataset_name: str, dax_query: str) -> str:
+    raw = f"{workspace_name}\n{dataset_name}\n{dax_query.strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(cursor_id: str, fingerprint: str, offset: int) -> str:
+    raw = json.dumps({"id": cursor_id, "q": fingerprint, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    """
+    Decode a cursor into ``(cursor_id, fingerprint, offset)``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(data["id"]), str(data["q"]), int(data["o"])
+    except Exception:
+        raise ValueError("Invalid cursor; pass the next_cursor value from the previous page unchanged")
+
+
+class _OpenReader:
+    """A reader left open between page requests, positioned at ``offset``."""
+
+    def __init__(self, connection: Any, reader: Any, template: ColumnarResult, fingerprint: str):
+        self.connection = connection
+        self.reader = reader
+        self.template = template
+        self.fingerprint = fingerprint
+        self.offset = 0
+        self.positioned = False  # The reader was advanced onto the first row of the next page
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.reader.Close()
+        except Exception as e:
+            logging.debug(f"Error closing paged reader: {e}")
+        close_adomd_connection(self.connection)
+
+
+_open_readers: "OrderedDict[str, _OpenReader]" = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def _take_reader(cursor_id: str, fingerprint: str, offset: int) -> Optional[_OpenReader]:
+    """Remove and return the open reader for a cursor, or None when it expired or does not match."""
+    expired: List[_OpenReader] = []
+    now = time.monotonic()
+    with _readers_lock:
+        for key in [k for k, r in _open_readers.items() if now - r.last_used > CURSOR_IDLE_TIMEOUT_SECONDS]:
+            expired.append(_open_readers.pop(key))
+        state = _open_readers.pop(cursor_id, None)
+    for old in expired:
+        old.close()
+    if state is not None and (state.fingerprint != fingerprint or state.offset != offset):
+        state.close()
+        return None
+    return state
+
+
+def _park_reader(cursor_id: str, state: _OpenReader) -> None:
+    state.last_used = time.monotonic()
+    evicted: List[_OpenReader] = []
+    with _readers_lock:
+        _open_readers[cursor_id] = state
+        while len(_open_readers) > MAX_OPEN_CURSORS:
+            evicted.append(_open_readers.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+
+
+def close_open_cursors() -> int:
+    """Close every reader kept open for paging; returns how many were closed."""
+    with _readers_lock:
+        states = list(_open_readers.values())
+        _open_readers.clear()
+    for state in states:
+        state.close()
+    return len(states)
+
+
+def _start_reader(workspace_name: str, dataset_name: str, dax_query: str, fingerprint: str,
+                  access_token: Optional[str]) -> _OpenReader:
+    connection = open_adomd_connection(workspace_name, dataset_name, access_token)
+    try:
+        command = connection.CreateCommand()
+        command.CommandText = dax_query
+        reader = command.ExecuteReader()
+    except Exception:
+        close_adomd_connection(connection)
+        raise
+    return _OpenReader(connection, reader, describe_reader(reader), fingerprint)
+
+
+def fetch_page(
+    workspace_name: str,
+    dataset_name: str,
+    dax_query: str,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    access_token: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Return one page of a DAX query result.
+
+    Args:
+        workspace_name: Power BI workspace name
+        dataset_name: Dataset name
+        dax_query: The DAX query; must be the same query on every page
+        page_size: Rows per page (default ``DEFAULT_PAGE_SIZE``, capped at ``MAX_PAGE_SIZE``)
+        cursor: ``next_cursor`` from the previous page, or None for the first page
+        access_token: Token to connect with; fetched when omitted
+
+    Returns:
+        Dict with ``rows``, ``columns``, ``offset``, ``row_count``, ``has_more``,
+        ``next_cursor`` and ``resumed_from`` (``reader``, ``requery`` or None)
+
+    Raises:
+        ValueError: If the cursor is invalid or belongs to a different query
+    """
+    page_size = max(1, min(int(page_size or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    fingerprint = query_fingerprint(workspace_name, dataset_name, dax_query)
+
+    offset = 0
+    cursor_id = uuid.uuid4().hex[:12]
+    state = None
+    resumed_from = None
+    if cursor:
+        cursor_id, cursor_fingerprint, offset = decode_cursor(cursor)
+        if cursor_fingerprint != fingerprint:
+            raise ValueError("Cursor belongs to a different query, workspace or dataset")
+        state = _take_reader(cursor_id, fingerprint, offset)
+        resumed_from = "reader"
+
+    if state is None:
+        state = _start_reader(workspace_name, dataset_name, dax_query, fingerprint, access_token)
+        if offset:
+            # The reader expired or was evicted: re-run the query and skip what was already returned
+            resumed_from = "requery"
+            skipped = 0
+            while skipped < offset and state.reader.Read():
+                skipped += 1
+            state.offset = skipped
+
+    try:
+        page = read_columnar(state.reader, page_size, empty_strings_as_null=True,
+                             positioned=state.positioned, result=_empty_like(state.template))
+    except Exception:
+        state.close()
+        raise
+    has_more = page.truncated
+    state.positioned = has_more
+
+    page_offset = state.offset
+    state.offset += page.row_count
+    if has_more:
+        _park_reader(cursor_id, state)
+    else:
+        state.close()
+
+    return {
+        "columns": page.names,
+        "rows": page.to_records(),
+        "offset": page_offset,
+        "row_count": page.row_count,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(cursor_id, fingerprint, state.offset) if has_more else None,
+        "resumed_from": resumed_from,
+    }
+
+
+def _default_export_path(dataset_name: str, export_format: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", dataset_name).strip("_") or "query"
+    # The random suffix keeps exports started in the same second from overwriting each other
+    stamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    return os.path.join(tempfile.gettempdir(), "semantic_model_exports", f"{safe_name}_{stamp}.{export_format}")
+
+
+def _resolve_export_path(export_path: Optional[str], dataset_name: str, export_format: str) -> str:
+    if not export_path:
+        path = _default_export_path(dataset_name, export_format)
+    elif os.path.isdir(export_path) or export_path.endswith(("/", "\\")):
+        path = os.path.join(export_path, os.path.basename(_default_export_path(dataset_name, export_format)))
+    else:
+        path = export_path
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+class _ColumnStats:
+    """Running null count and numeric min/max for one exported column."""
+
+    def __init__(self, logical_type: str):
+        self.numeric = logical_type in ("int64", "double", "decimal")
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, values: List[Any]) -> None:
+        nulls = values.count(None)
+        self.nulls += nulls
+        if not self.numeric or nulls == len(values):
+            return
+        present = [v for v in values if v is not None] if nulls else values
+        low, high = min(present), max(present)
+        if self.minimum is None or low < self.minimum:
+            self.minimum = low
+        if self.maximum is None or high > self.maximum:
+            self.maximum = high
+
+    def summary(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"null_count": self.nulls}
+        if self.minimum is not None:
+            result["min"] = self.minimum
+            result["max"] = self.maximum
+        return result
+
+
+class _CsvSink:
+    def __init__(self, path: str, template: ColumnarResult):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(template.names)
+
+    def write(self, batch: ColumnarResult) -> None:
+        self._writer.writerows(batch.to_rows())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str, template: ColumnarResult):
+        try:
+            import pyarrow.parquet as pq  # type: ignore
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow); use export_format='csv' instead")
+        # The schema comes from the reader's field types, so every batch shares it
+        self._writer = pq.ParquetWriter(path, template.to_arrow().schema)
+
+    def write(self, batch: ColumnarResult) -> None:
+        self._writer.write_table(batch.to_arrow())
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def export_query(
+    workspace_name: str,
+    dataset_name: str,
+    dax_query: str,
+    export_format: str = "csv",
+    export_path: Optional[str] = None,
+    access_token: Optional[str] = None,
+    batch_rows: int = EXPORT_BATCH_ROWS
+) -> Dict[str, Any]:
+    """
+    Stream a DAX query result into a local CSV or Parquet file.
+
+    Args:
+        workspace_name: Power BI workspace name
+        dataset_name: Dataset name
+        dax_query: The DAX query to run
+        export_format: ``csv`` or ``parquet`` (Parquet requires pyarrow)
+        export_path: Target file or directory; a temp file is used when omitted
+        access_token: Token to connect with; fetched when omitted
+        batch_rows: Rows buffered before each write
+
+    Returns:
+        Dict with the file path, row and batch counts, file size, elapsed
+        time and per-column null counts and numeric min/max
+
+    Raises:
+        ValueError: If the export format is not supported
+        ImportError: If Parquet is requested and pyarrow is not installed
+    """
+    export_format = (export_format or "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'; use one of: {', '.join(EXPORT_FORMATS)}")
+
+    path = _resolve_export_path(export_path, dataset_name, export_format)
+    started = time.perf_counter()
+    row_count = 0
+    batch_count = 0
+
+    with adomd_connection(workspace_name, dataset_name, access_token) as connection:
+        command = connection.CreateCommand()
+        command.CommandText = dax_query
+        reader = command.ExecuteReader()
+        try:
+            template = describe_reader(reader)
+            names = template.names
+            stats = [_ColumnStats(logical) for logical in template.types]
+            sink = _ParquetSink(path, template) if export_format == "parquet" else _CsvSink(path, template)
+            try:
+                for batch in iter_columnar_batches(reader, batch_rows, template=template):
+                    for column_stats, values in zip(stats, batch.columns):
+                        column_stats.add(values)
+                    sink.write(batch)
+                    row_count += batch.row_count
+                    batch_count += 1
+            finally:
+                sink.close()
+        finally:
+            reader.Close()
+
+    return {
+        "status": "exported",
+        "path": path,
+        "format": export_format,
+        "row_count": row_count,
+        "batches": batch_count,
+        "file_size_bytes": os.path.getsize(path),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "columns": {name: column_stats.summary() for name, column_stats in zip(names, stats)},
+    }
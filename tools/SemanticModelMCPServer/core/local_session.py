@@ -0,0 +1,309 @@
+"""
+Persistent Sessions to Local Power BI Desktop Models
+
+One ``LocalModelSession`` per connection string keeps an open ADOMD
+connection to the Desktop model and a metadata snapshot: tables, columns,
+measures and the table ID to name map, loaded on first use. The snapshot is
+tagged with the catalog's last schema update and is dropped when that
+changes (checked at most every ``SCHEMA_CHECK_INTERVAL_SECONDS``), so a
+series of exploration calls costs one schema check each instead of a new
+connection plus the INFO queries.
+
+Explorers with their own metadata queries can cache results in the same
+snapshot with ``LocalModelSession.cached``.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .columnar import ColumnarResult, describe_reader, read_columnar
+from .connection_pool import load_assemblies
+
+SCHEMA_CHECK_INTERVAL_SECONDS = 2.0  # Calls within this interval reuse the snapshot without a schema check
+MAX_SESSIONS = 8                     # Open sessions kept (one per Desktop instance) before LRU eviction
+
+SCHEMA_VERSION_QUERY = "SELECT [CATALOG_NAME], [DATE_MODIFIED] FROM $SYSTEM.DBSCHEMA_CATALOGS"
+
+logger = logging.getLogger(__name__)
+
+
+def _text(value: Any) -> str:
+    return str(value) if value is not None else ''
+
+
+def _flag(value: Any) -> bool:
+    return bool(value) if value is not None else False
+
+
+def _not_flag(value: Any) -> bool:
+    return not bool(value) if value is not None else True
+
+
+# Output key, INFO function column, converter
+_TABLE_FIELDS = (
+    ('id', '[ID]', _text), ('name', '[Name]', _text), ('data_category', '[DataCategory]', _text),
+    ('description', '[Description]', _text), ('is_hidden', '[IsHidden]', _flag), ('is_visible', '[IsHidden]', _not_flag),
+    ('modified_time', '[ModifiedTime]', _text), ('lineage_tag', '[LineageTag]', _text),
+)
+_COLUMN_FIELDS = (
+    ('table_id', '[TableID]', _text), ('column_id', '[ID]', _text), ('explicit_name', '[ExplicitName]', _text),
+    ('inferred_name', '[InferredName]', _text), ('data_type', '[ExplicitDataType]', _text),
+    ('is_hidden', '[IsHidden]', _flag), ('is_visible', '[IsHidden]', _not_flag), ('is_key', '[IsKey]', _flag),
+    ('description', '[Description]', _text), ('display_folder', '[DisplayFolder]', _text),
+    ('expression', '[Expression]', _text), ('lineage_tag', '[LineageTag]', _text),
+)
+_MEASURE_FIELDS = (
+    ('table_id', '[TableID]', _text), ('measure_id', '[ID]', _text), ('name', '[Name]', _text),
+    ('description', '[Description]', _text), ('expression', '[Expression]', _text),
+    ('is_hidden', '[IsHidden]', _flag), ('is_visible', '[IsHidden]', _not_flag),
+    ('display_folder', '[DisplayFolder]', _text), ('data_type', '[DataType]', _text),
+    ('format_string', '[FormatString]', _text), ('lineage_tag', '[LineageTag]', _text),
+)
+
+
+def read_rows(connection: Any, query: str, fields: Tuple[Tuple[str, str, Callable[[Any], Any]], ...]) -> List[Dict[str, Any]]:
+    """Run a query and map each row to a dict of ``fields`` (output key, source column, converter)."""
+    cmd = connection.CreateCommand()
+    cmd.CommandText = query
+    reader = cmd.ExecuteReader()
+    try:
+        rows = []
+        while reader.Read():
+            rows.append({key: convert(reader[column]) for key, column, convert in fields})
+        return rows
+    finally:
+        reader.Close()
+
+
+class _Snapshot:
+    def __init__(self, version: Optional[str]):
+        self.version = version
+        self.created = time.monotonic()
+        self.checked = self.created
+        self.parts: Dict[str, Any] = {}
+
+
+class LocalModelSession:
+    """
+    A live connection to one local model plus its metadata snapshot.
+
+    Queries on a session are serialized (an ADOMD connection is not
+    thread-safe). A connection that fails is closed and reopened on the next
+    use; metadata reads retry once when a reused connection fails.
+    """
+
+    def __init__(self, connection_string: str):
+        self.connection_string = connection_string
+        self._connection: Any = None
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.RLock()
+        self.stats = {"connections_opened": 0, "schema_checks": 0, "snapshots": 0, "metadata_hits": 0,
+                      "metadata_loads": 0}
+
+    # Connection
+
+    def _open(self) -> Any:
+        load_assemblies()
+        from Microsoft.AnalysisServices.AdomdClient import AdomdConnection  # type: ignore
+
+        connection = AdomdConnection(self.connection_string)
+        connection.Open()
+        self.stats["connections_opened"] += 1
+        return connection
+
+    @staticmethod
+    def _is_open(connection: Any) -> bool:
+        return connection is not None and getattr(connection, "State", None) == 1  # ConnectionState.Open = 1
+
+    def _drop_connection(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.Close()
+            except Exception as e:
+                logger.debug(f"Error closing local connection: {e}")
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrow the session's open ``AdomdConnection``.
+
+        Readers must be closed inside the block. If the block raises, the
+        connection is closed and the next use reconnects.
+        """
+        with self._lock:
+            if not self._is_open(self._connection):
+                self._drop_connection()
+                self._connection = self._open()
+            try:
+                yield self._connection
+            except BaseException:
+                self._drop_connection()
+                raise
+
+    def _with_retry(self, action: Callable[[Any], Any]) -> Any:
+        with self._lock:
+            reused = self._is_open(self._connection)
+            try:
+                with self.connection() as connection:
+                    return action(connection)
+            except Exception as e:
+                if not reused:
+                    raise
+                # The Desktop engine may have dropped an idle connection; try once on a new one
+                logger.debug(f"Retrying on a new local connection after: {e}")
+                with self.connection() as connection:
+                    return action(connection)
+
+    def execute(self, dax_query: str, max_rows: Optional[int] = None, skip_rows: int = 0) -> ColumnarResult:
+        """
+        Run a DAX query on the live connection and read it into typed columns.
+
+        Args:
+            skip_rows: Leading rows to discard (``LimitedQuery.client_skip``)
+        """
+        with self.connection() as connection:
+            cmd = connection.CreateCommand()
+            cmd.CommandText = dax_query
+            reader = cmd.ExecuteReader()
+            try:
+                if skip_rows and not all(reader.Read() for _ in range(skip_rows)):
+                    return describe_reader(reader)
+                return read_columnar(reader, max_rows=max_rows)
+            finally:
+                reader.Close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop_connection()
+            self._snapshot = None
+
+    # Metadata snapshot
+
+    def _schema_version(self, connection: Any) -> Optional[str]:
+        self.stats["schema_checks"] += 1
+        try:
+            cmd = connection.CreateCommand()
+            cmd.CommandText = SCHEMA_VERSION_QUERY
+            reader = cmd.ExecuteReader()
+            try:
+                versions = []
+                while reader.Read():
+                    versions.append(f"{reader['CATALOG_NAME']}@{reader['DATE_MODIFIED']}")
+                return "|".join(versions)
+            finally:
+                reader.Close()
+        except Exception as e:
+            logger.debug(f"Could not read the local schema version: {e}")
+            return None
+
+    def _current_snapshot(self, connection: Any) -> _Snapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot.checked < SCHEMA_CHECK_INTERVAL_SECONDS:
+            return snapshot
+        version = self._schema_version(connection)
+        if snapshot is not None and version is not None and version == snapshot.version:
+            snapshot.checked = now
+            return snapshot
+        # Without a readable version the snapshot lives for one check interval only
+        self._snapshot = snapshot = _Snapshot(version)
+        self.stats["snapshots"] += 1
+        return snapshot
+
+    def cached(self, key: str, loader: Callable[[Any], Any]) -> Any:
+        """
+        Return ``loader(connection)`` from the current snapshot, loading it if needed.
+
+        Results are shared until the model's schema changes; treat them as read-only.
+        """
+        def load(connection: Any) -> Any:
+            snapshot = self._current_snapshot(connection)
+            if key in snapshot.parts:
+                self.stats["metadata_hits"] += 1
+                return snapshot.parts[key]
+            value = snapshot.parts[key] = loader(connection)
+            self.stats["metadata_loads"] += 1
+            return value
+        return self._with_retry(load)
+
+    def invalidate(self) -> None:
+        """Drop the metadata snapshot, e.g. after the model was changed through this server."""
+        with self._lock:
+            self._snapshot = None
+
+    def tables(self) -> List[Dict[str, Any]]:
+        """Tables from ``INFO.TABLES()``"""
+        return self.cached("tables", lambda connection: read_rows(connection, "EVALUATE INFO.TABLES()", _TABLE_FIELDS))
+
+    def table_mapping(self) -> Dict[str, str]:
+        """Table ID -> table name"""
+        return {table['id']: table['name'] for table in self.tables()}
+
+    def columns(self, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Columns from ``INFO.COLUMNS()`` with their table names, optionally of one table"""
+        def load(connection: Any) -> Dict[str, List[Dict[str, Any]]]:
+            mapping = self.table_mapping()
+            by_table: Dict[str, List[Dict[str, Any]]] = OrderedDict()
+            for column in read_rows(connection, "EVALUATE INFO.COLUMNS()", _COLUMN_FIELDS):
+                name = mapping.get(column['table_id'], 'Unknown')
+                by_table.setdefault(name, []).append({'table_id': column['table_id'], 'table_name': name, **column})
+            return by_table
+
+        by_table = self.cached("columns_by_table", load)
+        if table_name:
+            return list(by_table.get(table_name, []))
+        return [column for columns in by_table.values() for column in columns]
+
+    def measures(self) -> List[Dict[str, Any]]:
+        """Measures from ``INFO.MEASURES()`` with their table names"""
+        def load(connection: Any) -> List[Dict[str, Any]]:
+            mapping = self.table_mapping()
+            return [{'table_id': measure['table_id'], 'table_name': mapping.get(measure['table_id'], 'Unknown'), **measure}
+                    for measure in read_rows(connection, "EVALUATE INFO.MEASURES()", _MEASURE_FIELDS)]
+        return self.cached("measures", load)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                "connection_string": self.connection_string,
+                "connected": self._is_open(self._connection),
+                "schema_version": snapshot.version if snapshot else None,
+                "snapshot_parts": sorted(snapshot.parts) if snapshot else [],
+                "snapshot_age_seconds": round(time.monotonic() - snapshot.created, 1) if snapshot else None,
+                **self.stats,
+            }
+
+
+_sessions: "OrderedDict[str, LocalModelSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_local_session(connection_string: str) -> LocalModelSession:
+    """Return the session for a local connection string, creating it on first use."""
+    key = connection_string.strip().rstrip(";").lower()
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = LocalModelSession(connection_string)
+            while len(_sessions) > MAX_SESSIONS:
+                evicted.append(_sessions.popitem(last=False)[1])
+        _sessions.move_to_end(key)
+    for old in evicted:
+        old.close()
+    return session
+
+
+def close_local_sessions() -> None:
+    """Close every local session."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
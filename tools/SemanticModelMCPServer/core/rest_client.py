@@ -0,0 +1,208 @@
+"""
+Shared REST Client for Fabric and Power BI APIs
+
+One pooled ``requests.Session`` for every Fabric / Power BI REST call, with:
+- Retry-After-aware backoff on 429 and transient 5xx responses
+- Pagination as a generator, following Fabric ``continuationToken`` /
+  ``continuationUri`` and Power BI ``@odata.nextLink``
+- An optional TTL cache for read-only listing endpoints
+"""
+
+import email.utils
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FABRIC_API_BASE = "https://api.fabric.microsoft.com/v1"
+POWERBI_API_BASE = "https://api.powerbi.com/v1.0/myorg"
+
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_RETRIES = 4                 # Retries after the first attempt for 429/5xx responses
+BACKOFF_BASE_SECONDS = 1.0      # Exponential backoff when no Retry-After header is sent
+MAX_BACKOFF_SECONDS = 60.0
+LISTING_CACHE_TTL_SECONDS = 60  # Default TTL for cached listing responses
+LISTING_CACHE_MAX_ENTRIES = 256
+POOL_MAXSIZE = 16
+
+_RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class RestApiError(Exception):
+    """A REST call returned a non-success status after retries."""
+
+    def __init__(self, status_code: int, text: str, payload: Optional[Dict[str, Any]] = None):
+        super().__init__(f"HTTP {status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+        self.payload = payload or {}
+
+    @property
+    def error_code(self) -> str:
+        return str(self.payload.get("errorCode", ""))
+
+
+def _retry_after_seconds(header: Optional[str], attempt: int) -> float:
+    """Seconds to wait before the next attempt, honoring Retry-After (seconds or HTTP date)."""
+    delay = None
+    if header:
+        try:
+            delay = float(header)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(header)
+                delay = retry_at.timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+    if delay is None:
+        delay = BACKOFF_BASE_SECONDS * (2 ** attempt)
+    return max(0.0, min(delay, MAX_BACKOFF_SECONDS))
+
+
+def _error_payload(response: Any) -> Dict[str, Any]:
+    try:
+        payload = response.json()
+        return payload if isinstance(payload, dict) else {}
+    except ValueError:
+        return {}
+
+
+class RestClient:
+    """Pooled, retrying REST client; one instance is shared through ``get_rest_client``."""
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT_SECONDS, max_retries: int = MAX_RETRIES):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._cache: Dict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._cache_lock = threading.Lock()
+
+    @property
+    def session(self) -> Any:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def request(self, method: str, url: str, access_token: str, params: Optional[Dict[str, Any]] = None,
+                **kwargs: Any) -> Any:
+        """
+        Send a request, retrying 429 and transient 5xx responses.
+
+        Returns:
+            The final ``requests.Response`` (success or not); network errors propagate
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {access_token}"
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            response = self.session.request(method, url, params=params, headers=headers, **kwargs)
+            if response.status_code not in _RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+            delay = _retry_after_seconds(response.headers.get("Retry-After"), attempt)
+            logger.info(f"{method} {url} returned {response.status_code}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, access_token: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        return self.request("GET", url, access_token, params=params, **kwargs)
+
+    def get_json(self, url: str, access_token: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET a JSON document.
+
+        Raises:
+            RestApiError: If the final response is not 200
+        """
+        response = self.get(url, access_token, params=params)
+        if response.status_code != 200:
+            raise RestApiError(response.status_code, response.text, _error_payload(response))
+        return response.json()
+
+    def paginate(self, url: str, access_token: str, params: Optional[Dict[str, Any]] = None,
+                 items_key: str = "value") -> Iterator[Dict[str, Any]]:
+        """
+        Yield every item of a paged listing.
+
+        Items are read from ``items_key`` (falling back to ``value``). The next
+        page comes from ``continuationUri`` / ``continuationToken`` (Fabric) or
+        ``@odata.nextLink`` (Power BI).
+
+        Raises:
+            RestApiError: If any page request fails
+        """
+        next_url: Optional[str] = url
+        next_params = dict(params or {})
+        while next_url:
+            payload = self.get_json(next_url, access_token, params=next_params or None)
+            for item in payload.get(items_key, payload.get("value", [])) or []:
+                yield item
+            if payload.get("continuationUri"):
+                next_url, next_params = payload["continuationUri"], {}
+            elif payload.get("continuationToken"):
+                next_params = dict(params or {}, continuationToken=payload["continuationToken"])
+            elif payload.get("@odata.nextLink"):
+                next_url, next_params = payload["@odata.nextLink"], {}
+            else:
+                next_url = None
+
+    def list_all(self, url: str, access_token: str, params: Optional[Dict[str, Any]] = None,
+                 items_key: str = "value", cache_ttl: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Collect a paged listing, optionally through the TTL cache.
+
+        Args:
+            cache_ttl: Seconds to keep the listing (None or 0 disables caching
+                for this call); only use it for read-only listing endpoints
+        """
+        key = (url, tuple(sorted((params or {}).items())), items_key)
+        if cache_ttl:
+            with self._cache_lock:
+                entry = self._cache.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return list(entry[1])
+        items = list(self.paginate(url, access_token, params=params, items_key=items_key))
+        if cache_ttl:
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic() + cache_ttl, items)
+                if len(self._cache) > LISTING_CACHE_MAX_ENTRIES:
+                    now = time.monotonic()
+                    for stale in [k for k, v in self._cache.items() if v[0] <= now]:
+                        del self._cache[stale]
+                    while len(self._cache) > LISTING_CACHE_MAX_ENTRIES:
+                        del self._cache[next(iter(self._cache))]
+        return list(items)
+
+    def clear_cache(self, url_prefix: Optional[str] = None) -> None:
+        """Drop cached listings, optionally only those whose URL starts with ``url_prefix``."""
+        with self._cache_lock:
+            if url_prefix is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0].startswith(url_prefix)]:
+                    del self._cache[key]
+
+
+_client: Optional[RestClient] = None
+_client_lock = threading.Lock()
+
+
+def get_rest_client() -> RestClient:
+    """Return the process-wide REST client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RestClient()
+    return _client
@@ -0,0 +1,210 @@
+"""
+Pooled Fabric SQL Analytics Endpoint Queries
+
+Keeps open pyodbc connections keyed by SQL endpoint server and database
+(reconnecting when the access token changes), resolves the ODBC driver
+once per process, and reads results with ``fetchmany`` so no more than the
+requested number of rows is pulled from the server. Where it is safe, the
+row limit is also pushed into the query as ``TOP``.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection_pool import ConnectionPool
+
+ODBC_DRIVER_PREFERENCE = [
+    "ODBC Driver 18 for SQL Server",
+    "ODBC Driver 17 for SQL Server",
+    "SQL Server",
+]
+SQL_COPT_SS_ACCESS_TOKEN = 1256  # pyodbc attrs_before key for an Azure AD access token struct
+DEFAULT_MAX_ROWS = 100
+FETCH_ARRAYSIZE = 500
+
+_driver: Optional[str] = None
+_driver_lock = threading.Lock()
+
+_pyodbc: Any = None  # The pyodbc module once imported, False if it is not installed
+
+
+def get_pyodbc() -> Optional[Any]:
+    """Return the pyodbc module, imported on first use, or None if it is not installed."""
+    global _pyodbc
+    if _pyodbc is None:
+        try:
+            import pyodbc
+            _pyodbc = pyodbc
+        except ImportError:
+            _pyodbc = False
+    return _pyodbc or None
+
+
+def _require_pyodbc() -> Any:
+    pyodbc = get_pyodbc()
+    if pyodbc is None:
+        raise ImportError("pyodbc not installed; install it with: pip install pyodbc")
+    return pyodbc
+
+
+class OdbcDriverNotFoundError(Exception):
+    """No supported SQL Server ODBC driver is installed."""
+
+    def __init__(self, installed: List[str]):
+        super().__init__("No compatible ODBC driver found. Please install ODBC Driver for SQL Server.")
+        self.installed = installed
+
+
+def resolve_odbc_driver() -> str:
+    """
+    Return the preferred installed SQL Server ODBC driver, probing ``pyodbc.drivers()`` only once.
+
+    Raises:
+        ImportError: If pyodbc is not installed
+        OdbcDriverNotFoundError: If none of ``ODBC_DRIVER_PREFERENCE`` is installed (not cached,
+            so installing a driver takes effect without a restart)
+    """
+    global _driver
+    if _driver:
+        return _driver
+    with _driver_lock:
+        if not _driver:
+            installed = list(_require_pyodbc().drivers())
+            for driver in ODBC_DRIVER_PREFERENCE:
+                if driver in installed:
+                    _driver = driver
+                    break
+            else:
+                raise OdbcDriverNotFoundError(installed)
+    return _driver
+
+
+def get_resolved_odbc_driver() -> Optional[str]:
+    """Return the driver chosen by ``resolve_odbc_driver``, or None if none was resolved yet."""
+    return _driver
+
+
+def build_sql_connection_string(server_name: str, database: str, driver: Optional[str] = None) -> str:
+    return (
+        f"Driver={{{driver or resolve_odbc_driver()}}};"
+        f"Server={server_name};"
+        f"Database={database};"
+        f"Encrypt=yes;"
+        f"TrustServerCertificate=yes;"
+        f"Connection Timeout=30;"
+    )
+
+
+def _open_sql(key: Tuple[str, ...], token_struct: Any) -> Any:
+    server_name, database = key
+    return _require_pyodbc().connect(build_sql_connection_string(server_name, database),
+                                     attrs_before={SQL_COPT_SS_ACCESS_TOKEN: token_struct})
+
+
+def _sql_is_open(connection: Any) -> bool:
+    return not getattr(connection, "closed", False)
+
+
+def _close_sql(connection: Any) -> None:
+    if _sql_is_open(connection):
+        connection.close()
+
+
+_sql_pool = ConnectionPool(_open_sql, _sql_is_open, _close_sql)
+
+_TOP_LEVEL_SELECT = re.compile(r"^\s*SELECT\s+((?:DISTINCT|ALL)\s+)?", re.IGNORECASE)
+_UNSAFE_FOR_TOP = re.compile(r"\bTOP\b|\bUNION\b|\bINTERSECT\b|\bEXCEPT\b|\bINTO\b|\bOFFSET\b|\bFOR\s+(?:XML|JSON)\b|;|--|/\*",
+                             re.IGNORECASE)
+
+
+def push_down_row_limit(sql_query: str, limit: int) -> Optional[str]:
+    """
+    Rewrite a single plain ``SELECT`` to ``SELECT TOP (limit)``.
+
+    Returns None when the statement is not a lone SELECT, or already limits,
+    combines or redirects its rows (TOP, UNION/INTERSECT/EXCEPT, INTO,
+    OFFSET, FOR XML/JSON), or contains comments or several statements.
+    """
+    match = _TOP_LEVEL_SELECT.match(sql_query)
+    if not match or _UNSAFE_FOR_TOP.search(sql_query):
+        return None
+    return f"{sql_query[:match.end()]}TOP ({int(limit)}) {sql_query[match.end():]}"
+
+
+def _json_value(value: Any) -> Any:
+    if hasattr(value, 'isoformat'):  # datetime objects
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):  # binary data
+        return str(value)
+    return value
+
+
+def execute_sql_query(
+    server_name: str,
+    database: str,
+    sql_query: str,
+    token_struct: Any,
+    max_rows: int = DEFAULT_MAX_ROWS,
+    arraysize: int = FETCH_ARRAYSIZE
+) -> Dict[str, Any]:
+    """
+    Run a query on a pooled SQL endpoint connection and read at most ``max_rows`` rows.
+
+    One row beyond the limit is requested so the caller can tell whether the
+    result was cut off; the cursor is closed after that, so the server stops
+    sending the remainder.
+
+    Args:
+        server_name: SQL Analytics Endpoint server
+        database: Database (lakehouse) name
+        sql_query: Query to run
+        token_struct: Packed access token for ``SQL_COPT_SS_ACCESS_TOKEN``
+        max_rows: Maximum rows returned
+        arraysize: Rows per ``fetchmany`` round trip
+
+    Returns:
+        Dict with ``columns``, ``results``, ``row_count``, ``truncated``,
+        ``limit_pushed_down`` and ``driver``
+    """
+    max_rows = max(1, int(max_rows))
+    limited_query = push_down_row_limit(sql_query, max_rows + 1)
+
+    with _sql_pool.connection((server_name, database), token_struct) as pooled:
+        cursor = pooled.connection.cursor()
+        try:
+            cursor.arraysize = max(1, min(arraysize, max_rows + 1))
+            cursor.execute(limited_query or sql_query)
+
+            columns = [column[0] for column in cursor.description] if cursor.description else []
+            rows: List[Any] = []
+            while columns and len(rows) <= max_rows:
+                batch = cursor.fetchmany(min(cursor.arraysize, max_rows + 1 - len(rows)))
+                if not batch:
+                    break
+                rows.extend(batch)
+        finally:
+            cursor.close()
+
+    truncated = len(rows) > max_rows
+    results = [
+        {name: _json_value(value) for name, value in zip(columns, row)}
+        for row in rows[:max_rows]
+    ]
+    return {
+        "columns": columns,
+        "results": results,
+        "row_count": len(results),
+        "truncated": truncated,
+        "limit_pushed_down": limited_query is not None,
+        "driver": _driver,
+    }
+
+
+def clear_sql_connection_pool() -> None:
+    """Close all pooled SQL endpoint connections."""
+    _sql_pool.clear()
+
+
+def get_sql_connection_pool_status() -> Dict[str, Any]:
+    return _sql_pool.status()
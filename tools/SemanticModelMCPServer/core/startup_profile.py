@@ -0,0 +1,49 @@
+"""
+Startup Timing
+
+Records how long each phase of server startup takes (module imports, tool
+registration, ...) and logs one line per phase. ``python server.py
+--profile-startup`` prints the report as JSON and exits instead of serving,
+so startup time can be measured without an MCP client.
+
+The report also lists which of ``HEAVY_MODULES`` were imported during
+startup; they are meant to load on first use, so any entry there means an
+eager import has crept back in.
+"""
+
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Dependencies that are slow to import and only needed by some tools
+HEAVY_MODULES = ("clr", "pyodbc", "msal", "requests", "azure.identity", "bs4", "pyarrow")
+
+
+class StartupProfile:
+    """Consecutive startup phases and their durations."""
+
+    def __init__(self, started: Optional[float] = None):
+        """
+        Args:
+            started: ``time.perf_counter()`` value when startup began (default: now)
+        """
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        """End the current phase, naming it, and return its duration in seconds."""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.phases.append((phase, elapsed))
+        logging.info(f"Startup: {phase} took {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases": [{"phase": phase, "ms": round(seconds * 1000, 1)} for phase, seconds in self.phases],
+            "total_ms": round((self._last - self.started) * 1000, 1),
+            "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+        }
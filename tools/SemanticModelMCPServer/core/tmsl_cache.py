@@ -0,0 +1,339 @@
+"""
+Versioned Model Definition (TMSL) Cache
+
+Serialized model definitions are kept per workspace and dataset together
+with the database ``Version`` and ``LastUpdate`` they were read at. A
+request first refreshes only the database's own properties; when the
+version is unchanged the definition is served from memory, or from the
+disk copy left by an earlier process, without serializing the model again.
+
+Partial requests name tables and/or object types (``measures``,
+``relationships``, ...). When the full definition is not cached at the
+current version, only the requested tables are serialized (each cached on
+its own), and the result is pruned to the requested object types.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection_pool import load_assemblies, tom_server
+
+MEMORY_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Total TMSL text kept in memory
+DISK_CACHE_MAX_ENTRIES = 128                 # Cached definitions kept on disk (oldest removed first)
+DISK_CACHE_DIR = os.path.join(tempfile.gettempdir(), "semantic_model_cache", "tmsl")
+
+# Object collections of a table and of the model that partial requests can select
+TABLE_OBJECT_TYPES = ("columns", "measures", "hierarchies", "partitions", "calculationGroup")
+MODEL_OBJECT_TYPES = ("relationships", "roles", "perspectives", "expressions", "dataSources", "cultures")
+OBJECT_TYPES = ("tables",) + TABLE_OBJECT_TYPES + MODEL_OBJECT_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+class TmslCache:
+    """
+    Memory (LRU by size) and disk cache of TMSL text.
+
+    Keys are ``(workspace, dataset, part)`` where part is ``""`` for the
+    whole database or ``"table:<name>"``; every entry carries the version
+    string it was read at and is only returned for that version.
+    """
+
+    def __init__(self, directory: str = DISK_CACHE_DIR, max_memory_bytes: int = MEMORY_CACHE_MAX_BYTES,
+                 max_disk_entries: int = DISK_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[Tuple[str, str, str], Tuple[str, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(workspace_name: str, dataset_name: str, part: str = "") -> Tuple[str, str, str]:
+        return (workspace_name.lower(), dataset_name.lower(), part.lower())
+
+    def _path(self, key: Tuple[str, str, str]) -> str:
+        digest = hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.tmsl")
+
+    def get(self, workspace_name: str, dataset_name: str, version: str, part: str = "") -> Optional[str]:
+        """Return the cached TMSL for ``version``, or None."""
+        key = self._key(workspace_name, dataset_name, part)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] == version:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+
+        tmsl = self._read_disk(key, version)
+        with self._lock:
+            if tmsl is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+        self._remember(key, version, tmsl)
+        return tmsl
+
+    def put(self, workspace_name: str, dataset_name: str, version: str, tmsl: str, part: str = "") -> None:
+        key = self._key(workspace_name, dataset_name, part)
+        self._remember(key, version, tmsl)
+        self._write_disk(key, version, tmsl)
+
+    def invalidate(self, workspace_name: str, dataset_name: str) -> None:
+        """Drop every cached part of a dataset (memory only; disk copies fail the version check)."""
+        prefix = self._key(workspace_name, dataset_name)[:2]
+        with self._lock:
+            for key in [k for k in self._memory if k[:2] == prefix]:
+                self._memory_bytes -= len(self._memory.pop(key)[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".tmsl"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "directory": self.directory,
+                **self.stats,
+            }
+
+    def _remember(self, key: Tuple[str, str, str], version: str, tmsl: str) -> None:
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            if len(tmsl) > self.max_memory_bytes:
+                return
+            self._memory[key] = (version, tmsl)
+            self._memory_bytes += len(tmsl)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, key: Tuple[str, str, str], version: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("key") != list(key) or header.get("version") != version:
+                    return None
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable TMSL cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key: Tuple[str, str, str], version: str, tmsl: str) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"key": list(key), "version": version, "written_at": time.time()}) + "\n")
+                f.write(tmsl)
+            os.replace(temp_path, path)
+            self._prune_disk()
+        except OSError as e:
+            logger.debug(f"Could not write TMSL cache file {path}: {e}")
+
+    def _prune_disk(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmsl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_disk_entries:
+            return
+        for _, path in sorted(entries)[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_cache = TmslCache()
+
+
+def get_tmsl_cache() -> TmslCache:
+    """Return the process-wide TMSL cache."""
+    return _cache
+
+
+def database_version(database: Any) -> str:
+    """Version key of a TOM database: its ``Version`` plus ``LastUpdate``."""
+    return f"{database.Version}|{database.LastUpdate}"
+
+
+def _serialize_options() -> Any:
+    from Microsoft.AnalysisServices.Tabular import SerializeOptions  # type: ignore
+
+    options = SerializeOptions()
+    options.IgnoreTimestamps = True
+    return options
+
+
+def _validate_object_types(object_types: Optional[List[str]]) -> Optional[List[str]]:
+    if not object_types:
+        return None
+    by_lower = {name.lower(): name for name in OBJECT_TYPES}
+    selected = []
+    for object_type in object_types:
+        name = by_lower.get(str(object_type).strip().lower())
+        if name is None:
+            raise ValueError(f"Unknown object type '{object_type}'; use any of: {', '.join(OBJECT_TYPES)}")
+        selected.append(name)
+    return selected
+
+
+def select_definition(
+    definition: Dict[str, Any],
+    tables: Optional[List[str]] = None,
+    object_types: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Prune a serialized database to the requested tables and object types.
+
+    Scalar properties of the database, model and kept tables are always
+    kept. With ``object_types``, only the listed collections remain; table
+    collections (``measures``, ``columns``, ...) keep the tables themselves
+    with just those collections, while ``tables`` keeps them whole.
+
+    Raises:
+        ValueError: If an object type or a requested table is unknown
+    """
+    object_types = _validate_object_types(object_types)
+    model = definition.get("model", {}) or {}
+    wanted_tables = {name.lower() for name in tables} if tables else None
+
+    # Model-level lists other than the selectable ones (annotations, ...) only survive a tables-only request
+    selected_model = {key: value for key, value in model.items()
+                      if key != "tables" and (not isinstance(value, list) or object_types is None
+                                              or key in object_types)}
+
+    table_types = None if object_types is None or "tables" in object_types else \
+        [key for key in object_types if key in TABLE_OBJECT_TYPES]
+    if wanted_tables is not None:
+        missing = wanted_tables - {str(table.get("name", "")).lower() for table in model.get("tables", []) or []}
+        if missing:
+            raise ValueError(f"Table(s) not found: {', '.join(sorted(missing))}")
+    if table_types is None or table_types:
+        selected_tables = []
+        for table in model.get("tables", []) or []:
+            if wanted_tables is not None and str(table.get("name", "")).lower() not in wanted_tables:
+                continue
+            if table_types is not None:
+                table = {key: value for key, value in table.items()
+                         if key in table_types or (key not in TABLE_OBJECT_TYPES and not isinstance(value, list))}
+            selected_tables.append(table)
+        selected_model["tables"] = selected_tables
+
+    selected = {key: value for key, value in definition.items() if key != "model"}
+    selected["model"] = selected_model
+    return selected
+
+
+def get_model_tmsl(
+    workspace_name: str,
+    dataset_name: str,
+    access_token: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    object_types: Optional[List[str]] = None,
+    use_cache: bool = True
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Read a dataset's model definition, through the versioned cache.
+
+    Args:
+        workspace_name: Power BI workspace name
+        dataset_name: Dataset name
+        access_token: Token to connect with; fetched when omitted
+        tables: Only these tables (names, case-insensitive)
+        object_types: Only these collections (see ``OBJECT_TYPES``)
+        use_cache: False always re-serializes (the result is still cached)
+
+    Returns:
+        ``(tmsl, info)``: the full serializer output, or indented JSON of the
+        selected part; ``info`` has the version, cache source and timings
+
+    Raises:
+        ValueError: If the dataset, a table or an object type is not found
+    """
+    _validate_object_types(object_types)
+    load_assemblies()
+    from Microsoft.AnalysisServices.Tabular import JsonSerializer  # type: ignore
+
+    cache = get_tmsl_cache()
+    started = time.perf_counter()
+    partial = bool(tables) or bool(object_types)
+    source = "cache"
+    with tom_server(workspace_name, access_token, database_name=dataset_name, full_refresh=False) as server:
+        database = server.Databases.FindByName(dataset_name)
+        if database is None:
+            raise ValueError(f"Dataset '{dataset_name}' not found in workspace '{workspace_name}'")
+        version = database_version(database)
+
+        full = cache.get(workspace_name, dataset_name, version) if use_cache else None
+        table_parts: List[str] = []
+        if full is None and tables:
+            # Serialize only the requested tables
+            database.Refresh(True)
+            for name in tables:
+                part = f"table:{name}"
+                text = cache.get(workspace_name, dataset_name, version, part) if use_cache else None
+                if text is None:
+                    table = database.Model.Tables.Find(name)
+                    if table is None:
+                        raise ValueError(f"Table '{name}' not found in dataset '{dataset_name}'")
+                    text = JsonSerializer.SerializeObject(table, _serialize_options())
+                    cache.put(workspace_name, dataset_name, version, text, part)
+                    source = "serialized"
+                table_parts.append(text)
+        elif full is None:
+            database.Refresh(True)
+            full = JsonSerializer.SerializeDatabase(database, _serialize_options())
+            cache.put(workspace_name, dataset_name, version, full)
+            source = "serialized"
+
+    if full is not None and not partial:
+        tmsl = full
+    elif full is not None:
+        tmsl = json.dumps(select_definition(json.loads(full), tables, object_types), indent=2)
+    else:
+        definition = {"name": dataset_name, "model": {"tables": [json.loads(text) for text in table_parts]}}
+        tmsl = json.dumps(select_definition(definition, None, object_types), indent=2)
+
+    return tmsl, {
+        "version": version,
+        "source": source,
+        "partial": partial,
+        "bytes": len(tmsl),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def invalidate_model_tmsl(workspace_name: str, dataset_name: str) -> None:
+    """Forget cached definitions of a dataset, e.g. after it was changed through this server."""
+    get_tmsl_cache().invalidate(workspace_name, dataset_name)
@@ -0,0 +1,362 @@
+"""
+Minimal-Diff TMSL Deployment
+
+Compares a submitted database definition with the current one and plans
+the smallest set of TMSL commands that turns one into the other, at object
+granularity:
+
+- data sources, tables and roles are created, altered or deleted
+  individually
+- ``alter`` only changes an object's own properties, never its children,
+  so every child that changed is deployed on its own: columns, measures,
+  hierarchies and partitions of a table, and the relationships,
+  perspectives, cultures and shared expressions of the model. New
+  children are created, changed ones replaced (``createOrReplace``) and
+  removed ones deleted; partitions are altered, so their data is kept
+- a table that changes between calculated and regular, or whose
+  calculation group changes, is replaced as a whole
+- the remaining model-level properties go out as one ``alter`` of the model
+
+All operations run in one ``sequence`` command, i.e. one transaction.
+The plan also estimates which tables and partitions will need a data
+refresh or a recalculation afterwards.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Properties that the server maintains or that do not affect the definition
+_VOLATILE_KEYS = frozenset({
+    "id", "lineageTag", "sourceLineageTag", "modifiedTime", "structureModifiedTime", "refreshedTime",
+    "lastUpdate", "lastSchemaUpdate", "lastProcessed", "state", "errorMessage", "createdTimestamp",
+})
+
+# Child collections deployed object by object: collection key -> TMSL object type
+_TABLE_CHILDREN = {"columns": "column", "measures": "measure", "hierarchies": "hierarchy"}
+_MODEL_CHILDREN = {"relationships": "relationship", "perspectives": "perspective", "cultures": "culture",
+                   "expressions": "expression"}
+
+# Model collections that are planned as separate objects
+_MODEL_OBJECT_KEYS = ("dataSources", "tables", "roles", *_MODEL_CHILDREN)
+
+# Delete order: objects before whatever they reference (relationships before their columns and
+# tables, hierarchies before their columns, tables before the expressions and data sources they used)
+_DELETE_ORDER = {"role": 0, "relationship": 0, "perspective": 0, "culture": 0,
+                 "hierarchy": 1, "measure": 1, "partition": 1, "column": 2, "table": 3,
+                 "expression": 4, "dataSource": 5}
+
+# Column properties whose change makes the column's stored data invalid
+_COLUMN_DATA_KEYS = ("dataType", "sourceColumn", "type", "expression", "isNullable")
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Comparable form of a TMSL fragment.
+
+    Volatile properties and empty values are dropped, multi-line string
+    arrays are joined, and named collections are compared by name rather
+    than position.
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key in _VOLATILE_KEYS or item is None or item == [] or item == {}:
+                continue
+            result[key] = _canonical(item)
+        return result
+    if isinstance(value, list):
+        if value and all(isinstance(item, str) for item in value):
+            return "\n".join(value)
+        if value and all(isinstance(item, dict) and "name" in item for item in value):
+            return {str(item["name"]).lower(): _canonical(item) for item in value}
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _same(a: Any, b: Any) -> bool:
+    return _canonical(a) == _canonical(b)
+
+
+def _by_name(items: Optional[List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    return {str(item.get("name", "")).lower(): item for item in items or []}
+
+
+def _without(definition: Dict[str, Any], *keys: str) -> Dict[str, Any]:
+    return {key: value for key, value in definition.items() if key not in keys}
+
+
+def database_definition(tmsl: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The database definition inside submitted TMSL, or None if it is not a whole database.
+
+    Accepts a bare database (``{"name": ..., "model": {...}}``) or a
+    ``create`` / ``createOrReplace`` / ``alter`` of a database.
+    """
+    for command in ("createOrReplace", "create", "alter"):
+        body = tmsl.get(command)
+        if isinstance(body, dict):
+            target = body.get("object", {}) or {}
+            if isinstance(body.get("database"), dict) and set(target) <= {"database"}:
+                return body["database"]
+            return None
+    if isinstance(tmsl.get("model"), dict):
+        return tmsl
+    return None
+
+
+@dataclass
+class DeploymentPlan:
+    """Operations that turn the current database into the target, plus the refresh they imply"""
+    database_name: str
+    operations: List[Dict[str, Any]] = field(default_factory=list)
+    steps: List[Dict[str, Any]] = field(default_factory=list)
+    refresh: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, action: str, object_type: str, path: Dict[str, str], definition: Optional[Dict[str, Any]] = None,
+            reason: str = "") -> None:
+        reference = {"database": self.database_name, **path}
+        operation: Dict[str, Any] = {action: {"object": reference}}
+        if definition is not None:
+            operation[action][object_type] = definition
+        self.operations.append(operation)
+        self.steps.append({"action": action, "object_type": object_type,
+                           "object": ".".join(path.values()) or self.database_name, "reason": reason})
+
+    def needs_refresh(self, object_type: str, name: str, refresh_type: str, reason: str) -> None:
+        self.refresh.append({"object_type": object_type, "object": name, "refresh_type": refresh_type, "reason": reason})
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.operations
+
+    def to_command(self) -> Dict[str, Any]:
+        """One TMSL ``sequence`` (a single transaction) with every operation, in order"""
+        return {"sequence": {"maxParallelism": 1, "operations": self.operations}}
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for step in self.steps:
+            counts[step["action"]] = counts.get(step["action"], 0) + 1
+        return {
+            "database": self.database_name,
+            "operation_count": len(self.operations),
+            "operations_by_action": counts,
+            "steps": self.steps,
+            "unchanged": self.unchanged,
+            "refresh_estimate": {
+                "objects_needing_refresh": len(self.refresh),
+                "full_refresh": [r for r in self.refresh if r["refresh_type"] == "full"],
+                "calculate": [r for r in self.refresh if r["refresh_type"] == "calculate"],
+            },
+        }
+
+
+def _table_is_calculated(table: Dict[str, Any]) -> bool:
+    partitions = table.get("partitions") or []
+    return bool(partitions) and (partitions[0].get("source") or {}).get("type") == "calculated"
+
+
+def _plan_table_refresh(plan: DeploymentPlan, name: str, current: Dict[str, Any], target: Dict[str, Any]) -> None:
+    """Work out whether a changed table's data or calculations are invalidated"""
+    if _table_is_calculated(target):
+        if not _same(current.get("partitions"), target.get("partitions")):
+            plan.needs_refresh("table", name, "calculate", "calculated table expression changed")
+        return
+    current_columns = _by_name(current.get("columns"))
+    data_changes, calculated_changes = [], []
+    for key, column in _by_name(target.get("columns")).items():
+        old = current_columns.get(key)
+        is_calculated = column.get("type") == "calculated"
+        if old is None or any(not _same(old.get(k), column.get(k)) for k in _COLUMN_DATA_KEYS):
+            (calculated_changes if is_calculated else data_changes).append(column.get("name", key))
+    if data_changes:
+        plan.needs_refresh("table", name, "full", f"data columns added or changed: {', '.join(data_changes)}")
+    elif calculated_changes:
+        plan.needs_refresh("table", name, "calculate",
+                           f"calculated columns added or changed: {', '.join(calculated_changes)}")
+
+
+def _plan_children(plan: DeploymentPlan, object_type: str, current_items: Optional[List[Dict[str, Any]]],
+                   target_items: Optional[List[Dict[str, Any]]], parent: Dict[str, str],
+                   deletes: List[Tuple[str, str, Dict[str, str], str]]) -> int:
+    """
+    Create new, replace changed and queue deletes of removed children of one collection.
+
+    Returns:
+        The number of children that were added, changed or removed
+    """
+    current_by_name = _by_name(current_items)
+    target_by_name = _by_name(target_items)
+    changed = 0
+    for key, item in target_by_name.items():
+        name = item.get("name", key)
+        previous = current_by_name.get(key)
+        if previous is None:
+            plan.add("create", object_type, {**parent, object_type: name}, item, f"new {object_type}")
+            changed += 1
+        elif not _same(previous, item):
+            plan.add("createOrReplace", object_type, {**parent, object_type: name}, item, f"{object_type} changed")
+            changed += 1
+    for key, item in current_by_name.items():
+        if key not in target_by_name:
+            name = item.get("name", key)
+            deletes.append((object_type, name, {**parent, object_type: name}, f"{object_type} removed"))
+            changed += 1
+    return changed
+
+
+def _plan_tables(plan: DeploymentPlan, current: Dict[str, Any], target: Dict[str, Any],
+                 deletes: List[Tuple[str, str, Dict[str, str], str]]) -> None:
+    current_tables = _by_name(current.get("tables"))
+    unchanged = 0
+    for key, table in _by_name(target.get("tables")).items():
+        name = table.get("name", key)
+        old = current_tables.get(key)
+        if old is None:
+            plan.add("create", "table", {"table": name}, table, "new table")
+            plan.needs_refresh("table", name, "calculate" if _table_is_calculated(table) else "full", "new table")
+            continue
+
+        if _table_is_calculated(table) != _table_is_calculated(old):
+            # Calculated <-> regular: the partitions cannot be altered in place, so replace the whole table
+            plan.add("createOrReplace", "table", {"table": name}, table, "table changed between calculated and regular")
+            plan.needs_refresh("table", name, "calculate" if _table_is_calculated(table) else "full",
+                               "table changed between calculated and regular")
+            continue
+        if not _same(old.get("calculationGroup"), table.get("calculationGroup")):
+            # Calculation items cannot be addressed on their own, so replace the whole table
+            plan.add("createOrReplace", "table", {"table": name}, table, "calculation group changed")
+            plan.needs_refresh("table", name, "calculate", "calculation group changed")
+            continue
+
+        # The table's own properties; its children are planned one by one below
+        own_keys = ("partitions", *_TABLE_CHILDREN)
+        table_changed = not _same(_without(old, *own_keys), _without(table, *own_keys))
+        if table_changed:
+            plan.add("alter", "table", {"table": name}, _without(table, *own_keys), "table properties changed")
+        for key, object_type in _TABLE_CHILDREN.items():
+            if _plan_children(plan, object_type, old.get(key), table.get(key), {"table": name}, deletes):
+                table_changed = True
+        if _table_is_calculated(table):
+            # Both calculated: the single partition holds the table's expression
+            if not _same(old.get("partitions"), table.get("partitions")):
+                plan.add("createOrReplace", "partition", {"table": name, "partition": table["partitions"][0]["name"]},
+                         table["partitions"][0], "calculated table expression changed")
+                table_changed = True
+        else:
+            old_partitions = _by_name(old.get("partitions"))
+            new_partitions = _by_name(table.get("partitions"))
+            for partition_key, partition in new_partitions.items():
+                partition_name = partition.get("name", partition_key)
+                previous = old_partitions.get(partition_key)
+                if previous is None:
+                    plan.add("create", "partition", {"table": name, "partition": partition_name}, partition, "new partition")
+                    plan.needs_refresh("partition", f"{name}.{partition_name}", "full", "new partition")
+                elif not _same(previous, partition):
+                    plan.add("alter", "partition", {"table": name, "partition": partition_name}, partition,
+                             "partition definition changed")
+                    if not _same(previous.get("source"), partition.get("source")):
+                        plan.needs_refresh("partition", f"{name}.{partition_name}", "full", "partition source changed")
+                    table_changed = True
+            for partition_key, partition in old_partitions.items():
+                if partition_key not in new_partitions:
+                    deletes.append(("partition", partition.get("name", partition_key),
+                                    {"table": name, "partition": partition.get("name", partition_key)},
+                                    "partition removed"))
+                    table_changed = True
+
+        if table_changed:
+            _plan_table_refresh(plan, name, old, table)
+        else:
+            unchanged += 1
+
+    target_tables = _by_name(target.get("tables"))
+    for key, table in current_tables.items():
+        if key not in target_tables:
+            deletes.append(("table", table.get("name", key), {"table": table.get("name", key)}, "table removed"))
+    plan.unchanged["tables"] = unchanged
+
+
+def plan_deployment(current: Dict[str, Any], target: Dict[str, Any], database_name: str) -> DeploymentPlan:
+    """
+    Plan the operations that deploy ``target`` over ``current`` (both database definitions).
+
+    Order: data sources, then tables with their children, then the model's
+    own properties, relationships, perspectives, cultures and expressions,
+    then roles (all of which may point at new tables and columns), then
+    deletes, ordered so that nothing still references a deleted object.
+
+    Raises:
+        ValueError: If the compatibility level differs, which needs a full createOrReplace
+    """
+    if current.get("compatibilityLevel") and target.get("compatibilityLevel") and \
+            current["compatibilityLevel"] != target["compatibilityLevel"]:
+        raise ValueError("compatibilityLevel changed; the database has to be replaced as a whole")
+
+    plan = DeploymentPlan(database_name)
+    current_model = current.get("model", {}) or {}
+    target_model = target.get("model", {}) or {}
+    deletes: List[Tuple[str, str, Dict[str, str], str]] = []
+
+    current_sources = _by_name(current_model.get("dataSources"))
+    target_sources = _by_name(target_model.get("dataSources"))
+    for key, source in target_sources.items():
+        name = source.get("name", key)
+        if key not in current_sources:
+            plan.add("create", "dataSource", {"dataSource": name}, source, "new data source")
+        elif not _same(current_sources[key], source):
+            plan.add("alter", "dataSource", {"dataSource": name}, source, "data source changed")
+    for key, source in current_sources.items():
+        if key not in target_sources:
+            deletes.append(("dataSource", source.get("name", key), {"dataSource": source.get("name", key)},
+                            "data source removed"))
+
+    _plan_tables(plan, current_model, target_model, deletes)
+
+    current_rest = _without(current_model, *_MODEL_OBJECT_KEYS)
+    target_rest = _without(target_model, *_MODEL_OBJECT_KEYS)
+    if not _same(current_rest, target_rest):
+        plan.add("alter", "model", {}, target_rest, "model properties changed")
+    for key, object_type in _MODEL_CHILDREN.items():
+        changed = _plan_children(plan, object_type, current_model.get(key), target_model.get(key), {}, deletes)
+        if changed and object_type == "relationship":
+            plan.needs_refresh("model", database_name, "calculate", "relationships changed")
+
+    current_roles = _by_name(current_model.get("roles"))
+    target_roles = _by_name(target_model.get("roles"))
+    for key, role in target_roles.items():
+        name = role.get("name", key)
+        if key not in current_roles:
+            plan.add("create", "role", {"role": name}, role, "new role")
+        elif not _same(current_roles[key], role):
+            plan.add("alter", "role", {"role": name}, role, "role changed")
+    for key, role in current_roles.items():
+        if key not in target_roles:
+            deletes.append(("role", role.get("name", key), {"role": role.get("name", key)}, "role removed"))
+
+    for object_type, _, path, reason in sorted(deletes, key=lambda d: _DELETE_ORDER[d[0]]):
+        plan.add("delete", object_type, path, None, reason)
+
+    plan.unchanged["dataSources"] = sum(1 for key in target_sources
+                                        if key in current_sources and _same(current_sources[key], target_sources[key]))
+    plan.unchanged["roles"] = sum(1 for key in target_roles
+                                  if key in current_roles and _same(current_roles[key], target_roles[key]))
+    return plan
+
+
+def plan_from_tmsl(current_tmsl: str, submitted: Dict[str, Any], database_name: str) -> Optional[DeploymentPlan]:
+    """
+    Plan a minimal deployment of submitted TMSL over the current definition.
+
+    Returns:
+        The plan, or None when the submitted TMSL is not a whole database definition
+
+    Raises:
+        ValueError: If the database cannot be deployed incrementally (see ``plan_deployment``)
+    """
+    target = database_definition(submitted)
+    if target is None:
+        return None
+    return plan_deployment(json.loads(current_tmsl), target, database_name)
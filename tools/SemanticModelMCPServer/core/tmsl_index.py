@@ -0,0 +1,150 @@
+"""
+Single-Pass TMSL Index
+
+One tool call often needs the same TMSL in several places: the structure
+validator, the node counts of the update path and the Best Practice
+Analyzer. ``get_tmsl_index`` parses a definition once and walks it once,
+collecting the objects of each type, a name lookup and per-key counts.
+Recently indexed texts are kept, so every consumer within a call (and a
+repeated call with the same text) shares the same parsed document.
+
+The document is shared between consumers and must not be modified.
+"""
+
+import json
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+INDEX_CACHE_SIZE = 4  # Recently indexed TMSL texts kept in memory
+
+# Child collections of each object type: key -> type of the objects it holds
+_CHILDREN: Dict[str, Dict[str, str]] = {
+    "document": {"createOrReplace": "command", "create": "command", "alter": "command",
+                 "database": "database", "model": "model"},
+    "command": {"database": "database", "model": "model", "table": "table"},
+    "database": {"model": "model"},
+    "model": {"dataSources": "dataSource", "expressions": "expression", "tables": "table",
+              "relationships": "relationship", "perspectives": "perspective", "roles": "role",
+              "cultures": "culture"},
+    "table": {"columns": "column", "measures": "measure", "hierarchies": "hierarchy", "partitions": "partition",
+              "calculationGroup": "calculationGroup"},
+    "calculationGroup": {"calculationItems": "calculationItem"},
+    "hierarchy": {"levels": "level"},
+    "role": {"tablePermissions": "tablePermission"},
+}
+
+# Object types that belong to a table and are looked up within it
+_TABLE_CHILD_TYPES = frozenset({"column", "measure", "hierarchy", "partition", "calculationItem", "level"})
+
+
+class TmslIndex:
+    """
+    A parsed TMSL document with its objects indexed in one walk.
+
+    Attributes:
+        document: The parsed JSON
+        database: The first database definition found, or None
+        model: The first model definition found, or ``{}``
+        objects: Objects by type (``table``, ``column``, ``measure``, ...), in document order
+        key_counts: How often each property name occurs anywhere in the document
+    """
+
+    def __init__(self, document: Any):
+        self.document = document
+        self.database: Optional[Dict[str, Any]] = None
+        self.model: Dict[str, Any] = {}
+        self.objects: Dict[str, List[Dict[str, Any]]] = {}
+        self.key_counts: Counter = Counter()
+        self._by_name: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._by_table: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._walk(document, "document", "")
+
+    @classmethod
+    def parse(cls, tmsl_definition: str) -> "TmslIndex":
+        """
+        Raises:
+            json.JSONDecodeError: If the text is not valid JSON
+        """
+        return cls(json.loads(tmsl_definition))
+
+    def _walk(self, value: Any, kind: Optional[str], table: str) -> None:
+        if isinstance(value, list):
+            for item in value:
+                self._walk(item, kind, table)
+            return
+        if not isinstance(value, dict):
+            return
+        self.key_counts.update(value.keys())
+        if kind not in (None, "document", "command"):
+            self._register(kind, value, table)
+            if kind == "table":
+                table = str(value.get("name", "")).lower()
+        children = _CHILDREN.get(kind, {})
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                self._walk(item, children.get(key), table)
+
+    def _register(self, kind: str, obj: Dict[str, Any], table: str) -> None:
+        if kind == "database" and self.database is None:
+            self.database = obj
+        elif kind == "model" and not self.model:
+            self.model = obj
+        self.objects.setdefault(kind, []).append(obj)
+        if kind in _TABLE_CHILD_TYPES:
+            self._by_table.setdefault((kind, table), []).append(obj)
+        name = obj.get("name")
+        if name is not None:
+            scope = table if kind in _TABLE_CHILD_TYPES else ""
+            self._by_name.setdefault((kind, scope, str(name).lower()), obj)
+
+    def count(self, key: str) -> int:
+        """Occurrences of a property name anywhere in the document"""
+        return self.key_counts.get(key, 0)
+
+    def get(self, object_type: str, name: str, table: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up an object by type and name (case-insensitive).
+
+        Columns, measures, hierarchies, levels, partitions and calculation
+        items are looked up within ``table``.
+        """
+        scope = (table or "").lower() if object_type in _TABLE_CHILD_TYPES else ""
+        return self._by_name.get((object_type, scope, name.lower()))
+
+    def table_objects(self, object_type: str, table: str) -> List[Dict[str, Any]]:
+        """Objects of a table-level type (``partition``, ``column``, ...) in ``table``, in document order"""
+        return self._by_table.get((object_type, table.lower()), [])
+
+    def summary(self) -> Dict[str, int]:
+        """Number of objects of each type"""
+        return {kind: len(items) for kind, items in self.objects.items()}
+
+
+_index_cache: "OrderedDict[str, TmslIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_tmsl_index(tmsl_definition: str) -> TmslIndex:
+    """
+    Index a TMSL text, reusing the index of a recently seen identical text.
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON
+    """
+    with _index_lock:
+        index = _index_cache.get(tmsl_definition)
+        if index is not None:
+            _index_cache.move_to_end(tmsl_definition)
+            return index
+    index = TmslIndex.parse(tmsl_definition)
+    with _index_lock:
+        _index_cache[tmsl_definition] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def clear_tmsl_index_cache() -> None:
+    with _index_lock:
+        _index_cache.clear()
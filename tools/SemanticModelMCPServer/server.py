@@ -1,30 +1,35 @@
+import time
+_startup_started = time.perf_counter()  # Before the imports below, which are the first startup phase
+
 from fastmcp import FastMCP
 import logging
-import clr
 import os
 import json
 import sys
+import threading
 from typing import List, Optional
 from core.auth import get_access_token
-from core.azure_token_manager import get_cached_azure_token, clear_token_cache
-from core.bpa_service import BPAService
-from tools.fabric_metadata import list_workspaces, list_datasets, get_workspace_id, list_notebooks, list_delta_tables, list_lakehouses, list_lakehouse_files, get_lakehouse_sql_connection_string as fabric_get_lakehouse_sql_connection_string
+from core.azure_token_manager import get_cached_azure_token, clear_token_cache, warm_azure_credential
+from core.connection_pool import load_assemblies, adomd_connection, tom_server, clear_connection_pools
+from core.columnar import read_columnar
+from core.dax_results import fetch_page, export_query, close_open_cursors
+from core.tmsl_cache import get_model_tmsl, invalidate_model_tmsl
+from core.tmsl_diff import database_definition, plan_from_tmsl
+from core.tmsl_index import get_tmsl_index
+from core.sql_endpoint import execute_sql_query, get_pyodbc, get_resolved_odbc_driver, clear_sql_connection_pool, OdbcDriverNotFoundError, ODBC_DRIVER_PREFERENCE
+from core.response_encoder import dumps, encode_response, get_response_page as fetch_response_page
+from core.startup_profile import StartupProfile
+from tools.fabric_metadata import list_workspaces, list_datasets, get_workspace_id, list_notebooks, list_delta_tables, list_lakehouses, list_lakehouse_files, get_lakehouse_sql_connection_string as fabric_get_lakehouse_sql_connection_string, invalidate_sql_endpoint_cache
 from tools.bpa_tools import register_bpa_tools
 from tools.powerbi_desktop_tools import register_powerbi_desktop_tools
 from tools.microsoft_learn_tools import register_microsoft_learn_tools
-import urllib.parse
-from src.helper import count_nodes_with_name
 from src.tmsl_validator import validate_tmsl_structure
-import time
 from datetime import datetime, timedelta
 from prompts import register_prompts
 from __version__ import __version__, __description__
 
-# Try to import pyodbc - it's needed for SQL Analytics Endpoint queries
-try:
-    import pyodbc
-except ImportError:
-    pyodbc = None
+startup_profile = StartupProfile(_startup_started)
+startup_profile.mark("imports")
 
 mcp = FastMCP(
     name="Semantic Model MCP Server", 
@@ -39,8 +44,9 @@ mcp = FastMCP(
     - List Fabric Delta Tables
     - List Fabric Data Pipelines
     - Get Power BI Workspace ID
-    - Get Model Definition
-    - Execute DAX Queries
+    - Get Model Definition (cached per dataset version; `tables`/`object_types` for partial definitions)
+    - Execute DAX Queries (large results: `page_size`/`cursor` paging, or `export_format` to write a CSV/Parquet file)
+    - Get Response Page (fetch the rest of a truncated result via its `_truncated` handle)
     - Update Model using TMSL (Enhanced with Validation)
     - Generate DirectLake TMSL Template (NEW)
     - Validate TMSL Structure (Built into update tool)
@@ -632,10 +638,7 @@ mcp = FastMCP(
 
 # Register all MCP prompts from the prompts module
 register_prompts(mcp)
-
-# Initialize BPA Service
-current_dir = os.path.dirname(os.path.abspath(__file__))
-bpa_service = BPAService(current_dir)
+startup_profile.mark("server and prompts")
 
 @mcp.tool
 def get_server_version() -> str:
@@ -700,13 +703,16 @@ def clear_azure_token_cache() -> str:
     # Get status before clearing
     status_before = get_token_cache_status()
     
-    # Clear the cache
+    # Clear the cache, and close pooled connections that were opened with the old tokens
     clear_token_cache()
+    clear_connection_pools()
+    clear_sql_connection_pool()
+    close_open_cursors()
     
     # Get status after clearing
     status_after = get_token_cache_status()
     
-    return f"Azure token cache cleared successfully. Had {len(status_before)} cached tokens, now has {len(status_after)} cached tokens."
+    return f"Azure token cache cleared successfully. Had {len(status_before)} cached tokens, now has {len(status_after)} cached tokens. Pooled XMLA connections closed."
 
 @mcp.tool
 def get_azure_token_status() -> str:
@@ -714,121 +720,118 @@ def get_azure_token_status() -> str:
     Shows which tokens are cached, their expiration times, and validity status.
     """
     from core.azure_token_manager import get_token_cache_status
-    import json
     
     status = get_token_cache_status()
     
     if not status:
         return "No Azure tokens currently cached."
     
-    return json.dumps(status, indent=2)
+    return encode_response(status, "get_azure_token_status")
 
 @mcp.tool
-def execute_dax_query(workspace_name:str, dataset_name: str, dax_query: str, dataset_id: str = None) -> list[dict]:
+def execute_dax_query(workspace_name:str, dataset_name: str, dax_query: str, dataset_id: str = None,
+                      page_size: int = None, cursor: str = None,
+                      export_format: str = None, export_path: str = None) -> str:
     """Executes a DAX query against the Power BI model.
     This tool connects to the specified Power BI workspace and dataset name, executes the provided DAX query,
     Use the dataset_name to specify the model to query and NOT the dataset ID.
     The function connects to the Power BI service using an access token, executes the DAX query,
     and returns the results.
+
+    For large results:
+    - Paging: pass page_size (and no cursor) to get the first page. The response holds `rows`, `has_more`
+      and `next_cursor`; call again with the same dax_query and cursor=next_cursor for the next page.
+    - Export: pass export_format ('csv' or 'parquet') to stream all rows into a local file. Only the file
+      path and summary statistics (row count, size, null counts, numeric min/max) are returned.
+      export_path may be a file or directory; a temp file is used when it is omitted.
     """  
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    dotnet_dir = os.path.join(script_dir, "dotnet")
-    
-    print(f"Using .NET assemblies from: {dotnet_dir}")
-    
     try:
-        #clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.dll"))
-        clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.Tabular.dll"))
-        clr.AddReference(os.path.join(dotnet_dir, "Microsoft.Identity.Client.dll"))
-        clr.AddReference(os.path.join(dotnet_dir, "Microsoft.IdentityModel.Abstractions.dll"))
-        clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.AdomdClient.dll"))
+        load_assemblies()
     except Exception as e:
-        return [{"error": f"Failed to load required .NET assemblies: {str(e)}", "error_type": "assembly_load_error"}]
+        return encode_response([{"error": f"Failed to load required .NET assemblies: {str(e)}", "error_type": "assembly_load_error"}], "execute_dax_query")
 
     try:
-        from Microsoft.AnalysisServices.AdomdClient import AdomdConnection ,AdomdDataReader  # type: ignore
+        from Microsoft.AnalysisServices.AdomdClient import AdomdDataReader  # type: ignore
     except ImportError as e:
-        return [{"error": f"Failed to import ADOMD libraries: {str(e)}", "error_type": "import_error"}]
+        return encode_response([{"error": f"Failed to import ADOMD libraries: {str(e)}", "error_type": "import_error"}], "execute_dax_query")
 
     # Validate authentication
     access_token = get_access_token()
     if not access_token:
-        return [{"error": "No valid access token available. Please check authentication.", "error_type": "authentication_error"}]
+        return encode_response([{"error": "No valid access token available. Please check authentication.", "error_type": "authentication_error"}], "execute_dax_query")
 
     # Validate required parameters
     if not workspace_name or not workspace_name.strip():
-        return [{"error": "Workspace name is required and cannot be empty.", "error_type": "parameter_error"}]
+        return encode_response([{"error": "Workspace name is required and cannot be empty.", "error_type": "parameter_error"}], "execute_dax_query")
     
     if not dataset_name or not dataset_name.strip():
-        return [{"error": "Dataset name is required and cannot be empty.", "error_type": "parameter_error"}]
+        return encode_response([{"error": "Dataset name is required and cannot be empty.", "error_type": "parameter_error"}], "execute_dax_query")
     
     if not dax_query or not dax_query.strip():
-        return [{"error": "DAX query is required and cannot be empty.", "error_type": "parameter_error"}]
+        return encode_response([{"error": "DAX query is required and cannot be empty.", "error_type": "parameter_error"}], "execute_dax_query")
+
+    if export_format:
+        try:
+            summary = export_query(workspace_name, dataset_name, dax_query, export_format, export_path, access_token)
+            return encode_response(summary, "execute_dax_query")
+        except (ValueError, ImportError) as e:
+            return encode_response([{"error": str(e), "error_type": "parameter_error"}], "execute_dax_query")
+        except Exception as e:
+            return _dax_error_response(e, workspace_name, dataset_name, dax_query)
 
-    workspace_name_encoded = urllib.parse.quote(workspace_name)
-    # Use URL-encoded workspace name and standard XMLA connection format
-    # The connection string format is: Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name};Password={access_token};Catalog={dataset_name};
-    connection_string = f"Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name_encoded};Password={access_token};Catalog={dataset_name};"
+    if page_size or cursor:
+        try:
+            page = fetch_page(workspace_name, dataset_name, dax_query, page_size, cursor, access_token)
+            return encode_response(page, "execute_dax_query")
+        except ValueError as e:
+            return encode_response([{"error": str(e), "error_type": "parameter_error"}], "execute_dax_query")
+        except Exception as e:
+            return _dax_error_response(e, workspace_name, dataset_name, dax_query)
 
-    connection = None
     try:
-        # Attempt to establish connection
-        connection = AdomdConnection(connection_string)
-        connection.Open()
-        
-        # Execute the DAX query
-        command = connection.CreateCommand()
-        command.CommandText = dax_query
-        reader: AdomdDataReader = command.ExecuteReader()
-        
-        results = []
-        while reader.Read():
-            row = {}
-            for i in range(reader.FieldCount):
-                # Handle different data types and null values
-                value = reader.GetValue(i)
-                if value is None or str(value) == "":
-                    row[reader.GetName(i)] = None
-                elif hasattr(value, 'isoformat'):  # DateTime objects
-                    row[reader.GetName(i)] = value.isoformat()
-                else:
-                    row[reader.GetName(i)] = value
-            results.append(row)
+        # Reuse a pooled connection to this model; it is reopened if the token changed
+        with adomd_connection(workspace_name, dataset_name, access_token) as connection:
+            # Execute the DAX query
+            command = connection.CreateCommand()
+            command.CommandText = dax_query
+            reader: AdomdDataReader = command.ExecuteReader()
+            
+            try:
+                # Typed columns are read first; rows are only assembled for the response
+                results = read_columnar(reader, empty_strings_as_null=True).to_records()
+            finally:
+                reader.Close()
         
-        reader.Close()
-        return results
+        return encode_response(results, "execute_dax_query")
         
     except Exception as e:
-        error_msg = str(e).lower()
-        error_details = str(e)
-        
-        # Categorize different types of errors and provide helpful messages
-        if "authentication" in error_msg or "unauthorized" in error_msg or "login" in error_msg:
-            return [{"error": f"Authentication failed: {error_details}. Please check your access token and permissions.", "error_type": "authentication_error"}]
-        elif "workspace" in error_msg or "not found" in error_msg:
-            return [{"error": f"Workspace or dataset not found: {error_details}. Please verify workspace name '{workspace_name}' and dataset name '{dataset_name}' are correct.", "error_type": "not_found_error"}]
-        elif "permission" in error_msg or "access" in error_msg or "forbidden" in error_msg:
-            return [{"error": f"Permission denied: {error_details}. You may not have sufficient permissions to query this dataset.", "error_type": "permission_error"}]
-        elif "syntax" in error_msg or "parse" in error_msg or "invalid" in error_msg:
-            return [{"error": f"DAX query syntax error: {error_details}. Please check your DAX query syntax.", "error_type": "dax_syntax_error", "query": dax_query}]
-        elif "timeout" in error_msg or "timed out" in error_msg:
-            return [{"error": f"Query timeout: {error_details}. The query took too long to execute.", "error_type": "timeout_error"}]
-        elif "connection" in error_msg or "network" in error_msg:
-            return [{"error": f"Connection error: {error_details}. Please check your network connection and try again.", "error_type": "connection_error"}]
-        else:
-            return [{"error": f"Unexpected error executing DAX query: {error_details}", "error_type": "general_error", "query": dax_query}]
-    
-    finally:
-        # Ensure connection is always closed
-        try:
-            if connection is not None and hasattr(connection, 'State') and connection.State == 1:  # ConnectionState.Open = 1
-                connection.Close()
-        except Exception as cleanup_error:
-            print(f"Warning: Error during connection cleanup: {cleanup_error}")
-            # Don't return error here as it would mask the main error
+        return _dax_error_response(e, workspace_name, dataset_name, dax_query)
+
+
+def _dax_error_response(e: Exception, workspace_name: str, dataset_name: str, dax_query: str) -> str:
+    """Categorize a DAX execution failure and return it as an encoded error response."""
+    error_msg = str(e).lower()
+    error_details = str(e)
+    
+    # Categorize different types of errors and provide helpful messages
+    if "authentication" in error_msg or "unauthorized" in error_msg or "login" in error_msg:
+        return encode_response([{"error": f"Authentication failed: {error_details}. Please check your access token and permissions.", "error_type": "authentication_error"}], "execute_dax_query")
+    elif "workspace" in error_msg or "not found" in error_msg:
+        return encode_response([{"error": f"Workspace or dataset not found: {error_details}. Please verify workspace name '{workspace_name}' and dataset name '{dataset_name}' are correct.", "error_type": "not_found_error"}], "execute_dax_query")
+    elif "permission" in error_msg or "access" in error_msg or "forbidden" in error_msg:
+        return encode_response([{"error": f"Permission denied: {error_details}. You may not have sufficient permissions to query this dataset.", "error_type": "permission_error"}], "execute_dax_query")
+    elif "syntax" in error_msg or "parse" in error_msg or "invalid" in error_msg:
+        return encode_response([{"error": f"DAX query syntax error: {error_details}. Please check your DAX query syntax.", "error_type": "dax_syntax_error", "query": dax_query}], "execute_dax_query")
+    elif "timeout" in error_msg or "timed out" in error_msg:
+        return encode_response([{"error": f"Query timeout: {error_details}. The query took too long to execute.", "error_type": "timeout_error"}], "execute_dax_query")
+    elif "connection" in error_msg or "network" in error_msg:
+        return encode_response([{"error": f"Connection error: {error_details}. Please check your network connection and try again.", "error_type": "connection_error"}], "execute_dax_query")
+    else:
+        return encode_response([{"error": f"Unexpected error executing DAX query: {error_details}", "error_type": "general_error", "query": dax_query}], "execute_dax_query")
+
 
 # Internal helper function for SQL queries (not exposed as MCP tool)
-def _internal_query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id: str = None, lakehouse_name: str = None) -> str:
+def _internal_query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id: str = None, lakehouse_name: str = None, max_rows: int = 100) -> str:
     """Executes a SQL query against a Fabric Lakehouse SQL Analytics Endpoint to validate table schemas and data.
     This tool connects to the specified Fabric Lakehouse SQL Analytics Endpoint and executes the provided SQL query.
     Use this tool to:
@@ -842,6 +845,7 @@ def _internal_query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, la
         sql_query: The SQL query to execute (e.g., "SELECT * FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = 'date'")
         lakehouse_id: Optional specific lakehouse ID to query
         lakehouse_name: Optional lakehouse name to query (alternative to lakehouse_id)
+        max_rows: Maximum rows to return (default 100); larger results are cut off and flagged as truncated
     
     Returns:
         JSON string containing query results or error message
@@ -851,22 +855,21 @@ def _internal_query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, la
     - "SELECT TOP 5 * FROM date"
     - "SHOW TABLES"
     """
-    import json
-
     # Get cached or fresh authentication token
     token_struct, success, error = get_cached_azure_token("https://database.windows.net/.default")
     if not success:
-        return json.dumps({
+        return dumps({
             "success": False,
             "error": f"Authentication failed: {error}"
-        }, indent=2)
+        })
 
-    # Check if pyodbc is available
+    # Check if pyodbc is available (imported on first use)
+    pyodbc = get_pyodbc()
     if pyodbc is None:
-        return json.dumps({
+        return dumps({
             "success": False,
             "error": "pyodbc is not installed. Please install it using: pip install pyodbc"
-        }, indent=2)
+        })
     
     try:
         # Get the SQL Analytics Endpoint connection string
@@ -887,107 +890,59 @@ def _internal_query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, la
         # For Fabric SQL Analytics Endpoints, use the lakehouse name as the database
         lakehouse_name = connection_data.get("lakehouse_name")
         if not lakehouse_name:
-            return json.dumps({
+            return dumps({
                 "success": False,
                 "error": "Could not determine lakehouse name for database connection"
-            }, indent=2)
-        
-        # Try different ODBC drivers in order of preference
-        available_drivers = [
-            "ODBC Driver 18 for SQL Server",
-            "ODBC Driver 17 for SQL Server", 
-            "SQL Server"
-        ]
-        
-        # Detect which driver is available
-        available_driver = None
-        available_pyodbc_drivers = pyodbc.drivers()
-        
-        for driver in available_drivers:
-            if driver in available_pyodbc_drivers:
-                available_driver = driver
-                break
-        
-        if not available_driver:
-            return json.dumps({
-                "success": False,
-                "error": "No compatible ODBC driver found. Please install ODBC Driver for SQL Server.",
-                "available_drivers": list(available_pyodbc_drivers),
-                "looking_for": available_drivers
-            }, indent=2)
+            })
         
-        connection_string = (
-            f"Driver={{{available_driver}}};"
-            f"Server={server_name};"
-            f"Database={lakehouse_name};"
-            f"Encrypt=yes;"
-            f"TrustServerCertificate=yes;"
-            f"Connection Timeout=30;"
-        )
+        # Run the query on a pooled connection, reading no more than max_rows rows
+        result = execute_sql_query(server_name, lakehouse_name, sql_query, token_struct, max_rows)
         
-        # Debug: log connection attempt
-        print(f"Attempting connection with driver: {available_driver}")
-        print(f"Connection string: {connection_string}")
+        return dumps({
+            "success": True,
+            "query": sql_query,
+            "columns": result["columns"],
+            "row_count": result["row_count"],
+            "results": result["results"],
+            "truncated": result["truncated"],
+            "note": f"Showing first {result['row_count']} rows; more rows are available (raise max_rows to see more)" if result["truncated"] else None
+        })
         
-        # Execute the query using ActiveDirectoryInteractive authentication
-        with pyodbc.connect(connection_string, attrs_before={1256  : token_struct}) as conn:
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
-            
-            # Get column names
-            columns = [column[0] for column in cursor.description]
-            
-            # Fetch results
-            rows = cursor.fetchall()
-            
-            # Convert to list of dictionaries
-            results = []
-            for row in rows:
-                row_dict = {}
-                for i, value in enumerate(row):
-                    # Handle special data types
-                    if hasattr(value, 'isoformat'):  # datetime objects
-                        row_dict[columns[i]] = value.isoformat()
-                    elif isinstance(value, (bytes, bytearray)):  # binary data
-                        row_dict[columns[i]] = str(value)
-                    else:
-                        row_dict[columns[i]] = value
-                results.append(row_dict)
-            
-            return json.dumps({
-                "success": True,
-                "query": sql_query,
-                "columns": columns,
-                "row_count": len(results),
-                "results": results[:100],  # Limit to first 100 rows to avoid large responses
-                "note": f"Showing first 100 rows out of {len(results)} total rows" if len(results) > 100 else None
-            }, indent=2)
-            
+    except OdbcDriverNotFoundError as e:
+        return dumps({
+            "success": False,
+            "error": str(e),
+            "available_drivers": e.installed,
+            "looking_for": ODBC_DRIVER_PREFERENCE
+        })
     except pyodbc.Error as e:
         error_details = str(e)
-        return json.dumps({
+        if not isinstance(e, pyodbc.ProgrammingError):
+            # Connection-level failure: the cached endpoint may have moved, so resolve it again next time
+            invalidate_sql_endpoint_cache(workspace_id, lakehouse_id, lakehouse_name)
+        return dumps({
             "success": False,
             "error": f"SQL Error: {error_details}",
             "query": sql_query,
             "debug_info": {
                 "server_name": server_name if 'server_name' in locals() else "Not available",
                 "lakehouse_name": lakehouse_name if 'lakehouse_name' in locals() else "Not available",
-                "available_driver": available_driver if 'available_driver' in locals() else "Not detected",
-                "connection_string": connection_string if 'connection_string' in locals() else "Not available"
+                "available_driver": get_resolved_odbc_driver() or "Not detected"
             }
-        }, indent=2)
+        })
     except Exception as e:
-        return json.dumps({
+        invalidate_sql_endpoint_cache(workspace_id, lakehouse_id, lakehouse_name)
+        return dumps({
             "success": False,
             "error": f"Connection Error: {str(e)}",
             "query": sql_query,
             "debug_info": {
                 "connection_info": connection_info if 'connection_info' in locals() else "Not available"
             }
-        }, indent=2)
+        })
 
 @mcp.tool
-def query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id: str = None, lakehouse_name: str = None) -> str:
+def query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id: str = None, lakehouse_name: str = None, max_rows: int = 100) -> str:
     """Executes a SQL query against a Fabric Lakehouse SQL Analytics Endpoint to validate table schemas and data.
     This tool connects to the specified Fabric Lakehouse SQL Analytics Endpoint and executes the provided SQL query.
     Use this tool to:
@@ -1001,6 +956,7 @@ def query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id
         sql_query: The SQL query to execute (e.g., "SELECT * FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = 'date'")
         lakehouse_id: Optional specific lakehouse ID to query
         lakehouse_name: Optional lakehouse name to query (alternative to lakehouse_id)
+        max_rows: Maximum rows to return (default 100); larger results are cut off and flagged as truncated
     
     Returns:
         JSON string containing query results or error message
@@ -1010,7 +966,37 @@ def query_lakehouse_sql_endpoint(workspace_id: str, sql_query: str, lakehouse_id
     - "SELECT TOP 5 * FROM date"
     - "SHOW TABLES"
     """
-    return _internal_query_lakehouse_sql_endpoint(workspace_id, sql_query, lakehouse_id, lakehouse_name)
+    return _internal_query_lakehouse_sql_endpoint(workspace_id, sql_query, lakehouse_id, lakehouse_name, max_rows)
+
+# Row cap for the batched INFORMATION_SCHEMA.COLUMNS query (one row per column of every requested table)
+_TEMPLATE_SCHEMA_MAX_ROWS = 20000
+
+_SYSTEM_SCHEMAS = {"INFORMATION_SCHEMA", "sys", "db_accessadmin", "db_backupoperator", "db_datareader", "db_datawriter",
+                   "db_ddladmin", "db_denydatareader", "db_denydatawriter", "db_owner", "db_securityadmin", "guest"}
+
+
+def _pick_table_schema(schemas: List[str]) -> str:
+    """Prefer 'gold', otherwise the first non-system schema (alphabetically) that holds the table."""
+    if "gold" in schemas:
+        return "gold"
+    user_schemas = sorted(s for s in schemas if s not in _SYSTEM_SCHEMAS)
+    return user_schemas[0] if user_schemas else sorted(schemas)[0]
+
+
+def _directlake_data_type(sql_type: str) -> str:
+    """Map a SQL endpoint DATA_TYPE to a DirectLake column dataType."""
+    sql_type = sql_type.lower()
+    if sql_type in ["varchar", "nvarchar", "char", "nchar", "text", "ntext"]:
+        return "string"
+    elif sql_type in ["int", "bigint", "smallint", "tinyint"]:
+        return "int64"
+    elif sql_type in ["decimal", "numeric", "float", "real", "money", "smallmoney"]:
+        return "decimal"
+    elif sql_type in ["datetime", "datetime2", "date", "time", "smalldatetime"]:
+        return "dateTime"
+    elif sql_type in ["bit"]:
+        return "boolean"
+    return "string"  # Default fallback
 
 @mcp.tool
 def generate_directlake_tmsl_template(workspace_id: str, lakehouse_id: str = None, lakehouse_name: str = None, table_names: Optional[List[str]] = None, model_name: str = "NewDirectLakeModel") -> str:
@@ -1053,76 +1039,61 @@ def generate_directlake_tmsl_template(workspace_id: str, lakehouse_id: str = Non
             try:
                 delta_tables = json.loads(delta_tables_result)
                 available_tables = [table["name"] for table in delta_tables]
-                return f"Available tables in lakehouse '{actual_lakehouse_name}':\n{json.dumps(available_tables, indent=2)}\n\nPlease call this function again with specific table_names parameter."
+                return f"Available tables in lakehouse '{actual_lakehouse_name}':\n{dumps(available_tables)}\n\nPlease call this function again with specific table_names parameter."
             except:
                 return f"Error retrieving available tables: {delta_tables_result}"
         
-        # First, detect available schemas in the lakehouse
-        schema_detection_query = "SELECT DISTINCT TABLE_SCHEMA FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_SCHEMA"
-        schema_result = _internal_query_lakehouse_sql_endpoint(workspace_id, schema_detection_query, lakehouse_id, lakehouse_name)
-        
-        detected_schema = "dbo"  # Default schema
+        # Fetch the columns of every requested table in one query over one pooled connection
+        table_list = ", ".join("'" + name.replace("'", "''") + "'" for name in table_names)
+        columns_query = (
+            "SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.IS_NULLABLE "
+            "FROM INFORMATION_SCHEMA.COLUMNS c "
+            "JOIN INFORMATION_SCHEMA.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+            f"WHERE t.TABLE_TYPE = 'BASE TABLE' AND c.TABLE_NAME IN ({table_list}) "
+            "ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION"
+        )
+        columns_result = _internal_query_lakehouse_sql_endpoint(workspace_id, columns_query, lakehouse_id, lakehouse_name,
+                                                                max_rows=_TEMPLATE_SCHEMA_MAX_ROWS)
         try:
-            schema_data = json.loads(schema_result)
-            if schema_data.get("success"):
-                schemas = [row["TABLE_SCHEMA"] for row in schema_data.get("results", [])]
-                # Prefer 'gold' schema if available, otherwise use first non-system schema
-                if "gold" in schemas:
-                    detected_schema = "gold"
-                elif schemas:
-                    # Filter out system schemas and use the first available
-                    user_schemas = [s for s in schemas if s not in ["INFORMATION_SCHEMA", "sys", "db_accessadmin", "db_backupoperator", 
-                                                                   "db_datareader", "db_datawriter", "db_ddladmin", "db_denydatareader", 
-                                                                   "db_denydatawriter", "db_owner", "db_securityadmin", "guest"]]
-                    if user_schemas:
-                        detected_schema = user_schemas[0]
-        except Exception as e:
-            print(f"Warning: Could not detect schema, using default 'dbo': {e}")
+            columns_data = json.loads(columns_result)
+        except Exception:
+            return f"Error validating table schemas: {columns_result}"
+        if not columns_data.get("success"):
+            return f"Error validating table schemas: {columns_data.get('error', 'Unknown error')}"
+        if columns_data.get("truncated"):
+            return f"Error validating table schemas: more than {_TEMPLATE_SCHEMA_MAX_ROWS} columns returned; request fewer tables"
+        
+        # Group columns by table and schema
+        columns_by_table = {}
+        for col in columns_data.get("results", []):
+            columns_by_table.setdefault(col["TABLE_NAME"].lower(), {}).setdefault(col["TABLE_SCHEMA"], []).append(col)
         
-        # Validate table schemas
+        missing_tables = [name for name in table_names if name.lower() not in columns_by_table]
+        if missing_tables:
+            return f"Error validating schema for table(s) {', '.join(missing_tables)}: not found in lakehouse '{actual_lakehouse_name}'"
+        
+        # Build every table definition from the grouped result
         validated_tables = []
         for table_name in table_names:
-            schema_query = f"SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = '{table_name}' ORDER BY ORDINAL_POSITION"
-            schema_result = _internal_query_lakehouse_sql_endpoint(workspace_id, schema_query, lakehouse_id, lakehouse_name)
+            schema_columns = columns_by_table[table_name.lower()]
+            table_schema = _pick_table_schema(list(schema_columns))
+            columns = []
+            for col in schema_columns[table_schema]:
+                dl_type = _directlake_data_type(col["DATA_TYPE"])
+                columns.append({
+                    "name": col["COLUMN_NAME"],
+                    "dataType": dl_type,
+                    "sourceColumn": col["COLUMN_NAME"],
+                    "lineageTag": f"{table_name}_{col['COLUMN_NAME']}",
+                    "sourceLineageTag": col["COLUMN_NAME"],
+                    "summarizeBy": "sum" if dl_type in ["int64", "decimal"] and "quantity" in col["COLUMN_NAME"].lower() else "none"
+                })
             
-            try:
-                schema_data = json.loads(schema_result)
-                if schema_data.get("success"):
-                    columns = []
-                    for col in schema_data.get("results", []):
-                        # Map SQL types to DirectLake types
-                        sql_type = col["DATA_TYPE"].lower()
-                        if sql_type in ["varchar", "nvarchar", "char", "nchar", "text", "ntext"]:
-                            dl_type = "string"
-                        elif sql_type in ["int", "bigint", "smallint", "tinyint"]:
-                            dl_type = "int64"
-                        elif sql_type in ["decimal", "numeric", "float", "real", "money", "smallmoney"]:
-                            dl_type = "decimal"
-                        elif sql_type in ["datetime", "datetime2", "date", "time", "smalldatetime"]:
-                            dl_type = "dateTime"
-                        elif sql_type in ["bit"]:
-                            dl_type = "boolean"
-                        else:
-                            dl_type = "string"  # Default fallback
-                        
-                        columns.append({
-                            "name": col["COLUMN_NAME"],
-                            "dataType": dl_type,
-                            "sourceColumn": col["COLUMN_NAME"],
-                            "lineageTag": f"{table_name}_{col['COLUMN_NAME']}",
-                            "sourceLineageTag": col["COLUMN_NAME"],
-                            "summarizeBy": "sum" if dl_type in ["int64", "decimal"] and "quantity" in col["COLUMN_NAME"].lower() else "none"
-                        })
-                    
-                    validated_tables.append({
-                        "name": table_name,
-                        "columns": columns,
-                        "schema": detected_schema  # Add schema information to each table
-                    })
-                else:
-                    return f"Error validating schema for table '{table_name}': {schema_data.get('error', 'Unknown error')}"
-            except Exception as e:
-                return f"Error processing schema for table '{table_name}': {str(e)}"
+            validated_tables.append({
+                "name": table_name,
+                "columns": columns,
+                "schema": table_schema  # Add schema information to each table
+            })
         
         # Generate complete TMSL structure
         tmsl_template = {
@@ -1203,13 +1174,14 @@ def generate_directlake_tmsl_template(workspace_id: str, lakehouse_id: str = Non
             }
             tmsl_template["createOrReplace"]["database"]["model"]["tables"].append(table_def)
         
-        return json.dumps(tmsl_template, indent=2)
+        return dumps(tmsl_template)
         
     except Exception as e:
         return f"Error generating DirectLake TMSL template: {str(e)}"
 
 @mcp.tool
-def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definition: str, validate_only: bool = False) -> str:
+def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definition: str, validate_only: bool = False,
+                            minimal_diff: bool = False, dry_run: bool = False) -> str:
     """Updates the TMSL definition for an Analysis Services Model with enhanced validation.
     
     This tool connects to the specified Power BI workspace and dataset name, validates and updates the TMSL definition,
@@ -1220,41 +1192,38 @@ def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definit
         dataset_name: The dataset/model name to update
         tmsl_definition: Valid TMSL JSON string
         validate_only: If True, only validates the TMSL without executing (default: False)
+        minimal_diff: If True, a whole-database definition is compared with the current model and only the
+                      changed objects (tables, columns, measures, partitions, relationships, roles, ...) are
+                      deployed, in one transaction (default: False, the definition is deployed as given)
+        dry_run: If True, nothing is deployed; returns the command that would run: the minimal-diff plan
+                 and refresh estimate, or the createOrReplace command
     
     Enhanced Features:
     - Pre-validates TMSL structure before sending to server
     - Checks for common DirectLake mistakes
     - Provides detailed error messages with suggestions
     - Validates required DirectLake components
+    - Optionally deploys only what changed instead of replacing the whole database (minimal_diff)
     
     Returns:
         Success message or detailed error with suggestions for fixes
     """   
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    dotnet_dir = os.path.join(script_dir, "dotnet")
-
-    print(f"Using .NET assemblies from: {dotnet_dir}")
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.dll"))
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.Tabular.dll"))
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.Identity.Client.dll"))
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.IdentityModel.Abstractions.dll"))
-
-    from Microsoft.AnalysisServices.Tabular import Server# type: ignore
+    load_assemblies()
     from Microsoft.AnalysisServices import XmlaResultCollection  # type: ignore
 
     access_token = get_access_token()
     if not access_token:
         return "Error: No valid access token available"
     
-    workspace_name_encoded = urllib.parse.quote(workspace_name)
-    connection_string = f"Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name_encoded};Password={access_token}"
-    server = Server()
-    
     try:
-        server.Connect(connection_string)
+        # Parse once; the validator and the wrapping logic below share the index
+        try:
+            index = get_tmsl_index(tmsl_definition)
+        except json.JSONDecodeError as e:
+            return f"❌ TMSL Validation Failed:\nInvalid JSON syntax: {e}\n\n💡 Suggestions:\nFix JSON syntax errors. Use a JSON validator to check your TMSL structure."
         
-        # Enhanced TMSL validation before processing
-        validation_result = validate_tmsl_structure(tmsl_definition)
+        # Enhanced TMSL validation before processing (no server connection needed)
+        validation_result = validate_tmsl_structure(index)
         if not validation_result["valid"]:
             return f"❌ TMSL Validation Failed:\n{validation_result['error']}\n\n💡 Suggestions:\n{validation_result['suggestions']}"
         
@@ -1262,17 +1231,34 @@ def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definit
         if validate_only:
             return f"✅ TMSL Validation Passed:\n{validation_result['summary']}\n\n📋 Structure validated successfully - ready for deployment!"
         
-        # Parse the TMSL definition to check its structure
-        try:
-            tmsl = json.loads(tmsl_definition)
-        except json.JSONDecodeError as e:
-            return f"Error: Invalid JSON in TMSL definition - {e}"
-        
-        databaseCount = count_nodes_with_name(tmsl, "database")
-        tableCount = count_nodes_with_name(tmsl, "table")
-        
+        tmsl = index.document
+        databaseCount = index.count("database")
+        tableCount = index.count("table")
+
+        plan = None
+        # Why the definition is deployed without a minimal-diff plan (reported by dry runs)
+        if not minimal_diff:
+            replace_reason = "minimal_diff is off; the definition is deployed as given"
+        elif not (isinstance(tmsl, dict) and database_definition(tmsl) is not None):
+            replace_reason = "Not a whole-database definition; it is deployed as given"
+        else:
+            try:
+                current_tmsl, _ = get_model_tmsl(workspace_name, dataset_name, access_token)
+                plan = plan_from_tmsl(current_tmsl, tmsl, dataset_name)
+            except ValueError as e:
+                # New dataset or a change the diff cannot express: replace the whole database
+                replace_reason = str(e)
+                logging.info(f"Minimal-diff deployment not possible for '{dataset_name}', using createOrReplace: {e}")
+
+        if plan is not None:
+            if dry_run:
+                return encode_response({"success": True, "dry_run": True, "mode": "minimal_diff",
+                                        "plan": plan.summary(), "command": plan.to_command()}, "update_model_using_tmsl")
+            if plan.is_empty:
+                return f"No changes to deploy for dataset '{dataset_name}' in workspace '{workspace_name}'; the model already matches the definition. ✅"
+            final_tmsl = json.dumps(plan.to_command())
         # Check if the tmsl_definition already has createOrReplace at the root level
-        if "createOrReplace" in tmsl:
+        elif "createOrReplace" in tmsl:
             # TMSL already has createOrReplace wrapper, use as-is
             final_tmsl = tmsl_definition
         elif databaseCount > 0:
@@ -1320,7 +1306,15 @@ def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definit
                 }
             })
 
-        retval: XmlaResultCollection = server.Execute(final_tmsl)
+        if dry_run:
+            # Nothing below this point may run for a dry run: it deploys
+            return encode_response({"success": True, "dry_run": True, "mode": "createOrReplace",
+                                    "reason": replace_reason, "command": json.loads(final_tmsl)},
+                                   "update_model_using_tmsl")
+
+        with tom_server(workspace_name, access_token) as server:
+            retval: XmlaResultCollection = server.Execute(final_tmsl)
+        invalidate_model_tmsl(workspace_name, dataset_name)
         
         # Check if the execution was successful by examining the XmlaResultCollection
         if retval is None:
@@ -1395,65 +1389,90 @@ def update_model_using_tmsl(workspace_name: str, dataset_name: str, tmsl_definit
             return f"Permission error: {error_message}. You may not have sufficient permissions to modify this dataset."
         else:
             return f"Error updating TMSL definition: {error_message}"
-    finally:
-        # Ensure server connection is always closed
-        try:
-            if server and hasattr(server, 'Connected') and server.Connected:
-                server.Disconnect()
-        except:
-            pass  # Ignore errors during cleanup
     
 @mcp.tool
-def get_model_definition(workspace_name:str = None, dataset_name:str=None) -> str:
+def get_model_definition(workspace_name:str = None, dataset_name:str=None, tables: Optional[List[str]] = None,
+                         object_types: Optional[List[str]] = None, use_cache: bool = True) -> str:
     """Gets TMSL definition for an Analysis Services Model.
     This tool connects to the specified Power BI workspace and dataset name, retrieves the model definition,
     and returns the TMSL definition as a string.
     The function connects to the Power BI service using an access token, retrieves the model definition,
     and returns the result.
+    Definitions are cached in memory and on disk per dataset and database version (Version/LastUpdate);
+    an unchanged model is returned without serializing it again.
+    Partial retrieval: pass `tables` to get only those tables and/or `object_types` to keep only some collections
+    (tables, columns, measures, hierarchies, partitions, calculationGroup, relationships, roles, perspectives,
+    expressions, dataSources, cultures), e.g. object_types=["measures"] for every table's measures only.
+    Set use_cache=False to force a fresh serialization.
     Note: The workspace_name and dataset_name should be valid names in the Power BI service.
     """
-    
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    dotnet_dir = os.path.join(script_dir, "dotnet")
-    
-    print(f"Using .NET assemblies from: {dotnet_dir}")
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.Tabular.dll"))
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.Identity.Client.dll"))
-    clr.AddReference(os.path.join(dotnet_dir, "Microsoft.IdentityModel.Abstractions.dll"))
-    
-    from Microsoft.AnalysisServices.Tabular import Server,Database, JsonSerializer,SerializeOptions # type: ignore
-
     access_token = get_access_token()
     if not access_token:
         return "Error: No valid access token available"
 
-    # Use URL-encoded workspace name and standard XMLA connection format
+    try:
+        tmsl_definition, _ = get_model_tmsl(workspace_name, dataset_name, access_token, tables, object_types, use_cache)
+    except ValueError as e:
+        return f"Error: {e}"
+    return tmsl_definition
 
-    workspace_name = urllib.parse.quote(workspace_name)
-    connection_string = f"Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name};Password={access_token}"
 
-    server: Server = Server()
-    server.Connect(connection_string)
-    database: Database = server.Databases.GetByName(dataset_name)
+@mcp.tool
+def get_response_page(handle: str, offset: int = 0, limit: int = 100) -> str:
+    """Fetches more items from an array that was truncated to keep a tool response within its size budget.
+    Truncated responses carry a `_truncated` list naming the array path, how many items were returned out of
+    the total, and the handle to pass here together with the offset of the next item.
+    """
+    try:
+        return encode_response(fetch_response_page(handle, offset, limit), "get_response_page")
+    except Exception as e:
+        return encode_response({"status": "error", "error": str(e)}, "get_response_page")
 
-    options = SerializeOptions()
-    options.IgnoreTimestamps = True
+startup_profile.mark("server tools")
 
-    tmsl_definition = JsonSerializer.SerializeDatabase(database, options)
-    return tmsl_definition
 
+def _preload_assemblies():
+    started = time.perf_counter()
+    try:
+        load_assemblies()
+        logging.info(f"Preloaded .NET assemblies in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logging.warning(f"Could not preload .NET assemblies: {e}")
 
 
 def main():
-    """Main entry point for the Semantic Model MCP Server."""
+    """Main entry point for the Semantic Model MCP Server.
+
+    ``--profile-startup`` prints the duration of each startup phase as JSON and exits instead of serving.
+    """
+    profile_only = "--profile-startup" in sys.argv[1:]
 
     # Register tool modules
     register_bpa_tools(mcp)
+    startup_profile.mark("BPA tools")
     register_powerbi_desktop_tools(mcp)
+    startup_profile.mark("Power BI Desktop tools")
     register_microsoft_learn_tools(mcp)
+    startup_profile.mark("Microsoft Learn tools")
+
+    # Load the Analysis Services assemblies (pythonnet) in the background, so the server answers the client's
+    # initialize request right away; a tool call that needs them meanwhile waits for the load to finish
+    preload = threading.Thread(target=_preload_assemblies, name="assembly-preload", daemon=True)
+    preload.start()
+
+    # Resolve the Azure credential for SQL endpoints in the background so the first query does not walk the chain
+    if not profile_only:
+        warm_azure_credential()
+    startup_profile.mark("background warm-up started")
+
+    if profile_only:
+        report = startup_profile.report()
+        preload.join()
+        report["background"] = {"assembly_preload_ms": round(startup_profile.mark("assembly preload (background)") * 1000, 1)}
+        print(json.dumps(report, indent=2))
+        return
 
-    logging.info("Starting Semantic Model MCP Server")
+    logging.info(f"Starting Semantic Model MCP Server (startup took {startup_profile.report()['total_ms']:.0f} ms)")
     mcp.run()
 
 if __name__ == "__main__":
@@ -11,14 +11,16 @@ Functions:
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
+from core.tmsl_index import TmslIndex, get_tmsl_index
 
-def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
+
+def validate_tmsl_structure(tmsl_definition: Union[str, TmslIndex]) -> Dict[str, Any]:
     """Validates TMSL structure for common DirectLake mistakes and required components.
     
     Args:
-        tmsl_definition: JSON string containing the TMSL definition
+        tmsl_definition: JSON string containing the TMSL definition, or its TmslIndex
     
     Returns:
         dict: {
@@ -30,7 +32,8 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
         }
     """
     try:
-        tmsl = json.loads(tmsl_definition)
+        index = tmsl_definition if isinstance(tmsl_definition, TmslIndex) else get_tmsl_index(tmsl_definition)
+        tmsl = index.document
     except json.JSONDecodeError as e:
         return {
             "valid": False,
@@ -51,11 +54,11 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
             model_content = tmsl["createOrReplace"]["database"]
         elif "table" in tmsl["createOrReplace"]:
             # Single table update - different validation
-            return validate_single_table_tmsl(tmsl)
+            return validate_single_table_tmsl(index)
     
     # Validate DirectLake specific requirements
     if "model" in model_content:
-        model = model_content["model"]
+        model = index.model
         
         # 🚨 CRITICAL CHECK #1: Expressions block for DirectLake
         if "expressions" not in model:
@@ -63,9 +66,8 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
             suggestions.append("Add expressions block with DatabaseQuery using Sql.Database() function")
         else:
             # Validate expressions content
-            expressions = model["expressions"]
             database_query_found = False
-            for expr in expressions:
+            for expr in index.objects.get("expression", []):
                 if expr.get("name") == "DatabaseQuery" and expr.get("kind") == "m":
                     database_query_found = True
                     # Check if expression contains Sql.Database
@@ -88,8 +90,7 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
         
         # 🚨 CRITICAL CHECK #2: Table validation
         if "tables" in model:
-            tables = model["tables"]
-            for table in tables:
+            for table in index.objects.get("table", []):
                 table_name = table.get("name", "unnamed_table")
                 
                 # Check for INVALID table-level mode property
@@ -107,9 +108,8 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
                     errors.append(f"❌ CRITICAL: Table '{table_name}' missing 'partitions' array")
                     suggestions.append(f"Add partitions array to table '{table_name}' with DirectLake partition")
                 else:
-                    partitions = table["partitions"]
                     directlake_partition_found = False
-                    for partition in partitions:
+                    for partition in index.table_objects("partition", str(table.get("name", ""))):
                         if partition.get("mode") == "directLake":
                             directlake_partition_found = True
                             # Validate partition structure
@@ -158,16 +158,17 @@ def validate_tmsl_structure(tmsl_definition: str) -> Dict[str, Any]:
     }
 
 
-def validate_single_table_tmsl(tmsl: Dict[str, Any]) -> Dict[str, Any]:
+def validate_single_table_tmsl(tmsl: Union[Dict[str, Any], TmslIndex]) -> Dict[str, Any]:
     """Validates TMSL for single table updates.
     
     Args:
-        tmsl: Parsed TMSL dictionary for single table operations
+        tmsl: Parsed TMSL dictionary for single table operations, or its TmslIndex
     
     Returns:
         dict: Validation result with same structure as validate_tmsl_structure
     """
-    table_content = tmsl.get("createOrReplace", {}).get("table", {})
+    index = tmsl if isinstance(tmsl, TmslIndex) else TmslIndex(tmsl)
+    table_content = index.document.get("createOrReplace", {}).get("table", {})
     table_name = table_content.get("name", "unnamed_table")
     
     errors = []
@@ -190,9 +191,8 @@ def validate_single_table_tmsl(tmsl: Dict[str, Any]) -> Dict[str, Any]:
         suggestions.append("Add partitions array with DirectLake partition")
     else:
         # Validate partition structure
-        partitions = table_content["partitions"]
         directlake_partition_found = False
-        for partition in partitions:
+        for partition in index.table_objects("partition", str(table_content.get("name", ""))):
             if partition.get("mode") == "directLake":
                 directlake_partition_found = True
                 # Validate partition structure
@@ -0,0 +1,325 @@
+"""
+Benchmark of the Power BI Desktop detectors on a fake process table
+
+Runs the unified incremental detector and the legacy standard, fast and
+ultra-fast detectors against the same simulated Windows process table, so
+their costs can be compared on any OS (including Linux CI) and without a
+running Power BI Desktop. The table is generated from a seed and every
+scenario is deterministic.
+
+For each detector and scenario the benchmark reports:
+- operations: process attribute reads, per-process port lookups,
+  whole-table port scans (netstat runs) - exact and machine independent
+- modeled_ms: the operations priced with per-operation costs (see
+  DEFAULT_COSTS_MS; override with --costs) - an estimate of the cost on a
+  real Windows machine, where these calls dominate
+- wall_ms: the measured Python time against the fake table
+
+The legacy detectors are pointed at the fake table by replacing the
+``psutil``, ``subprocess`` and ``os`` names in their modules; the unified
+detector takes the table directly. psutil itself is not needed.
+
+Usage:
+    python testing/benchmark_powerbi_detection.py [--processes 400] [--desktops 2] [--repeat 20] [--json]
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the parent directory to the Python path to import modules
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+# Assumed per-operation costs on Windows, in milliseconds. Rough orders of
+# magnitude only; pass --costs to price the operation counts differently.
+DEFAULT_COSTS_MS = {
+    "list_pids": 1.0,           # enumerating PIDs
+    "process_read": 0.05,       # one attribute (name, cmdline, ...) of one process
+    "port_lookup": 2.0,         # TCP connections of one process
+    "port_table_scan": 60.0,    # one netstat run / system-wide connection table
+}
+
+_BACKGROUND_NAMES = ("svchost.exe", "chrome.exe", "explorer.exe", "Teams.exe", "python.exe", "code.exe",
+                     "RuntimeBroker.exe", "conhost.exe", "OneDrive.exe", "sqlservr.exe")
+
+
+class _FakeError(Exception):
+    pass
+
+
+class FakeProcessTable:
+    """
+    A simulated process table with operation counters.
+
+    Implements the process table interface of the unified detector
+    (``pids``, ``name``, ``details``, ``listening_ports``) and, through
+    ``psutil_module``/``subprocess_module``, the parts of psutil and
+    netstat the legacy detectors use.
+    """
+
+    def __init__(self, processes: int, desktops: int, seed: int = 1):
+        self.random = random.Random(seed)
+        self.processes: Dict[int, Dict[str, Any]] = {}
+        self._next_pid = 1000
+        self.counts = {name: 0 for name in DEFAULT_COSTS_MS}
+        for _ in range(max(0, processes - 2 * desktops)):
+            self.start_background()
+        for _ in range(desktops):
+            self.open_desktop()
+
+    # Simulation
+
+    def _spawn(self, name: str, ppid: int, cmdline: List[str], ports: List[int] = ()) -> int:
+        pid = self._next_pid
+        self._next_pid += self.random.randint(4, 40)
+        self.processes[pid] = {"name": name, "ppid": ppid, "cmdline": cmdline, "create_time": 1.7e9 + pid,
+                               "ports": list(ports)}
+        return pid
+
+    def start_background(self) -> int:
+        name = self.random.choice(_BACKGROUND_NAMES)
+        ports = [self.random.randint(1025, 49999)] if self.random.random() < 0.1 else []
+        return self._spawn(name, 4, [f"C:\\Program Files\\{name}", f"--id={self.random.randint(1, 10**6)}"], ports)
+
+    def stop_background(self) -> None:
+        candidates = [pid for pid, p in self.processes.items() if p["name"] in _BACKGROUND_NAMES]
+        if candidates:
+            del self.processes[self.random.choice(candidates)]
+
+    def open_desktop(self) -> int:
+        report = f"C:\\Reports\\Report{len(self.processes)}.pbix"
+        desktop = self._spawn("PBIDesktop.exe", 4, ["C:\\Program Files\\Microsoft Power BI Desktop\\bin\\PBIDesktop.exe", report])
+        workspace = f"C:\\Users\\me\\Microsoft\\Power BI Desktop Store App\\AnalysisServicesWorkspaces\\AnalysisServicesWorkspace_{desktop}\\Data"
+        self._spawn("msmdsrv.exe", desktop, ["msmdsrv.exe", "-c", "-n", f"AnalysisServicesWorkspace_{desktop}", "-s", workspace],
+                    [self.random.randint(50001, 65000)])
+        return desktop
+
+    def reset_counts(self) -> None:
+        self.counts = {name: 0 for name in DEFAULT_COSTS_MS}
+
+    # Unified detector interface
+
+    def pids(self) -> List[int]:
+        self.counts["list_pids"] += 1
+        return list(self.processes)
+
+    def name(self, pid: int) -> Optional[str]:
+        self.counts["process_read"] += 1
+        process = self.processes.get(pid)
+        return process["name"] if process else None
+
+    def details(self, pid: int) -> Optional[Dict[str, Any]]:
+        self.counts["process_read"] += 3
+        process = self.processes.get(pid)
+        if process is None:
+            return None
+        return {"ppid": process["ppid"], "cmdline": list(process["cmdline"]), "create_time": process["create_time"]}
+
+    def listening_ports(self, pid: int) -> List[int]:
+        self.counts["port_lookup"] += 1
+        process = self.processes.get(pid)
+        return sorted(process["ports"]) if process else []
+
+    # psutil / netstat for the legacy detectors
+
+    def psutil_module(self) -> types.SimpleNamespace:
+        table = self
+        address = types.SimpleNamespace
+
+        class FakeProcess:
+            def __init__(self, pid: int, attrs: Optional[List[str]] = None):
+                if pid not in table.processes:
+                    raise _FakeError(pid)
+                self.pid = pid
+                self._process = table.processes[pid]
+                if attrs is not None:
+                    table.counts["process_read"] += len(attrs)
+                    self.info = {attr: pid if attr == "pid" else self._process.get(attr) for attr in attrs}
+
+            def name(self):
+                table.counts["process_read"] += 1
+                return self._process["name"]
+
+            def cmdline(self):
+                table.counts["process_read"] += 1
+                return list(self._process["cmdline"])
+
+            def connections(self, kind: str = "tcp"):
+                table.counts["port_lookup"] += 1
+                return [address(status="LISTEN", laddr=address(ip="127.0.0.1", port=port))
+                        for port in self._process["ports"]]
+
+        def process_iter(attrs=None):
+            table.counts["list_pids"] += 1
+            for pid in list(table.processes):
+                yield FakeProcess(pid, attrs)
+
+        def net_connections(kind: str = "tcp"):
+            table.counts["port_table_scan"] += 1
+            return [address(status="LISTEN", pid=pid, laddr=address(ip="127.0.0.1", port=port))
+                    for pid, process in table.processes.items() for port in process["ports"]]
+
+        return types.SimpleNamespace(process_iter=process_iter, Process=FakeProcess, net_connections=net_connections,
+                                     pids=table.pids, CONN_LISTEN="LISTEN", NoSuchProcess=_FakeError,
+                                     AccessDenied=_FakeError, ZombieProcess=_FakeError)
+
+    def subprocess_module(self) -> types.SimpleNamespace:
+        table = self
+
+        def run(cmd, **kwargs):
+            # netstat -ano -p TCP, Windows format
+            table.counts["port_table_scan"] += 1
+            lines = ["Active Connections", "", "  Proto  Local Address          Foreign Address        State           PID"]
+            for pid, process in table.processes.items():
+                for port in process["ports"]:
+                    lines.append(f"  TCP    127.0.0.1:{port}        0.0.0.0:0              LISTENING       {pid}")
+            return types.SimpleNamespace(returncode=0, stdout="\n".join(lines), stderr="")
+
+        return types.SimpleNamespace(run=run, TimeoutExpired=_FakeError, SubprocessError=_FakeError)
+
+
+def _load_legacy_modules() -> Dict[str, types.ModuleType]:
+    """Import the legacy detector modules; psutil is replaced per run, so it only has to be importable"""
+    try:
+        import psutil  # noqa: F401
+    except ImportError:
+        sys.modules["psutil"] = types.SimpleNamespace(NoSuchProcess=_FakeError, AccessDenied=_FakeError,
+                                                      ZombieProcess=_FakeError, CONN_LISTEN="LISTEN")
+    return {name: importlib.import_module(f"tools.{name}")
+            for name in ("powerbi_desktop_detector", "fast_powerbi_detector", "ultra_fast_powerbi_detector",
+                         "unified_powerbi_detector")}
+
+
+@contextlib.contextmanager
+def _patched(modules: Dict[str, types.ModuleType], table: FakeProcessTable):
+    fakes = {"psutil": table.psutil_module(), "subprocess": table.subprocess_module(),
+             "os": types.SimpleNamespace(name="nt", path=os.path)}
+    saved = []
+    for module in modules.values():
+        for attr, fake in fakes.items():
+            if hasattr(module, attr):
+                saved.append((module, attr, getattr(module, attr)))
+                setattr(module, attr, fake)
+    try:
+        yield
+    finally:
+        for module, attr, original in saved:
+            setattr(module, attr, original)
+
+
+def _detectors(modules: Dict[str, types.ModuleType], table: FakeProcessTable) -> Dict[str, Callable[[], Dict]]:
+    unified = modules["unified_powerbi_detector"].UnifiedPowerBIDesktopDetector(table)
+    return {
+        # The legacy MCP entry points create a new detector per call, so their 5 s caches never hit
+        "standard": lambda: json.loads(modules["powerbi_desktop_detector"].detect_powerbi_desktop_instances()),
+        "fast": lambda: modules["fast_powerbi_detector"].FastPowerBIDesktopDetector().detect_fast(),
+        "ultra_fast": lambda: modules["ultra_fast_powerbi_detector"].UltraFastPowerBIDesktopDetector().detect_ultra_fast(),
+        "unified": unified.detect,
+    }
+
+
+def _scenarios(repeat: int) -> List[tuple]:
+    def steady(table: FakeProcessTable) -> None:
+        pass
+
+    def churn(table: FakeProcessTable) -> None:
+        for _ in range(3):
+            table.stop_background()
+            table.start_background()
+
+    def desktop_opened(table: FakeProcessTable) -> None:
+        table.open_desktop()
+
+    return [
+        ("cold", 1, steady),
+        ("steady", repeat, steady),
+        ("background_churn", repeat, churn),
+        ("desktop_opened", 1, desktop_opened),
+    ]
+
+
+def run_benchmark(processes: int = 400, desktops: int = 2, repeat: int = 20, seed: int = 1,
+                  costs: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    costs = {**DEFAULT_COSTS_MS, **(costs or {})}
+    modules = _load_legacy_modules()
+    results: Dict[str, Any] = {"parameters": {"processes": processes, "desktops": desktops, "repeat": repeat,
+                                              "seed": seed, "costs_ms": costs},
+                               "scenarios": {}}
+
+    # Every detector gets its own table built from the same seed, so they see identical histories
+    tables = {}
+    runners = {}
+    for name in ("standard", "fast", "ultra_fast", "unified"):
+        tables[name] = FakeProcessTable(processes, desktops, seed)
+        runners[name] = _detectors(modules, tables[name])[name]
+
+    for scenario, iterations, mutate in _scenarios(repeat):
+        scenario_result = {}
+        for name, detect in runners.items():
+            table = tables[name]
+            wall, instances = [], None
+            table.reset_counts()
+            with _patched(modules, table):
+                for _ in range(iterations):
+                    mutate(table)
+                    started = time.perf_counter()
+                    detection = detect()
+                    wall.append((time.perf_counter() - started) * 1000)
+                    instances = (len(detection.get("powerbi_desktop_instances", [])),
+                                 len(detection.get("analysis_services_instances", [])))
+            per_call = {op: count / iterations for op, count in table.counts.items()}
+            scenario_result[name] = {
+                "operations_per_call": per_call,
+                "modeled_ms": round(sum(costs[op] * count for op, count in per_call.items()), 2),
+                "wall_ms": round(statistics.median(wall), 3),
+                "instances": instances[0],
+                "as_instances": instances[1],
+            }
+        results["scenarios"][scenario] = scenario_result
+    return results
+
+
+def _print_report(results: Dict[str, Any]) -> None:
+    params = results["parameters"]
+    print(f"Power BI Desktop detection benchmark: {params['processes']} processes, "
+          f"{params['desktops']} Desktop instances, {params['repeat']} repetitions, seed {params['seed']}")
+    for scenario, by_detector in results["scenarios"].items():
+        print(f"\n{scenario}")
+        print(f"  {'detector':<11} {'modeled ms':>10} {'wall ms':>9} {'reads':>7} {'port lookups':>12} {'netstat':>7}  found")
+        for name, r in by_detector.items():
+            ops = r["operations_per_call"]
+            print(f"  {name:<11} {r['modeled_ms']:>10.2f} {r['wall_ms']:>9.3f} {ops['process_read']:>7.0f} "
+                  f"{ops['port_lookup']:>12.1f} {ops['port_table_scan']:>7.1f}  {r['instances']}/{r['as_instances']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--processes", type=int, default=400, help="Processes in the simulated table")
+    parser.add_argument("--desktops", type=int, default=2, help="Power BI Desktop instances (each with its engine)")
+    parser.add_argument("--repeat", type=int, default=20, help="Detections per repeated scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--costs", type=json.loads, default=None,
+                        help="JSON object overriding per-operation costs in ms, e.g. '{\"port_table_scan\": 30}'")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.processes, args.desktops, args.repeat, args.seed, args.costs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
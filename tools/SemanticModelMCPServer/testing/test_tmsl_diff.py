@@ -0,0 +1,165 @@
+"""
+Tests for the minimal-diff TMSL deployment planner (core/tmsl_diff.py).
+
+The planner is pure Python, so these run without a server:
+    python -m pytest testing/test_tmsl_diff.py
+"""
+
+import copy
+import os
+import sys
+
+# Add the project root to the path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from core.tmsl_diff import plan_deployment
+
+
+def _partition(name, entity):
+    return {"name": name, "mode": "import",
+            "source": {"type": "m", "expression": f"let Source = Sql.Database(\"srv\", \"db\"){{[Item=\"{entity}\"]}} in Source"}}
+
+
+def _database():
+    return {
+        "name": "Sales",
+        "compatibilityLevel": 1604,
+        "model": {
+            "culture": "en-US",
+            "tables": [
+                {
+                    "name": "Sales",
+                    "columns": [
+                        {"name": "Amount", "dataType": "decimal", "sourceColumn": "Amount"},
+                        {"name": "CustomerKey", "dataType": "int64", "sourceColumn": "CustomerKey"},
+                    ],
+                    "measures": [{"name": "Total", "expression": "SUM(Sales[Amount])"}],
+                    "partitions": [_partition("Sales", "Sales")],
+                },
+                {
+                    "name": "Customer",
+                    "columns": [
+                        {"name": "CustomerKey", "dataType": "int64", "sourceColumn": "CustomerKey"},
+                        {"name": "Name", "dataType": "string", "sourceColumn": "Name"},
+                    ],
+                    "partitions": [_partition("Customer", "Customer")],
+                },
+            ],
+            "relationships": [
+                {"name": "Sales_Customer", "fromTable": "Sales", "fromColumn": "CustomerKey",
+                 "toTable": "Customer", "toColumn": "CustomerKey"},
+            ],
+        },
+    }
+
+
+def _steps(plan):
+    return [(step["action"], step["object_type"], step["object"]) for step in plan.steps]
+
+
+def _table(database, name):
+    return next(table for table in database["model"]["tables"] if table["name"] == name)
+
+
+def test_unchanged_model_has_no_operations():
+    plan = plan_deployment(_database(), _database(), "Sales")
+    assert plan.is_empty
+    assert plan.unchanged["tables"] == 2
+
+
+def test_measure_change_replaces_only_the_measure():
+    target = _database()
+    _table(target, "Sales")["measures"][0]["expression"] = "SUMX(Sales, Sales[Amount])"
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("createOrReplace", "measure", "Sales.Total")]
+    operation = plan.operations[0]["createOrReplace"]
+    assert operation["object"] == {"database": "Sales", "table": "Sales", "measure": "Total"}
+    assert operation["measure"]["expression"] == "SUMX(Sales, Sales[Amount])"
+    assert plan.refresh == []
+
+
+def test_column_add_and_remove_are_separate_operations():
+    target = _database()
+    columns = _table(target, "Customer")["columns"]
+    columns[1] = {"name": "City", "dataType": "string", "sourceColumn": "City"}
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("create", "column", "Customer.City"), ("delete", "column", "Customer.Name")]
+    assert [r["refresh_type"] for r in plan.refresh] == ["full"]
+
+
+def test_relationship_add_and_remove():
+    current = _database()
+    target = _database()
+    target["model"]["relationships"] = [
+        {"name": "Sales_Customer_Inactive", "fromTable": "Sales", "fromColumn": "CustomerKey",
+         "toTable": "Customer", "toColumn": "CustomerKey", "isActive": False},
+    ]
+
+    plan = plan_deployment(current, target, "Sales")
+
+    assert _steps(plan) == [
+        ("create", "relationship", "Sales_Customer_Inactive"),
+        ("delete", "relationship", "Sales_Customer"),
+    ]
+    assert plan.operations[0]["create"]["object"] == {"database": "Sales", "relationship": "Sales_Customer_Inactive"}
+    assert any(r["object_type"] == "model" and r["refresh_type"] == "calculate" for r in plan.refresh)
+
+
+def test_relationship_change_replaces_the_relationship_not_the_model():
+    target = _database()
+    target["model"]["relationships"][0]["crossFilteringBehavior"] = "bothDirections"
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("createOrReplace", "relationship", "Sales_Customer")]
+
+
+def test_table_delete_deletes_its_relationships_first():
+    target = _database()
+    target["model"]["tables"] = [_table(target, "Sales")]
+    target["model"]["relationships"] = []
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("delete", "relationship", "Sales_Customer"), ("delete", "table", "Customer")]
+
+
+def test_partition_change_alters_the_partition():
+    target = _database()
+    _table(target, "Sales")["partitions"][0] = _partition("Sales", "SalesArchive")
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("alter", "partition", "Sales.Sales")]
+    assert [(r["object"], r["refresh_type"]) for r in plan.refresh] == [("Sales.Sales", "full")]
+
+
+def test_table_property_change_alters_the_table_without_children():
+    target = _database()
+    _table(target, "Customer")["isHidden"] = True
+
+    plan = plan_deployment(_database(), target, "Sales")
+
+    assert _steps(plan) == [("alter", "table", "Customer")]
+    definition = plan.operations[0]["alter"]["table"]
+    assert definition["isHidden"] is True
+    assert not {"columns", "measures", "hierarchies", "partitions"} & set(definition)
+
+
+def test_perspective_and_expression_changes_are_separate_operations():
+    current = _database()
+    current["model"]["expressions"] = [{"name": "Server", "kind": "m", "expression": "\"srv\""}]
+    current["model"]["perspectives"] = [{"name": "Basic", "tables": [{"name": "Sales"}]}]
+    target = copy.deepcopy(current)
+    target["model"]["expressions"][0]["expression"] = "\"srv2\""
+    target["model"]["perspectives"][0]["tables"].append({"name": "Customer"})
+
+    plan = plan_deployment(current, target, "Sales")
+
+    assert _steps(plan) == [("createOrReplace", "perspective", "Basic"), ("createOrReplace", "expression", "Server")]
@@ -6,9 +6,11 @@ and TMSL definitions against best practice rules.
 """
 
 import os
+from typing import List, Optional
 from fastmcp import FastMCP
-import json
-from core.bpa_service import BPAService
+from core.bpa_service import get_bpa_service
+from core.bpa_scan import scan_workspaces, DEFAULT_FETCH_CONCURRENCY
+from core.response_encoder import encode_response
 
 def register_bpa_tools(mcp: FastMCP):
     """Register all BPA-related MCP tools"""
@@ -31,7 +33,7 @@ def register_bpa_tools(mcp: FastMCP):
             # For now, use analyze_tmsl_bpa as a workaround
             # This is a workaround - use the existing tool pipeline
             # Get TMSL first, then analyze it
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': 'analyze_model_bpa is temporarily unavailable. Please use get_model_definition followed by analyze_tmsl_bpa as a workaround.',
                 'error_type': 'function_unavailable',
@@ -39,14 +41,14 @@ def register_bpa_tools(mcp: FastMCP):
                     'step1': f'tmsl = get_model_definition("{workspace_name}", "{dataset_name}")',
                     'step2': 'result = analyze_tmsl_bpa(tmsl["result"])'
                 }
-            })
+            }, "analyze_model_bpa")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'BPA analysis failed: {str(e)}',
                 'error_type': 'bpa_analysis_error'
-            })
+            }, "analyze_model_bpa")
 
     @mcp.tool  
     def analyze_tmsl_bpa(tmsl_definition: str) -> str:
@@ -69,15 +71,93 @@ def register_bpa_tools(mcp: FastMCP):
         try:
             # Get the server directory (parent of tools directory)
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             result = bpa_service.analyze_model_from_tmsl(tmsl_definition)
-            return json.dumps(result, indent=2)
+            return encode_response(result, "analyze_tmsl_bpa")
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'TMSL BPA analysis failed: {str(e)}',
                 'error_type': 'tmsl_bpa_analysis_error'
-            })
+            }, "analyze_tmsl_bpa")
+
+    @mcp.tool
+    def scan_workspaces_bpa(workspace_names: List[str], dataset_pattern: Optional[str] = None,
+                            output_format: str = "jsonl", output_path: Optional[str] = None,
+                            fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                            max_processes: Optional[int] = None) -> str:
+        """Run the Best Practice Analyzer over every dataset in one or more workspaces.
+
+        Model definitions are downloaded in parallel (up to fetch_concurrency at
+        a time) and analyzed in worker processes. All violations are written to
+        one local file with workspace_name and dataset_name columns. Per-model
+        fetch/analysis timings and errors are written to a companion
+        .models.jsonl file. A model that fails is recorded and the scan continues.
+
+        Args:
+            workspace_names: Workspace names or IDs to scan
+            dataset_pattern: Optional case-insensitive regex; only matching dataset names are scanned
+            output_format: 'jsonl' (default) or 'parquet' (requires pyarrow)
+            output_path: Target file or directory; a temp file is used when omitted
+            fetch_concurrency: Parallel model downloads (1-16)
+            max_processes: Analysis worker processes (default: CPU count - 1, at most 4; 0 = in-process)
+
+        Returns:
+            JSON string with the output paths, counts, elapsed time and per-model results;
+            for large scans the per-model list is truncated, the full list is in the
+            file at models_path
+        """
+        try:
+            server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            rules_file = os.path.join(server_directory, "core", "bpa.json")
+            result = scan_workspaces(workspace_names, rules_file, dataset_pattern, output_format, output_path,
+                                     fetch_concurrency, max_processes)
+            return encode_response({'success': True, **result}, "scan_workspaces_bpa")
+        except PermissionError as e:
+            return encode_response({
+                'success': False,
+                'error': str(e),
+                'error_type': 'auth_error'
+            }, "scan_workspaces_bpa")
+        except (ValueError, ImportError) as e:
+            return encode_response({
+                'success': False,
+                'error': str(e),
+                'error_type': 'parameter_error'
+            }, "scan_workspaces_bpa")
+        except Exception as e:
+            return encode_response({
+                'success': False,
+                'error': f'BPA workspace scan failed: {str(e)}',
+                'error_type': 'bpa_scan_error'
+            }, "scan_workspaces_bpa")
+
+    @mcp.tool
+    def get_bpa_changes_since_last_analysis(tmsl_definition: str) -> str:
+        """List what changed in a model since it was last analyzed with analyze_tmsl_bpa.
+
+        Compares per-object content hashes of the given TMSL with those kept
+        from the previous analysis of the same database, without running any
+        rules. analyze_tmsl_bpa re-evaluates only changed and new objects (plus
+        rules that look across the model) on its next run.
+
+        Args:
+            tmsl_definition: TMSL JSON string (raw or escaped format)
+
+        Returns:
+            JSON string with added, changed and removed objects
+        """
+        try:
+            server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            bpa_service = get_bpa_service(server_directory)
+            result = bpa_service.get_changes_since_last_analysis(tmsl_definition)
+            return encode_response(result, "get_bpa_changes_since_last_analysis")
+        except Exception as e:
+            return encode_response({
+                'success': False,
+                'error': f'Error comparing with the last BPA analysis: {str(e)}',
+                'error_type': 'bpa_changes_error'
+            }, "get_bpa_changes_since_last_analysis")
 
     @mcp.tool
     def get_bpa_violations_by_severity(severity: str) -> str:
@@ -94,22 +174,22 @@ def register_bpa_tools(mcp: FastMCP):
         try:
             # Get the server directory (parent of tools directory)
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             violations = bpa_service.get_violations_by_severity(severity)
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'severity_filter': severity,
                 'violation_count': len(violations),
                 'violations': violations
-            }, indent=2)
+            }, "get_bpa_violations_by_severity")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error filtering BPA violations by severity: {str(e)}',
                 'error_type': 'bpa_filter_error'
-            })
+            }, "get_bpa_violations_by_severity")
 
     @mcp.tool
     def get_bpa_violations_by_category(category: str) -> str:
@@ -126,22 +206,22 @@ def register_bpa_tools(mcp: FastMCP):
         try:
             # Get the server directory (parent of tools directory)
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             violations = bpa_service.get_violations_by_category(category)
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'category_filter': category,
                 'violation_count': len(violations),
                 'violations': violations
-            }, indent=2)
+            }, "get_bpa_violations_by_category")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error filtering BPA violations by category: {str(e)}',
                 'error_type': 'bpa_filter_error'
-            })
+            }, "get_bpa_violations_by_category")
 
     @mcp.tool
     def get_bpa_rules_summary() -> str:
@@ -153,20 +233,20 @@ def register_bpa_tools(mcp: FastMCP):
         try:
             # Get the server directory (parent of tools directory)
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             summary = bpa_service.get_rules_summary()
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'rules_summary': summary
-            }, indent=2)
+            }, "get_bpa_rules_summary")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting BPA rules summary: {str(e)}',
                 'error_type': 'bpa_rules_error'
-            })
+            }, "get_bpa_rules_summary")
 
     @mcp.tool
     def get_bpa_categories() -> str:
@@ -178,20 +258,20 @@ def register_bpa_tools(mcp: FastMCP):
         try:
             # Get the server directory (parent of tools directory)
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             categories = bpa_service.get_available_categories()
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'available_categories': categories
-            }, indent=2)
+            }, "get_bpa_categories")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting BPA categories: {str(e)}',
                 'error_type': 'bpa_categories_error'
-            })
+            }, "get_bpa_categories")
 
     @mcp.tool
     def generate_bpa_report(workspace_name: str, dataset_name: str, format_type: str = 'summary') -> str:
@@ -206,83 +286,44 @@ def register_bpa_tools(mcp: FastMCP):
             JSON string with comprehensive BPA report
         """
         try:
-            # Import required modules for PowerBI connection
-            import urllib.parse
-            import sys
-            import os
-            
-            # Add .NET assemblies path
-            script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            dotnet_dir = os.path.join(script_dir, "dotnet")
-            
-            sys.path.append(script_dir)
-            import clr
-            clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.Tabular.dll"))
-            clr.AddReference(os.path.join(dotnet_dir, "Microsoft.Identity.Client.dll"))
-            clr.AddReference(os.path.join(dotnet_dir, "Microsoft.IdentityModel.Abstractions.dll"))
-            
-            from Microsoft.AnalysisServices.Tabular import Server, Database, JsonSerializer, SerializeOptions # type: ignore
-            
-            # Import auth function from core
             from core.auth import get_access_token
+            from core.tmsl_cache import get_model_tmsl
             
             # Get access token
             access_token = get_access_token()
             if not access_token:
-                return json.dumps({
+                return encode_response({
                     'success': False,
                     'error': "No valid access token available",
                     'error_type': 'auth_error'
-                })
-
-            # Connect to Power BI and get TMSL definition
-            workspace_name_encoded = urllib.parse.quote(workspace_name)
-            connection_string = f"Data Source=powerbi://api.powerbi.com/v1.0/myorg/{workspace_name_encoded};Password={access_token}"
+                }, "generate_bpa_report")
 
-            server = Server()
-            server.Connect(connection_string)
-            
-            # Find the database/dataset
-            database = None
-            for db in server.Databases:
-                if db.Name == dataset_name:
-                    database = db
-                    break
-            
-            if not database:
-                server.Disconnect()
-                return json.dumps({
+            # Get TMSL definition (served from the versioned cache when the model is unchanged)
+            try:
+                tmsl_definition, _ = get_model_tmsl(workspace_name, dataset_name, access_token)
+            except ValueError as e:
+                return encode_response({
                     'success': False,
-                    'error': f"Dataset '{dataset_name}' not found in workspace '{workspace_name}'",
+                    'error': str(e),
                     'error_type': 'dataset_not_found'
-                })
-            
-            # Get TMSL definition
-            options = SerializeOptions()
-            options.IgnoreInferredObjects = True
-            options.IgnoreInferredProperties = True
-            options.IgnoreTimestamps = True
-            options.SplitMultilineStrings = True
-            
-            tmsl_definition = JsonSerializer.SerializeDatabase(database, options)
-            server.Disconnect()
+                }, "generate_bpa_report")
             
             # Generate BPA report
             server_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bpa_service = BPAService(server_directory)
+            bpa_service = get_bpa_service(server_directory)
             report = bpa_service.generate_bpa_report(tmsl_definition, format_type)
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'workspace_name': workspace_name,
                 'dataset_name': dataset_name,
                 'format_type': format_type,
                 'report': report
-            }, indent=2)
+            }, "generate_bpa_report")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error generating BPA report: {str(e)}',
                 'error_type': 'bpa_report_error'
-            })
+            }, "generate_bpa_report")
@@ -1,6 +1,43 @@
 # Tool to list Power BI workspaces
 import json
+import threading
+import time
 from core.auth import get_access_token
+from core.rest_client import get_rest_client, RestApiError, FABRIC_API_BASE, POWERBI_API_BASE, LISTING_CACHE_TTL_SECONDS
+from core.response_encoder import dumps, encode_response
+from core.sql_endpoint import OdbcDriverNotFoundError, execute_sql_query, get_pyodbc, get_resolved_odbc_driver
+
+# Lakehouse SQL endpoint resolution cache: (workspace_id, "id"|"name", value) -> (expires_at, connection info JSON)
+SQL_ENDPOINT_CACHE_TTL_SECONDS = 600
+_sql_endpoint_cache = {}
+_sql_endpoint_cache_lock = threading.Lock()
+
+SQL_ENDPOINT_TABLES_MAX_ROWS = 10_000  # Tables read when listing a schema-enabled lakehouse through its SQL endpoint
+
+
+def _http_error_message(error: RestApiError, resource: str, not_found_message: str) -> str:
+    """Maps a failed REST call to the error strings these tools return."""
+    if error.status_code == 401:
+        return "Error: Unauthorized - Invalid or expired access token"
+    elif error.status_code == 403:
+        return f"Error: Forbidden - You don't have permission to access this {resource}"
+    elif error.status_code == 404:
+        return not_found_message
+    elif error.status_code == 429:
+        # Still throttled after the client's Retry-After backoff
+        return "Error: Too many requests - Please try again later"
+    return f"Error: HTTP {error.status_code} - {error.text}"
+
+
+def _list_workspace_groups(access_token: str) -> list:
+    """All Power BI workspaces (groups) visible to the user, from the listing cache when fresh."""
+    return get_rest_client().list_all(f"{POWERBI_API_BASE}/groups", access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS)
+
+
+def _list_lakehouse_items(workspace_id: str, access_token: str) -> list:
+    """All lakehouses in a Fabric workspace, from the listing cache when fresh."""
+    url = f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/lakehouses"
+    return get_rest_client().list_all(url, access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS)
 
 def list_workspaces() -> str:
     """Lists available Power BI workspaces for the current user. This tool retrieves the workspaces using the Power BI REST API.
@@ -8,62 +45,51 @@ def list_workspaces() -> str:
     It is useful for identifying which workspaces you can access and work with.
     It gets an access token using the Power BI REST API.
     """
-    import requests
     access_token = get_access_token()
     if not access_token:
         return "Error: No valid access token available"
-    url = "https://api.powerbi.com/v1.0/myorg/groups"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        return f"Error: {response.status_code} - {response.text}"
-    groups = response.json().get("value", [])
+    try:
+        groups = _list_workspace_groups(access_token)
+    except RestApiError as e:
+        return f"Error: {e.status_code} - {e.text}"
     if not groups:
         return "No workspaces found."
     
     # Extract only name and id from each workspace
     filtered_workspaces = [{"name": group.get("name"), "id": group.get("id")} for group in groups]
-    return json.dumps(filtered_workspaces, indent=2)
+    return encode_response(filtered_workspaces, "list_workspaces")
 
 # Tool to list datasets in a Power BI workspace
 
 def list_datasets(workspace_id: str) -> str:
     """Lists all datasets in a specified Power BI workspace using REST API."""
-    import requests
     access_token = get_access_token()
     if not access_token:
         return "Error: No valid access token available"
     
-    url = f"https://api.powerbi.com/v1.0/myorg/groups/{workspace_id}/datasets"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        return f"Error: {response.status_code} - {response.text}"
+    url = f"{POWERBI_API_BASE}/groups/{workspace_id}/datasets"
+    try:
+        datasets = get_rest_client().list_all(url, access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS)
+    except RestApiError as e:
+        return f"Error: {e.status_code} - {e.text}"
     
-    datasets = response.json().get("value", [])
     if not datasets:
         return "No datasets found in this workspace."
     
-    return json.dumps(datasets, indent=2)
+    return encode_response(datasets, "list_datasets")
 
 # Tool to get workspace ID by name
 def get_workspace_id(workspace_name: str) -> str:
     """Gets the workspace ID for a given workspace name.  This is useful for retrieving datasets."""
-    import requests
-
     access_token = get_access_token()
     if not access_token:
         return "Error: No valid access token available"
     
-    url = "https://api.powerbi.com/v1.0/myorg/groups"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        return f"Error: {response.status_code} - {response.text}"
+    try:
+        groups = _list_workspace_groups(access_token)
+    except RestApiError as e:
+        return f"Error: {e.status_code} - {e.text}"
     
-    groups = response.json().get("value", [])
     for group in groups:
         if group.get("name") == workspace_name:
             return group.get("id")
@@ -93,40 +119,16 @@ def list_notebooks(workspace_id: str) -> str:
         if not access_token:
             return "Error: No valid access token available"
         
-        # Construct API endpoint URL for listing notebooks
         # Strip whitespace from workspace_id to handle user input errors
-        url = f"https://api.powerbi.com/v1.0/myorg/groups/{workspace_id.strip()}/notebooks"
-        
-        # Set up authorization header with Bearer token
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
-        # Make the API request with 30-second timeout to prevent hanging
-        response = requests.get(url, headers=headers, timeout=30)
-        
-        # Handle different HTTP status codes with specific error messages
-        if response.status_code == 200:
-            # Success - parse the JSON response
-            notebooks = response.json().get("value", [])
-            if not notebooks:
-                return "No notebooks found in this workspace."
-            # Return formatted JSON with proper indentation
-            return json.dumps(notebooks, indent=2)
-        elif response.status_code == 401:
-            # Authentication failed - token is invalid or expired
-            return "Error: Unauthorized - Invalid or expired access token"
-        elif response.status_code == 403:
-            # Authorization failed - user doesn't have permission
-            return "Error: Forbidden - You don't have permission to access this workspace"
-        elif response.status_code == 404:
-            # Workspace not found
-            return f"Error: Workspace with ID '{workspace_id}' not found"
-        elif response.status_code == 429:
-            # Rate limiting - too many requests
-            return "Error: Too many requests - Please try again later"
-        else:
-            # Other HTTP errors - return status code and response text
-            return f"Error: HTTP {response.status_code} - {response.text}"
-            
+        url = f"{POWERBI_API_BASE}/groups/{workspace_id.strip()}/notebooks"
+        notebooks = get_rest_client().list_all(url, access_token, cache_ttl=LISTING_CACHE_TTL_SECONDS)
+        if not notebooks:
+            return "No notebooks found in this workspace."
+        # Return formatted JSON with proper indentation
+        return encode_response(notebooks, "list_notebooks")
+    
+    except RestApiError as e:
+        return _http_error_message(e, "workspace", f"Error: Workspace with ID '{workspace_id}' not found")
     # Handle specific request exceptions with informative error messages
     except requests.exceptions.Timeout:
         # Request took longer than 30 seconds
@@ -168,108 +170,34 @@ def list_delta_tables(workspace_id: str, lakehouse_id: str = None) -> str:
         if not access_token:
             return "Error: No valid access token available"
         
-        # Set up authorization header with Bearer token
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
-        # If no lakehouse_id provided, list all lakehouses in the workspace first
+        # If no lakehouse_id provided, use the first lakehouse in the workspace
         if not lakehouse_id:
-            # List all lakehouses in the workspace
-            lakehouses_url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses"
-            lakehouses_response = requests.get(lakehouses_url, headers=headers, timeout=30)
-            
-            if lakehouses_response.status_code != 200:
-                return f"Error listing lakehouses: HTTP {lakehouses_response.status_code} - {lakehouses_response.text}"
-            
-            lakehouses = lakehouses_response.json().get("value", [])
+            try:
+                lakehouses = _list_lakehouse_items(workspace_id, access_token)
+            except RestApiError as e:
+                return f"Error listing lakehouses: HTTP {e.status_code} - {e.text}"
             if not lakehouses:
                 return "No lakehouses found in this workspace."
             
-            # For simplicity, use the first lakehouse if multiple exist
             lakehouse_id = lakehouses[0].get("id")
             if not lakehouse_id:
                 return "Error: No valid lakehouse ID found"
         
-        # Construct API endpoint URL for listing tables in the lakehouse
-        tables_url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/tables"
-        
-        # Add timestamp to force fresh API call and avoid caching
-        import time
-        timestamp = str(int(time.time()))
-        print(f"DEBUG: Making API call at {timestamp} to {tables_url}")
-        
-        # Make the API request with 30-second timeout to prevent hanging
-        response = requests.get(tables_url, headers=headers, timeout=30)
-        
-        # Debug information
-        print(f"DEBUG: Response status code: {response.status_code}")
-        print(f"DEBUG: Response headers: {dict(response.headers)}")
-        print(f"DEBUG: Raw response text: {response.text[:500]}...")
-        
-        # Handle different HTTP status codes with specific error messages
-        if response.status_code == 200:
-            # Success - parse the JSON response
-            response_json = response.json()
-            tables = response_json.get("data", response_json.get("value", []))
-            if not tables:
-                # Return detailed debug information when no tables found
-                return f"No tables found in this lakehouse. API Response: {json.dumps(response.json(), indent=2)}"
-            
-            # Filter for Delta Tables only (if type information is available)
-            delta_tables = []
-            for table in tables:
-                # Check if it's a Delta Table - this might vary based on API response structure
-                table_type = table.get("type", "").lower()
-                format_type = table.get("format", "").lower()
-                
-                if "delta" in table_type or "delta" in format_type or table.get("format") == "Delta":
-                    delta_tables.append(table)
-                else:
-                    # If type info not available, include all tables (most Fabric lakehouse tables are Delta)
-                    delta_tables.append(table)
-            
-            if not delta_tables:
-                return f"No Delta Tables found in this lakehouse. Total tables found: {len(tables)}. Raw table data: {json.dumps(tables, indent=2)}"
-            
-            # Return formatted JSON with proper indentation
-            return json.dumps(delta_tables, indent=2)
-            
-        elif response.status_code == 400:
-            # Handle the specific case of schema-enabled lakehouses
-            print(f"DEBUG: Got 400 error, checking for schema-enabled lakehouse error")
-            print(f"DEBUG: Response text: {response.text}")
-            try:
-                response_json = response.json()
-                print(f"DEBUG: Parsed JSON: {response_json}")
-                error_code = response_json.get("errorCode", "")
-                print(f"DEBUG: Error code: {error_code}")
-                
-                if error_code == "UnsupportedOperationForSchemasEnabledLakehouse":
-                    # Fall back to using SQL Analytics Endpoint for schema-enabled lakehouses
-                    print(f"DEBUG: Lakehouse has schemas enabled, falling back to SQL Analytics Endpoint")
-                    return _list_delta_tables_via_sql_endpoint(workspace_id, lakehouse_id)
-                else:
-                    print(f"DEBUG: Different 400 error: {error_code}")
-                    return f"Error: HTTP 400 - {response.text}"
-            except Exception as e:
-                print(f"DEBUG: Error parsing JSON response: {e}")
-                # If we can't parse the JSON, just return the raw error
-                return f"Error: HTTP 400 - {response.text}"
-                
-        elif response.status_code == 401:
-            # Authentication failed - token is invalid or expired
-            return "Error: Unauthorized - Invalid or expired access token"
-        elif response.status_code == 403:
-            # Authorization failed - user doesn't have permission
-            return "Error: Forbidden - You don't have permission to access this lakehouse"
-        elif response.status_code == 404:
-            # Lakehouse or workspace not found
-            return f"Error: Lakehouse with ID '{lakehouse_id}' not found in workspace '{workspace_id}'"
-        elif response.status_code == 429:
-            # Rate limiting - too many requests
-            return "Error: Too many requests - Please try again later"
-        else:
-            # Other HTTP errors - return status code and response text
-            return f"Error: HTTP {response.status_code} - {response.text}"
+        # Table listings are not cached so newly loaded tables show up immediately
+        tables_url = f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/tables"
+        try:
+            tables = get_rest_client().list_all(tables_url, access_token, items_key="data")
+        except RestApiError as e:
+            if e.status_code == 400 and e.error_code == "UnsupportedOperationForSchemasEnabledLakehouse":
+                # Fall back to using SQL Analytics Endpoint for schema-enabled lakehouses
+                return _list_delta_tables_via_sql_endpoint(workspace_id, lakehouse_id)
+            return _http_error_message(e, "lakehouse", f"Error: Lakehouse with ID '{lakehouse_id}' not found in workspace '{workspace_id}'")
+        
+        if not tables:
+            return "No tables found in this lakehouse."
+        
+        # Most Fabric lakehouse tables are Delta, so every listed table is returned
+        return encode_response(tables, "list_delta_tables")
             
     # Handle specific request exceptions with informative error messages
     except requests.exceptions.Timeout:
@@ -299,9 +227,6 @@ def _list_delta_tables_via_sql_endpoint(workspace_id: str, lakehouse_id: str) ->
         str: JSON string containing table information from SQL endpoint
     """
     try:
-        # Import the SQL query function from the main server module
-        # We need to avoid circular imports, so we'll implement the SQL query logic here
-        
         # Get lakehouse connection details first
         lakehouse_info = get_lakehouse_sql_connection_string(workspace_id, lakehouse_id)
         if not lakehouse_info:
@@ -331,10 +256,8 @@ def _list_delta_tables_via_sql_endpoint(workspace_id: str, lakehouse_id: str) ->
         ORDER BY TABLE_SCHEMA, TABLE_NAME
         """
         
-        # Use pyodbc to connect to the SQL Analytics Endpoint
-        try:
-            import pyodbc
-        except ImportError:
+        pyodbc = get_pyodbc()
+        if pyodbc is None:
             return "Error: pyodbc module is required for SQL Analytics Endpoint queries but is not installed"
         
         # Get access token for Azure SQL connection - use same token manager as the main function
@@ -343,61 +266,28 @@ def _list_delta_tables_via_sql_endpoint(workspace_id: str, lakehouse_id: str) ->
         if not success:
             return f"Error: Authentication failed: {error}"
         
-        # Try different ODBC drivers in order of preference
-        available_drivers = [
-            "ODBC Driver 18 for SQL Server",
-            "ODBC Driver 17 for SQL Server", 
-            "SQL Server"
-        ]
-        
-        # Detect which driver is available
-        available_driver = None
-        available_pyodbc_drivers = pyodbc.drivers()
-        
-        for driver in available_drivers:
-            if driver in available_pyodbc_drivers:
-                available_driver = driver
-                break
+        # Run the query on a pooled connection with the shared ODBC driver; lakehouse_name is the database
+        try:
+            result = execute_sql_query(server_name, lakehouse_name, sql_query, token_struct,
+                                       max_rows=SQL_ENDPOINT_TABLES_MAX_ROWS)
+        except OdbcDriverNotFoundError as e:
+            return f"Error: No compatible ODBC driver found. Available drivers: {e.installed}"
+        except pyodbc.Error as e:
+            return f"Error connecting to SQL Analytics Endpoint (driver: {get_resolved_odbc_driver() or 'not detected'}): {str(e)}"
         
-        if not available_driver:
-            return f"Error: No compatible ODBC driver found. Available drivers: {list(available_pyodbc_drivers)}"
+        tables = []
+        for table_info in result["results"]:
+            # Add additional information to match the expected format
+            table_info['id'] = f"{table_info['TABLE_SCHEMA']}.{table_info['TABLE_NAME']}"
+            table_info['type'] = 'Delta'
+            table_info['format'] = 'Delta'
+            table_info['displayName'] = f"{table_info['TABLE_SCHEMA']}.{table_info['TABLE_NAME']}"
+            tables.append(table_info)
         
-        # Connection string for Azure SQL with access token - use lakehouse_name as database
-        connection_string = (
-            f"Driver={{{available_driver}}};"
-            f"Server={server_name};"
-            f"Database={lakehouse_name};"
-            f"Encrypt=yes;"
-            f"TrustServerCertificate=yes;"
-            f"Connection Timeout=30;"
-        )
+        if not tables:
+            return "No tables found in this schema-enabled lakehouse"
         
-        # Execute the query
-        try:
-            # Connect using access token authentication
-            with pyodbc.connect(connection_string, attrs_before={1256: token_struct}) as conn:
-                cursor = conn.cursor()
-                cursor.execute(sql_query)
-                
-                # Fetch results and format as list of dictionaries
-                columns = [column[0] for column in cursor.description]
-                tables = []
-                for row in cursor.fetchall():
-                    table_info = dict(zip(columns, row))
-                    # Add additional information to match the expected format
-                    table_info['id'] = f"{table_info['TABLE_SCHEMA']}.{table_info['TABLE_NAME']}"
-                    table_info['type'] = 'Delta'
-                    table_info['format'] = 'Delta'
-                    table_info['displayName'] = f"{table_info['TABLE_SCHEMA']}.{table_info['TABLE_NAME']}"
-                    tables.append(table_info)
-                
-                if not tables:
-                    return "No tables found in this schema-enabled lakehouse"
-                
-                return json.dumps(tables, indent=2)
-                
-        except pyodbc.Error as e:
-            return f"Error connecting to SQL Analytics Endpoint: {str(e)}"
+        return encode_response(tables, "list_delta_tables")
         
     except Exception as e:
         return f"Error querying SQL endpoint for schema-enabled lakehouse: {str(e)}"
@@ -412,8 +302,6 @@ def list_lakehouse_files(workspace_id: str, lakehouse_id: str = None) -> str:
     Returns:
         str: JSON string containing file information or error message
     """
-    import requests
-    
     # Input validation - ensure workspace_id is provided and not empty
     if not workspace_id or not workspace_id.strip():
         return "Error: Workspace ID is required and cannot be empty"
@@ -424,38 +312,31 @@ def list_lakehouse_files(workspace_id: str, lakehouse_id: str = None) -> str:
         if not access_token:
             return "Error: No valid access token available"
         
-        # Set up authorization header with Bearer token
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
-        # If no lakehouse_id provided, list all lakehouses in the workspace first
+        # If no lakehouse_id provided, use the first lakehouse in the workspace
         if not lakehouse_id:
-            # List all lakehouses in the workspace
-            lakehouses_url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses"
-            lakehouses_response = requests.get(lakehouses_url, headers=headers, timeout=30)
-            
-            if lakehouses_response.status_code != 200:
-                return f"Error listing lakehouses: HTTP {lakehouses_response.status_code} - {lakehouses_response.text}"
-            
-            lakehouses = lakehouses_response.json().get("value", [])
+            try:
+                lakehouses = _list_lakehouse_items(workspace_id, access_token)
+            except RestApiError as e:
+                return f"Error listing lakehouses: HTTP {e.status_code} - {e.text}"
             if not lakehouses:
                 return "No lakehouses found in this workspace."
             
-            # For simplicity, use the first lakehouse if multiple exist
             lakehouse_id = lakehouses[0].get("id")
             if not lakehouse_id:
                 return "Error: No valid lakehouse ID found"
         
         # Try different API endpoints to see if files are present
         endpoints_to_try = [
-            f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/files",
-            f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/items",
-            f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/items"
+            f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/files",
+            f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}/items",
+            f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/items"
         ]
         
+        client = get_rest_client()
         results = {}
         for endpoint in endpoints_to_try:
             try:
-                response = requests.get(endpoint, headers=headers, timeout=30)
+                response = client.get(endpoint, access_token)
                 results[endpoint] = {
                     "status_code": response.status_code,
                     "response": response.json() if response.status_code == 200 else response.text[:200]
@@ -463,24 +344,60 @@ def list_lakehouse_files(workspace_id: str, lakehouse_id: str = None) -> str:
             except Exception as e:
                 results[endpoint] = {"error": str(e)}
         
-        return json.dumps(results, indent=2)
+        return encode_response(results, "list_lakehouse_files")
             
     except Exception as e:
         return f"Error: Unexpected error occurred - {str(e)}"
 
-def get_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = None, lakehouse_name: str = None) -> str:
+def _sql_endpoint_cache_keys(workspace_id: str, lakehouse_id: str = None, lakehouse_name: str = None) -> list:
+    workspace_key = workspace_id.strip().lower()
+    keys = []
+    if lakehouse_id:
+        keys.append((workspace_key, "id", lakehouse_id.strip().lower()))
+    if lakehouse_name:
+        keys.append((workspace_key, "name", lakehouse_name.strip().lower()))
+    return keys
+
+
+def invalidate_sql_endpoint_cache(workspace_id: str = None, lakehouse_id: str = None, lakehouse_name: str = None) -> None:
+    """Drops cached SQL endpoint resolutions.
+    
+    With no arguments the whole cache is cleared; with only workspace_id every lakehouse in that workspace is
+    dropped; otherwise the lakehouse matching lakehouse_id or lakehouse_name is dropped under both of its keys.
+    """
+    with _sql_endpoint_cache_lock:
+        if not workspace_id:
+            _sql_endpoint_cache.clear()
+            return
+        workspace_key = workspace_id.strip().lower()
+        if not lakehouse_id and not lakehouse_name:
+            for key in [k for k in _sql_endpoint_cache if k[0] == workspace_key]:
+                del _sql_endpoint_cache[key]
+            return
+        entries = [_sql_endpoint_cache.pop(key, None) for key in _sql_endpoint_cache_keys(workspace_id, lakehouse_id, lakehouse_name)]
+        # Drop the sibling key (id <-> name) that points at the same resolution
+        for entry in entries:
+            if entry is not None:
+                for key in [k for k, v in _sql_endpoint_cache.items() if v[1] == entry[1]]:
+                    del _sql_endpoint_cache[key]
+
+
+def get_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = None, lakehouse_name: str = None, force_refresh: bool = False) -> str:
     """Gets the SQL endpoint connection string for a specified Fabric Lakehouse.
     
+    Successful resolutions are cached per workspace and lakehouse (by ID and by name) for
+    SQL_ENDPOINT_CACHE_TTL_SECONDS, so repeated SQL queries against one lakehouse do not
+    call the Fabric API each time.
+    
     Args:
         workspace_id (str): The unique identifier of the Fabric workspace
         lakehouse_id (str, optional): The unique identifier of the Lakehouse
         lakehouse_name (str, optional): The display name of the Lakehouse
+        force_refresh (bool, optional): Bypass the cache and resolve through the Fabric API
         
     Returns:
         str: JSON string containing SQL endpoint connection information or error message
     """
-    import requests
-    
     # Input validation - ensure workspace_id is provided and not empty
     if not workspace_id or not workspace_id.strip():
         return "Error: Workspace ID is required and cannot be empty"
@@ -489,25 +406,41 @@ def get_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = N
     if not lakehouse_id and not lakehouse_name:
         return "Error: Either lakehouse_id or lakehouse_name must be provided"
     
+    cache_keys = _sql_endpoint_cache_keys(workspace_id, lakehouse_id, lakehouse_name)
+    if not force_refresh:
+        now = time.monotonic()
+        with _sql_endpoint_cache_lock:
+            for key in cache_keys:
+                entry = _sql_endpoint_cache.get(key)
+                if entry and entry[0] > now:
+                    return entry[1]
+    
+    result = _resolve_lakehouse_sql_connection_string(workspace_id, lakehouse_id, lakehouse_name)
+    if result.startswith("{"):
+        data = json.loads(result)
+        expires_at = time.monotonic() + SQL_ENDPOINT_CACHE_TTL_SECONDS
+        with _sql_endpoint_cache_lock:
+            for key in cache_keys + _sql_endpoint_cache_keys(workspace_id, data.get("lakehouse_id"), data.get("lakehouse_name")):
+                _sql_endpoint_cache[key] = (expires_at, result)
+    return result
+
+
+def _resolve_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = None, lakehouse_name: str = None) -> str:
+    """Resolves the SQL endpoint of a lakehouse through the Fabric REST API (uncached)."""
+    import requests
+    
     try:
         # Get authentication token for Fabric API access
         access_token = get_access_token()
         if not access_token:
             return "Error: No valid access token available"
         
-        # Set up authorization header with Bearer token
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
         # If lakehouse_name is provided but not lakehouse_id, find the lakehouse by name
         if lakehouse_name and not lakehouse_id:
-            # List all lakehouses in the workspace to find the one with matching name
-            lakehouses_url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses"
-            lakehouses_response = requests.get(lakehouses_url, headers=headers, timeout=30)
-            
-            if lakehouses_response.status_code != 200:
-                return f"Error listing lakehouses: HTTP {lakehouses_response.status_code} - {lakehouses_response.text}"
-            
-            lakehouses = lakehouses_response.json().get("value", [])
+            try:
+                lakehouses = _list_lakehouse_items(workspace_id, access_token)
+            except RestApiError as e:
+                return f"Error listing lakehouses: HTTP {e.status_code} - {e.text}"
             if not lakehouses:
                 return "No lakehouses found in this workspace."
             
@@ -524,8 +457,8 @@ def get_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = N
                 return f"Lakehouse '{lakehouse_name}' not found. Available lakehouses: {', '.join(available_names)}"
         
         # Get specific lakehouse details to extract SQL endpoint information
-        lakehouse_url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}"
-        response = requests.get(lakehouse_url, headers=headers, timeout=30)
+        lakehouse_url = f"{FABRIC_API_BASE}/workspaces/{workspace_id.strip()}/lakehouses/{lakehouse_id.strip()}"
+        response = get_rest_client().get(lakehouse_url, access_token)
         
         # Handle different HTTP status codes
         if response.status_code == 200:
@@ -562,7 +495,7 @@ def get_lakehouse_sql_connection_string(workspace_id: str, lakehouse_id: str = N
                     "connection_string_template": f"Data Source={server_name};Initial Catalog={{database_name}};Integrated Security=True;"
                 }
             
-            return json.dumps(connection_info, indent=2)
+            return dumps(connection_info)
             
         elif response.status_code == 401:
             return "Error: Unauthorized - Invalid or expired access token"
@@ -605,39 +538,14 @@ def list_lakehouses(workspace_id: str) -> str:
         if not access_token:
             return "Error: No valid access token available"
         
-        # Construct API endpoint URL for listing lakehouses
-        url = f"https://api.fabric.microsoft.com/v1/workspaces/{workspace_id.strip()}/lakehouses"
-        
-        # Set up authorization header with Bearer token
-        headers = {"Authorization": f"Bearer {access_token}"}
-        
-        # Make the API request with 30-second timeout to prevent hanging
-        response = requests.get(url, headers=headers, timeout=30)
-        
-        # Handle different HTTP status codes with specific error messages
-        if response.status_code == 200:
-            # Success - parse the JSON response
-            lakehouses = response.json().get("value", [])
-            if not lakehouses:
-                return "No lakehouses found in this workspace."
-            # Return formatted JSON with proper indentation
-            return json.dumps(lakehouses, indent=2)
-        elif response.status_code == 401:
-            # Authentication failed - token is invalid or expired
-            return "Error: Unauthorized - Invalid or expired access token"
-        elif response.status_code == 403:
-            # Authorization failed - user doesn't have permission
-            return "Error: Forbidden - You don't have permission to access this workspace"
-        elif response.status_code == 404:
-            # Workspace not found
-            return f"Error: Workspace with ID '{workspace_id}' not found"
-        elif response.status_code == 429:
-            # Rate limiting - too many requests
-            return "Error: Too many requests - Please try again later"
-        else:
-            # Other HTTP errors - return status code and response text
-            return f"Error: HTTP {response.status_code} - {response.text}"
-            
+        lakehouses = _list_lakehouse_items(workspace_id, access_token)
+        if not lakehouses:
+            return "No lakehouses found in this workspace."
+        # Return formatted JSON with proper indentation
+        return encode_response(lakehouses, "list_lakehouses")
+    
+    except RestApiError as e:
+        return _http_error_message(e, "workspace", f"Error: Workspace with ID '{workspace_id}' not found")
     # Handle specific request exceptions with informative error messages
     except requests.exceptions.Timeout:
         # Request took longer than 30 seconds
@@ -12,6 +12,10 @@ import json
 import logging
 from typing import List, Dict, Optional, Any
 
+from core.dax_query import limit_dax_query
+from core.local_session import get_local_session
+from core.response_encoder import encode_response
+
 logger = logging.getLogger(__name__)
 
 class ImprovedDAXExplorer:
@@ -22,118 +26,84 @@ class ImprovedDAXExplorer:
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
         
-    def _safe_execute_dax(self, dax_query: str) -> Dict[str, Any]:
+    def _safe_execute_dax(self, dax_query: str, max_rows: int = 1000, offset: int = 0) -> Dict[str, Any]:
         """
         Safely execute a DAX query with comprehensive error handling.
         
+        The query is rewritten with TOPN/TOPNSKIP so the engine only produces
+        the rows that are returned.
+        
         Args:
             dax_query: DAX query to execute
+            max_rows: Maximum number of rows to return (safety limit to prevent memory issues)
+            offset: Number of rows to skip
             
         Returns:
             Dictionary with execution results or error information
         """
+        session = get_local_session(self.connection_string)
         try:
-            import clr
-            import os
-            
-            # Add references to Analysis Services libraries
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            dotnet_dir = os.path.join(os.path.dirname(current_dir), "dotnet")
+            # Open (or reuse) the session's connection first so connection errors are reported as such
+            with session.connection():
+                pass
+        except Exception as connection_error:
+            return self._connection_error(connection_error)
+        
+        try:
+            limited = limit_dax_query(dax_query, max_rows, offset)
+            # Read typed columns; unreadable cells come back as "<read_error: ...>"
+            result = session.execute(limited.query, max_rows=max_rows, skip_rows=limited.client_skip)
+            columns = [
+                {'name': column['name'], 'index': column['index'], 'type': column['type']}
+                for column in result.column_info()
+            ]
             
-            clr.AddReference(os.path.join(dotnet_dir, "Microsoft.AnalysisServices.AdomdClient.dll"))
-            from Microsoft.AnalysisServices.AdomdClient import AdomdConnection
+            return {
+                'success': True,
+                'connection_string': self.connection_string,
+                'dax_query': dax_query,
+                'columns': columns,
+                'total_rows': result.row_count,
+                'rows': result.to_records(),
+                'truncated': result.truncated,
+                'executed_query': limited.query,
+                'server_row_limit': limited.summary(),
+                'method': 'Improved DAX execution'
+            }
             
-            # Connect to local Power BI Desktop
-            conn = AdomdConnection(self.connection_string)
-            conn.Open()
+        except Exception as query_error:
+            error_msg = str(query_error)
+            logger.error(f"DAX query execution error: {error_msg}")
             
-            try:
-                # Execute DAX query
-                cmd = conn.CreateCommand()
-                cmd.CommandText = dax_query
-                
-                reader = cmd.ExecuteReader()
-                
-                # Get column information
-                columns = []
-                for i in range(reader.FieldCount):
-                    columns.append({
-                        'name': reader.GetName(i),
-                        'index': i,
-                        'type': str(reader.GetFieldType(i)) if reader.GetFieldType(i) else 'Unknown'
-                    })
-                
-                # Read data rows with improved error handling
-                rows = []
-                row_count = 0
-                max_rows = 1000  # Safety limit to prevent memory issues
-                
-                while reader.Read() and row_count < max_rows:
-                    row = {}
-                    for i in range(reader.FieldCount):
-                        column_name = reader.GetName(i)
-                        try:
-                            value = reader[i]
-                            if value is None:
-                                row[column_name] = None
-                            elif hasattr(value, 'isoformat'):  # DateTime objects
-                                row[column_name] = value.isoformat()
-                            else:
-                                row[column_name] = str(value)
-                        except Exception as col_error:
-                            logger.warning(f"Error reading column {column_name}: {str(col_error)}")
-                            row[column_name] = f"<read_error: {str(col_error)}>"
-                    
-                    rows.append(row)
-                    row_count += 1
-                
-                reader.Close()
-                conn.Close()
-                
-                return {
-                    'success': True,
-                    'connection_string': self.connection_string,
-                    'dax_query': dax_query,
-                    'columns': columns,
-                    'total_rows': row_count,
-                    'rows': rows,
-                    'truncated': row_count >= max_rows,
-                    'method': 'Improved DAX execution'
-                }
-                
-            except Exception as query_error:
-                conn.Close()
-                error_msg = str(query_error)
-                logger.error(f"DAX query execution error: {error_msg}")
-                
-                # Provide helpful error suggestions
-                suggestions = self._analyze_dax_error(error_msg, dax_query)
-                
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'error_type': 'query_execution',
-                    'suggestions': suggestions,
-                    'dax_query': dax_query,
-                    'connection_string': self.connection_string
-                }
-                
-        except Exception as connection_error:
-            error_msg = str(connection_error)
-            logger.error(f"Connection error: {error_msg}")
+            # Provide helpful error suggestions
+            suggestions = self._analyze_dax_error(error_msg, dax_query)
             
             return {
                 'success': False,
                 'error': error_msg,
-                'error_type': 'connection_error',
-                'suggestions': [
-                    "Verify Power BI Desktop is running",
-                    "Check if the port number is correct",
-                    "Ensure the connection string format is valid"
-                ],
+                'error_type': 'query_execution',
+                'suggestions': suggestions,
+                'dax_query': dax_query,
                 'connection_string': self.connection_string
             }
     
+    def _connection_error(self, connection_error: Exception) -> Dict[str, Any]:
+        """Error result for a connection that could not be opened"""
+        error_msg = str(connection_error)
+        logger.error(f"Connection error: {error_msg}")
+        
+        return {
+            'success': False,
+            'error': error_msg,
+            'error_type': 'connection_error',
+            'suggestions': [
+                "Verify Power BI Desktop is running",
+                "Check if the port number is correct",
+                "Ensure the connection string format is valid"
+            ],
+            'connection_string': self.connection_string
+        }
+    
     def _analyze_dax_error(self, error_msg: str, dax_query: str) -> List[str]:
         """
         Analyze DAX error and provide helpful suggestions.
@@ -195,13 +165,14 @@ class ImprovedDAXExplorer:
         
         return suggestions
     
-    def execute_table_query(self, table_name: str, max_rows: int = 10) -> Dict[str, Any]:
+    def execute_table_query(self, table_name: str, max_rows: int = 10, offset: int = 0) -> Dict[str, Any]:
         """
         Execute a simple table query with proper table reference handling.
         
         Args:
             table_name: Name of the table to query
             max_rows: Maximum number of rows to return
+            offset: Number of rows to skip
             
         Returns:
             Dictionary with query results
@@ -214,12 +185,10 @@ class ImprovedDAXExplorer:
         ]
         
         for table_ref in table_formats:
-            dax_query = f"""
-EVALUATE
-TOPN({max_rows}, {table_ref})
-"""
+            # Limited to max_rows by the TOPN/TOPNSKIP rewrite
+            dax_query = f"EVALUATE {table_ref}"
             
-            result = self._safe_execute_dax(dax_query.strip())
+            result = self._safe_execute_dax(dax_query, max_rows=max_rows, offset=offset)
             
             if result.get('success'):
                 result['table_reference_used'] = table_ref
@@ -295,34 +264,36 @@ TOPN({max_rows}, {table_ref})
             }
 
 
-def execute_improved_dax_query(connection_string: str, dax_query: str) -> str:
+def execute_improved_dax_query(connection_string: str, dax_query: str, max_rows: int = 1000, offset: int = 0) -> str:
     """
     Execute a DAX query using the improved explorer.
     
     Args:
         connection_string: Connection string for local Power BI Desktop
         dax_query: DAX query to execute
+        max_rows: Maximum number of rows to return
+        offset: Number of rows to skip
         
     Returns:
         JSON string with query results
     """
     try:
         explorer = ImprovedDAXExplorer(connection_string)
-        result = explorer._safe_execute_dax(dax_query)
-        return json.dumps(result, indent=2)
+        result = explorer._safe_execute_dax(dax_query, max_rows, offset)
+        return encode_response(result, "execute_improved_dax_query")
         
     except Exception as e:
         logger.error(f"Error in improved DAX query execution: {str(e)}")
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': str(e),
             'error_type': 'explorer_error',
             'connection_string': connection_string,
             'dax_query': dax_query
-        }, indent=2)
+        }, "execute_improved_dax_query")
 
 
-def query_table_safely(connection_string: str, table_name: str, max_rows: int = 10) -> str:
+def query_table_safely(connection_string: str, table_name: str, max_rows: int = 10, offset: int = 0) -> str:
     """
     Safely query a table with automatic table reference handling.
     
@@ -330,24 +301,25 @@ def query_table_safely(connection_string: str, table_name: str, max_rows: int =
         connection_string: Connection string for local Power BI Desktop
         table_name: Name of the table to query
         max_rows: Maximum number of rows to return
+        offset: Number of rows to skip
         
     Returns:
         JSON string with query results
     """
     try:
         explorer = ImprovedDAXExplorer(connection_string)
-        result = explorer.execute_table_query(table_name, max_rows)
-        return json.dumps(result, indent=2)
+        result = explorer.execute_table_query(table_name, max_rows, offset)
+        return encode_response(result, "query_table_safely")
         
     except Exception as e:
         logger.error(f"Error in safe table query: {str(e)}")
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': str(e),
             'error_type': 'table_query_error',
             'table_name': table_name,
             'connection_string': connection_string
-        }, indent=2)
+        }, "query_table_safely")
 
 
 def explore_model_structure(connection_string: str) -> str:
@@ -367,27 +339,27 @@ def explore_model_structure(connection_string: str) -> str:
         tables_result = explorer.get_available_tables()
         
         if not tables_result.get('success'):
-            return json.dumps(tables_result, indent=2)
+            return encode_response(tables_result, "explore_model_structure")
         
         # Get columns 
         columns_result = explorer.get_table_columns()
         
-        return json.dumps({
+        return encode_response({
             'success': True,
             'connection_string': connection_string,
             'tables': tables_result,
             'columns': columns_result,
             'method': 'Model structure exploration'
-        }, indent=2)
+        }, "explore_model_structure")
         
     except Exception as e:
         logger.error(f"Error exploring model structure: {str(e)}")
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': str(e),
             'error_type': 'structure_exploration_error',
             'connection_string': connection_string
-        }, indent=2)
+        }, "explore_model_structure")
 
 
 def get_local_tmsl_definition(connection_string: str) -> str:
@@ -426,12 +398,12 @@ def get_local_tmsl_definition(connection_string: str) -> str:
             # Get the database (there should be only one in Power BI Desktop)
             databases = server.Databases
             if databases.Count == 0:
-                return json.dumps({
+                return encode_response({
                     'success': False,
                     'error': 'No databases found in the local Power BI Desktop instance',
                     'connection_string': connection_string,
                     'error_type': 'no_databases'
-                }, indent=2)
+                }, "get_local_tmsl_definition")
             
             # Get the first (and typically only) database
             database = databases[0]
@@ -465,7 +437,7 @@ def get_local_tmsl_definition(connection_string: str) -> str:
             
             server.Disconnect()
             
-            return json.dumps({
+            return encode_response({
                 'success': True,
                 'connection_string': connection_string,
                 'server_info': server_info,
@@ -473,14 +445,14 @@ def get_local_tmsl_definition(connection_string: str) -> str:
                 'tmsl_definition': tmsl_definition,
                 'retrieval_method': 'Local Power BI Desktop TMSL extraction',
                 'message': f'Successfully retrieved TMSL definition for database "{database_name}"'
-            }, indent=2)
+            }, "get_local_tmsl_definition")
             
         except Exception as db_error:
             server.Disconnect()
             error_msg = str(db_error)
             logger.error(f"Error accessing database: {error_msg}")
             
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': error_msg,
                 'error_type': 'database_access_error',
@@ -491,13 +463,13 @@ def get_local_tmsl_definition(connection_string: str) -> str:
                     'Ensure the connection string port is correct',
                     'Try refreshing the model in Power BI Desktop'
                 ]
-            }, indent=2)
+            }, "get_local_tmsl_definition")
             
     except Exception as connection_error:
         error_msg = str(connection_error)
         logger.error(f"Connection error getting TMSL: {error_msg}")
         
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': error_msg,
             'error_type': 'connection_error',
@@ -508,7 +480,7 @@ def get_local_tmsl_definition(connection_string: str) -> str:
                 'Ensure the Analysis Services instance is accessible',
                 'Try detecting local instances first to get the correct port'
             ]
-        }, indent=2)
+        }, "get_local_tmsl_definition")
 
 
 def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str, validate_only: bool = False) -> str:
@@ -550,7 +522,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
             
             # Check if it's in the correct createOrReplace format
             if 'createOrReplace' not in tmsl_obj:
-                return json.dumps({
+                return encode_response({
                     'success': False,
                     'error': 'TMSL must be in createOrReplace format',
                     'error_type': 'validation_error',
@@ -559,18 +531,18 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                         'Use the format: {"createOrReplace": {"database": {...}}}',
                         'Check the TMSL structure matches expected format'
                     ]
-                }, indent=2)
+                }, "update_local_model_using_tmsl")
             
             if validate_only:
-                return json.dumps({
+                return encode_response({
                     'success': True,
                     'message': 'TMSL validation successful - structure is valid',
                     'connection_string': connection_string,
                     'validation_only': True
-                }, indent=2)
+                }, "update_local_model_using_tmsl")
                 
         except json.JSONDecodeError as json_error:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Invalid JSON in TMSL definition: {str(json_error)}',
                 'error_type': 'json_validation_error',
@@ -579,7 +551,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                     'Validate JSON structure using a JSON validator',
                     'Ensure all strings are properly quoted'
                 ]
-            }, indent=2)
+            }, "update_local_model_using_tmsl")
         
         # Connect to the local Power BI Desktop instance
         server = Server()
@@ -588,7 +560,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
             server.Connect(connection_string)
             
             if len(server.Databases) == 0:
-                return json.dumps({
+                return encode_response({
                     'success': False,
                     'error': 'No databases found on the server',
                     'error_type': 'database_access_error',
@@ -598,7 +570,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                         'Check that the model is loaded properly',
                         'Verify the connection string is correct'
                     ]
-                }, indent=2)
+                }, "update_local_model_using_tmsl")
             
             # Execute the TMSL update
             logger.info("Executing TMSL update...")
@@ -623,7 +595,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                                     error_messages.append(str(message))
                     
                     if has_errors:
-                        return json.dumps({
+                        return encode_response({
                             'success': False,
                             'error': 'TMSL execution failed with errors',
                             'error_type': 'tmsl_execution_error',
@@ -635,19 +607,20 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                                 'Ensure measure expressions are valid DAX',
                                 'Check for naming conflicts or reserved words'
                             ]
-                        }, indent=2)
+                        }, "update_local_model_using_tmsl")
                 
-                # Success!
-                return json.dumps({
+                # Success! Explorers must not serve the metadata cached before the update
+                get_local_session(connection_string).invalidate()
+                return encode_response({
                     'success': True,
                     'message': 'TMSL update completed successfully',
                     'connection_string': connection_string,
                     'execution_method': 'Local Power BI Desktop TMSL update'
-                }, indent=2)
+                }, "update_local_model_using_tmsl")
                 
             except Exception as tmsl_error:
                 error_msg = str(tmsl_error)
-                return json.dumps({
+                return encode_response({
                     'success': False,
                     'error': f'TMSL execution error: {error_msg}',
                     'error_type': 'tmsl_execution_error',
@@ -658,13 +631,13 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                         'Ensure DAX expressions in measures are correct',
                         'Check for circular references or dependencies'
                     ]
-                }, indent=2)
+                }, "update_local_model_using_tmsl")
                 
         except Exception as connection_error:
             error_msg = str(connection_error)
             logger.error(f"Connection error in local TMSL update: {error_msg}")
             
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Failed to connect to local Power BI Desktop: {error_msg}',
                 'error_type': 'connection_error',
@@ -675,7 +648,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                     'Ensure the Analysis Services instance is accessible',
                     'Try detecting local instances first to get the correct port'
                 ]
-            }, indent=2)
+            }, "update_local_model_using_tmsl")
             
         finally:
             try:
@@ -688,7 +661,7 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
         error_msg = str(general_error)
         logger.error(f"General error in local TMSL update: {error_msg}")
         
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': f'Unexpected error: {error_msg}',
             'error_type': 'general_error',
@@ -698,4 +671,4 @@ def update_local_model_using_tmsl(connection_string: str, tmsl_definition: str,
                 'Verify Python.NET (pythonnet) is installed correctly',
                 'Ensure all required dependencies are available'
             ]
-        }, indent=2)
+        }, "update_local_model_using_tmsl")
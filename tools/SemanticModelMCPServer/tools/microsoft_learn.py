@@ -1,9 +1,8 @@
 # Microsoft Learn API integration for Semantic Model MCP Server
-import json
-import requests
 from typing import Optional, List, Dict, Any
 from urllib.parse import quote, urljoin
 import logging
+from core.response_encoder import encode_response
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +12,21 @@ class MicrosoftLearnAPI:
     BASE_URL = "https://learn.microsoft.com/api"
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Semantic-Model-MCP-Server/1.0',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        })
+        self._session = None
+    
+    @property
+    def session(self):
+        """HTTP session, created (and requests imported) on first use"""
+        if self._session is None:
+            import requests
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Semantic-Model-MCP-Server/1.0',
+                'Accept': 'application/json',
+                'Content-Type': 'application/json'
+            })
+            self._session = session
+        return self._session
     
     def search_content(self, query: str, locale: str = "en-us", top: int = 10, 
                       content_type: Optional[str] = None) -> Dict[str, Any]:
@@ -231,7 +239,7 @@ def search_microsoft_learn(query: str, locale: str = "en-us", top: int = 10,
         JSON string with search results
     """
     result = learn_api.search_content(query, locale, top, content_type)
-    return json.dumps(result, indent=2)
+    return encode_response(result, "search_microsoft_learn")
 
 def get_microsoft_learn_paths(locale: str = "en-us", top: int = 20) -> str:
     """
@@ -245,7 +253,7 @@ def get_microsoft_learn_paths(locale: str = "en-us", top: int = 20) -> str:
         JSON string with learning paths
     """
     result = learn_api.get_learning_paths(locale, top)
-    return json.dumps(result, indent=2)
+    return encode_response(result, "get_microsoft_learn_paths")
 
 def get_microsoft_learn_modules(locale: str = "en-us", top: int = 20, 
                                learning_path_id: Optional[str] = None) -> str:
@@ -261,7 +269,7 @@ def get_microsoft_learn_modules(locale: str = "en-us", top: int = 20,
         JSON string with modules
     """
     result = learn_api.get_modules(locale, top, learning_path_id)
-    return json.dumps(result, indent=2)
+    return encode_response(result, "get_microsoft_learn_modules")
 
 def get_microsoft_learn_content(content_url: str, locale: str = "en-us") -> str:
     """
@@ -275,4 +283,4 @@ def get_microsoft_learn_content(content_url: str, locale: str = "en-us") -> str:
         JSON string with content details
     """
     result = learn_api.get_content_by_url(content_url, locale)
-    return json.dumps(result, indent=2)
+    return encode_response(result, "get_microsoft_learn_content")
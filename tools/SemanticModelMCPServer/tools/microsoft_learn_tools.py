@@ -6,8 +6,8 @@ and retrieving educational content.
 """
 
 from fastmcp import FastMCP
-import json
 from tools.microsoft_learn import search_microsoft_learn, get_microsoft_learn_paths, get_microsoft_learn_modules, get_microsoft_learn_content
+from core.response_encoder import encode_response
 
 def register_microsoft_learn_tools(mcp: FastMCP):
     """Register all Microsoft Learn related MCP tools"""
@@ -27,13 +27,13 @@ def register_microsoft_learn_tools(mcp: FastMCP):
         """
         try:
             result = search_microsoft_learn(query, locale, top, content_type)
-            return json.dumps(result, indent=2)
+            return result  # Already a JSON string
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error searching Microsoft Learn content: {str(e)}',
                 'error_type': 'microsoft_learn_search_error'
-            })
+            }, "search_learn_microsoft_content")
 
     @mcp.tool
     def get_learn_microsoft_paths(locale: str = "en-us", top: int = 20) -> str:
@@ -48,13 +48,13 @@ def register_microsoft_learn_tools(mcp: FastMCP):
         """
         try:
             result = get_microsoft_learn_paths(locale, top)
-            return json.dumps(result, indent=2)
+            return result  # Already a JSON string
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting Microsoft Learn paths: {str(e)}',
                 'error_type': 'microsoft_learn_paths_error'
-            })
+            }, "get_learn_microsoft_paths")
 
     @mcp.tool
     def get_learn_microsoft_modules(locale: str = "en-us", top: int = 20, learning_path_id: str = None) -> str:
@@ -70,13 +70,13 @@ def register_microsoft_learn_tools(mcp: FastMCP):
         """
         try:
             result = get_microsoft_learn_modules(locale, top, learning_path_id)
-            return json.dumps(result, indent=2)
+            return result  # Already a JSON string
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting Microsoft Learn modules: {str(e)}',
                 'error_type': 'microsoft_learn_modules_error'
-            })
+            }, "get_learn_microsoft_modules")
 
     @mcp.tool
     def get_learn_microsoft_content(content_url: str, locale: str = "en-us") -> str:
@@ -91,10 +91,10 @@ def register_microsoft_learn_tools(mcp: FastMCP):
         """
         try:
             result = get_microsoft_learn_content(content_url, locale)
-            return json.dumps(result, indent=2)
+            return result  # Already a JSON string
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting Microsoft Learn content: {str(e)}',
                 'error_type': 'microsoft_learn_content_error'
-            })
+            }, "get_learn_microsoft_content")
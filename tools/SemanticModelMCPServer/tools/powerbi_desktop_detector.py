@@ -5,12 +5,12 @@ This module provides functionality to detect running Power BI Desktop instances
 and their Analysis Services port numbers for local development and testing.
 """
 
-import json
 import subprocess
 import re
 import logging
 import psutil
 from typing import List, Dict, Optional, Tuple
+from core.response_encoder import encode_response
 
 logger = logging.getLogger(__name__)
 
@@ -432,17 +432,17 @@ def detect_powerbi_desktop_instances() -> str:
             }
         }
         
-        return json.dumps(result, indent=2, default=str)
+        return encode_response(result, "detect_powerbi_desktop_instances")
         
     except Exception as e:
         logger.error(f"Error detecting Power BI Desktop instances: {str(e)}")
-        return json.dumps({
+        return encode_response({
             'success': False,
             'error': str(e),
             'powerbi_desktop_instances': [],
             'analysis_services_instances': [],
             'total_instances': 0
-        }, indent=2)
+        }, "detect_powerbi_desktop_instances")
 
 def test_powerbi_desktop_connection(port: int) -> str:
     """
@@ -456,4 +456,4 @@ def test_powerbi_desktop_connection(port: int) -> str:
     """
     detector = PowerBIDesktopDetector()
     result = detector.test_connection(port)
-    return json.dumps(result, indent=2, default=str)
+    return encode_response(result, "test_powerbi_desktop_connection")
@@ -10,19 +10,24 @@ import json
 from tools.powerbi_desktop_detector import detect_powerbi_desktop_instances, test_powerbi_desktop_connection
 from tools.fast_powerbi_detector import detect_powerbi_desktop_instances_fast
 from tools.ultra_fast_powerbi_detector import detect_powerbi_desktop_instances_ultra_fast
+from tools.unified_powerbi_detector import UnifiedPowerBIDesktopDetector, detect_powerbi_desktop_instances_unified
 from tools.improved_dax_explorer import get_local_tmsl_definition, update_local_model_using_tmsl
 from tools.simple_dax_explorer import explore_local_powerbi_simple, execute_local_dax_query
+from core.response_encoder import encode_response
 
 def register_powerbi_desktop_tools(mcp: FastMCP):
     """Register all Power BI Desktop related MCP tools"""
 
     @mcp.tool
-    def detect_local_powerbi_desktop() -> str:
+    def detect_local_powerbi_desktop(force_rescan: bool = False) -> str:
         """Detect running Power BI Desktop instances and their Analysis Services connection information.
 
         This tool scans for running Power BI Desktop processes and their associated Analysis Services 
-        instances to enable local development and testing scenarios. Uses optimized fast detection
-        methods for improved performance.
+        instances to enable local development and testing scenarios. The detector keeps its view
+        between calls and only inspects processes started since the previous call.
+
+        Args:
+            force_rescan: Inspect every process again instead of updating the previous view
 
         Returns:
             JSON string containing:
@@ -33,16 +38,15 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             - Instructions for connecting to local instances
         """
         try:
-            # Use the ultra-fast detector for maximum performance
-            result = detect_powerbi_desktop_instances_ultra_fast()
-            return json.dumps(result, indent=2, default=str)  # Convert dict to JSON string
+            result = detect_powerbi_desktop_instances_unified(force_rescan)
+            return encode_response(result, "detect_local_powerbi_desktop")
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error detecting Power BI Desktop instances: {str(e)}',
                 'error_type': 'powerbi_detection_error',
                 'fallback_attempted': False
-            })
+            }, "detect_local_powerbi_desktop")
 
     @mcp.tool
     def test_local_powerbi_connection(port: int) -> str:
@@ -63,13 +67,13 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
         """
         try:
             result = test_powerbi_desktop_connection(port)
-            return json.dumps(result, indent=2)
+            return result  # Already a JSON string
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error testing Power BI Desktop connection: {str(e)}',
                 'error_type': 'powerbi_connection_error'
-            })
+            }, "test_local_powerbi_connection")
 
     @mcp.tool
     def explore_local_powerbi_tables(connection_string: str) -> str:
@@ -85,11 +89,11 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             result = explore_local_powerbi_simple(connection_string, 'tables')
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error exploring local Power BI tables: {str(e)}',
                 'error_type': 'powerbi_tables_error'
-            })
+            }, "explore_local_powerbi_tables")
 
     @mcp.tool
     def explore_local_powerbi_columns(connection_string: str, table_name: str = None) -> str:
@@ -107,11 +111,11 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             result = explore_local_powerbi_simple(connection_string, operation)
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error exploring local Power BI columns: {str(e)}',
                 'error_type': 'powerbi_columns_error'
-            })
+            }, "explore_local_powerbi_columns")
 
     @mcp.tool
     def explore_local_powerbi_measures(connection_string: str) -> str:
@@ -127,64 +131,72 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             result = explore_local_powerbi_simple(connection_string, 'measures')
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error exploring local Power BI measures: {str(e)}',
                 'error_type': 'powerbi_measures_error'
-            })
+            }, "explore_local_powerbi_measures")
 
     @mcp.tool
-    def execute_local_powerbi_dax(connection_string: str, dax_query: str) -> str:
+    def execute_local_powerbi_dax(connection_string: str, dax_query: str, max_rows: int = 1000, offset: int = 0) -> str:
         """Execute a DAX query against a local Power BI Desktop model.
         
+        Each EVALUATE is wrapped in TOPN/TOPNSKIP (honoring its ORDER BY) so the engine only
+        produces the rows that are returned; 'truncated' tells whether more rows exist.
+        
         Args:
             connection_string: The connection string to the local Power BI Desktop instance
             dax_query: The DAX query to execute
+            max_rows: Maximum number of rows to return (default: 1000)
+            offset: Number of rows to skip, for paging through a result (default: 0)
             
         Returns:
             JSON string with query results including columns and data
         """
         try:
-            result = execute_local_dax_query(connection_string, dax_query)
+            result = execute_local_dax_query(connection_string, dax_query, max_rows, offset)
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error executing local Power BI DAX query: {str(e)}',
                 'error_type': 'powerbi_dax_error'
-            })
+            }, "execute_local_powerbi_dax")
 
     @mcp.tool
-    def query_local_powerbi_table(connection_string: str, table_name: str, max_rows: int = 10) -> str:
+    def query_local_powerbi_table(connection_string: str, table_name: str, max_rows: int = 10, offset: int = 0) -> str:
         """Query data from a specific table in a local Power BI Desktop model.
         
         Args:
             connection_string: The connection string to the local Power BI Desktop instance
             table_name: The name of the table to query
             max_rows: Maximum number of rows to return (default: 10)
+            offset: Number of rows to skip, for paging through the table (default: 0)
             
         Returns:
             JSON string with table data including columns and sample rows
         """
         try:
-            # Construct a simple DAX query to get table data
-            dax_query = f"EVALUATE TOPN({max_rows}, '{table_name}')"
-            result = execute_local_dax_query(connection_string, dax_query)
+            # Construct a simple DAX query to get table data; limited to max_rows by the TOPN/TOPNSKIP rewrite
+            quoted_name = table_name.replace("'", "''")
+            dax_query = f"EVALUATE '{quoted_name}'"
+            result = execute_local_dax_query(connection_string, dax_query, max_rows, offset)
             
             # Parse the result and add table context
             result_data = json.loads(result)
             if result_data.get('success'):
                 result_data['table_name'] = table_name
                 result_data['max_rows_requested'] = max_rows
+                result_data['offset'] = offset
                 result_data['query_type'] = 'table_sample'
             
-            return json.dumps(result_data, indent=2)
+            return encode_response(result_data, "query_local_powerbi_table")
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error querying local Power BI table: {str(e)}',
                 'error_type': 'powerbi_table_query_error'
-            })
+            }, "query_local_powerbi_table")
 
     @mcp.tool
     def explore_local_powerbi_model_structure(connection_string: str) -> str:
@@ -225,13 +237,13 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
                 }
             }
             
-            return json.dumps(structure, indent=2)
+            return encode_response(structure, "explore_local_powerbi_model_structure")
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error exploring local Power BI model structure: {str(e)}',
                 'error_type': 'powerbi_structure_error'
-            })
+            }, "explore_local_powerbi_model_structure")
 
     @mcp.tool
     def get_local_powerbi_tmsl_definition(connection_string: str) -> str:
@@ -250,11 +262,11 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             result = get_local_tmsl_definition(connection_string)
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error getting local Power BI TMSL definition: {str(e)}',
                 'error_type': 'tmsl_retrieval_error'
-            })
+            }, "get_local_powerbi_tmsl_definition")
 
     @mcp.tool
     def update_local_powerbi_tmsl_definition(connection_string: str, tmsl_definition: str, validate_only: bool = False) -> str:
@@ -275,11 +287,11 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
             result = update_local_model_using_tmsl(connection_string, tmsl_definition, validate_only)
             return result
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error updating local Power BI Desktop model: {str(e)}',
                 'error_type': 'tmsl_update_error'
-            })
+            }, "update_local_powerbi_tmsl_definition")
 
     @mcp.tool
     def compare_analysis_services_connections() -> str:
@@ -359,176 +371,135 @@ def register_powerbi_desktop_tools(mcp: FastMCP):
                 }
             }
             
-            return json.dumps(result, indent=2)
+            return encode_response(result, "compare_analysis_services_connections")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error comparing connection types: {str(e)}',
                 'error_type': 'connection_comparison_error'
-            })
+            }, "compare_analysis_services_connections")
 
     @mcp.tool
     def compare_powerbi_detection_methods() -> str:
-        """Compare performance between ultra-fast, fast, and standard Power BI Desktop detection methods.
+        """Compare performance between the unified incremental detector and the legacy Power BI Desktop detection methods.
         
-        This tool runs all three detection methods (ultra-fast optimized, fast netstat-based, 
-        and standard psutil-based) to provide comprehensive performance metrics and validate 
-        that all methods return consistent results.
+        This tool runs the unified detector twice (a full scan with a fresh detector, then an
+        incremental update of the shared one) and the legacy ultra-fast, fast and standard
+        detectors, to provide performance metrics and validate that all methods return
+        consistent results. For reproducible numbers on any OS, run
+        testing/benchmark_powerbi_detection.py, which drives the detectors with a fake process table.
         
         Returns:
             JSON string with:
-            - Performance comparison metrics for all three methods
-            - Detection results from each method
+            - Performance comparison metrics for all methods
             - Consistency analysis across methods
             - Recommendations for optimal usage
         """
         try:
             import time
             
+            methods = [
+                ('unified_full_scan', lambda: UnifiedPowerBIDesktopDetector().detect()),
+                ('unified_incremental', detect_powerbi_desktop_instances_unified),
+                ('ultra_fast_method', detect_powerbi_desktop_instances_ultra_fast),
+                ('fast_method', detect_powerbi_desktop_instances_fast),
+                ('standard_method', detect_powerbi_desktop_instances),
+            ]
+            # Make sure the shared detector has a view, so its entry measures an incremental update
+            detect_powerbi_desktop_instances_unified()
+            
             result = {
                 'comparison_timestamp': time.time(),
-                'methods_compared': ['ultra_fast_optimized', 'fast_netstat', 'standard_psutil'],
+                'methods_compared': [name for name, _ in methods],
                 'performance_metrics': {},
                 'consistency_analysis': {},
                 'recommendations': []
             }
             
-            # Test ultra-fast method
-            start_time = time.time()
-            try:
-                ultra_fast_result = detect_powerbi_desktop_instances_ultra_fast()
-                ultra_fast_time = (time.time() - start_time) * 1000
-                
-                result['performance_metrics']['ultra_fast_method'] = {
-                    'detection_time_ms': round(ultra_fast_time, 2),
-                    'success': ultra_fast_result.get('success', False),
-                    'instances_found': len(ultra_fast_result.get('powerbi_desktop_instances', [])),
-                    'as_instances_found': len(ultra_fast_result.get('analysis_services_instances', []))
-                }
-                
-            except Exception as e:
-                result['performance_metrics']['ultra_fast_method'] = {
-                    'error': str(e),
-                    'success': False
-                }
-            
-            # Test fast method
-            start_time = time.time()
-            try:
-                fast_result = detect_powerbi_desktop_instances_fast()
-                fast_time = (time.time() - start_time) * 1000
-                
-                result['performance_metrics']['fast_method'] = {
-                    'detection_time_ms': round(fast_time, 2),
-                    'success': fast_result.get('success', False),
-                    'instances_found': len(fast_result.get('powerbi_desktop_instances', [])),
-                    'as_instances_found': len(fast_result.get('analysis_services_instances', []))
-                }
-                
-            except Exception as e:
-                result['performance_metrics']['fast_method'] = {
-                    'error': str(e),
-                    'success': False
-                }
-            
-            # Test standard method
-            start_time = time.time()
-            try:
-                standard_result = detect_powerbi_desktop_instances()
-                standard_time = (time.time() - start_time) * 1000
-                
-                result['performance_metrics']['standard_method'] = {
-                    'detection_time_ms': round(standard_time, 2),
-                    'success': standard_result.get('success', False),
-                    'instances_found': len(standard_result.get('powerbi_desktop_instances', [])),
-                    'as_instances_found': len(standard_result.get('analysis_services_instances', []))
-                }
-                
-            except Exception as e:
-                result['performance_metrics']['standard_method'] = {
-                    'error': str(e),
-                    'success': False
-                }
+            for name, detect in methods:
+                start_time = time.perf_counter()
+                try:
+                    detection = detect()
+                    elapsed = (time.perf_counter() - start_time) * 1000
+                    if isinstance(detection, str):
+                        # The standard detector returns JSON text
+                        detection = json.loads(detection)
+                    result['performance_metrics'][name] = {
+                        'detection_time_ms': round(elapsed, 2),
+                        'success': detection.get('success', False),
+                        'instances_found': len(detection.get('powerbi_desktop_instances', [])),
+                        'as_instances_found': len(detection.get('analysis_services_instances', []))
+                    }
+                except Exception as e:
+                    result['performance_metrics'][name] = {
+                        'error': str(e),
+                        'success': False
+                    }
             
-            # Performance comparison analysis
-            ultra_fast_metrics = result['performance_metrics'].get('ultra_fast_method', {})
-            fast_metrics = result['performance_metrics'].get('fast_method', {})
-            standard_metrics = result['performance_metrics'].get('standard_method', {})
+            metrics = result['performance_metrics']
+            incremental = metrics.get('unified_incremental', {})
+            standard = metrics.get('standard_method', {})
             
-            if ultra_fast_metrics.get('success') and standard_metrics.get('success'):
-                ultra_fast_time = ultra_fast_metrics.get('detection_time_ms', 0)
-                standard_time = standard_metrics.get('detection_time_ms', 0)
+            if incremental.get('success') and standard.get('success'):
+                incremental_time = incremental.get('detection_time_ms', 0)
+                standard_time = standard.get('detection_time_ms', 0)
                 
-                if standard_time > 0 and ultra_fast_time > 0:
-                    speedup = round(standard_time / ultra_fast_time, 1)
-                    time_saved = round(standard_time - ultra_fast_time, 1)
-                    
+                if standard_time > 0 and incremental_time > 0:
+                    speedup = round(standard_time / incremental_time, 1)
+                    time_saved = round(standard_time - incremental_time, 1)
                     result['performance_comparison'] = {
-                        'ultra_fast_detection_time_ms': ultra_fast_time,
+                        'unified_incremental_detection_time_ms': incremental_time,
+                        'unified_full_scan_detection_time_ms': metrics.get('unified_full_scan', {}).get('detection_time_ms'),
                         'standard_detection_time_ms': standard_time,
                         'speedup_factor': f"{speedup}x faster",
                         'time_saved_ms': time_saved,
                         'performance_improvement': f"{round((time_saved / standard_time) * 100, 1)}% faster"
                     }
-                    
-                    # Add fast method comparison if available
-                    if fast_metrics.get('success'):
-                        fast_time = fast_metrics.get('detection_time_ms', 0)
-                        result['performance_comparison']['fast_detection_time_ms'] = fast_time
-                
-                # Consistency check across all successful methods
-                methods_data = []
-                for method_name, metrics in result['performance_metrics'].items():
-                    if metrics.get('success'):
-                        methods_data.append({
-                            'name': method_name,
-                            'instances': metrics.get('instances_found', 0),
-                            'as_instances': metrics.get('as_instances_found', 0)
-                        })
-                
-                if len(methods_data) > 1:
-                    first_method = methods_data[0]
-                    consistent = all(
-                        m['instances'] == first_method['instances'] and 
-                        m['as_instances'] == first_method['as_instances']
-                        for m in methods_data
-                    )
-                    
-                    result['consistency_analysis'] = {
-                        'all_methods_consistent': consistent,
-                        'methods_tested': [m['name'] for m in methods_data],
-                        'instances_found_per_method': {m['name']: m['instances'] for m in methods_data},
-                        'as_instances_found_per_method': {m['name']: m['as_instances'] for m in methods_data}
-                    }
-                
-                # Recommendations
-                if ultra_fast_time < standard_time * 0.1:  # 10x faster
-                    result['recommendations'].append("Ultra-fast method is dramatically faster - strongly recommended")
-                elif ultra_fast_time < standard_time * 0.5:  # 2x faster
-                    result['recommendations'].append("Ultra-fast method provides significant performance improvement")
-                
-                if result['consistency_analysis'].get('all_methods_consistent', False):
-                    result['recommendations'].append("All methods return consistent results - ultra-fast method is safe to use")
+            
+            # Consistency check across all successful methods
+            methods_data = [
+                {'name': name, 'instances': m.get('instances_found', 0), 'as_instances': m.get('as_instances_found', 0)}
+                for name, m in metrics.items() if m.get('success')
+            ]
+            if len(methods_data) > 1:
+                first_method = methods_data[0]
+                consistent = all(
+                    m['instances'] == first_method['instances'] and 
+                    m['as_instances'] == first_method['as_instances']
+                    for m in methods_data
+                )
+                result['consistency_analysis'] = {
+                    'all_methods_consistent': consistent,
+                    'methods_tested': [m['name'] for m in methods_data],
+                    'instances_found_per_method': {m['name']: m['instances'] for m in methods_data},
+                    'as_instances_found_per_method': {m['name']: m['as_instances'] for m in methods_data}
+                }
+                if consistent:
+                    result['recommendations'].append("All methods return consistent results - the unified detector is safe to use")
                 else:
-                    result['recommendations'].append("Results differ between methods - investigate detection logic")
+                    result['recommendations'].append("Results differ between methods - the legacy detectors pair Desktop and "
+                                                     "Analysis Services processes heuristically, the unified detector by parent process")
+            
+            if incremental.get('success'):
+                result['recommendations'].append("Repeated detections with the unified detector only inspect new processes")
             
             result['summary'] = {
-                'recommended_method': 'ultra_fast_optimized' if ultra_fast_metrics.get('success') else 'fast_netstat',
+                'recommended_method': 'unified_incremental',
                 'performance_tested': True,
                 'consistency_verified': result.get('consistency_analysis', {}).get('all_methods_consistent', False),
                 'best_time_ms': min([
                     m.get('detection_time_ms', float('inf')) 
-                    for m in result['performance_metrics'].values() 
+                    for m in metrics.values() 
                     if m.get('success')
                 ], default=0)
             }
             
-            return json.dumps(result, indent=2)
+            return encode_response(result, "compare_powerbi_detection_methods")
             
         except Exception as e:
-            return json.dumps({
+            return encode_response({
                 'success': False,
                 'error': f'Error comparing detection methods: {str(e)}',
                 'error_type': 'detection_comparison_error'
-            })
+            }, "compare_powerbi_detection_methods")
@@ -0,0 +1,273 @@
+"""
+Unified Power BI Desktop Detection
+
+Keeps an incrementally updated view of running ``PBIDesktop.exe`` and
+``msmdsrv.exe`` processes and the ports their Analysis Services engines
+listen on. Every detection lists the current PIDs (cheap) and only inspects
+processes that appeared since the previous detection; processes that exited
+are dropped. Listening ports are looked up per engine process, once it is
+found, instead of scanning the whole TCP table with netstat. When the PID set
+is unchanged and every engine has a port, the previous result is returned
+without touching any process.
+
+Desktop instances are paired with their engine through the parent PID
+(``msmdsrv.exe`` is started by ``PBIDesktop.exe``).
+
+The process source is pluggable (see ``PsutilProcessTable``) so the detector
+can be driven by a fake process table, e.g. by
+``testing/benchmark_powerbi_detection.py``.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+DESKTOP_PROCESS_NAME = "PBIDesktop.exe"
+ENGINE_PROCESS_NAME = "msmdsrv.exe"
+
+# Command line markers of an Analysis Services engine started by Power BI Desktop
+_DESKTOP_ENGINE_MARKERS = ("analysisservicesworkspace", "pbidesktop", "power bi desktop", "powerbi")
+
+_GONE = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess)
+
+
+class PsutilProcessTable:
+    """
+    The running processes, read through psutil.
+
+    Any object with the same three methods can be passed to
+    ``UnifiedPowerBIDesktopDetector`` instead.
+    """
+
+    def pids(self) -> Iterable[int]:
+        return psutil.pids()
+
+    def name(self, pid: int) -> Optional[str]:
+        """Process name, or None if the process is gone or not accessible"""
+        try:
+            return psutil.Process(pid).name()
+        except _GONE:
+            return None
+
+    def details(self, pid: int) -> Optional[Dict[str, Any]]:
+        """``ppid``, ``cmdline`` (list) and ``create_time``, or None if the process is gone or not accessible"""
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                return {"ppid": process.ppid(), "cmdline": process.cmdline(), "create_time": process.create_time()}
+        except _GONE:
+            return None
+
+    def listening_ports(self, pid: int) -> List[int]:
+        """TCP ports the process listens on"""
+        try:
+            process = psutil.Process(pid)
+            # net_connections() replaced connections() in psutil 6
+            connections = getattr(process, "net_connections", process.connections)(kind="tcp")
+        except _GONE:
+            return []
+        return sorted({conn.laddr.port for conn in connections if conn.status == psutil.CONN_LISTEN and conn.laddr})
+
+
+class UnifiedPowerBIDesktopDetector:
+    """
+    Incremental detector of Power BI Desktop instances and their Analysis Services ports.
+
+    Thread-safe; one instance is meant to live for the whole server process
+    (see ``get_powerbi_desktop_detector``).
+    """
+
+    def __init__(self, process_table: Optional[Any] = None):
+        self.process_table = process_table or PsutilProcessTable()
+        self._lock = threading.Lock()
+        self._known: Dict[int, Optional[str]] = {}      # Every PID seen -> its name (None if inaccessible)
+        self._desktops: Dict[int, Dict[str, Any]] = {}
+        self._engines: Dict[int, Dict[str, Any]] = {}
+        self._result: Optional[Dict[str, Any]] = None
+        self.stats = {"detections": 0, "rescans": 0, "processes_inspected": 0, "port_lookups": 0}
+
+    def detect(self, force_rescan: bool = False) -> Dict[str, Any]:
+        """
+        Current Power BI Desktop instances, updating the view from processes that started or exited.
+
+        Args:
+            force_rescan: Forget the current view and inspect every process again
+
+        Returns:
+            Dictionary in the shape of the other detectors' results
+            (``powerbi_desktop_instances``, ``analysis_services_instances``,
+            ``performance_info``, ...)
+        """
+        with self._lock:
+            started = time.perf_counter()
+            self.stats["detections"] += 1
+            if force_rescan:
+                self._forget()
+            try:
+                pids = set(self.process_table.pids())
+                added = pids.difference(self._known)
+                removed = set(self._known).difference(pids)
+                unresolved = [pid for pid, engine in self._engines.items() if engine["port"] is None]
+
+                if self._result is not None and not added and not removed and not unresolved:
+                    self._result["performance_info"].update(
+                        detection_time_ms=round((time.perf_counter() - started) * 1000, 3), rescanned=False,
+                        processes_inspected=0, processes_exited=0)
+                    return self._result
+
+                self.stats["rescans"] += 1
+                for pid in removed:
+                    del self._known[pid]
+                    self._desktops.pop(pid, None)
+                    self._engines.pop(pid, None)
+                # Name every new process first, so an engine's parent is known when it is classified
+                for pid in added:
+                    self._known[pid] = self.process_table.name(pid)
+                self.stats["processes_inspected"] += len(added)
+                for pid in added:
+                    if self._known[pid] in (DESKTOP_PROCESS_NAME, ENGINE_PROCESS_NAME):
+                        self._inspect(pid, self._known[pid])
+                for pid, engine in self._engines.items():
+                    if engine["port"] is None:
+                        self._resolve_port(engine)
+
+                self._result = self._build_result(started, len(added), len(removed), len(pids))
+                return self._result
+            except Exception as e:
+                logger.error(f"Power BI Desktop detection failed: {e}")
+                self._forget()
+                return {
+                    'success': False,
+                    'error': f'Power BI Desktop detection failed: {str(e)}',
+                    'powerbi_desktop_instances': [],
+                    'analysis_services_instances': [],
+                    'detection_method': 'unified_incremental_failed'
+                }
+
+    def clear_cache(self) -> None:
+        """Forget the current view; the next detection inspects every process again."""
+        with self._lock:
+            self._forget()
+
+    def _forget(self) -> None:
+        self._known.clear()
+        self._desktops.clear()
+        self._engines.clear()
+        self._result = None
+
+    def _inspect(self, pid: int, name: str) -> None:
+        details = self.process_table.details(pid) or {}
+        cmdline = details.get("cmdline") or []
+        cmdline_str = ' '.join(cmdline)
+        if name == DESKTOP_PROCESS_NAME:
+            self._desktops[pid] = {
+                'process_name': DESKTOP_PROCESS_NAME,
+                'pid': pid,
+                'cmdline': cmdline_str,
+                'create_time': details.get("create_time"),
+                'file_path': next((arg for arg in cmdline if arg.lower().endswith('.pbix')), None),
+            }
+            return
+        parent_is_desktop = self._known.get(details.get("ppid")) == DESKTOP_PROCESS_NAME
+        if not parent_is_desktop and not any(marker in cmdline_str.lower() for marker in _DESKTOP_ENGINE_MARKERS):
+            return
+        self._engines[pid] = {
+            'process_name': ENGINE_PROCESS_NAME,
+            'pid': pid,
+            'parent_pid': details.get("ppid"),
+            'port': None,
+            'cmdline': cmdline_str,
+            'is_powerbi_desktop': True,
+            'connection_string': None,
+        }
+
+    def _resolve_port(self, engine: Dict[str, Any]) -> None:
+        self.stats["port_lookups"] += 1
+        ports = self.process_table.listening_ports(engine["pid"])
+        if ports:
+            # Desktop engines listen on one dynamic port; prefer it over anything else the process opened
+            port = next((p for p in ports if p > 50000), ports[0])
+            engine.update(port=port, connection_string=f"Data Source=localhost:{port}", verified_listening=True)
+
+    def _build_result(self, started: float, added: int, removed: int, process_count: int) -> Dict[str, Any]:
+        engines = sorted(self._engines.values(), key=lambda engine: engine["pid"])
+        unpaired = [engine for engine in engines if engine["parent_pid"] not in self._desktops]
+        instances = []
+        paired_engines = set()
+        for desktop in sorted(self._desktops.values(), key=lambda desktop: desktop["pid"]):
+            engine = next((e for e in engines if e["parent_pid"] == desktop["pid"]), None)
+            if engine is None:
+                # Parent unknown (e.g. access denied): fall back to the first unpaired engine with a port
+                engine = next((e for e in unpaired if e.get("port") and e["pid"] not in paired_engines), None)
+            instance = {**desktop, 'analysis_services_port': None, 'connection_string': None}
+            if engine is not None:
+                paired_engines.add(engine["pid"])
+                instance.update(analysis_services_port=engine["port"], connection_string=engine["connection_string"],
+                                analysis_services_info=engine)
+            instances.append(instance)
+        for engine in engines:
+            if engine["pid"] not in paired_engines:
+                instances.append({
+                    'process_name': 'Analysis Services (Power BI Desktop)',
+                    'pid': engine['pid'],
+                    'cmdline': engine['cmdline'],
+                    'create_time': None,
+                    'analysis_services_port': engine.get('port'),
+                    'connection_string': engine.get('connection_string'),
+                    'file_path': None,
+                    'analysis_services_info': engine
+                })
+
+        detection_time = (time.perf_counter() - started) * 1000
+        return {
+            'success': True,
+            'powerbi_desktop_instances': instances,
+            'analysis_services_instances': engines,
+            'total_instances': len(instances),
+            'total_as_instances': len(engines),
+            'detection_method': 'unified_incremental',
+            'performance_info': {
+                'detection_time_ms': round(detection_time, 3),
+                'method_used': 'incremental pid set + per-process ports',
+                'rescanned': True,
+                'processes_running': process_count,
+                'processes_inspected': added,
+                'processes_exited': removed,
+                'pbi_processes_found': len(self._desktops),
+                'as_processes_found': len(engines),
+            },
+            'instructions': {
+                'connection_usage': 'Use the connection_string to connect to local Power BI Desktop models',
+                'port_info': 'Power BI Desktop typically uses dynamic ports above 50000',
+                'refresh': 'Repeated detections only inspect processes started since the last one; pass force_rescan=True to start over',
+                'testing': 'Use test_powerbi_desktop_connection(port) to verify connectivity'
+            }
+        }
+
+
+_detector: Optional[UnifiedPowerBIDesktopDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_powerbi_desktop_detector() -> UnifiedPowerBIDesktopDetector:
+    """Return the process-wide detector, whose view is kept between tool calls."""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = UnifiedPowerBIDesktopDetector()
+        return _detector
+
+
+def detect_powerbi_desktop_instances_unified(force_rescan: bool = False) -> Dict:
+    """
+    Detect Power BI Desktop instances with the shared incremental detector.
+
+    Returns:
+        Dictionary with detected instances and performance metrics
+    """
+    return get_powerbi_desktop_detector().detect(force_rescan)